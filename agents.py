@@ -28,8 +28,10 @@ def create_product_manager() -> Agent:
         backstory="""You are an experienced Product Manager with 10+ years in software development.
         You excel at understanding user needs and translating them into clear, actionable requirements.
 
-        IMPORTANT: Before creating the PRD, use the retrieve_context tool to search the knowledge base
-        for similar projects, PRD templates, and best practices. This will help you create better requirements.
+        IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, base your work on it and
+        use the retrieve_context tool only if the provided context is insufficient. Otherwise, before
+        creating the PRD, use retrieve_context to search the knowledge base for similar projects,
+        PRD templates, and best practices.
 
         You always include:
         - Project goals and objectives
@@ -63,7 +65,9 @@ def create_architect() -> Agent:
         goal="Design robust, scalable software architectures based on requirements",
         backstory="""You are a Senior Software Architect with expertise in system design.
 
-        IMPORTANT: Use the retrieve_context tool to search for:
+        IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, use it directly and
+        call retrieve_context only if the provided context is insufficient. Otherwise, use the
+        retrieve_context tool to search for:
         - Software architecture best practices
         - Design patterns relevant to the project
         - Technology stack recommendations
@@ -102,7 +106,9 @@ def create_engineer() -> Agent:
         goal="Implement high-quality, well-tested code based on architecture and requirements",
         backstory="""You are a Senior Software Engineer with expertise in multiple programming languages.
 
-        IMPORTANT: Use the retrieve_context tool to search for:
+        IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, use it directly and
+        call retrieve_context only if the provided context is insufficient. Otherwise, use the
+        retrieve_context tool to search for:
         - Code examples and patterns for the technologies you're using
         - Coding standards and best practices
         - Design pattern implementations
@@ -135,7 +141,10 @@ def create_qa_engineer() -> Agent:
     """
     QA Engineer: Tests and validates the code.
     Additional agent for quality assurance.
+    Uses the workspace index to retrieve only the relevant code.
     """
+    from rag import search_workspace_tool
+
     return Agent(
         role="QA Engineer",
         goal="Ensure software quality through comprehensive testing and validation",
@@ -145,8 +154,11 @@ def create_qa_engineer() -> Agent:
         - Unit tests
         - Integration tests
         - Manual test scenarios
-        You identify edge cases and potential issues before they reach production.""",
-        tools=[file_reader_tool, file_writer_tool, directory_reader_tool],
+        You identify edge cases and potential issues before they reach production.
+
+        IMPORTANT: Use the search_workspace tool to retrieve the specific functions and
+        sections you need to test instead of reading whole files.""",
+        tools=[file_reader_tool, file_writer_tool, directory_reader_tool, search_workspace_tool],
         verbose=config.AGENT_CONFIG["verbose"],
         allow_delegation=False,
     )
@@ -156,7 +168,10 @@ def create_tech_writer() -> Agent:
     """
     Technical Writer: Creates documentation.
     Ensures project has comprehensive documentation.
+    Uses the workspace index to retrieve only the relevant code and sections.
     """
+    from rag import search_workspace_tool
+
     return Agent(
         role="Technical Writer",
         goal="Create clear, comprehensive documentation for the project",
@@ -167,8 +182,11 @@ def create_tech_writer() -> Agent:
         - User guides
         - Installation instructions
         - Contributing guidelines
-        Your documentation helps users and developers understand and use the software effectively.""",
-        tools=[file_writer_tool, file_reader_tool, directory_reader_tool],
+        Your documentation helps users and developers understand and use the software effectively.
+
+        IMPORTANT: Use the search_workspace tool to retrieve the specific functions and
+        document sections you need instead of reading whole files.""",
+        tools=[file_writer_tool, file_reader_tool, directory_reader_tool, search_workspace_tool],
         verbose=config.AGENT_CONFIG["verbose"],
         allow_delegation=False,
     )
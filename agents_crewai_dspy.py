@@ -13,7 +13,8 @@ from tools import (
     directory_reader_tool,
     directory_creator_tool,
 )
-from rag import knowledge_base_tools
+from rag import knowledge_base_tools, search_workspace_tool
+from metrics import register_section
 import config
 
 
@@ -118,6 +119,11 @@ todo_cli/
 """
 
 
+# Label the few-shot blocks in the per-section prompt token counts
+register_section("few_shot:PRD_EXAMPLE", PRD_EXAMPLE)
+register_section("few_shot:ARCHITECTURE_EXAMPLE", ARCHITECTURE_EXAMPLE)
+
+
 # ============================================================================
 # CrewAI Agents with DSPy-Enhanced Prompts
 # ============================================================================
@@ -133,8 +139,10 @@ def create_product_manager() -> Agent:
     enhanced_backstory = f"""You are an experienced Product Manager with 10+ years in software development.
 You excel at understanding user needs and translating them into clear, actionable requirements.
 
-IMPORTANT: Before creating the PRD, use the retrieve_context tool to search the knowledge base
-for similar projects, PRD templates, and best practices. This will help you create better requirements.
+IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, base your work on it and
+use the retrieve_context tool only if the provided context is insufficient. Otherwise, before
+creating the PRD, use retrieve_context to search the knowledge base for similar projects,
+PRD templates, and best practices.
 
 Here is an example of an EXCELLENT PRD that you should use as inspiration:
 {PRD_EXAMPLE}
@@ -175,7 +183,9 @@ def create_architect() -> Agent:
     # Enhanced backstory with DSPy few-shot example
     enhanced_backstory = f"""You are a Senior Software Architect with expertise in system design.
 
-IMPORTANT: Use the retrieve_context tool to search for:
+IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, use it directly and
+call retrieve_context only if the provided context is insufficient. Otherwise, use the
+retrieve_context tool to search for:
 - Software architecture best practices
 - Design patterns relevant to the project
 - Technology stack recommendations
@@ -219,7 +229,9 @@ def create_engineer() -> Agent:
 
     enhanced_backstory = """You are a Senior Software Engineer with expertise in multiple programming languages.
 
-IMPORTANT: Use the retrieve_context tool to search for:
+IMPORTANT: If your task includes a KNOWLEDGE BASE CONTEXT section, use it directly and
+call retrieve_context only if the provided context is insufficient. Otherwise, use the
+retrieve_context tool to search for:
 - Code examples and patterns for the technologies you're using
 - Coding standards and best practices
 - Design pattern implementations
@@ -283,13 +295,16 @@ Your testing approach should include:
    - Assertions and expected outcomes
 
 You identify edge cases and potential issues before they reach production.
-Your test documentation should be detailed enough that anyone can execute the tests."""
+Your test documentation should be detailed enough that anyone can execute the tests.
+
+Use the search_workspace tool to retrieve the specific functions you need to test
+instead of reading whole files."""
 
     return Agent(
         role="QA Engineer",
         goal="Ensure software quality through comprehensive testing and validation with detailed test plans",
         backstory=enhanced_backstory,
-        tools=[file_reader_tool, file_writer_tool, directory_reader_tool],
+        tools=[file_reader_tool, file_writer_tool, directory_reader_tool, search_workspace_tool],
         verbose=config.AGENT_CONFIG["verbose"],
         allow_delegation=False,
         llm=config.get_llm(),  # ← LLM configurado para AgentOps tracking
@@ -326,13 +341,16 @@ Your documentation should include:
    - Example usage with curl or code
 
 Your documentation helps users and developers understand and use the software effectively.
-Write for beginners - assume no prior knowledge of the project."""
+Write for beginners - assume no prior knowledge of the project.
+
+Use the search_workspace tool to retrieve the specific functions and sections you need
+instead of reading whole files."""
 
     return Agent(
         role="Technical Writer",
         goal="Create clear, comprehensive documentation that makes the project accessible to all users",
         backstory=enhanced_backstory,
-        tools=[file_writer_tool, file_reader_tool, directory_reader_tool],
+        tools=[file_writer_tool, file_reader_tool, directory_reader_tool, search_workspace_tool],
         verbose=config.AGENT_CONFIG["verbose"],
         allow_delegation=False,
         llm=config.get_llm(),  # ← LLM configurado para AgentOps tracking
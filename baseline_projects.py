@@ -0,0 +1,37 @@
+# baseline_projects.py
+"""
+Projects used by the baseline batches.
+
+Shared by the sequential baselines (tests/test_baseline.py,
+tests/test_baseline_no_rag.py) and the parallel runner (batch_runner.py),
+so every variant runs the same projects.
+"""
+
+# 5 projetos de teste para baseline
+TEST_PROJECTS = [
+    {
+        "id": "project_01",
+        "name": "Todo List CLI",
+        "description": "crie uma aplicação CLI para gerenciar lista de tarefas com comandos add, list, done e delete",
+    },
+    {
+        "id": "project_02",
+        "name": "URL Shortener API",
+        "description": "crie uma API REST para encurtar URLs com endpoints para criar, listar e redirecionar",
+    },
+    {
+        "id": "project_03",
+        "name": "Weather CLI",
+        "description": "crie uma ferramenta CLI que consulta API de clima e mostra previsão formatada",
+    },
+    {
+        "id": "project_04",
+        "name": "Password Generator",
+        "description": "crie um gerador de senhas seguras CLI com opções de tamanho, caracteres especiais e força",
+    },
+    {
+        "id": "project_05",
+        "name": "Markdown to HTML Converter",
+        "description": "crie um conversor de Markdown para HTML com suporte a títulos, listas e links",
+    },
+]
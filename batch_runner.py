@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Parallel baseline batches: projects × repetitions on a process pool.
+
+The sequential baselines (tests/test_baseline*.py) take the sum of all
+project runtimes. Here every run is a job in a ProcessPoolExecutor
+("spawn": workers inherit no state from the parent):
+- isolation: each run gets its own workspace, output directory and
+  workspace index, and a fresh MetricsTracker. Worker trackers stream to
+  segments/segment-<pid>.jsonl, so MetricsAggregator shows the whole
+  batch live (metrics/aggregate.py);
+- one LLM rate limit shared by all workers (metrics/rate_limit.py), on top
+  of the per-crew max_rpm;
+- results stream to disk as runs finish: projects/<run_id>.json per run
+  and one line per run in results.jsonl. --resume skips runs that already
+  succeeded;
+- baseline_report.json has the schema of the sequential baselines
+  (metrics.build_baseline_report).
+
+Layout of a batch directory:
+    runs/<run_id>/workspace/    files written by the agents
+    runs/<run_id>/run.log       stdout/stderr of the run
+    projects/<run_id>.json      per-run metrics (+ .trace.json)
+    segments/                   live metrics of every worker
+    results.jsonl               one status line per finished run
+    baseline_report.json        consolidated report
+
+Usage:
+    python batch_runner.py --variant rag --workers 4 --repetitions 3 --rpm 60
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+import config
+from baseline_projects import TEST_PROJECTS
+from metrics import (reset_tracker, attach_segment, build_baseline_report,
+                     BudgetExceededError, SharedRateLimiter)
+from metrics.rate_limit import install_crewai_rate_limit_hook
+
+
+class Variant(NamedTuple):
+    """How to run one crew variant and label its report."""
+    runner: str                      # "module:function" taking the project idea
+    report_type: str
+    rag: bool = False                # knowledge base indexed before the pool starts
+    setup: Optional[str] = None      # "module:function" run once per worker
+    report_fields: Optional[Dict[str, Any]] = None
+
+
+VARIANTS = {
+    "rag": Variant("crew:run_software_dev_crew", "baseline", rag=True),
+    "no_rag": Variant("crew_no_rag:run_software_dev_crew", "baseline_no_rag",
+                      report_fields={"rag_enabled": False}),
+    "dspy": Variant("crew_crewai_dspy:run_software_dev_crew_dspy", "baseline_crewai_dspy",
+                    rag=True, setup="dspy_config:configure_dspy"),
+}
+
+
+def _resolve(spec: str):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    """Write via a temporary file, so readers never see a partial file."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    tmp.replace(path)
+
+
+def plan_jobs(projects: Sequence[Dict[str, Any]], repetitions: int, runner: str) -> List[Dict]:
+    """One job per project and repetition, repetitions outermost."""
+    return [
+        {"project": project, "repetition": repetition, "runner": runner,
+         "run_id": f"{project['id']}-r{repetition:02d}"}
+        for repetition in range(1, repetitions + 1)
+        for project in projects
+    ]
+
+
+# --- worker side -------------------------------------------------------------
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(batch_dir: str, limiter: Optional[SharedRateLimiter], setup: Optional[str]):
+    _worker["batch_dir"] = Path(batch_dir)
+    if limiter is not None:
+        install_crewai_rate_limit_hook(limiter)
+    if setup:
+        _resolve(setup)()
+
+
+def _isolate(run_dir: Path) -> Path:
+    """Point the tools, partial outputs and workspace index at this run."""
+    workspace = run_dir / "workspace"
+    workspace.mkdir(parents=True, exist_ok=True)
+    config.WORKSPACE_DIR = workspace
+    config.OUTPUT_DIR = run_dir / "output"
+    config.OUTPUT_DIR.mkdir(exist_ok=True)
+    workspace_index = sys.modules.get("rag.workspace_index")
+    if workspace_index is not None:
+        workspace_index.deactivate_workspace_index()
+        workspace_index.WORKSPACE_PERSIST_DIR = str(run_dir / "vector_db")
+    return workspace
+
+
+def _project_result(job: Dict[str, Any], **fields) -> Dict[str, Any]:
+    project = job["project"]
+    return {
+        "project_id": project["id"],
+        "project_name": project["name"],
+        "description": project["description"],
+        "timestamp": datetime.now().isoformat(),
+        **fields,
+        "repetition": job["repetition"],
+        "run_id": job["run_id"],
+        "worker_pid": os.getpid(),
+    }
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one project in this worker; returns the per-project metrics."""
+    batch_dir = _worker["batch_dir"]
+    run_dir = batch_dir / "runs" / job["run_id"]
+    runner = _resolve(job["runner"])
+    workspace = _isolate(run_dir)
+
+    tracker = reset_tracker()
+    attach_segment(tracker, batch_dir / "segments")
+    start_time = time.time()
+    with open(run_dir / "run.log", "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            runner(job["project"]["description"])
+            result = _project_result(job, duration_seconds=time.time() - start_time,
+                                     status="success", metrics=tracker.get_summary())
+        except Exception as e:
+            budget_exceeded = isinstance(e, BudgetExceededError)
+            result = _project_result(
+                job, duration_seconds=time.time() - start_time, status="failed",
+                error=str(e), budget_exceeded=budget_exceeded,
+                # Budget stop: partial metrics up to the limit
+                metrics=tracker.get_summary() if budget_exceeded else None,
+            )
+    result["workspace"] = str(workspace)
+    tracker.close()
+
+    metrics_file = batch_dir / "projects" / f"{job['run_id']}.json"
+    tracker.trace().export_chrome_trace(metrics_file.with_suffix(".trace.json"))
+    _write_json(metrics_file, result)
+    return result
+
+
+# --- parent side -------------------------------------------------------------
+
+def _load_finished(batch_dir: Path, jobs: Sequence[Dict]) -> Dict[str, Dict]:
+    finished = {}
+    for job in jobs:
+        path = batch_dir / "projects" / f"{job['run_id']}.json"
+        if path.exists():
+            result = json.loads(path.read_text())
+            if result.get("status") == "success":
+                finished[job["run_id"]] = result
+    return finished
+
+
+def _status_line(result: Dict[str, Any]) -> Dict[str, Any]:
+    summary = (result.get("metrics") or {}).get("summary", {})
+    return {
+        "run_id": result["run_id"],
+        "project_id": result["project_id"],
+        "repetition": result["repetition"],
+        "status": result["status"],
+        "duration_seconds": result["duration_seconds"],
+        "total_cost": summary.get("total_cost", 0.0),
+        "total_tokens": summary.get("total_tokens", 0),
+        "error": result.get("error"),
+    }
+
+
+def run_batch(variant: Union[str, Variant] = "rag",
+              projects: Optional[Sequence[Dict[str, Any]]] = None,
+              repetitions: int = 1,
+              workers: Optional[int] = None,
+              rpm: Optional[float] = None,
+              batch_dir: Optional[Union[str, Path]] = None,
+              resume: bool = False) -> Dict[str, Any]:
+    """
+    Run projects × repetitions on a process pool and save the report.
+
+    Args:
+        variant: Key of VARIANTS or a Variant
+        projects: Default TEST_PROJECTS
+        workers: Pool size (default: BATCH_CONFIG)
+        rpm: LLM requests per minute shared by all workers (0/None = no limit)
+        batch_dir: Default <BATCH_CONFIG output_dir>/<variant>_<timestamp>
+        resume: Skip runs of batch_dir that already succeeded
+
+    Returns:
+        dict: The consolidated report (also saved as baseline_report.json)
+    """
+    name = variant if isinstance(variant, str) else variant.report_type
+    variant = VARIANTS[variant] if isinstance(variant, str) else variant
+    jobs = plan_jobs(projects or TEST_PROJECTS, repetitions, variant.runner)
+    batch_dir = Path(batch_dir or Path(config.BATCH_CONFIG["output_dir"])
+                     / f"{name}_{datetime.now():%Y%m%d_%H%M%S}")
+    (batch_dir / "projects").mkdir(parents=True, exist_ok=True)
+
+    results = _load_finished(batch_dir, jobs) if resume else {}
+    pending = [job for job in jobs if job["run_id"] not in results]
+    workers = max(1, min(workers or config.BATCH_CONFIG["workers"], len(pending) or 1))
+    context = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(rpm, context=context) if rpm else None
+
+    print(f"🚀 {len(pending)} runs on {workers} workers"
+          + (f" ({len(results)} already done)" if results else "")
+          + (f", {rpm:g} LLM requests/min shared" if rpm else ""))
+    print(f"📁 Batch directory: {batch_dir}")
+
+    batch_start = time.time()
+    with open(batch_dir / "results.jsonl", "a", encoding="utf-8") as stream, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                initializer=_init_worker,
+                                initargs=(str(batch_dir), limiter, variant.setup)) as pool:
+        futures = {pool.submit(run_job, job): job for job in pending}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker died (crash, BrokenProcessPool): record the run as failed
+                    result = _project_result(job, duration_seconds=0.0, status="failed",
+                                             error=f"{type(e).__name__}: {e}",
+                                             budget_exceeded=False, metrics=None)
+                    _write_json(batch_dir / "projects" / f"{job['run_id']}.json", result)
+                results[job["run_id"]] = result
+                stream.write(json.dumps(_status_line(result)) + "\n")
+                stream.flush()
+                mark = "✅" if result["status"] == "success" else "❌"
+                print(f"{mark} [{done}/{len(pending)}] {job['run_id']} "
+                      f"{result['duration_seconds']:.1f}s")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    report = build_baseline_report(
+        [results[job["run_id"]] for job in jobs], time.time() - batch_start,
+        report_type=variant.report_type, **(variant.report_fields or {}),
+    )
+    _write_json(batch_dir / "baseline_report.json", report)
+    return report
+
+
+def initialize_rag() -> bool:
+    """Index the knowledge base once, before the workers open it."""
+    from rag import setup_knowledge_base
+
+    kb_path = Path(config.RAG_CONFIG["knowledge_base_dir"])
+    if not kb_path.exists():
+        print("⚠️  Knowledge base not found - RAG disabled")
+        return False
+    try:
+        stats = setup_knowledge_base(str(kb_path)).get_stats()
+        print(f"✅ RAG initialized: {stats['total_documents']} documents")
+        return True
+    except Exception as e:
+        print(f"⚠️  Error initializing RAG: {e}")
+        return False
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="rag")
+    parser.add_argument("--workers", type=int, default=config.BATCH_CONFIG["workers"])
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--rpm", type=float, default=config.BATCH_CONFIG["rpm"],
+                        help="LLM requests per minute shared by all workers (0 = no limit)")
+    parser.add_argument("--projects", nargs="+", metavar="ID",
+                        help="Subset of TEST_PROJECTS (default: all)")
+    parser.add_argument("--batch-dir", help="Output directory (reuse with --resume)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip runs of --batch-dir that already succeeded")
+    args = parser.parse_args(argv)
+
+    projects = [p for p in TEST_PROJECTS if not args.projects or p["id"] in args.projects]
+    if not projects:
+        print(f"❌ No project matches {args.projects}")
+        return 1
+    if VARIANTS[args.variant].rag:
+        initialize_rag()
+
+    try:
+        report = run_batch(args.variant, projects, args.repetitions, args.workers,
+                           args.rpm, args.batch_dir, args.resume)
+    except KeyboardInterrupt:
+        print("\n⚠️  Batch interrupted - finished runs are kept (use --resume)")
+        return 130
+
+    stats = report["aggregated_stats"]
+    print()
+    print("=" * 80)
+    print(f"📊 {report['successful_projects']}/{report['total_projects']} runs succeeded "
+          f"in {report['batch_duration_seconds']:.1f}s")
+    print(f"💰 Total cost: ${stats['total_cost']:.4f}")
+    print(f"🎫 Total tokens: {stats['total_tokens']:,}")
+    print(f"⏱️  Average duration per run: {stats['avg_duration_per_project']:.1f}s")
+    print("=" * 80)
+    return 0 if report["failed_projects"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
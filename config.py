@@ -52,17 +52,84 @@ CREW_CONFIG = {
     "max_rpm": 10,  # Rate limiting
 }
 
+# RAG Configuration
+RAG_CONFIG = {
+    "knowledge_base_dir": "knowledge_base",
+    # Observa knowledge_base/ e atualiza o índice em tempo real
+    "watch_knowledge_base": os.getenv("RAG_WATCH_KB", "false").lower() == "true",
+    "watch_debounce_seconds": float(os.getenv("RAG_WATCH_DEBOUNCE", "1.0")),
+    "watch_poll_interval": float(os.getenv("RAG_WATCH_POLL_INTERVAL", "2.0")),
+    # Busca o contexto das tasks antes do kickoff e injeta nas descrições
+    "prefetch_task_context": os.getenv("RAG_PREFETCH_CONTEXT", "true").lower() == "true",
+    "prefetch_top_k": int(os.getenv("RAG_PREFETCH_TOP_K", "3")),
+}
+
+# Metrics Configuration
+METRICS_CONFIG = {
+    # Sinks em streaming: jsonl, rotating, parquet (separados por vírgula) ou none
+    "sinks": os.getenv("METRICS_SINKS", "jsonl"),
+    "flush_interval": float(os.getenv("METRICS_FLUSH_INTERVAL", "5.0")),
+    "max_buffered_events": int(os.getenv("METRICS_MAX_BUFFERED", "10000")),
+    # OpenMetrics endpoint (http://<host>:<port>/metrics) for local scrapers; 0 = off
+    "exporter_port": int(os.getenv("METRICS_EXPORTER_PORT", "0")),
+    "exporter_host": os.getenv("METRICS_EXPORTER_HOST", "127.0.0.1"),
+    "exporter_max_label_values": int(os.getenv("METRICS_EXPORTER_MAX_LABEL_VALUES", "20")),
+}
+
+
+
+def _env_limit(name, cast=float):
+    """Optional numeric limit from the environment (unset or empty = no limit)."""
+    value = os.getenv(name, "").strip()
+    return cast(value) if value else None
+
+
+# Budget Configuration (metrics/budget.py): hard limits stop the run and save
+# partial outputs; at soft_fraction of a limit the agent's model is downgraded
+# and long history messages are compressed
+BUDGET_CONFIG = {
+    "run": {
+        "tokens": _env_limit("BUDGET_RUN_TOKENS", int),
+        "cost": _env_limit("BUDGET_RUN_COST"),
+        "llm_calls": _env_limit("BUDGET_RUN_LLM_CALLS", int),
+        "wall_seconds": _env_limit("BUDGET_RUN_WALL_SECONDS"),
+    },
+    "task": {
+        "tokens": _env_limit("BUDGET_TASK_TOKENS", int),
+        "cost": _env_limit("BUDGET_TASK_COST"),
+        "llm_calls": _env_limit("BUDGET_TASK_LLM_CALLS", int),
+        "wall_seconds": _env_limit("BUDGET_TASK_WALL_SECONDS"),
+    },
+    "soft_fraction": float(os.getenv("BUDGET_SOFT_FRACTION", "0.8")),
+    # downgrade, compress (comma-separated) or empty
+    "soft_actions": os.getenv("BUDGET_SOFT_ACTIONS", "downgrade,compress"),
+    "fallback_model": os.getenv("BUDGET_FALLBACK_MODEL", "gpt-4.1-nano"),
+    "compress_max_chars": int(os.getenv("BUDGET_COMPRESS_MAX_CHARS", "4000")),
+}
+
+# Parallel baseline batches (batch_runner.py)
+BATCH_CONFIG = {
+    "workers": int(os.getenv("BATCH_WORKERS", "4")),
+    # LLM requests per minute shared by all workers; 0 = no global limit
+    "rpm": float(os.getenv("BATCH_RPM", "60")),
+    "output_dir": os.getenv("BATCH_OUTPUT_DIR", "metrics/data/batches"),
+}
+
 
 def get_llm():
     """
     Get configured LLM for agents.
-    This ensures AgentOps can track LLM calls properly.
+    This ensures AgentOps can track LLM calls properly, and records latency,
+    tokens and cost of every call in the metrics tracker.
     """
     from langchain_openai import ChatOpenAI
+    from metrics.llm_hooks import MetricsCallbackHandler
 
     return ChatOpenAI(
         model=OPENAI_MODEL,
         temperature=AGENT_CONFIG["temperature"],
         max_tokens=AGENT_CONFIG["max_tokens"],
         api_key=OPENAI_API_KEY,
+        stream_usage=True,
+        callbacks=[MetricsCallbackHandler()],
     )
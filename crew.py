@@ -3,8 +3,18 @@
 Main Crew definition for the software development team.
 This is where AgentOps observability shines - everything is tracked automatically!
 """
+import json
+
 from crewai import Crew, Process
 from tasks import get_all_tasks
+from rag import activate_workspace_index
+from rag.prefetch import apply_task_contexts, start_task_context_prefetch
+from metrics.llm_hooks import install_crewai_llm_hooks
+from metrics.tracing import install_crewai_trace_hooks, span
+from metrics.token_attribution import install_crewai_prompt_hooks, register_crew
+from metrics.budget import enable_budget, save_partial_outputs
+from metrics.analysis import task_dependencies
+from metrics.metrics_tracker import get_tracker
 import config
 
 
@@ -21,6 +31,23 @@ def create_software_dev_crew(project_idea: str) -> Crew:
 
     All steps are automatically tracked by AgentOps!
     """
+    # Record latency, tokens and cost of every agent LLM call in the metrics,
+    # task/agent spans for the trace, and prompt tokens per section
+    install_crewai_llm_hooks()
+    install_crewai_trace_hooks()
+    install_crewai_prompt_hooks()
+
+    # Retrieve every task's knowledge base context concurrently, while the
+    # crew is being built, so agents don't spend a turn calling retrieve_context
+    prefetch = None
+    if config.RAG_CONFIG["prefetch_task_context"]:
+        prefetch = start_task_context_prefetch(
+            project_idea, top_k=config.RAG_CONFIG["prefetch_top_k"]
+        )
+
+    # Index files written by the crew into this project's workspace collection
+    activate_workspace_index(project_idea, config.WORKSPACE_DIR)
+
     # Get all tasks (tasks include their agents)
     tasks = get_all_tasks(project_idea)
 
@@ -32,6 +59,11 @@ def create_software_dev_crew(project_idea: str) -> Crew:
         memory=config.CREW_CONFIG["memory"],
         max_rpm=config.CREW_CONFIG["max_rpm"],
     )
+    # Join the prefetch only now that agents, tasks and crew exist
+    if prefetch:
+        apply_task_contexts(tasks, prefetch.result())
+    # Agent/task texts to label the sections of each prompt
+    register_crew(crew)
 
     return crew
 
@@ -45,6 +77,10 @@ def run_software_dev_crew(project_idea: str) -> dict:
 
     Returns:
         dict: Results from the crew execution
+
+    Raises:
+        BudgetExceededError: A hard budget limit stopped the run (the outputs
+            of the finished tasks are saved under output/)
     """
     print("=" * 80)
     print(f"🚀 Starting Software Development Crew")
@@ -52,9 +88,28 @@ def run_software_dev_crew(project_idea: str) -> dict:
     print("=" * 80)
     print()
 
-    # Create and run crew
-    crew = create_software_dev_crew(project_idea)
-    result = crew.kickoff()
+    # Token/cost/call/time limits, checked before every agent LLM call
+    budget = enable_budget(**config.BUDGET_CONFIG)
+
+    # Create and run crew; the spans nest tasks, agents, tools and LLM calls
+    with span("crew.run", kind="crew", project=project_idea[:200]) as run_span:
+        with span("crew.build", kind="crew"):
+            crew = create_software_dev_crew(project_idea)
+        # Task graph for the parallelism estimate of the run analysis
+        run_span.set_attribute("task_dependencies", json.dumps(task_dependencies(crew)))
+        try:
+            result = crew.kickoff()
+        except Exception:
+            if budget.exceeded is None:
+                raise
+            # Hard limit hit: keep what the finished tasks produced
+            partial_file = save_partial_outputs(
+                crew, config.OUTPUT_DIR / f"partial_{get_tracker().session_id}.json",
+                budget.exceeded,
+            )
+            print(f"\n🛑 {budget.exceeded}")
+            print(f"📁 Partial outputs saved to: {partial_file}")
+            raise budget.exceeded
 
     print()
     print("=" * 80)
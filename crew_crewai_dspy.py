@@ -7,6 +7,8 @@ This hybrid approach provides:
 3. Complete AgentOps tracking (tools, agents, tasks, LLM calls, costs)
 4. RAG integration for context enhancement
 """
+import json
+
 from crewai import Crew, Process, Task
 from agents_crewai_dspy import (
     create_product_manager,
@@ -15,6 +17,14 @@ from agents_crewai_dspy import (
     create_qa_engineer,
     create_tech_writer,
 )
+from rag import activate_workspace_index
+from rag.prefetch import apply_task_contexts, start_task_context_prefetch
+from metrics.llm_hooks import install_crewai_llm_hooks
+from metrics.tracing import install_crewai_trace_hooks, span
+from metrics.token_attribution import install_crewai_prompt_hooks, register_crew
+from metrics.budget import enable_budget, save_partial_outputs
+from metrics.analysis import task_dependencies
+from metrics.metrics_tracker import get_tracker
 import config
 
 
@@ -23,6 +33,16 @@ def create_tasks_dspy(project_idea: str) -> list[Task]:
     Create tasks with DSPy-enhanced descriptions.
     Tasks use the enhanced agents from agents_crewai_dspy.
     """
+    # The prefetched context is appended after the tasks are built
+    # (apply_task_contexts in create_software_dev_crew_dspy), and only if enabled
+    prefetched_step = ("the KNOWLEDGE BASE CONTEXT at the end of this description, if present; "
+                       "only if it is missing or insufficient")
+    prd_step = (f"review {prefetched_step}, use the retrieve_context tool "
+                "to search for similar PRDs and best practices")
+    arch_step = (f"Review {prefetched_step}, use retrieve_context tool "
+                 "to find architecture patterns and best practices")
+    impl_step = (f"Review {prefetched_step}, use retrieve_context tool "
+                 "to find code examples and patterns")
 
     # Task 1: Create PRD
     prd_task = Task(
@@ -31,7 +51,7 @@ def create_tasks_dspy(project_idea: str) -> list[Task]:
 PROJECT IDEA: {project_idea}
 
 INSTRUCTIONS:
-1. FIRST, use the retrieve_context tool to search for similar PRDs and best practices
+1. FIRST, {prd_step}
 2. THEN, create a PRD following the example structure you've been trained on
 
 Your PRD MUST include these sections:
@@ -66,11 +86,11 @@ Save the PRD to 'prd.md' using the file_writer tool.""",
 
     # Task 2: Design Architecture
     arch_task = Task(
-        description="""Based on the PRD, design a detailed system architecture.
+        description=f"""Based on the PRD, design a detailed system architecture.
 
 INSTRUCTIONS:
 1. Read the PRD from 'prd.md' using file_reader tool
-2. Use retrieve_context tool to find architecture patterns and best practices
+2. {arch_step}
 3. Design architecture following the example structure you've been trained on
 
 Your architecture document MUST include:
@@ -107,12 +127,12 @@ Save your architecture to 'architecture.md' using the file_writer tool.""",
 
     # Task 3: Implement Code
     impl_task = Task(
-        description="""Implement the core functionality based on the architecture and PRD.
+        description=f"""Implement the core functionality based on the architecture and PRD.
 
 INSTRUCTIONS:
 1. Read the PRD from 'prd.md'
 2. Read the architecture from 'architecture.md'
-3. Use retrieve_context tool to find code examples and patterns
+3. {impl_step}
 4. Create the project structure EXACTLY as specified in architecture
 5. Implement core features
 
@@ -137,7 +157,7 @@ Focus on quality over quantity - better to have 2 well-implemented features than
         description="""Create a comprehensive testing strategy and test cases.
 
 INSTRUCTIONS:
-1. Read the implementation files from the workspace
+1. Use search_workspace to retrieve the implemented functions from the workspace
 2. Understand what functionality was implemented
 3. Create thorough test documentation
 
@@ -175,7 +195,7 @@ Use file_writer tool to save all test documentation.""",
         description="""Create comprehensive project documentation.
 
 INSTRUCTIONS:
-1. Read ALL project files from workspace (PRD, architecture, implementation, tests)
+1. Use search_workspace to retrieve the relevant parts of the project files (PRD, architecture, implementation, tests)
 2. Create user-friendly documentation
 
 Your documentation MUST include:
@@ -235,6 +255,23 @@ def create_software_dev_crew_dspy(project_idea: str) -> Crew:
     - Tool calls
     - LLM calls and costs
     """
+    # Record latency, tokens and cost of every agent LLM call in the metrics,
+    # task/agent spans for the trace, and prompt tokens per section
+    install_crewai_llm_hooks()
+    install_crewai_trace_hooks()
+    install_crewai_prompt_hooks()
+
+    # Retrieve every task's knowledge base context concurrently, while the
+    # crew is being built, so agents don't spend a turn calling retrieve_context
+    prefetch = None
+    if config.RAG_CONFIG["prefetch_task_context"]:
+        prefetch = start_task_context_prefetch(
+            project_idea, top_k=config.RAG_CONFIG["prefetch_top_k"]
+        )
+
+    # Index files written by the crew into this project's workspace collection
+    activate_workspace_index(project_idea, config.WORKSPACE_DIR)
+
     tasks = create_tasks_dspy(project_idea)
 
     crew = Crew(
@@ -244,6 +281,11 @@ def create_software_dev_crew_dspy(project_idea: str) -> Crew:
         memory=config.CREW_CONFIG["memory"],
         max_rpm=config.CREW_CONFIG["max_rpm"],
     )
+    # Join the prefetch only now that agents, tasks and crew exist
+    if prefetch:
+        apply_task_contexts(tasks, prefetch.result())
+    # Agent/task texts to label the sections of each prompt
+    register_crew(crew)
 
     return crew
 
@@ -258,6 +300,10 @@ def run_software_dev_crew_dspy(project_idea: str) -> dict:
     Returns:
         dict: Results from the crew execution
 
+    Raises:
+        BudgetExceededError: A hard budget limit stopped the run (the outputs
+            of the finished tasks are saved under output/)
+
     This function:
     - Creates CrewAI crew with DSPy-enhanced agents
     - Executes all tasks sequentially
@@ -273,9 +319,28 @@ def run_software_dev_crew_dspy(project_idea: str) -> dict:
     print("=" * 80)
     print()
 
-    # Create and run crew
-    crew = create_software_dev_crew_dspy(project_idea)
-    result = crew.kickoff()
+    # Token/cost/call/time limits, checked before every agent LLM call
+    budget = enable_budget(**config.BUDGET_CONFIG)
+
+    # Create and run crew; the spans nest tasks, agents, tools and LLM calls
+    with span("crew.run", kind="crew", project=project_idea[:200]) as run_span:
+        with span("crew.build", kind="crew"):
+            crew = create_software_dev_crew_dspy(project_idea)
+        # Task graph for the parallelism estimate of the run analysis
+        run_span.set_attribute("task_dependencies", json.dumps(task_dependencies(crew)))
+        try:
+            result = crew.kickoff()
+        except Exception:
+            if budget.exceeded is None:
+                raise
+            # Hard limit hit: keep what the finished tasks produced
+            partial_file = save_partial_outputs(
+                crew, config.OUTPUT_DIR / f"partial_{get_tracker().session_id}.json",
+                budget.exceeded,
+            )
+            print(f"\n🛑 {budget.exceeded}")
+            print(f"📁 Partial outputs saved to: {partial_file}")
+            raise budget.exceeded
 
     print()
     print("=" * 80)
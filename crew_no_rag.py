@@ -4,8 +4,16 @@ Main Crew definition for the software development team - WITHOUT RAG.
 Version for baseline comparison (no knowledge base retrieval).
 This is where AgentOps observability shines - everything is tracked automatically!
 """
+import json
+
 from crewai import Crew, Process
 from tasks_no_rag import get_all_tasks
+from metrics.llm_hooks import install_crewai_llm_hooks
+from metrics.tracing import install_crewai_trace_hooks, span
+from metrics.token_attribution import install_crewai_prompt_hooks, register_crew
+from metrics.budget import enable_budget, save_partial_outputs
+from metrics.analysis import task_dependencies
+from metrics.metrics_tracker import get_tracker
 import config
 
 
@@ -22,6 +30,12 @@ def create_software_dev_crew(project_idea: str) -> Crew:
 
     All steps are automatically tracked by AgentOps!
     """
+    # Record latency, tokens and cost of every agent LLM call in the metrics,
+    # task/agent spans for the trace, and prompt tokens per section
+    install_crewai_llm_hooks()
+    install_crewai_trace_hooks()
+    install_crewai_prompt_hooks()
+
     # Get all tasks (tasks include their agents)
     tasks = get_all_tasks(project_idea)
 
@@ -33,6 +47,8 @@ def create_software_dev_crew(project_idea: str) -> Crew:
         memory=config.CREW_CONFIG["memory"],
         max_rpm=config.CREW_CONFIG["max_rpm"],
     )
+    # Agent/task texts to label the sections of each prompt
+    register_crew(crew)
 
     return crew
 
@@ -46,6 +62,10 @@ def run_software_dev_crew(project_idea: str) -> dict:
 
     Returns:
         dict: Results from the crew execution
+
+    Raises:
+        BudgetExceededError: A hard budget limit stopped the run (the outputs
+            of the finished tasks are saved under output/)
     """
     print("=" * 80)
     print(f"🚀 Starting Software Development Crew (NO RAG)")
@@ -53,9 +73,28 @@ def run_software_dev_crew(project_idea: str) -> dict:
     print("=" * 80)
     print()
 
-    # Create and run crew
-    crew = create_software_dev_crew(project_idea)
-    result = crew.kickoff()
+    # Token/cost/call/time limits, checked before every agent LLM call
+    budget = enable_budget(**config.BUDGET_CONFIG)
+
+    # Create and run crew; the spans nest tasks, agents, tools and LLM calls
+    with span("crew.run", kind="crew", project=project_idea[:200]) as run_span:
+        with span("crew.build", kind="crew"):
+            crew = create_software_dev_crew(project_idea)
+        # Task graph for the parallelism estimate of the run analysis
+        run_span.set_attribute("task_dependencies", json.dumps(task_dependencies(crew)))
+        try:
+            result = crew.kickoff()
+        except Exception:
+            if budget.exceeded is None:
+                raise
+            # Hard limit hit: keep what the finished tasks produced
+            partial_file = save_partial_outputs(
+                crew, config.OUTPUT_DIR / f"partial_{get_tracker().session_id}.json",
+                budget.exceeded,
+            )
+            print(f"\n🛑 {budget.exceeded}")
+            print(f"📁 Partial outputs saved to: {partial_file}")
+            raise budget.exceeded
 
     print()
     print("=" * 80)
@@ -5,9 +5,11 @@ Configures LM, retriever, and optimizers for prompt optimization.
 """
 import os
 import dspy
+from dspy.utils.callback import BaseCallback
 from pathlib import Path
 from typing import List, Optional
 import config
+from metrics.llm_hooks import LLMCallTimer
 
 
 class FAISSRetriever(dspy.Retrieve):
@@ -73,6 +75,47 @@ class FAISSRetriever(dspy.Retrieve):
             return []
 
 
+# Recent history entries searched for the entry of a finished call
+HISTORY_LOOKBACK = 64
+
+
+class MetricsLMCallback(BaseCallback):
+    """
+    DSPy callback that records every dspy.LM call in the metrics tracker.
+
+    Token usage and the resolved model come from the LM history entry that
+    the call appends (cache hits report no usage and cost nothing). The LM
+    may be shared by concurrent calls, so the entry is the one holding this
+    call's `outputs` object, not simply the last one.
+    """
+
+    def __init__(self, tracker=None):
+        self.timer = LLMCallTimer(tracker)
+        self._instances = {}
+
+    def on_lm_start(self, call_id, instance, inputs):
+        self._instances[call_id] = instance
+        self.timer.start(call_id, getattr(instance, "model", None))
+
+    def on_lm_end(self, call_id, outputs, exception=None):
+        instance = self._instances.pop(call_id, None)
+        if exception is not None or instance is None:
+            self.timer.discard(call_id)
+            return
+        entry = self._history_entry(instance, outputs)
+        self.timer.finish(call_id, entry.get("usage"), entry.get("model"))
+
+    @staticmethod
+    def _history_entry(instance, outputs) -> dict:
+        """History entry whose outputs are this call's ({} if not found)."""
+        history = getattr(instance, "history", None) or []
+        # Slice first: other calls may append (or trim) the history meanwhile
+        for entry in reversed(history[-HISTORY_LOOKBACK:]):
+            if entry.get("outputs") is outputs:
+                return entry
+        return {}
+
+
 def configure_dspy(
     model: str = None,
     temperature: float = 0.7,
@@ -97,6 +140,7 @@ def configure_dspy(
         api_key=config.OPENAI_API_KEY,
         temperature=temperature,
         max_tokens=max_tokens,
+        callbacks=[MetricsLMCallback()],
     )
 
     # Configure FAISS retriever
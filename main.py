@@ -29,8 +29,9 @@ from crew import run_software_dev_crew
 import config
 
 # Import RAG and metrics
-from rag import setup_knowledge_base
-from metrics import get_tracker, reset_tracker
+from rag import setup_knowledge_base, start_knowledge_base_watcher
+from metrics import (get_tracker, reset_tracker, create_sinks, enable_profiling,
+                     start_exporter, BudgetExceededError)
 
 def initialize_observability():
     """Initialize AgentOps observability."""
@@ -82,6 +83,13 @@ def initialize_rag():
         print(f"   - Vector dimension: {stats['dimension']}")
         print()
 
+        if config.RAG_CONFIG["watch_knowledge_base"]:
+            start_knowledge_base_watcher(
+                str(kb_path),
+                debounce=config.RAG_CONFIG["watch_debounce_seconds"],
+                poll_interval=config.RAG_CONFIG["watch_poll_interval"],
+            )
+
         return True
     except Exception as e:
         print(f"⚠️  Failed to initialize RAG: {e}")
@@ -89,8 +97,36 @@ def initialize_rag():
         return False
 
 
-def main(project_idea: str):
-    """Main execution function."""
+def report_metrics(tracker):
+    """Print the metrics summary and save the metrics file (plus trace/profile)."""
+    print("\n" + "=" * 80)
+    print("📊 METRICS SUMMARY")
+    print("=" * 80)
+    tracker.print_summary()
+
+    # Save metrics to file
+    if tracker.profiler is not None:
+        tracker.profiler.stop()
+    metrics_file = tracker.save_metrics()
+    print(f"\n💾 Metrics saved to: {metrics_file}")
+    trace_file = metrics_file.with_name(f"{metrics_file.stem}.trace.json")
+    if trace_file.exists():
+        print(f"🔥 Trace (chrome://tracing or ui.perfetto.dev): {trace_file}")
+    collapsed_file = metrics_file.with_name(f"{metrics_file.stem}.collapsed.txt")
+    if tracker.profiler is not None and collapsed_file.exists():
+        print(f"🧪 Collapsed stacks (flamegraph.pl or speedscope): {collapsed_file}")
+    print()
+
+
+def main(project_idea: str, profile: bool = False):
+    """
+    Main execution function.
+
+    Args:
+        project_idea: Description of the software to build
+        profile: Record RSS/tracemalloc at task boundaries and sample stacks
+                 (attached to the metrics file; see metrics/profiling.py)
+    """
 
     print()
     print("=" * 80)
@@ -101,6 +137,30 @@ def main(project_idea: str):
     # Initialize metrics tracker
     tracker = reset_tracker()
     print("📊 Metrics tracking initialized")
+
+    # Stream events to disk while the crew runs (survives crashes and Ctrl-C)
+    sinks = create_sinks(config.METRICS_CONFIG["sinks"],
+                         tracker.output_dir / f"stream_{tracker.session_id}")
+    if sinks:
+        flusher = tracker.attach_sinks(
+            sinks,
+            interval=config.METRICS_CONFIG["flush_interval"],
+            max_buffered=config.METRICS_CONFIG["max_buffered_events"],
+        )
+        print(f"💾 Streaming metrics to: {', '.join(flusher.describe())}")
+    if profile:
+        # Started before RAG setup so FAISS loading shows up in the "setup" phase
+        enable_profiling(tracker)
+        print("🧪 Profiling: tracemalloc + RSS per task, stack sampling")
+    # Live metrics for local Prometheus-compatible scrapers (no network egress)
+    exporter = None
+    if config.METRICS_CONFIG["exporter_port"]:
+        exporter = start_exporter(
+            host=config.METRICS_CONFIG["exporter_host"],
+            port=config.METRICS_CONFIG["exporter_port"],
+            max_label_values=config.METRICS_CONFIG["exporter_max_label_values"],
+        )
+        print(f"📡 OpenMetrics endpoint: {exporter.url}")
     print()
 
     # Initialize observability
@@ -131,16 +191,7 @@ def main(project_idea: str):
         print("   - user_guide.md (User Guide)")
         print()
 
-        # Print metrics summary
-        print("\n" + "=" * 80)
-        print("📊 METRICS SUMMARY")
-        print("=" * 80)
-        tracker.print_summary()
-
-        # Save metrics to file
-        metrics_file = tracker.save_metrics()
-        print(f"\n💾 Metrics saved to: {metrics_file}")
-        print()
+        report_metrics(tracker)
 
         if observability_enabled:
             print("📊 Check your AgentOps dashboard for detailed analytics:")
@@ -159,6 +210,14 @@ def main(project_idea: str):
 
         return 0
 
+    except BudgetExceededError as e:
+        # Hard budget limit: the crew stopped cleanly, keep its metrics
+        print(f"\n\n🛑 Run stopped by budget: {e}")
+        report_metrics(tracker)
+        if observability_enabled:
+            agentops.end_session(end_state="Fail")
+        return 2
+
     except KeyboardInterrupt:
         print("\n\n⚠️  Operation cancelled by user")
         if observability_enabled:
@@ -174,13 +233,22 @@ def main(project_idea: str):
             agentops.end_session(end_state="Fail")
         return 1
 
+    finally:
+        # Final flush of the streaming sinks (also on Ctrl-C and errors)
+        if tracker.profiler is not None:
+            tracker.profiler.stop()
+        if exporter is not None:
+            exporter.stop()
+        tracker.close()
+
 
 if __name__ == "__main__":
     # Get project idea from command line or use default
-    if len(sys.argv) > 1:
-        project_idea = " ".join(sys.argv[1:])
+    args = [arg for arg in sys.argv[1:] if arg != "--profile"]
+    if args:
+        project_idea = " ".join(args)
     else:
         project_idea = "escreva um jogo cli cobra baseado em pygame"
 
-    exit_code = main(project_idea)
+    exit_code = main(project_idea, profile="--profile" in sys.argv[1:])
     sys.exit(exit_code)
@@ -8,10 +8,28 @@ from .metrics_tracker import (
     LLMMetrics,
     ToolMetrics,
     AgentMetrics,
-    track_timing,
     get_tracker,
     reset_tracker,
 )
+from .histogram import LatencyHistogram, merge_histograms
+from .tracing import Tracer, Span, span, traced, get_tracer
+from .timing import timed, track_timing, configure_timing
+from .sinks import (
+    MetricsSink,
+    JSONLSink,
+    RotatingJSONLSink,
+    ParquetSink,
+    MetricsFlusher,
+    create_sinks,
+    load_metrics,
+)
+from .aggregate import MetricsAggregator, attach_segment, merge_summaries, build_baseline_report
+from .profiling import RunProfiler, enable_profiling
+from .token_attribution import attribute_prompt, count_tokens, register_section
+from .budget import BudgetGuard, BudgetLimits, BudgetExceededError, enable_budget
+from .openmetrics import OpenMetricsExporter, render_openmetrics, start_exporter
+from .analysis import analyze_spans, merge_run_analyses
+from .rate_limit import SharedRateLimiter
 
 __all__ = [
     'MetricsTracker',
@@ -22,4 +40,39 @@ __all__ = [
     'track_timing',
     'get_tracker',
     'reset_tracker',
+    'LatencyHistogram',
+    'merge_histograms',
+    'Tracer',
+    'Span',
+    'span',
+    'traced',
+    'get_tracer',
+    'timed',
+    'configure_timing',
+    'MetricsSink',
+    'JSONLSink',
+    'RotatingJSONLSink',
+    'ParquetSink',
+    'MetricsFlusher',
+    'create_sinks',
+    'load_metrics',
+    'MetricsAggregator',
+    'attach_segment',
+    'merge_summaries',
+    'build_baseline_report',
+    'RunProfiler',
+    'enable_profiling',
+    'attribute_prompt',
+    'count_tokens',
+    'register_section',
+    'BudgetGuard',
+    'BudgetLimits',
+    'BudgetExceededError',
+    'enable_budget',
+    'OpenMetricsExporter',
+    'render_openmetrics',
+    'start_exporter',
+    'analyze_spans',
+    'merge_run_analyses',
+    'SharedRateLimiter',
 ]
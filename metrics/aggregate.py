@@ -0,0 +1,280 @@
+# metrics/aggregate.py
+"""
+Agregação de métricas de vários processos.
+
+get_tracker() é global por processo: workers paralelos (ou várias crews
+em processos separados) geram cada um o seu MetricsTracker. Para uma visão
+consolidada:
+- cada worker grava um segmento próprio, segment-<pid>.jsonl, com
+  attach_segment(): o caminho quente continua sem lock (colunas por thread
+  do EventRecorder) e só a thread de flush escreve no arquivo. Um arquivo
+  por pid dispensa coordenação entre processos;
+- MetricsAggregator lê os segmentos de um diretório, ao vivo (lê só os
+  bytes novos de cada segmento, linhas completas) ou depois da execução, e
+  reaplica eventos e spans num MetricsTracker: contadores, histogramas,
+  tools, agentes, modelos e spans saem do próprio get_summary()/exports;
+- merge_summaries() combina resumos já salvos (get_summary() de cada
+  execução), somando contadores e mesclando histogramas;
+  build_baseline_report() monta com eles o baseline_report.json de um batch.
+"""
+import os
+import json
+from datetime import datetime
+from pathlib import Path
+from statistics import mean, median
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from .metrics_tracker import MetricsTracker, _sections_total
+from .histogram import merge_histograms
+from .analysis import merge_run_analyses
+from .sinks import JSONLSink, MetricsSink, SESSION_EVENT, apply_event
+
+
+SEGMENT_PREFIX = "segment"
+
+
+def segment_path(directory: Union[str, Path], pid: Optional[int] = None) -> Path:
+    """Arquivo de segmento do processo (padrão: o processo corrente)."""
+    return Path(directory) / f"{SEGMENT_PREFIX}-{pid or os.getpid()}.jsonl"
+
+
+def attach_segment(tracker: MetricsTracker, directory: Union[str, Path],
+                   interval: float = 1.0, max_buffered: int = 10_000,
+                   extra_sinks: Sequence[MetricsSink] = ()):
+    """
+    Liga o tracker do worker ao seu segmento (segment-<pid>.jsonl).
+
+    Args:
+        interval: Segundos entre flushes (atraso máximo da visão ao vivo)
+        extra_sinks: Outros sinks do worker, alimentados pelo mesmo flush
+
+    Returns:
+        O MetricsFlusher (tracker.close() faz o flush final)
+    """
+    sinks = [JSONLSink(segment_path(directory)), *extra_sinks]
+    return tracker.attach_sinks(sinks, interval=interval, max_buffered=max_buffered)
+
+
+class MetricsAggregator:
+    """
+    Resumo único de uma sessão com vários processos.
+
+    Uso:
+        # em cada worker
+        attach_segment(get_tracker(), "metrics/data/run-42")
+        # no processo principal (durante ou depois da execução)
+        aggregator = MetricsAggregator("metrics/data/run-42")
+        aggregator.summary()['summary']['total_llm_calls']
+        aggregator.save()
+    """
+
+    def __init__(self, directory: Union[str, Path], output_dir: Optional[str] = None):
+        self.directory = Path(directory)
+        self.tracker = MetricsTracker(output_dir=output_dir or str(self.directory))
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self._offsets: Dict[Path, int] = {}
+
+    def segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}-*.jsonl"))
+
+    def refresh(self) -> int:
+        """Aplica os eventos novos de todos os segmentos; retorna quantos."""
+        applied = 0
+        for path in self.segments():
+            offset = self._offsets.get(path, 0)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            # Só linhas completas: a última pode estar sendo escrita agora
+            end = data.rfind(b"\n") + 1
+            if not end:
+                continue
+            self._offsets[path] = offset + end
+            pid = int(path.stem.rsplit("-", 1)[1])
+            worker = self.workers.setdefault(pid, {'segment': str(path), 'events': 0,
+                                                   'session_id': None, 'last_event': None})
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # linha truncada por um crash do worker
+                event_type = event.pop('type')
+                if event_type == SESSION_EVENT:
+                    worker['session_id'] = event['session_id']
+                timestamp = apply_event(self.tracker, event_type, event)
+                if timestamp is not None:
+                    worker['last_event'] = max(worker['last_event'] or timestamp, timestamp)
+                worker['events'] += 1
+                applied += 1
+        self._drain()
+        return applied
+
+    def _drain(self):
+        # Os resumos usam os agregados do tracker: os eventos não ficam em memória
+        for event_type in self.tracker.event_types:
+            self.tracker.drain(event_type)
+        last_events = [w['last_event'] for w in self.workers.values() if w['last_event']]
+        if last_events:
+            self.tracker.session_end = max(last_events)
+
+    def summary(self) -> Dict[str, Any]:
+        """get_summary() da sessão consolidada, com os workers vistos."""
+        self.refresh()
+        summary = self.tracker.get_summary()
+        summary['workers'] = {
+            pid: {**worker, 'last_event': worker['last_event'].isoformat()
+                  if worker['last_event'] else None}
+            for pid, worker in sorted(self.workers.items())
+        }
+        return summary
+
+    def save(self, filename: Optional[str] = None) -> Path:
+        """Salva o resumo consolidado (e os traces com os spans de todos os workers)."""
+        self.refresh()
+        return self.tracker.save_metrics(filename)
+
+    def print_summary(self):
+        self.refresh()
+        self.tracker.print_summary()
+
+
+# --- resumos já salvos -------------------------------------------------------------
+
+_SUMMED = ('total_queries', 'total_retrievals', 'total_llm_calls', 'total_tool_calls',
+           'total_agent_tasks', 'total_cost', 'total_tokens', 'total_cached_tokens')
+
+
+def merge_summaries(summaries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combina resumos de várias execuções (get_summary() ou o JSON salvo).
+
+    Contadores, custo e tokens são somados; latências vêm dos histogramas
+    mesclados (percentis da união, não média de percentis); tools, modelos
+    e agentes são somados e as taxas recalculadas. Campos ausentes em
+    resumos de versões anteriores contam como zero.
+    """
+    summaries = [s for s in summaries if s]
+    totals: Dict[str, Any] = {key: 0 for key in _SUMMED}
+    totals['total_cost'] = 0.0
+    versions = set()
+    tools: Dict[str, Dict] = {}
+    models: Dict[str, Dict] = {}
+    agents: Dict[str, Dict] = {}
+    prompts: Dict[str, Dict[str, Dict]] = {}
+    for summary in summaries:
+        for key in _SUMMED:
+            totals[key] += summary['summary'].get(key, 0)
+        if summary['summary'].get('price_table_version'):
+            versions.add(summary['summary']['price_table_version'])
+        detailed = summary.get('detailed_metrics', {})
+        for name, stats in detailed.get('tool_efficiency', {}).items():
+            _sum_into(tools, name, stats, ('total_calls', 'successful_calls',
+                                           'failed_calls', 'total_duration'))
+        for name, stats in detailed.get('llm_usage_by_model', {}).items():
+            _sum_into(models, name, stats, ('calls', 'tokens_prompt', 'tokens_completion',
+                                            'cached_tokens', 'cost'))
+        for name, stats in detailed.get('agent_success_rates', {}).items():
+            merged = _sum_into(agents, name, stats, ('tasks_completed', 'tasks_failed'))
+            merged.setdefault('quality_scores', []).extend(stats.get('quality_scores', []))
+        for agent, tasks in detailed.get('prompt_attribution', {}).items():
+            for task, stats in tasks.items():
+                merged = _sum_into(prompts.setdefault(agent, {}), task, stats,
+                                   ('calls', 'tokens', 'cost'))
+                sections = merged.setdefault('sections', {})
+                for label, section in stats.get('sections', {}).items():
+                    _sum_into(sections, label, section, ('tokens', 'cost'))
+
+    for stats in tools.values():
+        calls = stats['total_calls']
+        stats['avg_duration'] = stats['total_duration'] / calls if calls else 0.0
+        stats['success_rate'] = stats['successful_calls'] / calls if calls else 0.0
+    for stats in agents.values():
+        total = stats['tasks_completed'] + stats['tasks_failed']
+        stats['success_rate'] = stats['tasks_completed'] / total if total else 0
+        if stats['quality_scores']:
+            stats['avg_quality_score'] = mean(stats['quality_scores'])
+            stats['median_quality_score'] = median(stats['quality_scores'])
+
+    latency = merge_histograms(s.get('detailed_metrics', {}).get('latency_histograms', {})
+                               for s in summaries)
+    timings = merge_histograms(s.get('detailed_metrics', {}).get('timing_histograms', {})
+                               for s in summaries)
+    return {
+        'session_ids': [s.get('session_id') for s in summaries],
+        'session_duration': sum(s.get('session_duration', 0) for s in summaries),
+        'summary': {
+            **totals,
+            'avg_retrieval_latency': latency['retrieval'].mean if 'retrieval' in latency else 0,
+            'avg_llm_latency': latency['llm'].mean if 'llm' in latency else 0,
+            'price_table_version': ", ".join(sorted(versions)),
+            'prompt_tokens_by_section': _sections_total(prompts),
+            'latency': {op: h.percentiles() for op, h in latency.items()},
+            'timings': {op: h.percentiles() for op, h in timings.items()},
+        },
+        'detailed_metrics': {
+            'tool_efficiency': tools,
+            'llm_usage_by_model': models,
+            'prompt_attribution': prompts,
+            'agent_success_rates': agents,
+            'latency_histograms': {op: h.to_dict() for op, h in latency.items()},
+            'timing_histograms': {op: h.to_dict() for op, h in timings.items()},
+            'run_analysis': merge_run_analyses(
+                s.get('detailed_metrics', {}).get('run_analysis') for s in summaries),
+        },
+    }
+
+
+def build_baseline_report(all_metrics: Sequence[Dict[str, Any]], batch_duration: float,
+                          report_type: str = "baseline",
+                          merged: Optional[Dict[str, Any]] = None,
+                          **fields) -> Dict[str, Any]:
+    """
+    Relatório consolidado de um batch (o baseline_report.json).
+
+    Usado pelos baselines sequenciais (tests/test_baseline*.py) e pelo
+    batch_runner.py, para que o esquema seja o mesmo.
+
+    Args:
+        all_metrics: Resultado de cada projeto ('status', 'duration_seconds',
+            'metrics' = get_summary())
+        merged: merge_summaries() dos projetos com sucesso, se já calculado
+        **fields: Campos extras logo após report_type (ex.: rag_enabled)
+    """
+    successful = [m for m in all_metrics if m['status'] == 'success']
+    failed = [m for m in all_metrics if m['status'] == 'failed']
+    if merged is None:
+        merged = merge_summaries(m['metrics'] for m in successful)
+    totals = merged['summary']
+    count = len(successful)
+    return {
+        "report_type": report_type,
+        **fields,
+        "timestamp": datetime.now().isoformat(),
+        "batch_duration_seconds": batch_duration,
+        "total_projects": len(all_metrics),
+        "successful_projects": count,
+        "failed_projects": len(failed),
+        "aggregated_stats": {
+            "total_cost": totals['total_cost'],
+            "avg_cost_per_project": totals['total_cost'] / count if count else 0,
+            "total_tokens": totals['total_tokens'],
+            "avg_tokens_per_project": totals['total_tokens'] // count if count else 0,
+            "total_llm_calls": totals['total_llm_calls'],
+            "avg_llm_calls_per_project": totals['total_llm_calls'] // count if count else 0,
+            "total_rag_retrievals": totals['total_retrievals'],
+            "avg_duration_per_project": (sum(m['duration_seconds'] for m in successful) / count
+                                         if count else 0),
+            "latency": totals['latency'],
+        },
+        "merged_metrics": merged,
+        "projects": list(all_metrics),
+    }
+
+
+def _sum_into(target: Dict[str, Dict], name: str, stats: Dict, fields: Sequence[str]) -> Dict:
+    merged = target.setdefault(name, {field: 0 for field in fields})
+    for field in fields:
+        merged[field] += stats.get(field, 0)
+    return merged
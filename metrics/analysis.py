@@ -0,0 +1,322 @@
+# metrics/analysis.py
+"""
+Caminho crítico e decomposição do tempo de cada execução, a partir dos spans.
+
+Os relatórios de baseline só tinham a duração total por projeto. A partir
+dos spans gravados (metrics/tracing.py), para cada execução (span raiz de
+tipo 'crew', ou cada raiz se não houver):
+- tempo por categoria: cada instante da execução vai para o span ativo
+  mais específico — espera de LLM, de embeddings, busca vetorial, I/O de
+  arquivos (tools de arquivo), demais tools, 'framework' (dentro de
+  task/agent sem nenhuma das anteriores: montagem de prompt, parsing,
+  orquestração da CrewAI) ou 'idle' (só a raiz aberta: entre tasks);
+- lacunas ociosas: os maiores intervalos 'idle', com as tasks vizinhas;
+- caminho crítico: a cadeia de spans que determina o fim da execução
+  (do fim para o início, o filho que terminou por último antes do cursor),
+  com o tempo por categoria e os maiores trechos;
+- paralelismo entre tasks: com as dependências gravadas no span da
+  execução (task_dependencies(), pelo task.context da CrewAI; sem elas, o
+  processo sequencial, em que cada task recebe a saída de todas as
+  anteriores), o caminho mais longo do grafo de tasks estima a duração e o
+  speedup se as tasks independentes rodassem em paralelo.
+
+get_summary() grava o resultado em detailed_metrics['run_analysis'] e
+merge_summaries() combina execuções (merge_run_analyses).
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Da mais específica para a menos: um instante conta só para a primeira ativa
+CATEGORIES = ('llm', 'embedding', 'retrieval', 'file_io', 'tool', 'framework')
+IDLE = 'idle'
+FILE_IO_TOOLS = {'tool: write_file', 'tool: read_file', 'tool: list_files',
+                 'tool: create_directory'}
+DEPENDENCIES_ATTRIBUTE = 'task_dependencies'
+TOP_N = 5
+
+_PRIORITY = {category: i for i, category in enumerate(CATEGORIES)}
+
+
+def span_category(span: Dict[str, Any]) -> str:
+    """Categoria de tempo de um span (ver CATEGORIES)."""
+    kind = span.get('kind')
+    if kind in ('llm', 'embedding', 'retrieval'):
+        return kind
+    if kind == 'tool':
+        return 'file_io' if span.get('name') in FILE_IO_TOOLS else 'tool'
+    return 'framework'
+
+
+def task_dependencies(crew: Any) -> Dict[str, List[str]]:
+    """
+    id da task -> ids das tasks de que ela depende (task.context). Sem
+    context explícito, o processo sequencial da CrewAI passa a saída de
+    todas as tasks anteriores, então todas elas são dependências.
+    """
+    dependencies: Dict[str, List[str]] = {}
+    previous: List[str] = []
+    for task in getattr(crew, 'tasks', []):
+        context = getattr(task, 'context', None)
+        if isinstance(context, (list, tuple)):
+            dependencies[str(task.id)] = [str(t.id) for t in context]
+        else:
+            dependencies[str(task.id)] = list(previous)
+        previous.append(str(task.id))
+    return dependencies
+
+
+def _as_dicts(spans: Iterable[Any]) -> List[Dict[str, Any]]:
+    result = []
+    for span in spans:
+        data = span.to_dict() if hasattr(span, 'to_dict') else span
+        if data.get('end_ns') is not None:
+            result.append(data)
+    return result
+
+
+def _seconds(ns: float) -> float:
+    return ns / 1e9
+
+
+# --- tempo por categoria e lacunas ---------------------------------------------------
+
+def _timeline(root: Dict, spans: List[Dict]) -> List[Tuple[int, int, str]]:
+    """Trechos (início, fim, categoria) cobrindo toda a janela da raiz."""
+    start, end = root['start_ns'], root['end_ns']
+    boundaries = {start, end}
+    events = []
+    for span in spans:
+        s, e = max(span['start_ns'], start), min(span['end_ns'], end)
+        if e <= s:
+            continue
+        category = span_category(span)
+        events.append((s, 1, category))
+        events.append((e, -1, category))
+        boundaries.update((s, e))
+    events.sort()
+
+    active = {category: 0 for category in CATEGORIES}
+    segments: List[Tuple[int, int, str]] = []
+    position = 0
+    points = sorted(boundaries)
+    for left, right in zip(points, points[1:]):
+        while position < len(events) and events[position][0] <= left:
+            _, delta, category = events[position]
+            active[category] += delta
+            position += 1
+        category = next((c for c in CATEGORIES if active[c] > 0), IDLE)
+        if segments and segments[-1][2] == category and segments[-1][1] == left:
+            segments[-1] = (segments[-1][0], right, category)
+        else:
+            segments.append((left, right, category))
+    return segments
+
+
+def _task_name(span: Dict) -> str:
+    name = span.get('name', '')
+    return name[len("task: "):] if name.startswith("task: ") else name
+
+
+def _idle_gaps(root: Dict, segments, tasks: List[Dict]) -> List[Dict[str, Any]]:
+    gaps = []
+    for start, end, category in segments:
+        if category != IDLE:
+            continue
+        before = [t for t in tasks if t['end_ns'] <= start]
+        after = [t for t in tasks if t['start_ns'] >= end]
+        gaps.append({
+            'offset': _seconds(start - root['start_ns']),
+            'seconds': _seconds(end - start),
+            'after_task': _task_name(max(before, key=lambda t: t['end_ns'])) if before else None,
+            'before_task': _task_name(min(after, key=lambda t: t['start_ns'])) if after else None,
+        })
+    return sorted(gaps, key=lambda gap: -gap['seconds'])
+
+
+# --- caminho crítico ---------------------------------------------------------------
+
+def _critical_segments(span: Dict, end: int, children: Dict[str, List[Dict]]
+                       ) -> List[Tuple[Dict, int, int]]:
+    """Trechos (span, início, fim) do caminho crítico dentro de `span` até `end`."""
+    segments = []
+    cursor = min(span['end_ns'], end)
+    for child in sorted(children.get(span['span_id'], []), key=lambda c: -c['end_ns']):
+        if cursor <= span['start_ns']:
+            break
+        if child['start_ns'] >= cursor:
+            continue
+        child_end = min(child['end_ns'], cursor)
+        if child_end < cursor:
+            segments.append((span, child_end, cursor))
+        segments.extend(_critical_segments(child, child_end, children))
+        cursor = max(child['start_ns'], span['start_ns'])
+    if cursor > span['start_ns']:
+        segments.append((span, span['start_ns'], cursor))
+    return segments
+
+
+def _critical_path(root: Dict, spans: List[Dict]) -> Dict[str, Any]:
+    children: Dict[str, List[Dict]] = {}
+    for span in spans:
+        children.setdefault(span.get('parent_id'), []).append(span)
+    by_category: Dict[str, float] = {}
+    by_span: Dict[str, Dict[str, Any]] = {}
+    for span, start, end in _critical_segments(root, root['end_ns'], children):
+        # Tempo próprio da raiz no caminho crítico = nada em andamento
+        category = IDLE if span is root else span_category(span)
+        seconds = _seconds(end - start)
+        by_category[category] = by_category.get(category, 0.0) + seconds
+        entry = by_span.setdefault(span['span_id'], {
+            'name': span['name'], 'category': category, 'seconds': 0.0})
+        entry['seconds'] += seconds
+    return {
+        'seconds': _seconds(root['end_ns'] - root['start_ns']),
+        'by_category': by_category,
+        'top_segments': sorted(by_span.values(), key=lambda s: -s['seconds'])[:TOP_N],
+    }
+
+
+# --- paralelismo entre tasks ---------------------------------------------------------
+
+def _task_parallelism(root: Dict, tasks: List[Dict]) -> Dict[str, Any]:
+    tasks = sorted(tasks, key=lambda t: t['start_ns'])
+    ids = [str(t.get('attributes', {}).get('task_id') or t['span_id']) for t in tasks]
+    recorded = root.get('attributes', {}).get(DEPENDENCIES_ATTRIBUTE)
+    if isinstance(recorded, str):
+        recorded = json.loads(recorded)
+    if recorded:
+        dependencies = {task_id: [d for d in recorded.get(task_id, []) if d in ids]
+                        for task_id in ids}
+    else:
+        dependencies = {task_id: ids[:i] for i, task_id in enumerate(ids)}
+
+    durations = {task_id: _seconds(t['end_ns'] - t['start_ns']) for task_id, t in zip(ids, tasks)}
+    finish: Dict[str, float] = {}
+    level: Dict[str, int] = {}
+    for task_id in ids:   # em ordem de início: dependências já calculadas
+        deps = [d for d in dependencies[task_id] if d in finish]
+        finish[task_id] = durations[task_id] + max((finish[d] for d in deps), default=0.0)
+        level[task_id] = 1 + max((level[d] for d in deps), default=-1)
+    groups: List[List[str]] = []
+    for task_id, task in zip(ids, tasks):
+        while len(groups) <= level[task_id]:
+            groups.append([])
+        groups[level[task_id]].append(_task_name(task))
+
+    return {
+        'count': len(tasks),
+        'dependencies': 'recorded' if recorded else 'assumed_sequential',
+        'sequential_seconds': sum(durations.values()),
+        'parallel_seconds': max(finish.values(), default=0.0),
+        # Grupos de tasks que poderiam rodar juntas (mesmo nível do grafo)
+        'parallel_groups': groups,
+    }
+
+
+def _with_estimates(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    total = analysis['total_seconds']
+    analysis['shares'] = {category: seconds / total if total else 0.0
+                          for category, seconds in analysis['time_by_category'].items()}
+    tasks = analysis['tasks']
+    estimated = total - tasks['sequential_seconds'] + tasks['parallel_seconds']
+    tasks['estimated_run_seconds'] = estimated
+    tasks['estimated_speedup'] = total / estimated if estimated > 0 else 1.0
+    return analysis
+
+
+def analyze_run(root: Dict[str, Any], spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Decomposição de uma execução: `spans` são os do mesmo trace da raiz."""
+    spans = [s for s in spans if s['span_id'] != root['span_id']]
+    tasks = [s for s in spans if s.get('kind') == 'task']
+    segments = _timeline(root, spans)
+    time_by_category = {category: 0.0 for category in (*CATEGORIES, IDLE)}
+    for start, end, category in segments:
+        time_by_category[category] += _seconds(end - start)
+    gaps = _idle_gaps(root, segments, tasks)
+    return _with_estimates({
+        'runs': 1,
+        'total_seconds': _seconds(root['end_ns'] - root['start_ns']),
+        'time_by_category': time_by_category,
+        'idle_gaps': gaps[:TOP_N],
+        'critical_path': _critical_path(root, spans),
+        'tasks': _task_parallelism(root, tasks),
+    })
+
+
+def span_skeleton(span: Any) -> Dict[str, Any]:
+    """
+    Só os campos de um span usados pela análise (o MetricsTracker guarda
+    isto dos spans já enviados aos sinks até a execução terminar).
+    """
+    data = span.to_dict() if hasattr(span, 'to_dict') else span
+    attributes = data.get('attributes') or {}
+    skeleton = {field: data.get(field) for field in
+                ('name', 'kind', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns')}
+    skeleton['attributes'] = {key: attributes[key] for key in ('task_id', DEPENDENCIES_ATTRIBUTE)
+                              if key in attributes}
+    return skeleton
+
+
+def run_analyses(spans: Iterable[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Análises (analyze_run) das execuções terminadas em `spans`, separadas
+    em (raízes de tipo 'crew', demais raízes).
+    """
+    spans = _as_dicts(spans)
+    by_trace: Dict[str, List[Dict]] = {}
+    for span in spans:
+        by_trace.setdefault(span['trace_id'], []).append(span)
+    crew, other = [], []
+    for root in spans:
+        if root.get('parent_id') is None:
+            analysis = analyze_run(root, by_trace[root['trace_id']])
+            (crew if root.get('kind') == 'crew' else other).append(analysis)
+    return crew, other
+
+
+def analyze_spans(spans: Iterable[Any]) -> Optional[Dict[str, Any]]:
+    """
+    Analisa as execuções de uma lista de spans (Span ou Span.to_dict) e
+    combina o resultado (merge_run_analyses). None se não houver execução
+    terminada.
+    """
+    crew, other = run_analyses(spans)
+    return merge_run_analyses(crew or other)
+
+
+def merge_run_analyses(analyses: Iterable[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Soma tempos e estimativas de várias execuções e recalcula proporções e speedup."""
+    analyses = [a for a in analyses if a]
+    if not analyses:
+        return None
+    if len(analyses) == 1:
+        return analyses[0]
+    time_by_category: Dict[str, float] = {}
+    critical_by_category: Dict[str, float] = {}
+    for analysis in analyses:
+        for category, seconds in analysis['time_by_category'].items():
+            time_by_category[category] = time_by_category.get(category, 0.0) + seconds
+        for category, seconds in analysis['critical_path']['by_category'].items():
+            critical_by_category[category] = critical_by_category.get(category, 0.0) + seconds
+    tasks = [a['tasks'] for a in analyses]
+    return _with_estimates({
+        'runs': sum(a['runs'] for a in analyses),
+        'total_seconds': sum(a['total_seconds'] for a in analyses),
+        'time_by_category': time_by_category,
+        'idle_gaps': sorted((g for a in analyses for g in a['idle_gaps']),
+                            key=lambda gap: -gap['seconds'])[:TOP_N],
+        'critical_path': {
+            'seconds': sum(a['critical_path']['seconds'] for a in analyses),
+            'by_category': critical_by_category,
+            'top_segments': sorted((s for a in analyses for s in a['critical_path']['top_segments']),
+                                   key=lambda s: -s['seconds'])[:TOP_N],
+        },
+        'tasks': {
+            'count': sum(t['count'] for t in tasks),
+            'dependencies': ", ".join(sorted({t['dependencies'] for t in tasks})),
+            'sequential_seconds': sum(t['sequential_seconds'] for t in tasks),
+            'parallel_seconds': sum(t['parallel_seconds'] for t in tasks),
+            'parallel_groups': [group for t in tasks for group in t['parallel_groups']],
+        },
+    })
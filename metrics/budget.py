@@ -0,0 +1,337 @@
+# metrics/budget.py
+"""
+Orçamento de tokens, custo, chamadas LLM e tempo por execução e por task.
+
+Um loop de agente descontrolado podia gastar tokens sem limite até o
+crew.kickoff() voltar. O BudgetGuard soma o consumo em tempo real (cada
+track_llm_call do tracker) e é consultado antes de cada chamada LLM da
+CrewAI (hook before_llm_call, que roda antes do envio):
+- limite suave (`soft_fraction` do limite, padrão 80%): troca o modelo do
+  agente por um mais barato ('downgrade') e/ou encurta as mensagens longas
+  do histórico da chamada ('compress');
+- limite rígido: a chamada é bloqueada e o guard guarda o
+  BudgetExceededError; o runner salva as saídas das tasks já concluídas
+  (save_partial_outputs) e as métricas, e encerra a execução.
+
+Os limites vêm de config.BUDGET_CONFIG (variáveis BUDGET_*); None = sem
+limite. O estado do orçamento vai para o arquivo de métricas ('budget').
+"""
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from .pricing import find_price
+
+
+SOFT_ACTIONS = ('downgrade', 'compress')
+RUN_SCOPE = "run"
+
+
+class BudgetLimits(NamedTuple):
+    """Limites de um escopo (execução ou task); None = sem limite."""
+    tokens: Optional[int] = None
+    cost: Optional[float] = None
+    llm_calls: Optional[int] = None
+    wall_seconds: Optional[float] = None
+
+
+class BudgetExceededError(RuntimeError):
+    """Limite rígido atingido: a execução deve parar."""
+
+    def __init__(self, scope: str, limit: str, used: float, maximum: float):
+        super().__init__(f"Orçamento excedido ({scope}): {limit} = {used:g} "
+                         f"(limite {maximum:g})")
+        self.scope = scope
+        self.limit = limit
+        self.used = used
+        self.maximum = maximum
+
+
+def _omitted_note(chars: int) -> str:
+    return f"\n[... {chars} caracteres omitidos pelo orçamento ...]\n"
+
+
+def compress_messages(messages: List[Dict[str, Any]], max_chars: int = 4000,
+                      keep_last: int = 2) -> int:
+    """
+    Encurta no lugar as mensagens longas do histórico (resultados de tools,
+    saídas de tasks anteriores), mantendo início e fim de cada uma. A
+    mensagem de sistema e as `keep_last` últimas ficam intactas.
+
+    Returns:
+        Caracteres removidos
+    """
+    removed = 0
+    for message in messages[:max(len(messages) - keep_last, 0)]:
+        if not isinstance(message, dict) or message.get('role') == 'system':
+            continue
+        content = message.get('content')
+        if not isinstance(content, str) or len(content) <= max_chars:
+            continue
+        # O resultado, com o aviso, cabe em max_chars (não é encurtado de novo)
+        keep = max_chars - len(_omitted_note(len(content)))
+        if keep < 2:
+            continue
+        head = keep // 2
+        shortened = (content[:head] + _omitted_note(len(content) - keep)
+                     + content[len(content) - (keep - head):])
+        message['content'] = shortened
+        removed += len(content) - len(shortened)
+    return removed
+
+
+class _Usage:
+    __slots__ = ('tokens', 'cost', 'llm_calls', 'started')
+
+    def __init__(self):
+        self.tokens = 0
+        self.cost = 0.0
+        self.llm_calls = 0
+        self.started = time.monotonic()
+
+    def value(self, limit: str) -> float:
+        if limit == 'wall_seconds':
+            return time.monotonic() - self.started
+        return getattr(self, limit)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'tokens': self.tokens, 'cost': self.cost, 'llm_calls': self.llm_calls,
+                'wall_seconds': self.value('wall_seconds')}
+
+
+class BudgetGuard:
+    """
+    Consumo e limites de uma execução (thread-safe).
+
+    charge() soma cada chamada concluída na execução e na task corrente;
+    check() é chamado antes de cada chamada LLM e devolve 'ok' ou 'soft',
+    ou levanta BudgetExceededError. Depois do primeiro estouro rígido
+    todas as chamadas seguintes também são bloqueadas.
+
+    Uso:
+        guard = BudgetGuard(run=BudgetLimits(cost=0.50), task=BudgetLimits(llm_calls=40))
+        guard.check("Create PRD")          # antes da chamada
+        guard.charge(1200, 0.0004)         # depois, com tokens e custo
+    """
+
+    def __init__(self, run: Optional[BudgetLimits] = None,
+                 task: Optional[BudgetLimits] = None,
+                 soft_fraction: float = 0.8,
+                 soft_actions: Union[str, Sequence[str]] = SOFT_ACTIONS,
+                 fallback_model: Optional[str] = None,
+                 compress_max_chars: int = 4000):
+        if isinstance(soft_actions, str):
+            soft_actions = [a.strip() for a in soft_actions.split(",") if a.strip()]
+        unknown = set(soft_actions) - set(SOFT_ACTIONS)
+        if unknown:
+            raise ValueError(f"Ações de limite suave desconhecidas: {sorted(unknown)}")
+        self.run_limits = run or BudgetLimits()
+        self.task_limits = task or BudgetLimits()
+        self.soft_fraction = soft_fraction
+        self.soft_actions = tuple(soft_actions)
+        self.fallback_model = fallback_model
+        self.compress_max_chars = compress_max_chars
+
+        self._lock = threading.Lock()
+        self._run = _Usage()
+        self._tasks: Dict[str, _Usage] = {}
+        self.current_task: Optional[str] = None
+        self.exceeded: Optional[BudgetExceededError] = None
+        # Ações de limite suave aplicadas, em ordem
+        self.soft_events: List[Dict[str, Any]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return any(v is not None for v in (*self.run_limits, *self.task_limits))
+
+    def _scopes(self):
+        yield RUN_SCOPE, self._run, self.run_limits
+        if self.current_task is not None:
+            yield self.current_task, self._tasks[self.current_task], self.task_limits
+
+    def charge(self, tokens: int, cost: float, task: Optional[str] = None):
+        """Soma uma chamada concluída à execução e à task (padrão: a corrente)."""
+        with self._lock:
+            task = task or self.current_task
+            usages = [self._run]
+            if task is not None:
+                usages.append(self._tasks.setdefault(task, _Usage()))
+            for usage in usages:
+                usage.tokens += tokens
+                usage.cost += cost
+                usage.llm_calls += 1
+
+    def check(self, task: Optional[str] = None) -> str:
+        """
+        Estado do orçamento antes de uma chamada: 'ok' ou 'soft'.
+
+        Raises:
+            BudgetExceededError: Algum limite rígido foi atingido
+        """
+        with self._lock:
+            if self.exceeded is not None:
+                raise self.exceeded
+            if task is not None:
+                self.current_task = task
+                self._tasks.setdefault(task, _Usage())
+            state = 'ok'
+            for scope, usage, limits in self._scopes():
+                for limit, maximum in limits._asdict().items():
+                    if maximum is None:
+                        continue
+                    used = usage.value(limit)
+                    # Limite atingido: a próxima chamada passaria dele
+                    if used >= maximum:
+                        self.exceeded = BudgetExceededError(scope, limit, used, maximum)
+                        raise self.exceeded
+                    if used >= maximum * self.soft_fraction:
+                        state = 'soft'
+            return state
+
+    def record_soft_action(self, action: str, **details):
+        with self._lock:
+            self.soft_events.append({'action': action, 'task': self.current_task,
+                                     'run': self._run.to_dict(), **details})
+
+    def usage(self, scope: str = RUN_SCOPE) -> Dict[str, float]:
+        """Consumo da execução ou de uma task."""
+        with self._lock:
+            usage = self._run if scope == RUN_SCOPE else self._tasks.get(scope)
+            return usage.to_dict() if usage is not None else _Usage().to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            exceeded = self.exceeded
+            return {
+                'limits': {'run': self.run_limits._asdict(),
+                           'task': self.task_limits._asdict()},
+                'soft_fraction': self.soft_fraction,
+                'usage': {'run': self._run.to_dict(),
+                          'tasks': {name: u.to_dict() for name, u in self._tasks.items()}},
+                'soft_actions': list(self.soft_events),
+                'exceeded': None if exceeded is None else {
+                    'scope': exceeded.scope, 'limit': exceeded.limit,
+                    'used': exceeded.used, 'maximum': exceeded.maximum,
+                },
+            }
+
+    # --- ações de limite suave ------------------------------------------------
+
+    def downgrade(self, llm: Any) -> Optional[str]:
+        """Troca o modelo do LLM pelo fallback, se ele for mais barato."""
+        model_attr = next((a for a in ('model', 'model_name') if hasattr(llm, a)), None)
+        if llm is None or model_attr is None or not self.fallback_model:
+            return None
+        current = getattr(llm, model_attr)
+        if not isinstance(current, str) or current == self.fallback_model:
+            return None
+        price, fallback = find_price(current), find_price(self.fallback_model)
+        if price is None or fallback is None or fallback.input >= price.input:
+            return None
+        try:
+            setattr(llm, model_attr, self.fallback_model)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        self.record_soft_action('downgrade', model=current, fallback=self.fallback_model)
+        return current
+
+    def compress(self, messages: Any) -> int:
+        """Encurta o histórico da chamada (no lugar)."""
+        if not isinstance(messages, list):
+            return 0
+        removed = compress_messages(messages, self.compress_max_chars)
+        if removed:
+            self.record_soft_action('compress', chars_removed=removed)
+        return removed
+
+
+def save_partial_outputs(crew: Any, path: Union[str, Path],
+                         error: Optional[BudgetExceededError] = None) -> Path:
+    """Grava as saídas das tasks já concluídas da crew (JSON)."""
+    tasks = []
+    for task in getattr(crew, 'tasks', []):
+        output = getattr(task, 'output', None)
+        agent = getattr(task, 'agent', None)
+        tasks.append({
+            'task': (getattr(task, 'name', None) or task.description).strip().split("\n", 1)[0],
+            'agent': getattr(agent, 'role', None),
+            'completed': output is not None,
+            'output': getattr(output, 'raw', None),
+        })
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'stopped_by': str(error) if error is not None else None,
+        'tasks': tasks,
+    }, indent=2, ensure_ascii=False))
+    return path
+
+
+# --- integração com o tracker e a CrewAI ------------------------------------------
+
+_crewai_installed = False
+_crewai_lock = threading.Lock()
+
+
+def enable_budget(tracker=None, run: Optional[Dict[str, Any]] = None,
+                  task: Optional[Dict[str, Any]] = None, **kwargs) -> BudgetGuard:
+    """
+    Liga o orçamento na sessão do tracker (padrão: o global) e instala o
+    hook before_llm_call da CrewAI. `run`/`task` são dicts de limites
+    (config.BUDGET_CONFIG). track_llm_call passa a debitar cada chamada e
+    save_metrics grava o estado do orçamento.
+    """
+    from .metrics_tracker import get_tracker
+
+    tracker = tracker or get_tracker()
+    try:
+        install_crewai_budget_hooks()
+    except ImportError:
+        pass  # sem CrewAI: check() manual antes de cada chamada
+    tracker.budget = BudgetGuard(run=BudgetLimits(**(run or {})),
+                                 task=BudgetLimits(**(task or {})), **kwargs)
+    return tracker.budget
+
+
+def _active_budget() -> Optional[BudgetGuard]:
+    from .metrics_tracker import get_tracker
+    guard = get_tracker().budget
+    return guard if guard is not None and guard.enabled else None
+
+
+def _before_llm_call(context) -> None:
+    """Hook before_llm_call: aplica o limite suave ou bloqueia a chamada."""
+    guard = _active_budget()
+    if guard is None:
+        return None
+    from .token_attribution import task_label
+
+    task = getattr(context, 'task', None)
+    name = task_label(getattr(task, 'name', None) or getattr(task, 'description', None)) \
+        if task is not None else None
+    try:
+        state = guard.check(name)
+    except BudgetExceededError as error:
+        # HookAborted atravessa o executor da CrewAI e encerra o kickoff
+        from crewai.hooks import HookAborted
+        raise HookAborted(str(error), source="budget") from error
+    if state == 'soft':
+        if 'downgrade' in guard.soft_actions:
+            guard.downgrade(getattr(context, 'llm', None))
+        if 'compress' in guard.soft_actions:
+            guard.compress(getattr(context, 'messages', None))
+    return None
+
+
+def install_crewai_budget_hooks():
+    """Registra o hook before_llm_call global da CrewAI (idempotente)."""
+    global _crewai_installed
+    with _crewai_lock:
+        if _crewai_installed:
+            return
+        from crewai.hooks import register_before_llm_call_hook
+
+        register_before_llm_call_hook(_before_llm_call)
+        _crewai_installed = True
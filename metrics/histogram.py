@@ -0,0 +1,163 @@
+# metrics/histogram.py
+"""
+Histograma de latências log-linear (estilo HDR Histogram).
+
+Os valores (segundos) são gravados em microssegundos inteiros em baldes
+log-lineares: exatos abaixo de 2·2^b µs e, acima disso, 2^b sub-baldes por
+potência de 2 — erro relativo máximo de 2^-b (b=7: < 0,8%). Guarda só as
+contagens por balde (esparsas), além de count/sum/min/max exatos, então:
+- p50/p90/p99 sem guardar cada amostra (memória ~ constante);
+- merge() soma contagens: histogramas de execuções/processos diferentes
+  combinam sem perda adicional (to_dict/from_dict para JSON).
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class LatencyHistogram:
+    """Histograma mergeável de durações em segundos."""
+
+    def __init__(self, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_buckets = 1 << sub_bucket_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    # --- baldes --------------------------------------------------------------
+
+    def _index(self, micros: int) -> int:
+        limit = 2 * self._sub_buckets
+        if micros < limit:
+            return micros
+        shift = micros.bit_length() - (self.sub_bucket_bits + 1)
+        mantissa = micros >> shift
+        return limit + (shift - 1) * self._sub_buckets + (mantissa - self._sub_buckets)
+
+    def _bounds(self, index: int):
+        """Intervalo [início, fim] em µs coberto por um balde."""
+        limit = 2 * self._sub_buckets
+        if index < limit:
+            return index, index
+        shift, offset = divmod(index - limit, self._sub_buckets)
+        shift += 1
+        mantissa = self._sub_buckets + offset
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    # --- gravação ----------------------------------------------------------------
+
+    def record(self, seconds: float, count: int = 1):
+        if seconds is None or seconds != seconds:
+            return
+        seconds = max(seconds, 0.0)
+        index = self._index(int(round(seconds * 1e6)))
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += seconds * count
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def record_many(self, values: Iterable[float]):
+        for value in values:
+            self.record(value)
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Soma as contagens de `other` (mesma resolução) neste histograma."""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Histogramas com resoluções diferentes")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def copy(self) -> 'LatencyHistogram':
+        return LatencyHistogram(self.sub_bucket_bits).merge(self)
+
+    # --- consultas ------------------------------------------------------------
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Valor (segundos) no quantil q ∈ [0, 1]."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self._bounds(index)
+                value = (low + high) / 2 / 1e6
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: Sequence[float]) -> List[int]:
+        """
+        Amostras <= cada limite (segundos, crescentes), como os baldes `le`
+        do Prometheus; um balde conta no primeiro limite que cobre todo ele.
+        """
+        cumulative, seen = [], 0
+        indexes = sorted(self.counts)
+        position = 0
+        for bound in bounds:
+            while position < len(indexes) and self._bounds(indexes[position])[1] <= bound * 1e6:
+                seen += self.counts[indexes[position]]
+                position += 1
+            cumulative.append(seen)
+        return cumulative
+
+    def percentiles(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.50),
+            'p90': self.quantile(0.90),
+            'p99': self.quantile(0.99),
+            'max': self.max or 0.0,
+        }
+
+    # --- serialização -----------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            'sub_bucket_bits': self.sub_bucket_bits,
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'counts': {str(i): c for i, c in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data.get('sub_bucket_bits', 7))
+        histogram.counts = {int(i): c for i, c in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['sum']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+def merge_histograms(histograms: Iterable[Dict[str, Dict]]) -> Dict[str, LatencyHistogram]:
+    """
+    Combina histogramas serializados (ex.: 'latency_histograms' de vários
+    JSONs de métricas) por operação.
+    """
+    merged: Dict[str, LatencyHistogram] = {}
+    for by_operation in histograms:
+        for operation, data in by_operation.items():
+            histogram = LatencyHistogram.from_dict(data)
+            if operation in merged:
+                merged[operation].merge(histogram)
+            else:
+                merged[operation] = histogram
+    return merged
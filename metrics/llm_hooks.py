@@ -0,0 +1,244 @@
+# metrics/llm_hooks.py
+"""
+Captura automática de chamadas LLM no MetricsTracker.
+
+Sem estes hooks track_llm_call nunca era chamado e os relatórios saíam com
+tokens, custo e latência de LLM zerados. Cada caminho de LLM do projeto
+grava latência, TTFT (tempo até o primeiro token, com streaming), tokens de
+prompt/completion/cache e o modelo:
+- CrewAI: handlers no crewai_event_bus (LLMCallStarted/StreamChunk/
+  Completed/Failed), instalados por install_crewai_llm_hooks();
+- LangChain (config.get_llm): MetricsCallbackHandler nos callbacks do
+  ChatOpenAI;
+- DSPy (dspy.LM): callback em dspy_config.py, sobre o mesmo LLMCallTimer.
+
+O custo vem da tabela versionada de metrics/pricing.py.
+"""
+import time
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics_tracker import get_tracker
+from .tracing import get_tracer
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    BaseCallbackHandler = object
+    LANGCHAIN_AVAILABLE = False
+
+
+def _get(obj: Any, key: str, default: Any = None) -> Any:
+    """Lê um campo de dict ou de objeto (respostas dos SDKs variam)."""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    return getattr(obj, key, default)
+
+
+def parse_usage(usage: Any) -> Tuple[int, int, int]:
+    """
+    (prompt, completion, cached) a partir do `usage` de OpenAI, LiteLLM,
+    CrewAI ou LangChain (usage_metadata).
+    """
+    if not usage:
+        return 0, 0, 0
+    prompt = _get(usage, 'prompt_tokens') or _get(usage, 'input_tokens') or 0
+    completion = _get(usage, 'completion_tokens') or _get(usage, 'output_tokens') or 0
+    cached = (
+        _get(usage, 'cached_prompt_tokens')
+        or _get(_get(usage, 'prompt_tokens_details'), 'cached_tokens')
+        or _get(_get(usage, 'input_token_details'), 'cache_read')
+        or 0
+    )
+    return int(prompt), int(completion), int(cached)
+
+
+class LLMCallTimer:
+    """
+    Tempos de chamadas em andamento, por id da chamada (thread-safe).
+
+    start() no início, first_token() no primeiro chunk de streaming e
+    finish() com o usage da resposta; a chamada é gravada no tracker quando
+    início e fim foram vistos, em qualquer ordem (os handlers da CrewAI
+    rodam num pool de threads). `at` é o instante do evento em segundos
+    (padrão: time.time()), então a latência não inclui o atraso do handler.
+    """
+
+    def __init__(self, tracker=None):
+        self.tracker = tracker
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, call_id: Any) -> Dict[str, Any]:
+        call = self._calls.get(call_id)
+        if call is None:
+            call = self._calls[call_id] = {'start': None, 'first_token': None,
+                                           'end': None, 'usage': None, 'model': None,
+                                           'parent': None}
+        return call
+
+    def start(self, call_id: Any, model: Optional[str] = None, at: Optional[float] = None):
+        with self._lock:
+            call = self._call(call_id)
+            call['start'] = time.time() if at is None else at
+            call['model'] = call['model'] or model
+            # Pai do span da chamada: task/agent/tool em andamento
+            call['parent'] = self._tracer().current_span()
+            done = call['end'] is not None and self._calls.pop(call_id)
+        if done:
+            self._record(done)
+
+    def first_token(self, call_id: Any, at: Optional[float] = None):
+        with self._lock:
+            call = self._call(call_id)
+            if call['first_token'] is None:
+                call['first_token'] = time.time() if at is None else at
+
+    def finish(self, call_id: Any, usage: Any = None, model: Optional[str] = None,
+               at: Optional[float] = None):
+        with self._lock:
+            call = self._call(call_id)
+            call['end'] = time.time() if at is None else at
+            call['usage'] = usage
+            call['model'] = model or call['model']
+            done = call['start'] is not None and self._calls.pop(call_id)
+        if done:
+            self._record(done)
+
+    def discard(self, call_id: Any):
+        with self._lock:
+            self._calls.pop(call_id, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _tracer(self):
+        return self.tracker.tracer if self.tracker is not None else get_tracer()
+
+    def _record(self, call: Dict[str, Any]):
+        prompt, completion, cached = parse_usage(call['usage'])
+        started, first_token = call['start'], call['first_token']
+        model = call['model'] or "unknown"
+        ttft = max(first_token - started, 0.0) if first_token is not None else None
+        tracker = self.tracker or get_tracker()
+        tracker.track_llm_call(
+            duration=max(call['end'] - started, 0.0),
+            tokens_prompt=prompt,
+            tokens_completion=completion,
+            model=model,
+            cached_tokens=cached,
+            ttft=ttft,
+        )
+        tracker.tracer.record_span(
+            f"llm: {model}", "llm", int(started * 1e9), int(call['end'] * 1e9),
+            {'model': model, 'tokens_prompt': prompt, 'tokens_completion': completion,
+             'cached_tokens': cached, 'ttft': ttft},
+            parent=call['parent'],
+        )
+
+
+# --- CrewAI ------------------------------------------------------------------
+
+_crewai_timer: Optional[LLMCallTimer] = None
+_crewai_lock = threading.Lock()
+
+
+def install_crewai_llm_hooks(tracker=None) -> LLMCallTimer:
+    """
+    Registra handlers de eventos LLM no crewai_event_bus (idempotente).
+
+    Cobre todos os LLMs usados pelos agentes da CrewAI (provedores nativos
+    e LiteLLM). Sem `tracker`, grava no tracker global corrente.
+    """
+    global _crewai_timer
+    with _crewai_lock:
+        if _crewai_timer is not None:
+            return _crewai_timer
+
+        from crewai.events import (
+            crewai_event_bus,
+            LLMCallStartedEvent,
+            LLMCallCompletedEvent,
+            LLMCallFailedEvent,
+            LLMStreamChunkEvent,
+        )
+
+        timer = LLMCallTimer(tracker)
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def _on_llm_started(source, event):
+            timer.start(event.call_id, event.model, at=event.timestamp.timestamp())
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _on_llm_chunk(source, event):
+            timer.first_token(event.call_id, at=event.timestamp.timestamp())
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def _on_llm_completed(source, event):
+            timer.finish(event.call_id, event.usage, event.model,
+                         at=event.timestamp.timestamp())
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def _on_llm_failed(source, event):
+            timer.discard(event.call_id)
+
+        _crewai_timer = timer
+        return timer
+
+
+def crewai_calls_in_flight() -> int:
+    """Chamadas LLM da CrewAI iniciadas e ainda sem resposta."""
+    timer = _crewai_timer
+    return timer.in_flight() if timer is not None else 0
+
+
+# --- LangChain ---------------------------------------------------------------
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback de LangChain que grava as chamadas do modelo no tracker.
+
+    Uso:
+        ChatOpenAI(..., callbacks=[MetricsCallbackHandler()])
+    """
+
+    def __init__(self, tracker=None):
+        if not LANGCHAIN_AVAILABLE:
+            raise ImportError("langchain-core não está instalado (pip install langchain-core)")
+        super().__init__()
+        self.timer = LLMCallTimer(tracker)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.timer.start(run_id, _langchain_model(serialized, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.timer.start(run_id, _langchain_model(serialized, kwargs))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        self.timer.first_token(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        llm_output = response.llm_output or {}
+        usage = llm_output.get('token_usage')
+        if not usage:
+            # Streaming: o uso vem em usage_metadata da mensagem gerada
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, 'message', None)
+                    usage = getattr(message, 'usage_metadata', None) or usage
+        self.timer.finish(run_id, usage, llm_output.get('model_name'))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.timer.discard(run_id)
+
+
+def _langchain_model(serialized: Optional[Dict], kwargs: Dict) -> Optional[str]:
+    params = kwargs.get('invocation_params') or {}
+    model = params.get('model') or params.get('model_name')
+    if model is None and serialized:
+        model = (serialized.get('kwargs') or {}).get('model_name')
+    return model
@@ -2,15 +2,26 @@
 """
 Sistema completo de métricas para o projeto CrewAI com RAG.
 Rastreia latência, throughput, uso de tools e performance de agentes.
+
+Os eventos são gravados em colunas por thread (metrics/recorder.py); as
+dataclasses abaixo descrevem o formato dos eventos materializados.
 """
 import time
 import json
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from statistics import mean, median, stdev
 
+from .recorder import EventRecorder, EventSchema
+from .histogram import LatencyHistogram
+from .throughput import ThroughputMeter
+from .pricing import PRICE_TABLE_VERSION, estimate_cost, find_price
+from .tracing import Span, Tracer
+from .analysis import merge_run_analyses, run_analyses, span_skeleton
+
 
 @dataclass
 class RAGMetrics:
@@ -32,6 +43,8 @@ class LLMMetrics:
     tokens_total: int
     estimated_cost: float
     model: str
+    cached_tokens: int
+    ttft: Optional[float]
     timestamp: str
 
 
@@ -55,95 +68,294 @@ class AgentMetrics:
     timestamp: str
 
 
+# Schemas das colunas gravadas por tipo de evento (mesmos campos das dataclasses)
+EVENT_SCHEMAS = [
+    EventSchema('retrieval_times', [
+        ('retrieval_latency', 'd'), ('num_documents_retrieved', 'q'),
+        ('relevance_score', 'd'), ('embedding_latency', 'd'), ('total_latency', 'd'),
+    ]),
+    EventSchema('llm_calls', [
+        ('duration', 'd'), ('tokens_prompt', 'q'), ('tokens_completion', 'q'),
+        ('tokens_total', 'q'), ('estimated_cost', 'd'), ('model', 's'),
+        ('cached_tokens', 'q'), ('ttft', 'o'),
+    ]),
+    EventSchema('tool_usage', [
+        ('tool_name', 's'), ('duration', 'd'), ('success', 'b'),
+    ]),
+    EventSchema('agent_performance', [
+        ('agent_name', 's'), ('task_id', 's'), ('success', 'b'),
+        ('duration', 'd'), ('quality_score', 'o'),
+    ]),
+    EventSchema('throughput', []),
+    # Durações medidas por @timed (metrics/timing.py); sample_rate < 1 = amostrado
+    EventSchema('timings', [
+        ('operation', 's'), ('duration', 'd'), ('success', 'b'), ('sample_rate', 'd'),
+    ]),
+    # Tokens do prompt por seção (metrics/token_attribution.py): uma linha por
+    # seção; calls = 1 só na primeira linha de cada chamada
+    EventSchema('prompt_sections', [
+        ('agent', 's'), ('task', 's'), ('model', 's'), ('section', 's'),
+        ('tokens', 'q'), ('calls', 'q'),
+    ]),
+]
+
+
+# Valor de campos ausentes ao recarregar eventos antigos (replay)
+_REPLAY_DEFAULTS = {'d': 0.0, 'q': 0, 'b': False, 's': '', 'o': None}
+
+
+# Histogramas de latência: operação -> (tipo de evento, campo, ignorar zeros).
+# Embedding zero = "já incluído na busca" (tools de RAG), não uma medição;
+# TTFT ausente (None) = chamada sem streaming.
+LATENCY_OPERATIONS = {
+    'retrieval': ('retrieval_times', 'total_latency', False),
+    'embedding': ('retrieval_times', 'embedding_latency', True),
+    'llm': ('llm_calls', 'duration', False),
+    'ttft': ('llm_calls', 'ttft', True),
+    'tool': ('tool_usage', 'duration', False),
+    'task': ('agent_performance', 'duration', False),
+}
+
+
 class MetricsTracker:
     """
     Rastreador central de métricas do sistema.
+
+    Os track_* são thread-safe e baratos: gravam valores em colunas da
+    thread corrente, com timestamp monotônico. Os dicts de cada evento só
+    são montados sob demanda (`metrics`, save_metrics).
     """
 
     def __init__(self, output_dir: str = "metrics/data"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        self.metrics = {
-            'retrieval_times': [],
-            'llm_calls': [],
-            'tool_usage': [],
-            'agent_performance': [],
-            'throughput': [],
+        self._recorder = EventRecorder(EVENT_SCHEMAS)
+
+        # Agregados dos eventos já enviados aos sinks (drain); os resumos
+        # combinam estes totais com os eventos ainda em memória
+        self._lock = threading.RLock()
+        self._drained = {
+            'counts': {name: 0 for name in self._recorder.schemas},
+            'histograms': {op: LatencyHistogram() for op in LATENCY_OPERATIONS},
+            'cost': 0.0,
+            'tokens': 0,
+            'cached_tokens': 0,
+            'models': {},
+            'timings': {},
+            'tools': {},
+            'agents': {},
+            'prompts': {},
+            # Spans enviados aos sinks: análises das execuções terminadas
+            # (raízes 'crew' e demais) e o esqueleto das ainda abertas
+            'runs': ([], []),
+            'traces': {},
         }
+        # Throughput em janelas deslizantes e EWMA de 1/5/15 min (O(1))
+        self.meters = {
+            'queries': ThroughputMeter(),
+            'llm_calls': ThroughputMeter(),
+            'tokens': ThroughputMeter(),
+            'tool_calls': ThroughputMeter(),
+        }
+        self.flusher = None
+        # Flusher (mesmo já encerrado) cujo sink guarda os spans drenados do tracer
+        self._span_archive = None
+        # Spans hierárquicos crew → task → agent → tool → LLM (metrics/tracing.py)
+        self.tracer = Tracer()
+        # RunProfiler do modo --profile (metrics/profiling.py), se ligado
+        self.profiler = None
+        # BudgetGuard da execução (metrics/budget.py), se ligado
+        self.budget = None
 
         self.session_start = datetime.now()
+        self._session_start_ns = time.monotonic_ns()
         self.session_id = self.session_start.strftime("%Y%m%d_%H%M%S")
+        # Definido ao recarregar uma sessão gravada (sinks.load_metrics)
+        self.session_end: Optional[datetime] = None
+
+    @property
+    def metrics(self) -> Dict[str, List[Dict]]:
+        """Eventos em memória materializados como dicts (formato dos JSONs salvos)."""
+        return {name: self._recorder.rows(name) for name in self._recorder.schemas}
+
+    @property
+    def event_types(self) -> List[str]:
+        return list(self._recorder.schemas)
+
+    def buffered_events(self) -> int:
+        """Eventos ainda em memória (não enviados aos sinks)."""
+        return sum(self._recorder.count(name) for name in self._recorder.schemas)
+
+    def drain(self, event_type: str) -> List[Dict]:
+        """
+        Retira da memória os eventos de um tipo (para os sinks) e os soma
+        aos agregados usados nos resumos.
+        """
+        with self._lock:
+            _, rows = self._recorder.drain(event_type)
+            drained = self._drained
+            drained['counts'][event_type] += len(rows)
+            for operation, (op_type, field, skip_zero) in LATENCY_OPERATIONS.items():
+                if op_type == event_type:
+                    drained['histograms'][operation].record_many(
+                        row[field] for row in rows if row[field] or not skip_zero
+                    )
+            for row in rows:
+                if event_type == 'llm_calls':
+                    drained['cost'] += row['estimated_cost']
+                    drained['tokens'] += row['tokens_total']
+                    drained['cached_tokens'] += row['cached_tokens']
+                    _add_llm_call(drained['models'], row)
+                elif event_type == 'timings':
+                    _add_timing(drained['timings'], row['operation'],
+                                row['duration'], row['sample_rate'])
+                elif event_type == 'tool_usage':
+                    _add_tool_call(drained['tools'], row['tool_name'],
+                                   row['duration'], row['success'])
+                elif event_type == 'agent_performance':
+                    _add_agent_task(drained['agents'], row['agent_name'],
+                                    row['success'], row['quality_score'])
+                elif event_type == 'prompt_sections':
+                    _add_prompt_sections(drained['prompts'], row)
+        return rows
+
+    def drain_spans(self) -> List[Span]:
+        """
+        Retira do tracer os spans terminados (para os sinks) e os soma às
+        análises de execução usadas nos resumos: sem reler o sink.
+        """
+        spans = self.tracer.drain()
+        with self._lock:
+            crew, other = self._drained['runs']
+            traces = self._drained['traces']
+            for span in spans:
+                traces.setdefault(span.trace_id, []).append(span_skeleton(span))
+            for span in spans:
+                if span.parent_id is None:
+                    # A raiz termina por último: a execução está completa
+                    finished_crew, finished_other = run_analyses(traces.pop(span.trace_id))
+                    crew.extend(finished_crew)
+                    other.extend(finished_other)
+        return spans
+
+    def get_run_analysis(self) -> Optional[Dict[str, Any]]:
+        """Caminho crítico e tempo por categoria das execuções (metrics/analysis.py)."""
+        with self._lock:
+            crew, other = (list(runs) for runs in self._drained['runs'])
+            pending = [span for spans in self._drained['traces'].values() for span in spans]
+        live_crew, live_other = run_analyses(pending + self.tracer.spans())
+        return merge_run_analyses((crew + live_crew) or (other + live_other))
+
+    def replay(self, event_type: str, event: Dict, timestamp: datetime):
+        """Regrava um evento já materializado (usado por sinks.load_metrics)."""
+        schema = self._recorder.schemas[event_type]
+        # Campos ausentes em arquivos gravados por versões anteriores
+        values = [event.get(name, _REPLAY_DEFAULTS[kind])
+                  for name, kind in schema.fields]
+        self._recorder.record(event_type, values,
+                              timestamp_ns=self._recorder.from_datetime(timestamp))
+
+    def attach_sinks(self, sinks: List, interval: float = 5.0,
+                     max_buffered: int = 10_000):
+        """
+        Envia os eventos periodicamente aos sinks (metrics/sinks.py) numa
+        thread de flush, mantendo no máximo ~max_buffered eventos em memória.
+        """
+        from .sinks import MetricsFlusher
+
+        self.close()
+        self.flusher = MetricsFlusher(self, sinks, interval=interval,
+                                      max_buffered=max_buffered)
+        if self.flusher.span_archive is not None:
+            self._span_archive = self.flusher
+        self.flusher.start()
+        return self.flusher
+
+    def flush(self):
+        """Envia imediatamente os eventos em memória aos sinks (se houver)."""
+        if self.flusher is not None:
+            self.flusher.flush()
+
+    def trace(self) -> Tracer:
+        """
+        Tracer com todos os spans terminados da sessão, para exportação. Com
+        sinks, os spans já enviados são relidos do sink (o tracer só guarda
+        os pendentes); os resumos usam get_run_analysis, que não relê.
+        """
+        if self._span_archive is None:
+            return self.tracer
+        tracer = Tracer(self.tracer.service_name, max_spans=self.tracer.max_spans)
+        for data in self._span_archive.spans():
+            tracer.add_span(data)
+        return tracer
+
+    def close(self):
+        """Faz o flush final e encerra a thread de flush (se houver)."""
+        if self.flusher is not None:
+            self.flusher.stop()
+            self.flusher = None
 
     def track_retrieval(self, duration: float, docs_retrieved: int,
                        relevance_score: float, embedding_latency: float):
         """Rastreia operação de retrieval RAG."""
-        metrics = RAGMetrics(
-            retrieval_latency=duration - embedding_latency,
-            num_documents_retrieved=docs_retrieved,
-            relevance_score=relevance_score,
-            embedding_latency=embedding_latency,
-            total_latency=duration,
-            timestamp=datetime.now().isoformat()
-        )
-        self.metrics['retrieval_times'].append(asdict(metrics))
-        return metrics
+        self._recorder.record('retrieval_times', (
+            duration - embedding_latency, docs_retrieved, relevance_score,
+            embedding_latency, duration,
+        ))
 
     def track_llm_call(self, duration: float, tokens_prompt: int,
-                      tokens_completion: int, model: str = "gpt-4"):
-        """Rastreia chamada LLM."""
-        # Custos aproximados (ajustar conforme modelo)
-        cost_per_1k_prompt = 0.03 if "gpt-4" in model else 0.0015
-        cost_per_1k_completion = 0.06 if "gpt-4" in model else 0.002
-
-        estimated_cost = (
-            (tokens_prompt / 1000) * cost_per_1k_prompt +
-            (tokens_completion / 1000) * cost_per_1k_completion
-        )
-
-        metrics = LLMMetrics(
-            duration=duration,
-            tokens_prompt=tokens_prompt,
-            tokens_completion=tokens_completion,
-            tokens_total=tokens_prompt + tokens_completion,
-            estimated_cost=estimated_cost,
-            model=model,
-            timestamp=datetime.now().isoformat()
-        )
-        self.metrics['llm_calls'].append(asdict(metrics))
-        return metrics
+                      tokens_completion: int, model: str = "gpt-4",
+                      cached_tokens: int = 0, ttft: Optional[float] = None):
+        """
+        Rastreia chamada LLM (gravada automaticamente por metrics/llm_hooks.py).
+
+        Args:
+            cached_tokens: Parte de tokens_prompt servida do cache de prompt
+            ttft: Tempo até o primeiro token (s), em chamadas com streaming
+        """
+        # Custo pela tabela versionada (metrics/pricing.py)
+        estimated_cost = estimate_cost(model, tokens_prompt, tokens_completion, cached_tokens)
+
+        self._recorder.record('llm_calls', (
+            duration, tokens_prompt, tokens_completion,
+            tokens_prompt + tokens_completion, estimated_cost, model,
+            cached_tokens, ttft,
+        ))
+        self.meters['llm_calls'].mark()
+        self.meters['tokens'].mark(tokens_prompt + tokens_completion)
+        if self.budget is not None:
+            self.budget.charge(tokens_prompt + tokens_completion, estimated_cost)
 
     def track_tool_call(self, tool_name: str, duration: float, success: bool):
         """Rastreia uso de tool."""
-        metrics = ToolMetrics(
-            tool_name=tool_name,
-            duration=duration,
-            success=success,
-            timestamp=datetime.now().isoformat()
-        )
-        self.metrics['tool_usage'].append(asdict(metrics))
-        return metrics
+        self._recorder.record('tool_usage', (tool_name, duration, success))
+        self.meters['tool_calls'].mark()
 
     def track_agent_task(self, agent_name: str, task_id: str,
                         success: bool, duration: float,
                         quality_score: Optional[float] = None):
         """Rastreia execução de task por agente."""
-        metrics = AgentMetrics(
-            agent_name=agent_name,
-            task_id=task_id,
-            success=success,
-            duration=duration,
-            quality_score=quality_score,
-            timestamp=datetime.now().isoformat()
-        )
-        self.metrics['agent_performance'].append(asdict(metrics))
-        return metrics
+        self._recorder.record('agent_performance', (
+            agent_name, task_id, success, duration, quality_score,
+        ))
+
+    def record_timing(self, operation: str, duration: float, success: bool = True,
+                      sample_rate: float = 1.0):
+        """Grava a duração de uma operação medida por @timed (metrics/timing.py)."""
+        self._recorder.record('timings', (operation, duration, success, sample_rate))
+
+    def track_prompt_sections(self, agent: str, task: str, model: str,
+                              sections: Dict[str, int]):
+        """Grava os tokens do prompt de uma chamada LLM por seção (backstory, RAG...)."""
+        for i, (section, tokens) in enumerate(sections.items()):
+            self._recorder.record('prompt_sections',
+                                  (agent, task, model, section, tokens, int(i == 0)))
 
     def track_query(self):
         """Registra uma query para cálculo de throughput."""
-        self.metrics['throughput'].append({
-            'timestamp': datetime.now().isoformat()
-        })
+        self._recorder.record('throughput', ())
+        self.meters['queries'].mark()
 
     def calculate_throughput(self, time_window: int = 60) -> float:
         """
@@ -152,63 +364,105 @@ class MetricsTracker:
         Args:
             time_window: Janela de tempo em segundos (default: 60s)
         """
-        now = datetime.now()
-        recent_queries = [
-            q for q in self.metrics['throughput']
-            if (now - datetime.fromisoformat(q['timestamp'])).seconds <= time_window
-        ]
-        return len(recent_queries)
+        return self.meters['queries'].window_count(time_window)
+
+    def get_rates(self) -> Dict[str, Dict[str, float]]:
+        """Taxas por minuto (EWMA 1/5/15 min e média) de queries, LLM, tokens e tools."""
+        return {name: meter.rates() for name, meter in self.meters.items()}
+
+    def _count(self, event_type: str) -> int:
+        with self._lock:
+            return self._drained['counts'][event_type] + self._recorder.count(event_type)
+
+    def get_latency_histogram(self, operation: str) -> LatencyHistogram:
+        """Histograma de latência de uma operação (retrieval, embedding, llm, ttft, tool, task)."""
+        event_type, field, skip_zero = LATENCY_OPERATIONS[operation]
+        with self._lock:
+            histogram = self._drained['histograms'][operation].copy()
+            values = self._recorder.column(event_type, field)
+        histogram.record_many(v for v in values if v or not skip_zero)
+        return histogram
+
+    def get_latency_histograms(self) -> Dict[str, LatencyHistogram]:
+        return {op: self.get_latency_histogram(op) for op in LATENCY_OPERATIONS}
+
+    def get_timing_histograms(self) -> Dict[str, LatencyHistogram]:
+        """Histogramas das operações medidas por @timed (amostras com peso 1/taxa)."""
+        with self._lock:
+            histograms = {op: h.copy() for op, h in self._drained['timings'].items()}
+            columns = [self._recorder.column('timings', field)
+                       for field in ('operation', 'duration', 'sample_rate')]
+        for operation, duration, sample_rate in zip(*columns):
+            _add_timing(histograms, operation, duration, sample_rate)
+        return histograms
 
     def get_avg_retrieval_time(self) -> float:
         """Calcula latência média de retrieval."""
-        if not self.metrics['retrieval_times']:
-            return 0.0
-        times = [r['total_latency'] for r in self.metrics['retrieval_times']]
-        return mean(times)
+        return self.get_latency_histogram('retrieval').mean
 
     def get_avg_llm_time(self) -> float:
         """Calcula latência média de LLM calls."""
-        if not self.metrics['llm_calls']:
-            return 0.0
-        times = [l['duration'] for l in self.metrics['llm_calls']]
-        return mean(times)
+        return self.get_latency_histogram('llm').mean
 
     def get_total_cost(self) -> float:
         """Calcula custo total estimado."""
-        if not self.metrics['llm_calls']:
-            return 0.0
-        return sum(l['estimated_cost'] for l in self.metrics['llm_calls'])
+        with self._lock:
+            return self._drained['cost'] + sum(self._recorder.column('llm_calls', 'estimated_cost'))
 
     def get_total_tokens(self) -> int:
         """Calcula total de tokens usados."""
-        if not self.metrics['llm_calls']:
-            return 0
-        return sum(l['tokens_total'] for l in self.metrics['llm_calls'])
+        with self._lock:
+            return self._drained['tokens'] + sum(self._recorder.column('llm_calls', 'tokens_total'))
+
+    def get_total_cached_tokens(self) -> int:
+        """Total de tokens de prompt servidos do cache."""
+        with self._lock:
+            return (self._drained['cached_tokens']
+                    + sum(self._recorder.column('llm_calls', 'cached_tokens')))
+
+    def get_llm_usage_by_model(self) -> Dict[str, Any]:
+        """Chamadas, tokens e custo por modelo."""
+        with self._lock:
+            model_stats = {model: dict(stats)
+                           for model, stats in self._drained['models'].items()}
+            rows = self._recorder.rows('llm_calls')
+        for row in rows:
+            _add_llm_call(model_stats, row)
+        return model_stats
+
+    def get_prompt_attribution(self) -> Dict[str, Any]:
+        """
+        Tokens e custo de entrada do prompt por agente → task → seção, com
+        o número de chamadas.
+        """
+        with self._lock:
+            stats = {
+                agent: {task: dict(task_stats, sections={
+                    label: dict(section) for label, section in task_stats['sections'].items()
+                }) for task, task_stats in tasks.items()}
+                for agent, tasks in self._drained['prompts'].items()
+            }
+            rows = self._recorder.rows('prompt_sections')
+        for row in rows:
+            _add_prompt_sections(stats, row)
+        return stats
+
+    def get_prompt_tokens_by_section(self) -> Dict[str, int]:
+        """Tokens do prompt por seção, somados em todos os agentes e tasks."""
+        return _sections_total(self.get_prompt_attribution())
 
     def get_tool_efficiency(self) -> Dict[str, Any]:
         """Calcula eficiência por tool."""
-        if not self.metrics['tool_usage']:
-            return {}
-
-        tool_stats = {}
-        for tool_call in self.metrics['tool_usage']:
-            tool_name = tool_call['tool_name']
-            if tool_name not in tool_stats:
-                tool_stats[tool_name] = {
-                    'total_calls': 0,
-                    'successful_calls': 0,
-                    'failed_calls': 0,
-                    'total_duration': 0.0,
-                    'avg_duration': 0.0,
-                    'success_rate': 0.0
-                }
-
-            tool_stats[tool_name]['total_calls'] += 1
-            if tool_call['success']:
-                tool_stats[tool_name]['successful_calls'] += 1
-            else:
-                tool_stats[tool_name]['failed_calls'] += 1
-            tool_stats[tool_name]['total_duration'] += tool_call['duration']
+        recorder = self._recorder
+        with self._lock:
+            tool_stats = {name: dict(stats) for name, stats in self._drained['tools'].items()}
+            tool_calls = zip(
+                recorder.column('tool_usage', 'tool_name'),
+                recorder.column('tool_usage', 'duration'),
+                recorder.column('tool_usage', 'success'),
+            )
+            for tool_name, duration, success in tool_calls:
+                _add_tool_call(tool_stats, tool_name, duration, success)
 
         # Calcular médias e taxas
         for tool_name, stats in tool_stats.items():
@@ -219,28 +473,19 @@ class MetricsTracker:
 
     def get_agent_success_rates(self) -> Dict[str, Any]:
         """Calcula taxa de sucesso por agente."""
-        if not self.metrics['agent_performance']:
-            return {}
-
-        agent_stats = {}
-        for task in self.metrics['agent_performance']:
-            agent_name = task['agent_name']
-            if agent_name not in agent_stats:
-                agent_stats[agent_name] = {
-                    'tasks_completed': 0,
-                    'tasks_failed': 0,
-                    'success_rate': 0.0,
-                    'avg_duration': 0.0,
-                    'quality_scores': []
-                }
-
-            if task['success']:
-                agent_stats[agent_name]['tasks_completed'] += 1
-            else:
-                agent_stats[agent_name]['tasks_failed'] += 1
-
-            if task['quality_score'] is not None:
-                agent_stats[agent_name]['quality_scores'].append(task['quality_score'])
+        recorder = self._recorder
+        with self._lock:
+            agent_stats = {
+                name: dict(stats, quality_scores=list(stats['quality_scores']))
+                for name, stats in self._drained['agents'].items()
+            }
+            tasks = zip(
+                recorder.column('agent_performance', 'agent_name'),
+                recorder.column('agent_performance', 'success'),
+                recorder.column('agent_performance', 'quality_score'),
+            )
+            for agent_name, success, quality_score in tasks:
+                _add_agent_task(agent_stats, agent_name, success, quality_score)
 
         # Calcular taxas e médias
         for agent_name, stats in agent_stats.items():
@@ -253,26 +498,48 @@ class MetricsTracker:
 
         return agent_stats
 
+    def _session_duration(self) -> int:
+        if self.session_end is not None:
+            return int((self.session_end - self.session_start).total_seconds())
+        return (time.monotonic_ns() - self._session_start_ns) // 10**9
+
     def get_summary(self) -> Dict[str, Any]:
         """Gera resumo completo das métricas."""
+        histograms = self.get_latency_histograms()
+        timings = self.get_timing_histograms()
+        prompt_attribution = self.get_prompt_attribution()
         return {
             'session_id': self.session_id,
-            'session_duration': (datetime.now() - self.session_start).seconds,
+            'session_duration': self._session_duration(),
             'summary': {
-                'total_queries': len(self.metrics['throughput']),
-                'total_retrievals': len(self.metrics['retrieval_times']),
-                'total_llm_calls': len(self.metrics['llm_calls']),
-                'total_tool_calls': len(self.metrics['tool_usage']),
-                'total_agent_tasks': len(self.metrics['agent_performance']),
-                'avg_retrieval_latency': self.get_avg_retrieval_time(),
-                'avg_llm_latency': self.get_avg_llm_time(),
+                'total_queries': self._count('throughput'),
+                'total_retrievals': self._count('retrieval_times'),
+                'total_llm_calls': self._count('llm_calls'),
+                'total_tool_calls': self._count('tool_usage'),
+                'total_agent_tasks': self._count('agent_performance'),
+                # Médias mantidas para os relatórios existentes; ver 'latency'
+                'avg_retrieval_latency': histograms['retrieval'].mean,
+                'avg_llm_latency': histograms['llm'].mean,
                 'total_cost': self.get_total_cost(),
                 'total_tokens': self.get_total_tokens(),
+                'total_cached_tokens': self.get_total_cached_tokens(),
+                'price_table_version': PRICE_TABLE_VERSION,
+                'prompt_tokens_by_section': _sections_total(prompt_attribution),
                 'throughput': self.calculate_throughput(),
+                'latency': {op: h.percentiles() for op, h in histograms.items()},
+                'timings': {op: h.percentiles() for op, h in timings.items()},
+                'rates_per_minute': self.get_rates(),
             },
             'detailed_metrics': {
                 'tool_efficiency': self.get_tool_efficiency(),
+                'llm_usage_by_model': self.get_llm_usage_by_model(),
+                'prompt_attribution': prompt_attribution,
                 'agent_success_rates': self.get_agent_success_rates(),
+                # Serializados: combináveis entre execuções (histogram.merge_histograms)
+                'latency_histograms': {op: h.to_dict() for op, h in histograms.items()},
+                'timing_histograms': {op: h.to_dict() for op, h in timings.items()},
+                # Caminho crítico e tempo por categoria (metrics/analysis.py)
+                'run_analysis': self.get_run_analysis(),
             }
         }
 
@@ -283,7 +550,25 @@ class MetricsTracker:
 
         filepath = self.output_dir / filename
         summary = self.get_summary()
+        # Com sinks, os eventos já enviados ficam nos arquivos deles
         summary['raw_metrics'] = self.metrics
+        if self.flusher is not None:
+            summary['sinks'] = self.flusher.describe()
+        trace = self.trace()
+        if trace.spans():
+            # Flame chart offline: chrome://tracing / ui.perfetto.dev e OTLP
+            stem = filepath.with_suffix("")
+            summary['traces'] = {
+                'chrome': str(trace.export_chrome_trace(f"{stem}.trace.json")),
+                'otlp': str(trace.export_otlp(f"{stem}.otlp.json")),
+            }
+        if self.profiler is not None:
+            # Memória/CPU por task e pilhas amostradas (flamegraph.pl, speedscope)
+            summary['profile'] = self.profiler.to_dict()
+            summary['profile']['collapsed'] = str(
+                self.profiler.export_collapsed(f"{filepath.with_suffix('')}.collapsed.txt"))
+        if self.budget is not None:
+            summary['budget'] = self.budget.to_dict()
 
         filepath.write_text(json.dumps(summary, indent=2))
         return filepath
@@ -305,13 +590,65 @@ class MetricsTracker:
         print(f"Total de Agent Tasks: {summary['summary']['total_agent_tasks']}")
 
         print("\n--- PERFORMANCE ---")
-        print(f"Latência Média Retrieval: {summary['summary']['avg_retrieval_latency']:.3f}s")
-        print(f"Latência Média LLM: {summary['summary']['avg_llm_latency']:.3f}s")
+        print(f"{'Latência (s)':22}{'n':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        latencies = {**summary['summary']['latency'], **summary['summary']['timings']}
+        for operation, stats in latencies.items():
+            if not stats['count']:
+                continue
+            print(f"{operation:22}{stats['count']:>7}{stats['p50']:>9.3f}"
+                  f"{stats['p90']:>9.3f}{stats['p99']:>9.3f}{stats['max']:>9.3f}")
         print(f"Throughput: {summary['summary']['throughput']:.1f} queries/min")
+        print(f"{'Taxa (/min)':14}{'1m':>9}{'5m':>9}{'15m':>9}{'média':>9}")
+        for name, rates in summary['summary']['rates_per_minute'].items():
+            if rates['count']:
+                print(f"{name:14}{rates['m1']:>9.1f}{rates['m5']:>9.1f}"
+                      f"{rates['m15']:>9.1f}{rates['mean']:>9.1f}")
 
         print("\n--- CUSTOS ---")
         print(f"Total de Tokens: {summary['summary']['total_tokens']:,}")
-        print(f"Custo Estimado: ${summary['summary']['total_cost']:.4f}")
+        print(f"Tokens em Cache: {summary['summary']['total_cached_tokens']:,}")
+        print(f"Custo Estimado: ${summary['summary']['total_cost']:.4f}"
+              f" (preços de {summary['summary']['price_table_version']})")
+        for model, stats in summary['detailed_metrics']['llm_usage_by_model'].items():
+            print(f"  {model}: {stats['calls']} chamadas, "
+                  f"{stats['tokens_prompt'] + stats['tokens_completion']:,} tokens, "
+                  f"${stats['cost']:.4f}")
+
+        by_section = summary['summary']['prompt_tokens_by_section']
+        if by_section:
+            print("\n--- TOKENS DO PROMPT POR SEÇÃO ---")
+            total = sum(by_section.values())
+            for label, tokens in by_section.items():
+                print(f"  {label:22}{tokens:>10,}{tokens / total * 100:>7.1f}%")
+            for agent, tasks in summary['detailed_metrics']['prompt_attribution'].items():
+                for task, stats in tasks.items():
+                    top = max(stats['sections'].items(), key=lambda item: item[1]['tokens'])
+                    print(f"  {agent} / {task}: {stats['tokens']:,} tokens em "
+                          f"{stats['calls']} chamadas (${stats['cost']:.4f}; "
+                          f"maior: {top[0]})")
+
+        analysis = summary['detailed_metrics']['run_analysis']
+        if analysis:
+            print("\n--- CAMINHO CRÍTICO E OVERHEAD ---")
+            print(f"{'Categoria':14}{'tempo (s)':>11}{'%':>8}{'crítico (s)':>13}")
+            critical = analysis['critical_path']['by_category']
+            for category, seconds in analysis['time_by_category'].items():
+                if seconds or critical.get(category):
+                    print(f"{category:14}{seconds:>11.2f}"
+                          f"{analysis['shares'][category] * 100:>7.1f}%"
+                          f"{critical.get(category, 0.0):>13.2f}")
+            for segment in analysis['critical_path']['top_segments'][:3]:
+                print(f"  crítico: {segment['name']} ({segment['category']}): "
+                      f"{segment['seconds']:.2f}s")
+            for gap in analysis['idle_gaps'][:3]:
+                print(f"  ocioso: {gap['seconds']:.2f}s em +{gap['offset']:.1f}s "
+                      f"({gap['after_task'] or 'início'} → {gap['before_task'] or 'fim'})")
+            tasks = analysis['tasks']
+            if tasks['count']:
+                print(f"Tasks: {tasks['sequential_seconds']:.1f}s em sequência, "
+                      f"{tasks['parallel_seconds']:.1f}s com as independentes em paralelo "
+                      f"(speedup estimado {tasks['estimated_speedup']:.2f}x; "
+                      f"dependências: {tasks['dependencies']})")
 
         print("\n--- EFICIÊNCIA DE TOOLS ---")
         for tool_name, stats in summary['detailed_metrics']['tool_efficiency'].items():
@@ -331,29 +668,90 @@ class MetricsTracker:
         print("\n" + "=" * 80)
 
 
-def track_timing(stage_name: str):
-    """
-    Decorator para rastrear tempo de execução de funções.
+def _add_timing(histograms: Dict[str, LatencyHistogram], operation: str,
+                duration: float, sample_rate: float):
+    histogram = histograms.get(operation)
+    if histogram is None:
+        histogram = histograms[operation] = LatencyHistogram()
+    histogram.record(duration, max(1, round(1 / sample_rate)) if sample_rate > 0 else 1)
 
-    Usage:
-        @track_timing("retrieval")
-        def my_function():
-            pass
-    """
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            start_time = time.time()
-            try:
-                result = func(*args, **kwargs)
-                duration = time.time() - start_time
-                print(f"⏱️  [{stage_name}] {func.__name__}: {duration:.3f}s")
-                return result
-            except Exception as e:
-                duration = time.time() - start_time
-                print(f"❌ [{stage_name}] {func.__name__}: {duration:.3f}s (FAILED: {e})")
-                raise
-        return wrapper
-    return decorator
+
+def _add_llm_call(model_stats: Dict, row: Dict):
+    stats = model_stats.get(row['model'])
+    if stats is None:
+        stats = model_stats[row['model']] = {
+            'calls': 0, 'tokens_prompt': 0, 'tokens_completion': 0,
+            'cached_tokens': 0, 'cost': 0.0,
+        }
+    stats['calls'] += 1
+    stats['tokens_prompt'] += row['tokens_prompt']
+    stats['tokens_completion'] += row['tokens_completion']
+    stats['cached_tokens'] += row['cached_tokens']
+    stats['cost'] += row['estimated_cost']
+
+
+def _add_prompt_sections(prompt_stats: Dict, row: Dict):
+    stats = prompt_stats.setdefault(row['agent'], {}).get(row['task'])
+    if stats is None:
+        stats = prompt_stats[row['agent']][row['task']] = {
+            'calls': 0, 'tokens': 0, 'cost': 0.0, 'sections': {},
+        }
+    # Custo de entrada (sem desconto de cache: a atribuição é feita antes do envio)
+    price = find_price(row['model'])
+    cost = row['tokens'] * price.input / 1_000_000 if price else 0.0
+    section = stats['sections'].setdefault(row['section'], {'tokens': 0, 'cost': 0.0})
+    section['tokens'] += row['tokens']
+    section['cost'] += cost
+    stats['calls'] += row['calls']
+    stats['tokens'] += row['tokens']
+    stats['cost'] += cost
+
+
+def _sections_total(prompt_attribution: Dict) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for tasks in prompt_attribution.values():
+        for stats in tasks.values():
+            for label, section in stats['sections'].items():
+                totals[label] = totals.get(label, 0) + section['tokens']
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def _add_tool_call(tool_stats: Dict, tool_name: str, duration: float, success: bool):
+    stats = tool_stats.get(tool_name)
+    if stats is None:
+        stats = tool_stats[tool_name] = {
+            'total_calls': 0,
+            'successful_calls': 0,
+            'failed_calls': 0,
+            'total_duration': 0.0,
+            'avg_duration': 0.0,
+            'success_rate': 0.0
+        }
+    stats['total_calls'] += 1
+    if success:
+        stats['successful_calls'] += 1
+    else:
+        stats['failed_calls'] += 1
+    stats['total_duration'] += duration
+
+
+def _add_agent_task(agent_stats: Dict, agent_name: str, success: bool,
+                    quality_score: Optional[float]):
+    stats = agent_stats.get(agent_name)
+    if stats is None:
+        stats = agent_stats[agent_name] = {
+            'tasks_completed': 0,
+            'tasks_failed': 0,
+            'success_rate': 0.0,
+            'avg_duration': 0.0,
+            'quality_scores': []
+        }
+    if success:
+        stats['tasks_completed'] += 1
+    else:
+        stats['tasks_failed'] += 1
+    if quality_score is not None:
+        stats['quality_scores'].append(quality_score)
 
 
 # Instância global do tracker (opcional)
@@ -368,7 +766,9 @@ def get_tracker() -> MetricsTracker:
 
 
 def reset_tracker():
-    """Reseta tracker global."""
+    """Reseta tracker global (fazendo o flush final dos sinks do anterior)."""
     global global_tracker
+    if global_tracker is not None:
+        global_tracker.close()
     global_tracker = MetricsTracker()
     return global_tracker
@@ -0,0 +1,289 @@
+# metrics/openmetrics.py
+"""
+Endpoint HTTP local com as métricas do MetricsTracker em formato OpenMetrics.
+
+A observabilidade dependia do AgentOps (serviço externo) ou dos JSONs em
+metrics/data, lidos depois da execução. O OpenMetricsExporter serve
+GET /metrics de dentro do processo (padrão 127.0.0.1, sem tráfego de
+saída), para Prometheus/VictoriaMetrics/Grafana Agent locais acompanharem
+a execução em tempo real:
+- contadores: queries, retrievals, chamadas/tokens/tokens em cache/custo
+  de LLM por modelo, chamadas de tool e tasks de agente por status;
+- histogramas (segundos): latências do tracker (retrieval, embedding, llm,
+  ttft, tool, task) e operações medidas com @timed;
+- gauges: taxa de sucesso por tool, proporção de tokens de prompt servidos
+  do cache, execuções e spans em andamento, chamadas LLM em voo e eventos
+  na fila dos sinks.
+
+Cardinalidade limitada: cada família aceita até `max_label_values` valores
+distintos por label (modelo, tool, agente, operação); os demais são
+somados em "other". Cada scrape lê o tracker global corrente (o runner de
+baseline troca de tracker por projeto; os contadores recomeçam e o
+`_created` muda junto).
+
+Uso:
+    exporter = start_exporter(port=9464)   # http://127.0.0.1:9464/metrics
+    ...
+    exporter.stop()
+"""
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .histogram import LatencyHistogram
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "crewai_"
+OTHER = "other"
+# Limites `le` dos histogramas de latência (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0)
+_MAX_LABEL_CHARS = 100
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class LabelLimiter:
+    """
+    Limita os valores distintos de cada (família, label). Os primeiros
+    `max_values` vistos ficam fixos entre scrapes; os seguintes viram OTHER.
+    """
+
+    def __init__(self, max_values: int = 20):
+        self.max_values = max_values
+        self._seen: Dict[Tuple[str, str], set] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, family: str, label: str, value: str) -> str:
+        value = str(value)[:_MAX_LABEL_CHARS]
+        with self._lock:
+            seen = self._seen.setdefault((family, label), set())
+            if value in seen:
+                return value
+            if len(seen) < self.max_values:
+                seen.add(value)
+                return value
+        return OTHER
+
+
+class _Family:
+    """Uma família de métricas: amostras somadas por (sufixo, labels)."""
+
+    def __init__(self, name: str, kind: str, help: str, unit: str = ""):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.unit = unit
+        self.samples: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Labels, LatencyHistogram] = {}
+
+    def add(self, value: float, labels: Labels = (), suffix: str = ""):
+        key = (suffix, labels)
+        self.samples[key] = self.samples.get(key, 0) + value
+
+    def set(self, value: float, labels: Labels = ()):
+        self.samples[("", labels)] = value
+
+    def observe(self, histogram: LatencyHistogram, labels: Labels = ()):
+        if labels in self.histograms:
+            self.histograms[labels].merge(histogram)
+        else:
+            self.histograms[labels] = histogram.copy()
+
+    def render(self, created: float) -> List[str]:
+        lines = [f"# TYPE {self.name} {self.kind}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {_escape(self.help, help_text=True)}")
+        for (suffix, labels), value in sorted(self.samples.items()):
+            lines.append(f"{self.name}{suffix}{_labels(labels)} {_number(value)}")
+            if self.kind == 'counter':
+                lines.append(f"{self.name}_created{_labels(labels)} {_number(created)}")
+        for labels, histogram in sorted(self.histograms.items()):
+            for bound, count in zip(LATENCY_BUCKETS, histogram.cumulative_counts(LATENCY_BUCKETS)):
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{self.name}_count{_labels(labels)} {histogram.count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(histogram.total)}")
+            lines.append(f"{self.name}_created{_labels(labels)} {_number(created)}")
+        return lines
+
+
+def _escape(value: str, help_text: bool = False) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value if help_text else value.replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def render_openmetrics(tracker=None, limiter: Optional[LabelLimiter] = None) -> str:
+    """Exposição OpenMetrics do tracker (padrão: o global corrente)."""
+    from .metrics_tracker import get_tracker
+    from .llm_hooks import crewai_calls_in_flight
+
+    tracker = tracker or get_tracker()
+    limit = limiter or LabelLimiter()
+    families: List[_Family] = []
+
+    def family(name: str, kind: str, help: str, unit: str = "") -> _Family:
+        families.append(_Family(PREFIX + name, kind, help, unit))
+        return families[-1]
+
+    def label(f: _Family, name: str, value: str) -> Tuple[str, str]:
+        return name, limit(f.name, name, value)
+
+    # --- contadores -----------------------------------------------------------------
+    family("queries", 'counter', "Queries atendidas").add(
+        tracker._count('throughput'), suffix="_total")
+    family("retrievals", 'counter', "Retrievals da base de conhecimento").add(
+        tracker._count('retrieval_times'), suffix="_total")
+
+    calls = family("llm_calls", 'counter', "Chamadas LLM por modelo")
+    tokens = family("llm_tokens", 'counter', "Tokens de LLM por modelo e tipo")
+    cached = family("llm_cached_tokens", 'counter',
+                    "Tokens de prompt servidos do cache do provedor (cache hits)")
+    cost = family("llm_cost_usd", 'counter', "Custo estimado de LLM em USD", unit="usd")
+    prompt_total = cached_total = 0
+    for model, stats in tracker.get_llm_usage_by_model().items():
+        model_label = (label(calls, 'model', model),)
+        calls.add(stats['calls'], model_label, "_total")
+        tokens.add(stats['tokens_prompt'], model_label + (('type', 'prompt'),), "_total")
+        tokens.add(stats['tokens_completion'], model_label + (('type', 'completion'),), "_total")
+        cached.add(stats['cached_tokens'], model_label, "_total")
+        cost.add(stats['cost'], model_label, "_total")
+        prompt_total += stats['tokens_prompt']
+        cached_total += stats['cached_tokens']
+
+    tool_calls = family("tool_calls", 'counter', "Chamadas de tool por status")
+    tool_success = family("tool_success_ratio", 'gauge', "Taxa de sucesso por tool")
+    for tool, stats in tracker.get_tool_efficiency().items():
+        tool_label = (label(tool_calls, 'tool', tool),)
+        tool_calls.add(stats['successful_calls'], tool_label + (('status', 'success'),), "_total")
+        tool_calls.add(stats['failed_calls'], tool_label + (('status', 'failure'),), "_total")
+    # Taxa recalculada depois de agrupar em "other"
+    totals: Dict[Labels, List[float]] = {}
+    for (_, labels), value in tool_calls.samples.items():
+        counts = totals.setdefault(labels[:1], [0, 0])
+        counts[0] += value if labels[1][1] == 'success' else 0
+        counts[1] += value
+    for labels, (successes, total) in totals.items():
+        tool_success.set(successes / total if total else 0.0, labels)
+
+    agent_tasks = family("agent_tasks", 'counter', "Tasks executadas por agente e status")
+    for agent, stats in tracker.get_agent_success_rates().items():
+        agent_label = (label(agent_tasks, 'agent', agent),)
+        agent_tasks.add(stats['tasks_completed'], agent_label + (('status', 'success'),), "_total")
+        agent_tasks.add(stats['tasks_failed'], agent_label + (('status', 'failure'),), "_total")
+
+    # --- histogramas -------------------------------------------------------------------
+    latency = family("latency_seconds", 'histogram', "Latências por operação", unit="seconds")
+    for operation, histogram in tracker.get_latency_histograms().items():
+        latency.observe(histogram, (('operation', operation),))
+    timings = family("timing_seconds", 'histogram',
+                     "Durações das operações medidas com @timed", unit="seconds")
+    for operation, histogram in tracker.get_timing_histograms().items():
+        timings.observe(histogram, (label(timings, 'operation', operation),))
+
+    # --- gauges ---------------------------------------------------------------------------
+    family("llm_prompt_cache_hit_ratio", 'gauge',
+           "Proporção dos tokens de prompt servidos do cache").set(
+        cached_total / prompt_total if prompt_total else 0.0)
+    open_spans = tracker.tracer.open_spans()
+    family("active_runs", 'gauge', "Execuções da crew em andamento (spans raiz abertos)").set(
+        sum(1 for span in open_spans if span.parent_id is None))
+    in_progress = family("spans_in_progress", 'gauge', "Spans abertos por tipo")
+    for span in open_spans:
+        in_progress.add(1, (label(in_progress, 'kind', span.kind),))
+    family("llm_calls_in_flight", 'gauge', "Chamadas LLM iniciadas e sem resposta").set(
+        crewai_calls_in_flight())
+    family("buffered_events", 'gauge',
+           "Eventos em memória aguardando o flush para os sinks (fila)").set(
+        tracker.buffered_events())
+
+    created = tracker.session_start.timestamp()
+    lines = [line for f in families for line in f.render(created)]
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class OpenMetricsExporter:
+    """
+    Servidor HTTP (thread daemon) que responde GET /metrics com
+    render_openmetrics(); `tracker=None` segue o tracker global corrente.
+    """
+
+    def __init__(self, tracker=None, host: str = "127.0.0.1", port: int = 9464,
+                 max_label_values: int = 20):
+        self.tracker = tracker
+        self.limiter = LabelLimiter(max_label_values)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.host = host
+        self.port = port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def render(self) -> str:
+        return render_openmetrics(self.tracker, self.limiter)
+
+    def start(self) -> 'OpenMetricsExporter':
+        if self._server is not None:
+            return self
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes a cada poucos segundos não vão para o console
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]   # port=0: porta livre
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-openmetrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = self._thread = None
+
+
+def start_exporter(tracker=None, host: str = "127.0.0.1", port: int = 9464,
+                   max_label_values: int = 20) -> OpenMetricsExporter:
+    """Cria e inicia um OpenMetricsExporter."""
+    return OpenMetricsExporter(tracker, host, port, max_label_values).start()
@@ -0,0 +1,82 @@
+# metrics/pricing.py
+"""
+Tabela de preços versionada dos modelos usados pelo projeto.
+
+Preços em USD por 1M de tokens (entrada, entrada em cache, saída), conforme
+a página de preços da OpenAI na data de PRICE_TABLE_VERSION. Ao atualizar
+os valores, atualize também a versão: ela é gravada no resumo das métricas,
+então relatórios antigos continuam comparáveis.
+
+O nome do modelo é casado pelo prefixo mais longo, sem o provedor
+("openai/gpt-4o-mini-2024-07-18" -> "gpt-4o-mini").
+"""
+from typing import Dict, NamedTuple, Optional
+
+
+PRICE_TABLE_VERSION = "2025-08-01"
+
+
+class ModelPrice(NamedTuple):
+    """USD por 1M de tokens."""
+    input: float
+    cached_input: Optional[float]
+    output: float
+
+
+PRICE_TABLE: Dict[str, ModelPrice] = {
+    # Chat
+    'gpt-5': ModelPrice(1.25, 0.125, 10.00),
+    'gpt-5-mini': ModelPrice(0.25, 0.025, 2.00),
+    'gpt-5-nano': ModelPrice(0.05, 0.005, 0.40),
+    'gpt-4.1': ModelPrice(2.00, 0.50, 8.00),
+    'gpt-4.1-mini': ModelPrice(0.40, 0.10, 1.60),
+    'gpt-4.1-nano': ModelPrice(0.10, 0.025, 0.40),
+    'gpt-4o': ModelPrice(2.50, 1.25, 10.00),
+    'gpt-4o-mini': ModelPrice(0.15, 0.075, 0.60),
+    'gpt-4-turbo': ModelPrice(10.00, None, 30.00),
+    'gpt-4': ModelPrice(30.00, None, 60.00),
+    'gpt-3.5-turbo': ModelPrice(0.50, None, 1.50),
+    'o4-mini': ModelPrice(1.10, 0.275, 4.40),
+    'o3-mini': ModelPrice(1.10, 0.55, 4.40),
+    'o3': ModelPrice(2.00, 0.50, 8.00),
+    # Embeddings (só entrada)
+    'text-embedding-3-small': ModelPrice(0.02, None, 0.0),
+    'text-embedding-3-large': ModelPrice(0.13, None, 0.0),
+    'text-embedding-ada-002': ModelPrice(0.10, None, 0.0),
+}
+
+
+def normalize_model(model: str) -> str:
+    """Remove o provedor ("openai/", "azure/"...) e normaliza a caixa."""
+    return (model or "").rsplit("/", 1)[-1].strip().lower()
+
+
+def find_price(model: str) -> Optional[ModelPrice]:
+    """Preço do modelo pelo prefixo mais longo da tabela (None se desconhecido)."""
+    name = normalize_model(model)
+    best = None
+    for prefix in PRICE_TABLE:
+        if name.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return PRICE_TABLE[best] if best else None
+
+
+def estimate_cost(model: str, tokens_prompt: int, tokens_completion: int,
+                  cached_tokens: int = 0) -> float:
+    """
+    Custo estimado (USD) de uma chamada.
+
+    `cached_tokens` é a parte de `tokens_prompt` servida do cache de prompt
+    (cobrada pelo preço de entrada em cache, quando o modelo tem um).
+    Modelos fora da tabela custam 0.
+    """
+    price = find_price(model)
+    if price is None:
+        return 0.0
+    cached = min(max(cached_tokens, 0), tokens_prompt)
+    cached_rate = price.input if price.cached_input is None else price.cached_input
+    return (
+        (tokens_prompt - cached) * price.input
+        + cached * cached_rate
+        + tokens_completion * price.output
+    ) / 1_000_000
@@ -0,0 +1,343 @@
+# metrics/profiling.py
+"""
+Modo --profile: memória e CPU da camada de orquestração, por task.
+
+Os spans dizem onde o tempo de relógio foi gasto; não dizem quanto RSS e
+CPU a própria orquestração consome (CrewAI, LangChain, carga do FAISS,
+embeddings da memória da crew). O RunProfiler registra:
+- a cada fronteira de task (eventos da CrewAI, ou boundary() manual):
+  RSS, memória rastreada pelo tracemalloc (atual e pico da fase), CPU do
+  processo e os sites que mais alocaram desde a fronteira anterior;
+- um profiler estatístico: uma thread amostra as pilhas de todas as
+  threads (sys._current_frames) a cada `sample_interval` e as atribui à
+  fase corrente. Sai em formato "collapsed" (fase;thread;frame;... N), a
+  entrada de flamegraph.pl, speedscope e inferno.
+
+Tudo vai para o arquivo de métricas da execução (save_metrics grava
+'profile' no JSON e <sessão>.collapsed.txt ao lado).
+
+Custo: o tracemalloc deixa as alocações ~2x mais lentas e cada snapshot
+percorre todas as alocações vivas; por isso só no modo --profile. A
+amostragem (padrão 100 Hz) custa poucos % de uma CPU.
+"""
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Fase antes da primeira task (imports, carga do FAISS, montagem da crew)
+SETUP_PHASE = "setup"
+BETWEEN_TASKS = "between tasks"
+
+# Frames de espera: a thread está bloqueada, não consumindo CPU
+_IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'), ('selectors.py', 'select'), ('thread.py', '_worker'),
+}
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss() -> int:
+    """RSS atual do processo em bytes (Linux: /proc; senão o pico do getrusage)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(";", ",")
+
+
+class RunProfiler:
+    """
+    Memória/CPU por task e pilhas amostradas de uma execução.
+
+    Uso:
+        profiler = enable_profiling(tracker)   # ou RunProfiler().start()
+        ...crew.kickoff()...                   # fronteiras pelos eventos de task
+        profiler.stop()
+        tracker.save_metrics()                 # grava 'profile' e .collapsed.txt
+
+    Args:
+        sample_interval: Segundos entre amostras de pilha (0 = sem amostragem)
+        top_n: Sites de alocação por fronteira
+        traceback_frames: Frames guardados pelo tracemalloc por alocação
+    """
+
+    def __init__(self, sample_interval: float = 0.01, top_n: int = 10,
+                 traceback_frames: int = 8, max_stack_depth: int = 64):
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.traceback_frames = traceback_frames
+        self.max_stack_depth = max_stack_depth
+        self.boundaries: List[Dict[str, Any]] = []
+        self.stacks: Dict[str, Counter] = {}
+        self.samples = 0
+        self.phase = SETUP_PHASE
+        self._lock = threading.Lock()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._owns_tracemalloc = False
+        self._last = None
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._running = False
+
+    # --- ciclo de vida -------------------------------------------------------------
+
+    def start(self) -> 'RunProfiler':
+        if self._running:
+            return self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._owns_tracemalloc = True
+        self._running = True
+        self.boundary("start")
+        if self.sample_interval > 0:
+            self._stop_event.clear()
+            self._sampler = threading.Thread(target=self._sample_loop,
+                                             name="metrics-profiler", daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        """Para a amostragem e registra a fronteira final (idempotente)."""
+        if not self._running:
+            return
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        self.boundary("end")
+        self._running = False
+        self._snapshot = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    # --- fronteiras ------------------------------------------------------------------
+
+    def task_started(self, name: str):
+        self.boundary(f"task started: {name}", next_phase=name)
+
+    def task_finished(self, name: str, error: Optional[str] = None):
+        self.boundary(f"task {'failed' if error else 'completed'}: {name}",
+                      next_phase=BETWEEN_TASKS)
+
+    def boundary(self, label: str, next_phase: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fecha a fase corrente: RSS, tracemalloc, CPU e top de alocações
+        desde a fronteira anterior. `next_phase` nomeia a fase seguinte.
+        """
+        with self._lock:
+            now = time.perf_counter()
+            times = os.times()
+            cpu = times.user + times.system
+            rss = current_rss()
+            record: Dict[str, Any] = {
+                'label': label,
+                'phase': self.phase,
+                'timestamp': time.time(),
+                'rss_bytes': rss,
+            }
+            if self._last is not None:
+                last_wall, last_cpu, last_rss = self._last
+                record['wall_seconds'] = now - last_wall
+                record['cpu_seconds'] = cpu - last_cpu
+                record['rss_delta_bytes'] = rss - last_rss
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                record['traced_bytes'] = current
+                record['traced_peak_bytes'] = peak
+                record['top_allocations'] = self._top_allocations()
+                tracemalloc.reset_peak()
+            self._last = (now, cpu, rss)
+            if next_phase is not None:
+                self.phase = next_phase
+            self.boundaries.append(record)
+            return record
+
+    def _top_allocations(self) -> List[Dict[str, Any]]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, __file__),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            stats = snapshot.statistics('lineno')[:self.top_n]
+            return [{'site': str(s.traceback[0]), 'size_bytes': s.size,
+                     'count': s.count} for s in stats]
+        stats = snapshot.compare_to(previous, 'lineno')[:self.top_n]
+        return [{'site': str(s.traceback[0]), 'size_bytes': s.size,
+                 'size_diff_bytes': s.size_diff, 'count_diff': s.count_diff}
+                for s in stats]
+
+    # --- amostragem ------------------------------------------------------------------
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.sample_interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: Optional[int] = None):
+        """Uma amostra das pilhas de todas as threads (exceto `exclude`)."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        collected = []
+        for ident, frame in frames.items():
+            if ident == exclude:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_stack_depth:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)).replace(";", ","))
+            collected.append(";".join(reversed(stack)))
+        del frames
+        with self._lock:
+            counter = self.stacks.setdefault(self.phase, Counter())
+            counter.update(collected)
+            self.samples += 1
+
+    def collapsed_stacks(self) -> List[str]:
+        """Linhas 'fase;thread;frame;... contagem' (formato collapsed/folded)."""
+        with self._lock:
+            return [f"{phase.replace(';', ',')};{stack} {count}"
+                    for phase, counter in self.stacks.items()
+                    for stack, count in counter.most_common()]
+
+    def export_collapsed(self, path: Union[str, Path]) -> Path:
+        path = Path(path)
+        path.write_text("\n".join(self.collapsed_stacks()) + "\n")
+        return path
+
+    # --- resumo ----------------------------------------------------------------------
+
+    def phases(self) -> Dict[str, Dict[str, Any]]:
+        """Totais por fase (task): tempo, CPU, variação de RSS e pilhas mais quentes."""
+        with self._lock:
+            boundaries = list(self.boundaries)
+            stacks = {phase: counter.copy() for phase, counter in self.stacks.items()}
+        phases: Dict[str, Dict[str, Any]] = {}
+
+        def _phase(name: str) -> Dict[str, Any]:
+            return phases.setdefault(name, {
+                'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rss_delta_bytes': 0,
+                'traced_peak_bytes': 0, 'samples': 0, 'top_stacks': [],
+            })
+
+        for record in boundaries[1:]:
+            stats = _phase(record['phase'])
+            stats['wall_seconds'] += record['wall_seconds']
+            stats['cpu_seconds'] += record['cpu_seconds']
+            stats['rss_delta_bytes'] += record['rss_delta_bytes']
+            stats['traced_peak_bytes'] = max(stats['traced_peak_bytes'],
+                                             record.get('traced_peak_bytes', 0))
+        for phase, counter in stacks.items():
+            stats = _phase(phase)
+            stats['samples'] = sum(counter.values())
+            stats['top_stacks'] = [{'stack': stack, 'samples': count}
+                                   for stack, count in counter.most_common(5)]
+        return phases
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            boundaries = list(self.boundaries)
+            samples = self.samples
+        return {
+            'sample_interval': self.sample_interval,
+            'samples': samples,
+            'peak_rss_bytes': max((b['rss_bytes'] for b in boundaries), default=0),
+            'phases': self.phases(),
+            'boundaries': boundaries,
+        }
+
+
+# --- integração com o tracker e a CrewAI ------------------------------------------
+
+_crewai_installed = False
+_crewai_lock = threading.Lock()
+
+
+def enable_profiling(tracker=None, **kwargs) -> RunProfiler:
+    """
+    Liga o profiler na sessão do tracker (padrão: o global) e instala as
+    fronteiras por task da CrewAI. save_metrics() passa a gravar o perfil.
+    """
+    from .metrics_tracker import get_tracker
+
+    tracker = tracker or get_tracker()
+    # Antes do tracemalloc: importar a CrewAI com ele ligado leva minutos
+    try:
+        install_crewai_profile_hooks()
+    except ImportError:
+        pass  # sem CrewAI: fronteiras só com boundary()/task_started()
+    if tracker.profiler is not None:
+        tracker.profiler.stop()
+    tracker.profiler = RunProfiler(**kwargs).start()
+    return tracker.profiler
+
+
+def _active_profiler() -> Optional[RunProfiler]:
+    from .metrics_tracker import get_tracker
+    profiler = get_tracker().profiler
+    return profiler if profiler is not None and profiler.running else None
+
+
+def install_crewai_profile_hooks():
+    """Fronteiras de fase nos eventos de task da CrewAI (idempotente)."""
+    global _crewai_installed
+    with _crewai_lock:
+        if _crewai_installed:
+            return
+        from crewai.events import (
+            crewai_event_bus,
+            TaskStartedEvent,
+            TaskCompletedEvent,
+            TaskFailedEvent,
+        )
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def _on_task_started(source, event):
+            profiler = _active_profiler()
+            if profiler is not None:
+                profiler.task_started(event.task_name or event.task_id or "task")
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def _on_task_completed(source, event):
+            profiler = _active_profiler()
+            if profiler is not None:
+                profiler.task_finished(event.task_name or event.task_id or "task")
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def _on_task_failed(source, event):
+            profiler = _active_profiler()
+            if profiler is not None:
+                profiler.task_finished(event.task_name or event.task_id or "task",
+                                       error=event.error)
+
+        _crewai_installed = True
@@ -0,0 +1,97 @@
+# metrics/rate_limit.py
+"""
+Limite global de chamadas LLM compartilhado entre processos.
+
+O max_rpm da crew (config.CREW_CONFIG) vale por crew: com N workers em
+paralelo (batch_runner.py) o total chega a N vezes o limite da conta.
+SharedRateLimiter é um token bucket em memória compartilhada
+(multiprocessing.Value + Lock), passado aos workers na criação do pool:
+- acquire() reserva a próxima vaga e dorme o que faltar (fora do lock),
+  então os workers são atendidos na ordem em que pedem;
+- `burst` chamadas podem sair juntas depois de um período ocioso.
+
+install_crewai_rate_limit_hook() aplica o limite antes de cada chamada LLM
+dos agentes (hook before_llm_call da CrewAI, como o orçamento em
+metrics/budget.py); a espera vira o span/timing 'rate_limit.wait'.
+"""
+import time
+import threading
+import multiprocessing
+from typing import Optional
+
+from .timing import timed
+
+
+class SharedRateLimiter:
+    """
+    Token bucket de `requests_per_minute` compartilhado por processos.
+
+    Crie antes do pool, com o mesmo contexto de multiprocessing do pool, e
+    passe nos initargs (Lock/Value só atravessam na criação do processo).
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None,
+                 context=None):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute deve ser positivo")
+        context = context or multiprocessing.get_context()
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst or 1
+        self._lock = context.Lock()
+        # Vagas disponíveis (negativo = reservas à frente) e última atualização
+        self._tokens = context.Value('d', float(self.burst), lock=False)
+        self._updated = context.Value('d', time.time(), lock=False)
+
+    @property
+    def rate(self) -> float:
+        """Vagas por segundo."""
+        return self.requests_per_minute / 60.0
+
+    def reserve(self) -> float:
+        """Reserva uma vaga; retorna os segundos até ela valer."""
+        with self._lock:
+            now = time.time()
+            elapsed = max(now - self._updated.value, 0.0)
+            tokens = min(self._tokens.value + elapsed * self.rate, float(self.burst)) - 1.0
+            self._tokens.value = tokens
+            self._updated.value = now
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """Bloqueia até a próxima vaga; retorna os segundos de espera."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+# --- CrewAI ------------------------------------------------------------------
+
+_limiter: Optional[SharedRateLimiter] = None
+_crewai_installed = False
+_crewai_lock = threading.Lock()
+
+
+def _before_llm_call(context) -> None:
+    limiter = _limiter
+    if limiter is None:
+        return None
+    with timed("rate_limit.wait", kind="rate_limit"):
+        limiter.acquire()
+    return None
+
+
+def install_crewai_rate_limit_hook(limiter: Optional[SharedRateLimiter]):
+    """
+    Limita as chamadas LLM dos agentes deste processo com `limiter` (None
+    desliga). O hook global da CrewAI é registrado uma vez só.
+    """
+    global _limiter, _crewai_installed
+    _limiter = limiter
+    with _crewai_lock:
+        if _crewai_installed or limiter is None:
+            return
+        from crewai.hooks import register_before_llm_call_hook
+
+        register_before_llm_call_hook(_before_llm_call)
+        _crewai_installed = True
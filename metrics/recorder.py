@@ -0,0 +1,222 @@
+# metrics/recorder.py
+"""
+Gravação de eventos de métricas com baixo overhead.
+
+Cada thread grava nos seus próprios buffers (sem lock no caminho quente):
+uma coluna `array` por campo numérico, strings internadas como códigos
+inteiros e timestamps em nanossegundos monotônicos (time.monotonic_ns).
+Nada de dataclass, asdict() ou datetime.now() por evento: os dicts (com
+timestamp ISO) só são montados na leitura, juntando os buffers de todas as
+threads em ordem de tempo.
+
+Leitura concorrente com gravação é segura: o timestamp é a última coluna
+gravada, então cada buffer é lido até len(timestamps) (linhas completas).
+drain() retira da memória os eventos já lidos (ver metrics/sinks.py).
+"""
+import math
+import time
+import threading
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+# Tipos de coluna: 'd' float, 'q' inteiro, 'b' booleano, 's' string internada,
+# 'o' float opcional (None gravado como NaN)
+_TYPECODES = {'d': 'd', 'q': 'q', 'b': 'b', 's': 'l', 'o': 'd'}
+
+
+def _optional_float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+# Conversão de cada valor antes do append ('s' usa EventRecorder.intern)
+_COERCE = {'d': float, 'q': int, 'b': bool, 'o': _optional_float}
+
+
+class EventSchema:
+    """Campos (nome, tipo) de um tipo de evento; o timestamp é implícito."""
+
+    def __init__(self, name: str, fields: Sequence[Tuple[str, str]]):
+        self.name = name
+        self.fields = list(fields)
+        self.names = [f for f, _ in self.fields]
+        self.kinds = [k for _, k in self.fields]
+
+
+class _Columns:
+    """Colunas de um tipo de evento dentro do buffer de uma thread."""
+
+    __slots__ = ('columns', 'timestamps')
+
+    def __init__(self, schema: EventSchema):
+        self.columns = [array(_TYPECODES[kind]) for kind in schema.kinds]
+        self.timestamps = array('q')
+
+    def __len__(self) -> int:
+        # O timestamp é gravado por último: len(timestamps) conta linhas completas
+        return len(self.timestamps)
+
+
+class EventRecorder:
+    """
+    Colunas de eventos por thread, juntadas na leitura.
+
+    Uso:
+        recorder = EventRecorder([EventSchema('tool', [('name', 's'), ('ok', 'b')])])
+        recorder.record('tool', ('semantic_search', True))
+        recorder.rows('tool')  # [{'name': ..., 'ok': True, 'timestamp': '...'}]
+    """
+
+    def __init__(self, schemas: Sequence[EventSchema]):
+        self.schemas: Dict[str, EventSchema] = {s.name: s for s in schemas}
+        self._local = threading.local()
+        self._buffers: List[Dict[str, _Columns]] = []
+        self._buffers_lock = threading.Lock()
+        # Leitores e drain() não se sobrepõem (drain remove linhas das colunas)
+        self._read_lock = threading.Lock()
+        self._strings: Dict[str, int] = {}
+        self._string_list: List[str] = []
+        self._strings_lock = threading.Lock()
+        # Conversores por campo de cada tipo de evento
+        self._coercers: Dict[str, List] = {
+            name: [self.intern if kind == 's' else _COERCE[kind] for kind in schema.kinds]
+            for name, schema in self.schemas.items()
+        }
+        # Âncora para converter monotonic_ns em horário de parede na leitura
+        self._wall_anchor = datetime.now()
+        self._mono_anchor = time.monotonic_ns()
+
+    # --- gravação (caminho quente) -------------------------------------------
+
+    def _thread_buffer(self) -> Dict[str, _Columns]:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = {name: _Columns(schema) for name, schema in self.schemas.items()}
+            self._local.buffer = buffer
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def intern(self, value: str) -> int:
+        code = self._strings.get(value)
+        if code is None:
+            with self._strings_lock:
+                code = self._strings.get(value)
+                if code is None:
+                    code = len(self._string_list)
+                    self._string_list.append(value)
+                    self._strings[value] = code
+        return code
+
+    def record(self, event_type: str, values: Sequence, timestamp_ns: int = 0):
+        """
+        Grava um evento (valores na ordem dos campos do schema).
+
+        A linha inteira é convertida antes do primeiro append: um valor
+        inválido levanta ValueError/TypeError sem deixar colunas da thread
+        com comprimentos diferentes (o que desalinharia as linhas seguintes).
+        """
+        try:
+            columns = self._local.buffer[event_type]
+        except AttributeError:
+            columns = self._thread_buffer()[event_type]
+        coercers = self._coercers[event_type]
+        if len(values) != len(coercers):
+            raise ValueError(f"{event_type}: esperados {len(coercers)} valores, "
+                             f"recebidos {len(values)}")
+        values = [coerce(value) for coerce, value in zip(coercers, values)]
+        for column, value in zip(columns.columns, values):
+            column.append(value)
+        columns.timestamps.append(timestamp_ns or time.monotonic_ns())
+
+    # --- leitura ----------------------------------------------------------------
+
+    def _snapshots(self, event_type: str) -> List[Tuple[_Columns, int]]:
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        return [(b[event_type], len(b[event_type])) for b in buffers]
+
+    def count(self, event_type: str) -> int:
+        return sum(n for _, n in self._snapshots(event_type))
+
+    def column(self, event_type: str, field: str) -> List:
+        """Valores de um campo de todas as threads (ordem por thread, não por tempo)."""
+        schema = self.schemas[event_type]
+        index = schema.names.index(field)
+        kind = schema.kinds[index]
+        values: List = []
+        with self._read_lock:
+            for columns, n in self._snapshots(event_type):
+                values.extend(columns.columns[index][:n])
+        return self._decode(kind, values)
+
+    def timestamps(self, event_type: str) -> List[int]:
+        """Timestamps monotônicos (ns) de todas as threads, ordenados."""
+        values: List[int] = []
+        with self._read_lock:
+            for columns, n in self._snapshots(event_type):
+                values.extend(columns.timestamps[:n])
+        values.sort()
+        return values
+
+    def _decode(self, kind: str, values: List) -> List:
+        if kind == 's':
+            strings = self._string_list
+            return [strings[v] for v in values]
+        if kind == 'b':
+            return [bool(v) for v in values]
+        if kind == 'o':
+            return [None if v != v else v for v in values]
+        return values
+
+    def _merged(self, event_type: str, consume: bool = False) -> List[Tuple]:
+        """Linhas (timestamp_ns, *valores) de todas as threads, em ordem de tempo."""
+        schema = self.schemas[event_type]
+        merged = []
+        with self._read_lock:
+            for columns, n in self._snapshots(event_type):
+                decoded = [self._decode(kind, list(col[:n]))
+                           for kind, col in zip(schema.kinds, columns.columns)]
+                merged.extend(zip(columns.timestamps[:n], *decoded))
+                if consume:
+                    # Remove só as n linhas completas lidas: appends concorrentes
+                    # vão para o fim das colunas e não são afetados
+                    for col in columns.columns:
+                        del col[:n]
+                    del columns.timestamps[:n]
+        merged.sort(key=lambda row: row[0])
+        return merged
+
+    def _to_dicts(self, event_type: str, merged: List[Tuple]) -> Iterator[Dict]:
+        names = self.schemas[event_type].names
+        for row in merged:
+            event = dict(zip(names, row[1:]))
+            event['timestamp'] = self.to_datetime(row[0]).isoformat()
+            yield event
+
+    def iter_rows(self, event_type: str) -> Iterator[Dict]:
+        """Eventos como dicts, em ordem de tempo, com timestamp ISO."""
+        return self._to_dicts(event_type, self._merged(event_type))
+
+    def drain(self, event_type: str) -> Tuple[List[int], List[Dict]]:
+        """
+        Retira da memória os eventos gravados até agora.
+
+        Returns:
+            (timestamps monotônicos em ns, eventos como dicts), em ordem de tempo
+        """
+        merged = self._merged(event_type, consume=True)
+        return [row[0] for row in merged], list(self._to_dicts(event_type, merged))
+
+    def rows(self, event_type: str) -> List[Dict]:
+        return list(self.iter_rows(event_type))
+
+    def to_datetime(self, timestamp_ns: int) -> datetime:
+        return self._wall_anchor + timedelta(
+            microseconds=(timestamp_ns - self._mono_anchor) / 1000
+        )
+
+    def from_datetime(self, moment: datetime) -> int:
+        """Inverso de to_datetime (para recarregar eventos gravados)."""
+        return self._mono_anchor + int((moment - self._wall_anchor).total_seconds() * 1e9)
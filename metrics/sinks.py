@@ -0,0 +1,374 @@
+# metrics/sinks.py
+"""
+Sinks de métricas em streaming.
+
+Em vez de um único JSON no fim da execução (perdido em crash/Ctrl-C e com
+memória crescendo com o número de eventos), uma thread de flush
+(MetricsFlusher) retira periodicamente os eventos do MetricsTracker e os
+grava em sinks:
+- JSONLSink: um arquivo .jsonl, uma linha por evento ({"type": ..., ...});
+- RotatingJSONLSink: partes events-00001.jsonl, ... com tamanho máximo;
+- ParquetSink: colunar (pyarrow, opcional), um arquivo por flush e tipo.
+
+O flush acontece a cada `interval` segundos ou quando há `max_buffered`
+eventos em memória, e também no stop()/atexit (crash não tratado). Os spans
+terminados do tracer (metrics/tracing.py) também são gravados, como eventos
+'spans'. Se algum sink relê o que gravou (JSONL, Parquet), os spans saem do
+tracer a cada flush e os resumos/exports de trace os leem de volta desse
+sink (MetricsFlusher.spans); senão continuam no tracer.
+load_metrics() reconstrói um MetricsTracker (e portanto o resumo) a partir
+dos arquivos gravados.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+SESSION_EVENT = 'session'
+SPAN_EVENT = 'spans'
+
+
+class MetricsSink(ABC):
+    """Interface dos sinks."""
+
+    # True se read_events() relê o que este sink gravou
+    readable = False
+
+    @abstractmethod
+    def write(self, event_type: str, rows: List[Dict]):
+        """Recebe um lote de eventos de um tipo (chamado pela thread de flush)."""
+
+    def flush(self):
+        pass
+
+    def read_events(self, event_type: str) -> Iterator[Dict]:
+        """Eventos de um tipo gravados por este sink (após o flush)."""
+        return iter(())
+
+    def close(self):
+        self.flush()
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+
+class JSONLSink(MetricsSink):
+    """Uma linha JSON por evento, com o tipo em 'type'."""
+
+    readable = True
+
+    def __init__(self, path: Union[str, Path], fsync: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self._file = open(self.path, 'a', encoding='utf-8')
+        # (arquivo, offset inicial) do que este sink gravou (o arquivo pode ser anterior)
+        self._written: List[Tuple[Path, int]] = [(self.path, self._file.tell())]
+
+    def write(self, event_type: str, rows: List[Dict]):
+        self._file.write("".join(
+            json.dumps({'type': event_type, **row}, ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+
+    def flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def read_events(self, event_type: str) -> Iterator[Dict]:
+        for path, offset in list(self._written):
+            for found, event in _iter_events(path, offset):
+                if found == event_type:
+                    yield event
+
+    def describe(self) -> str:
+        return str(self.path)
+
+
+class RotatingJSONLSink(JSONLSink):
+    """JSONL em partes de até `max_bytes` (prefix-00001.jsonl, prefix-00002.jsonl...)."""
+
+    def __init__(self, directory: Union[str, Path], prefix: str = "events",
+                 max_bytes: int = 64 * 1024 * 1024, fsync: bool = False):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        existing = sorted(self.directory.glob(f"{prefix}-*.jsonl"))
+        self.part = int(existing[-1].stem.rsplit("-", 1)[1]) if existing else 1
+        super().__init__(self._part_path(), fsync=fsync)
+
+    def _part_path(self) -> Path:
+        return self.directory / f"{self.prefix}-{self.part:05d}.jsonl"
+
+    def flush(self):
+        super().flush()
+        if self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self.part += 1
+            self.path = self._part_path()
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._written.append((self.path, self._file.tell()))
+
+    def describe(self) -> str:
+        return str(self.directory / f"{self.prefix}-*.jsonl")
+
+
+class ParquetSink(MetricsSink):
+    """Um arquivo Parquet por flush e tipo: <dir>/<tipo>/part-00001.parquet."""
+
+    readable = True
+
+    def __init__(self, directory: Union[str, Path]):
+        if not ARROW_AVAILABLE:
+            raise ImportError("pyarrow não está instalado (pip install pyarrow)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._pending: Dict[str, List[Dict]] = {}
+        self._parts: Dict[str, int] = {}
+        self._written: Dict[str, List[Path]] = {}
+
+    def write(self, event_type: str, rows: List[Dict]):
+        self._pending.setdefault(event_type, []).extend(rows)
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        for event_type, rows in pending.items():
+            if not rows:
+                continue
+            target = self.directory / event_type
+            target.mkdir(exist_ok=True)
+            part = self._parts.get(event_type) or len(list(target.glob("part-*.parquet")))
+            part += 1
+            self._parts[event_type] = part
+            path = target / f"part-{part:05d}.parquet"
+            pq.write_table(pa.Table.from_pylist(rows), path)
+            self._written.setdefault(event_type, []).append(path)
+
+    def read_events(self, event_type: str) -> Iterator[Dict]:
+        for path in list(self._written.get(event_type, [])):
+            yield from pq.read_table(path).to_pylist()
+
+    def describe(self) -> str:
+        return str(self.directory / "*" / "part-*.parquet")
+
+
+def create_sinks(spec: str, directory: Union[str, Path]) -> List[MetricsSink]:
+    """
+    Cria sinks a partir de uma especificação ("jsonl", "rotating", "parquet",
+    separados por vírgula; "none" ou vazio = nenhum) dentro de `directory`.
+    """
+    directory = Path(directory)
+    sinks = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if name in ("", "none"):
+            continue
+        if name == "jsonl":
+            sinks.append(JSONLSink(directory / "events.jsonl"))
+        elif name == "rotating":
+            sinks.append(RotatingJSONLSink(directory))
+        elif name == "parquet":
+            sinks.append(ParquetSink(directory / "parquet"))
+        else:
+            raise ValueError(f"Sink de métricas desconhecido: {name}")
+    return sinks
+
+
+class MetricsFlusher(threading.Thread):
+    """
+    Thread que drena o MetricsTracker para os sinks.
+
+    Flush a cada `interval` segundos ou quando houver `max_buffered` eventos
+    em memória (verificado a cada `poll_interval`); flush final em stop(),
+    que também é registrado no atexit. Com um sink legível, os spans gravados
+    saem do tracer (memória limitada) e spans() os relê desse sink.
+    """
+
+    def __init__(self, tracker, sinks: Sequence[MetricsSink], interval: float = 5.0,
+                 max_buffered: int = 10_000, poll_interval: float = 0.25):
+        super().__init__(name="metrics-flusher", daemon=True)
+        self.tracker = tracker
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.max_buffered = max_buffered
+        self.poll_interval = min(poll_interval, interval)
+        self.flushes = 0
+        self._stop_event = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._span_cursor = 0
+        # Sink de onde os spans drenados do tracer são relidos
+        self.span_archive = next((sink for sink in self.sinks if sink.readable), None)
+
+        session = [{'session_id': tracker.session_id,
+                    'session_start': tracker.session_start.isoformat(),
+                    'pid': os.getpid()}]
+        for sink in self.sinks:
+            sink.write(SESSION_EVENT, session)
+        atexit.register(self.stop)
+
+    def run(self):
+        next_flush = time.monotonic() + self.interval
+        while not self._stop_event.wait(self.poll_interval):
+            if (time.monotonic() >= next_flush
+                    or self.tracker.buffered_events() >= self.max_buffered):
+                self.flush()
+                next_flush = time.monotonic() + self.interval
+
+    def flush(self):
+        with self._flush_lock:
+            if self._closed:
+                return
+            if self.span_archive is not None:
+                spans = self.tracker.drain_spans()
+            else:
+                spans, self._span_cursor = self.tracker.tracer.finished_since(self._span_cursor)
+            batches = [(event_type, self.tracker.drain(event_type))
+                       for event_type in self.tracker.event_types]
+            batches.append((SPAN_EVENT, [span.to_dict() for span in spans]))
+            for event_type, rows in batches:
+                if not rows:
+                    continue
+                for sink in self.sinks:
+                    try:
+                        sink.write(event_type, rows)
+                    except Exception as e:
+                        print(f"⚠️  Falha ao gravar métricas em {sink.describe()}: {e}")
+            for sink in self.sinks:
+                try:
+                    sink.flush()
+                except Exception as e:
+                    print(f"⚠️  Falha no flush de {sink.describe()}: {e}")
+            self.flushes += 1
+
+    def spans(self) -> List[Dict]:
+        """
+        Todos os spans terminados da sessão (Span.to_dict): os já gravados,
+        relidos do sink, seguidos dos que ainda estão no tracer.
+        """
+        with self._flush_lock:
+            if self.span_archive is None:
+                return [span.to_dict() for span in self.tracker.tracer.spans()]
+            if not self._closed:
+                self.span_archive.flush()
+            archived = list(self.span_archive.read_events(SPAN_EVENT))
+            return archived + [span.to_dict() for span in self.tracker.tracer.spans()]
+
+    def stop(self):
+        """Para a thread, faz o flush final e fecha os sinks (idempotente)."""
+        if self._closed:
+            return
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        self.flush()
+        with self._flush_lock:
+            self._closed = True
+            for sink in self.sinks:
+                sink.close()
+        atexit.unregister(self.stop)
+
+    def describe(self) -> List[str]:
+        return [sink.describe() for sink in self.sinks]
+
+
+def _iter_events(path: Path, offset: int = 0):
+    """
+    (tipo, evento) de um .jsonl (a partir de `offset` bytes), de um diretório
+    de partes ou de Parquet.
+
+    Num diretório com .jsonl e Parquet (create_sinks("jsonl,parquet")) os dois
+    formatos têm os mesmos eventos: só os .jsonl são lidos.
+    """
+    if path.is_file():
+        with open(path, encoding='utf-8') as f:
+            f.seek(offset)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # última linha truncada por um crash
+                yield event.pop('type'), event
+        return
+    jsonl_files = sorted(path.glob("*.jsonl"))
+    for jsonl in jsonl_files:
+        yield from _iter_events(jsonl)
+    if jsonl_files:
+        return
+    parquet_root = path / "parquet" if (path / "parquet").is_dir() else path
+    parquet_files = sorted(parquet_root.glob("*/part-*.parquet"))
+    if parquet_files and not ARROW_AVAILABLE:
+        raise ImportError("pyarrow não está instalado (pip install pyarrow)")
+    for part in parquet_files:
+        event_type = part.parent.name
+        for event in pq.read_table(part).to_pylist():
+            yield event_type, event
+
+
+def apply_event(tracker, event_type: str, event: Dict) -> Optional[datetime]:
+    """
+    Aplica um evento gravado pelos sinks a um MetricsTracker (replay, span
+    ou início de sessão; com vários processos vale a sessão mais antiga).
+
+    Returns:
+        Timestamp do evento (None para sessão e spans)
+    """
+    if event_type == SESSION_EVENT:
+        session_start = datetime.fromisoformat(event['session_start'])
+        if session_start <= tracker.session_start:
+            tracker.session_id = event['session_id']
+            tracker.session_start = session_start
+        return None
+    if event_type == SPAN_EVENT:
+        tracker.tracer.add_span(event)
+        return None
+    timestamp = datetime.fromisoformat(event['timestamp'])
+    tracker.replay(event_type, event, timestamp)
+    return timestamp
+
+
+def load_metrics(path: Union[str, Path], output_dir: str = "metrics/data"):
+    """
+    Reconstrói um MetricsTracker a partir dos arquivos dos sinks, para
+    gerar resumos (get_summary/print_summary) de uma execução já gravada.
+
+    Args:
+        path: Arquivo .jsonl ou diretório (partes .jsonl ou parquet/, ou
+              segmentos de vários processos, ver metrics/aggregate.py); se
+              houver os dois formatos, vale o .jsonl
+
+    Returns:
+        MetricsTracker com os eventos recarregados
+    """
+    from .metrics_tracker import MetricsTracker
+
+    tracker = MetricsTracker(output_dir=output_dir)
+    last_event = None
+    for event_type, event in _iter_events(Path(path)):
+        timestamp = apply_event(tracker, event_type, event)
+        if timestamp is not None:
+            last_event = max(last_event or timestamp, timestamp)
+    if last_event is not None:
+        tracker.session_end = last_event
+    return tracker
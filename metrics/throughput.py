@@ -0,0 +1,123 @@
+# metrics/throughput.py
+"""
+Medidores de throughput com custo O(1) por evento e por consulta.
+
+Em vez de reler todos os timestamps a cada cálculo, cada ThroughputMeter
+mantém, com tempo monotônico:
+- contadores por segundo numa deque para cada janela deslizante
+  configurada (padrão 1, 5 e 15 minutos), com a soma corrente da janela;
+- taxas EWMA de 1/5/15 minutos (como o load average do Unix), atualizadas
+  em ticks de 5 s aplicados de forma preguiçosa na gravação/leitura.
+"""
+import math
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Sequence
+
+
+TICK_SECONDS = 5.0
+EWMA_MINUTES = (1, 5, 15)
+
+
+class _SlidingWindow:
+    """Soma de eventos nos últimos `seconds` segundos (baldes de 1 s)."""
+
+    __slots__ = ('seconds', 'buckets', 'total')
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.buckets = deque()  # [segundo, contagem]
+        self.total = 0
+
+    def add(self, second: int, n: int):
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += n
+        else:
+            self.buckets.append([second, n])
+        self.total += n
+
+    def evict(self, now_second: int):
+        cutoff = now_second - self.seconds
+        buckets = self.buckets
+        while buckets and buckets[0][0] <= cutoff:
+            self.total -= buckets.popleft()[1]
+
+
+class ThroughputMeter:
+    """
+    Taxa de eventos (ou de uma quantidade, ex.: tokens) por janela.
+
+    Uso:
+        meter = ThroughputMeter()
+        meter.mark()            # um evento
+        meter.mark(1500)        # ex.: 1500 tokens
+        meter.window_count(60)  # eventos no último minuto
+        meter.rates()           # {'m1': ..., 'm5': ..., 'm15': ..., 'mean': ...} por minuto
+    """
+
+    def __init__(self, windows: Sequence[int] = (60, 300, 900),
+                 clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._windows = {seconds: _SlidingWindow(seconds) for seconds in windows}
+        self.count = 0
+        self._started = clock()
+        self._last_tick = self._started
+        self._uncounted = 0
+        self._alphas = {m: 1 - math.exp(-TICK_SECONDS / (60.0 * m)) for m in EWMA_MINUTES}
+        self._ewma: Dict[int, float] = {m: 0.0 for m in EWMA_MINUTES}
+        self._ewma_started = False
+
+    def _tick(self, now: float):
+        """Aplica os ticks de 5 s pendentes às EWMAs (O(1) para k ticks vazios)."""
+        ticks = int((now - self._last_tick) // TICK_SECONDS)
+        if ticks <= 0:
+            return
+        instant = self._uncounted / TICK_SECONDS
+        self._uncounted = 0
+        for minutes, alpha in self._alphas.items():
+            if self._ewma_started:
+                rate = self._ewma[minutes] + alpha * (instant - self._ewma[minutes])
+            else:
+                rate = instant
+            # Ticks seguintes sem eventos: decaimento geométrico
+            self._ewma[minutes] = rate * (1 - alpha) ** (ticks - 1)
+        self._ewma_started = True
+        self._last_tick += ticks * TICK_SECONDS
+
+    def mark(self, n: int = 1):
+        now = self._clock()
+        second = int(now)
+        with self._lock:
+            self._tick(now)
+            self.count += n
+            self._uncounted += n
+            for window in self._windows.values():
+                window.add(second, n)
+                window.evict(second)
+
+    def window_count(self, seconds: int = 60) -> int:
+        """Eventos nos últimos `seconds` segundos (O(1) para janelas configuradas)."""
+        now_second = int(self._clock())
+        with self._lock:
+            window = self._windows.get(seconds)
+            if window is not None:
+                window.evict(now_second)
+                return window.total
+            # Janela não configurada: soma os baldes da maior janela que a cobre
+            largest = max(self._windows.values(), key=lambda w: w.seconds)
+            largest.evict(now_second)
+            cutoff = now_second - seconds
+            return sum(n for second, n in largest.buckets if second > cutoff)
+
+    def rates(self) -> Dict[str, float]:
+        """Taxas por minuto: EWMA de 1/5/15 min e média desde o início."""
+        now = self._clock()
+        with self._lock:
+            self._tick(now)
+            elapsed = max(now - self._started, 1e-9)
+            rates = {f"m{m}": self._ewma[m] * 60 for m in EWMA_MINUTES}
+            rates['mean'] = self.count / elapsed * 60
+            rates['count'] = self.count
+        return rates
@@ -0,0 +1,230 @@
+# metrics/timing.py
+"""
+Decorator / context manager de tempo integrado ao MetricsTracker.
+
+`timed("operação")` substitui o antigo track_timing (que só imprimia no
+stdout, quebrava com corrotinas e perdia __wrapped__/__name__):
+- funciona com funções síncronas, async, geradores e geradores async
+  (o tempo de um gerador vai da primeira iteração até o fim/close);
+- grava a duração no tracker (evento 'timings' → histograma por operação
+  em get_summary()['summary']['timings']) e abre um span (metrics/tracing.py);
+- amostragem por site: cada operação tem sua taxa (0..1); chamadas não
+  amostradas custam só uma checagem de flag e um random(). As durações
+  amostradas entram no histograma com peso 1/taxa.
+- desligado (METRICS_TIMING=false ou configure_timing(enabled=False)), o
+  wrapper só checa uma flag e chama a função: dá para deixar em caminhos
+  quentes como VectorStore.search.
+
+Configuração por ambiente (ou configure_timing() em tempo de execução):
+    METRICS_TIMING=true|false
+    METRICS_TIMING_SAMPLE_RATE=1.0                      # taxa padrão
+    METRICS_TIMING_SAMPLE_RATES="vector_store.search=0.1,embedding=0.5"
+"""
+import os
+import time
+import random
+import inspect
+import functools
+from typing import Dict, Optional
+
+from .metrics_tracker import get_tracker
+from .tracing import _current_span
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        operation, _, rate = item.partition("=")
+        rates[operation.strip()] = float(rate)
+    return rates
+
+
+_enabled = os.getenv("METRICS_TIMING", "true").lower() == "true"
+_default_rate = float(os.getenv("METRICS_TIMING_SAMPLE_RATE", "1.0"))
+_rates: Dict[str, float] = _parse_rates(os.getenv("METRICS_TIMING_SAMPLE_RATES", ""))
+_sites: Dict[str, list] = {}
+
+
+class _Site:
+    """Um ponto instrumentado: operação, taxa de amostragem e se está ativo."""
+
+    __slots__ = ('operation', 'kind', 'span', 'rate', 'active', '_effective')
+
+    def __init__(self, operation: str, kind: str, span: bool, rate: Optional[float]):
+        self.operation = operation
+        self.kind = kind
+        self.span = span
+        self.rate = rate  # None = taxa configurada para a operação
+        self.active = False
+        self._effective = 1.0
+
+    def refresh(self):
+        rate = _rates.get(self.operation, _default_rate) if self.rate is None else self.rate
+        self.active = _enabled and rate > 0
+        self._effective = rate
+
+    def sampled(self) -> bool:
+        rate = self._effective
+        return rate >= 1.0 or random.random() < rate
+
+
+def _get_site(operation: str, kind: str, span: bool, rate: Optional[float]) -> _Site:
+    """Um site por configuração: `with timed(...)` em laço não acumula sites."""
+    sites = _sites.setdefault(operation, [])
+    for site in sites:
+        if (site.kind, site.span, site.rate) == (kind, span, rate):
+            return site
+    site = _Site(operation, kind, span, rate)
+    site.refresh()
+    sites.append(site)
+    return site
+
+
+def configure_timing(enabled: Optional[bool] = None,
+                     default_rate: Optional[float] = None,
+                     rates: Optional[Dict[str, float]] = None):
+    """
+    Liga/desliga a medição e ajusta taxas de amostragem em tempo de execução.
+
+    Args:
+        enabled: False = wrappers só chamam a função (custo ~zero)
+        default_rate: Taxa para operações sem taxa própria
+        rates: Taxas por operação (mescladas às atuais)
+    """
+    global _enabled, _default_rate
+    if enabled is not None:
+        _enabled = enabled
+    if default_rate is not None:
+        _default_rate = default_rate
+    if rates:
+        _rates.update(rates)
+    for sites in _sites.values():
+        for site in sites:
+            site.refresh()
+
+
+def get_sample_rates() -> Dict[str, float]:
+    """Taxa efetiva de cada operação instrumentada."""
+    return {operation: sites[0]._effective for operation, sites in _sites.items()}
+
+
+class _Measurement:
+    """Mede uma execução: span (opcional) + duração gravada no tracker."""
+
+    __slots__ = ('site', 'activate', 'tracker', 'span', 'token', 'start')
+
+    def __init__(self, site: _Site, activate: bool = True):
+        self.site = site
+        # Geradores não tornam o span corrente: o consumidor roda entre os yields
+        self.activate = activate
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        self.tracker = get_tracker()
+        if self.site.span:
+            self.span = self.tracker.tracer.start_span(self.site.operation, self.site.kind)
+            if self.activate:
+                self.token = _current_span.set(self.span)
+        self.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        site = self.site
+        self.tracker.record_timing(site.operation, duration, exc_type is None,
+                                   site._effective)
+        if self.span is not None:
+            if self.token is not None:
+                _current_span.reset(self.token)
+            self.span.end(error=exc if exc_type is not None else None)
+        return False
+
+
+class timed:
+    """
+    Mede a duração de uma função ou bloco no MetricsTracker.
+
+    Uso:
+        @timed("vector_store.search", kind="retrieval")
+        def search(...): ...
+
+        @timed("llm.generate", sample_rate=0.1)
+        async def generate(...): ...
+
+        with timed("prefetch"):
+            ...
+
+    Args:
+        operation: Nome da operação (histograma e span)
+        kind: Tipo do span (tool, retrieval, llm...)
+        sample_rate: Taxa fixa deste site (padrão: configuração por operação)
+        span: Também abre um span no tracer da sessão
+    """
+
+    def __init__(self, operation: str, kind: str = "internal",
+                 sample_rate: Optional[float] = None, span: bool = True):
+        self.site = _get_site(operation, kind, span, sample_rate)
+        self._measurement: Optional[_Measurement] = None
+
+    # --- context manager (um objeto por bloco `with`) --------------------------
+
+    def __enter__(self):
+        site = self.site
+        if site.active and site.sampled():
+            self._measurement = _Measurement(site)
+            return self._measurement.__enter__()
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        measurement, self._measurement = self._measurement, None
+        if measurement is not None:
+            return measurement.__exit__(exc_type, exc, tb)
+        return False
+
+    # --- decorator ---------------------------------------------------------------
+
+    def __call__(self, func):
+        site = self.site
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not (site.active and site.sampled()):
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                with _Measurement(site, activate=False):
+                    async for item in func(*args, **kwargs):
+                        yield item
+
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not (site.active and site.sampled()):
+                    return await func(*args, **kwargs)
+                with _Measurement(site):
+                    return await func(*args, **kwargs)
+
+        elif inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not (site.active and site.sampled()):
+                    return (yield from func(*args, **kwargs))
+                with _Measurement(site, activate=False):
+                    return (yield from func(*args, **kwargs))
+
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not (site.active and site.sampled()):
+                    return func(*args, **kwargs)
+                with _Measurement(site):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+
+def track_timing(stage_name: str):
+    """Compatibilidade: equivalente a @timed(stage_name)."""
+    return timed(stage_name)
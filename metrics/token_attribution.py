@@ -0,0 +1,277 @@
+# metrics/token_attribution.py
+"""
+Atribuição dos tokens do prompt a seções, por agente e task.
+
+Os relatórios só tinham o total de tokens; não dava para saber quanto do
+prompt é o bloco few-shot estático (PRD_EXAMPLE/ARCHITECTURE_EXAMPLE em
+agents_crewai_dspy.py), o backstory, o contexto de RAG, as saídas de tasks
+anteriores ou resultados de tools. Antes de cada chamada (evento
+LLMCallStarted da CrewAI, emitido antes do envio) as mensagens são
+divididas em seções rotuladas e cada trecho é contado com o tokenizer do
+modelo (tiktoken; sem ele, estimativa de 4 caracteres por token).
+
+Seções, por ordem de prioridade (um trecho conta só para a primeira):
+- textos registrados com register_section() (few-shot, contexto pré-buscado);
+- saídas das tasks de contexto ('task_context'), descrição e critério da
+  task ('task_description', 'expected_output'), backstory e role/goal do
+  agente — casados pelo texto exato dos objetos da crew (register_crew();
+  os eventos da CrewAI só trazem os ids);
+- resultados de tools ('Observation: ...' ou mensagens role=tool): tools de
+  RAG viram 'rag_context', as demais 'tool_results';
+- memórias da crew ('memory');
+- o resto: 'framework' (instruções da CrewAI em system/user) e
+  'agent_scratchpad' (turnos anteriores do próprio modelo).
+
+Os totais por agente/task/seção vão para o resumo do MetricsTracker
+(summary['prompt_tokens_by_section'], detailed_metrics['prompt_attribution']),
+com o custo de entrada de cada seção pela tabela de metrics/pricing.py.
+"""
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .pricing import normalize_model
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+APPROX_TOKENIZER = "approx-4-chars"
+
+# Tools cujo resultado é contexto da base de conhecimento
+RAG_TOOLS = {'retrieve_context', 'semantic_search', 'search_workspace'}
+
+# Tokens de formatação por mensagem e de início da resposta (formato chat da OpenAI)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_OBSERVATION = re.compile(r"Observation:(.*?)(?=\n\s*Thought:|\Z)", re.DOTALL)
+_ACTION = re.compile(r"Action:\s*([^\n]+)")
+_MEMORY = re.compile(r"\n\n# (?:Memories from past conversations|Useful context):.*?(?=\n\n[A-Z]|\Z)",
+                     re.DOTALL)
+_MIN_SECTION_CHARS = 8
+
+_registered: Dict[str, str] = {}
+_registered_lock = threading.Lock()
+_encodings: Dict[str, Any] = {}
+
+
+def register_section(label: str, text: str):
+    """
+    Rotula um bloco de texto estático ou injetado (ex.: exemplo few-shot,
+    contexto pré-buscado da KB) onde quer que ele apareça nos prompts.
+    """
+    if text and len(text.strip()) >= _MIN_SECTION_CHARS:
+        with _registered_lock:
+            _registered[text.strip()] = label
+
+
+def registered_sections() -> Dict[str, str]:
+    """Texto -> rótulo das seções registradas."""
+    with _registered_lock:
+        return dict(_registered)
+
+
+def _encoding(model: Optional[str]):
+    name = normalize_model(model or "")
+    encoding = _encodings.get(name)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        _encodings[name] = encoding
+    return encoding
+
+
+def tokenizer_name(model: Optional[str]) -> str:
+    return _encoding(model).name if TIKTOKEN_AVAILABLE else APPROX_TOKENIZER
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens de `text` no tokenizer do modelo (estimativa sem tiktoken)."""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    return max(1, round(len(text) / 4))
+
+
+class _Claims:
+    """Intervalos já rotulados do conteúdo de uma mensagem."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.spans: List[Tuple[int, int, str]] = []
+
+    def claim(self, start: int, end: int, label: str):
+        # Só as partes ainda livres do intervalo
+        for taken_start, taken_end, _ in sorted(self.spans):
+            if taken_end <= start or taken_start >= end:
+                continue
+            if taken_start > start:
+                self.spans.append((start, taken_start, label))
+            start = max(start, taken_end)
+            if start >= end:
+                return
+        self.spans.append((start, end, label))
+
+    def claim_text(self, text: str, label: str):
+        text = text.strip()
+        if len(text) < _MIN_SECTION_CHARS:
+            return
+        position = self.content.find(text)
+        while position != -1:
+            self.claim(position, position + len(text), label)
+            position = self.content.find(text, position + len(text))
+
+    def segments(self, rest_label: str) -> Iterable[Tuple[str, str]]:
+        position = 0
+        for start, end, label in sorted(self.spans):
+            if start > position:
+                yield rest_label, self.content[position:start]
+            yield label, self.content[start:end]
+            position = end
+        if position < len(self.content):
+            yield rest_label, self.content[position:]
+
+
+def _text(content: Any) -> str:
+    """Conteúdo de uma mensagem (string ou lista de partes multimodais)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get('text', '') if isinstance(part, dict) else str(part)
+                         for part in content)
+    return "" if content is None else str(content)
+
+
+def _tool_label(tool_name: str) -> str:
+    name = tool_name.strip().strip('"\'').lower().replace(" ", "_")
+    return 'rag_context' if name in RAG_TOOLS else 'tool_results'
+
+
+def known_sections(agent: Any = None, task: Any = None) -> List[Tuple[str, str]]:
+    """(rótulo, texto) do agente e da task da CrewAI, em ordem de prioridade."""
+    sections = []
+    if task is not None:
+        context = getattr(task, 'context', None)
+        # Sem context a CrewAI usa um sentinela (NOT_SPECIFIED), não uma lista
+        for context_task in context if isinstance(context, (list, tuple)) else []:
+            output = getattr(context_task, 'output', None)
+            if output is not None and getattr(output, 'raw', None):
+                sections.append(('task_context', output.raw))
+        sections.append(('task_description', getattr(task, 'description', '') or ''))
+        sections.append(('expected_output', getattr(task, 'expected_output', '') or ''))
+    if agent is not None:
+        sections.append(('backstory', getattr(agent, 'backstory', '') or ''))
+        sections.append(('role_goal', getattr(agent, 'goal', '') or ''))
+        sections.append(('role_goal', f"You are {getattr(agent, 'role', '')}."))
+    return sections
+
+
+def segment_messages(messages: Any, sections: Sequence[Tuple[str, str]] = ()
+                     ) -> List[Tuple[str, str]]:
+    """
+    Divide as mensagens de uma chamada em (rótulo, trecho).
+
+    Args:
+        messages: Lista de mensagens {'role', 'content'} ou um prompt em texto
+        sections: (rótulo, texto) conhecidos (ver known_sections), depois dos
+                  registrados com register_section()
+    """
+    if isinstance(messages, str):
+        messages = [{'role': 'user', 'content': messages}]
+    ordered = [(label, text) for text, label in registered_sections().items()]
+    ordered.extend(sections)
+
+    segments: List[Tuple[str, str]] = []
+    for message in messages or []:
+        role = message.get('role', 'user') if isinstance(message, dict) else 'user'
+        content = _text(message.get('content') if isinstance(message, dict) else message)
+        if role in ('tool', 'function'):
+            segments.append((_tool_label(message.get('name') or ''), content))
+            continue
+        claims = _Claims(content)
+        for label, text in ordered:
+            claims.claim_text(text, label)
+        for match in _OBSERVATION.finditer(content):
+            actions = _ACTION.findall(content, 0, match.start())
+            claims.claim(match.start(1), match.end(1),
+                         _tool_label(actions[-1]) if actions else 'tool_results')
+        for match in _MEMORY.finditer(content):
+            claims.claim(match.start(), match.end(), 'memory')
+        rest = 'agent_scratchpad' if role == 'assistant' else 'framework'
+        segments.extend(claims.segments(rest))
+    return segments
+
+
+def attribute_prompt(messages: Any, model: Optional[str] = None,
+                     sections: Sequence[Tuple[str, str]] = ()) -> Dict[str, int]:
+    """
+    Tokens do prompt por seção, contados trecho a trecho no tokenizer do
+    modelo. 'message_overhead' são os tokens de formatação do chat.
+    """
+    counts: Dict[str, int] = {}
+    for label, text in segment_messages(messages, sections):
+        tokens = count_tokens(text, model)
+        if tokens:
+            counts[label] = counts.get(label, 0) + tokens
+    n_messages = 1 if isinstance(messages, str) else len(messages or [])
+    if n_messages:
+        counts['message_overhead'] = TOKENS_PER_MESSAGE * n_messages + TOKENS_PER_REPLY
+    return counts
+
+
+# --- CrewAI ------------------------------------------------------------------
+
+_crewai_installed = False
+_crewai_lock = threading.Lock()
+# Agentes e tasks por id (os eventos de LLM trazem só agent_id/task_id)
+_agents: Dict[str, Any] = {}
+_tasks: Dict[str, Any] = {}
+
+
+def register_crew(crew):
+    """Registra agentes e tasks da crew para casar os textos nos prompts."""
+    for task in crew.tasks:
+        _tasks[str(task.id)] = task
+        if task.agent is not None:
+            _agents[str(task.agent.id)] = task.agent
+    for agent in crew.agents:
+        _agents[str(agent.id)] = agent
+
+
+def task_label(task_name: Optional[str]) -> str:
+    """Nome curto da task (a CrewAI usa a descrição quando não há nome)."""
+    first_line = (task_name or "").strip().split("\n", 1)[0]
+    return first_line[:60] or "unknown"
+
+
+def install_crewai_prompt_hooks(tracker=None):
+    """
+    Atribui o prompt de cada LLMCallStartedEvent e grava as contagens no
+    tracker (padrão: o global corrente). Idempotente.
+    """
+    global _crewai_installed
+    with _crewai_lock:
+        if _crewai_installed:
+            return
+        from crewai.events import crewai_event_bus, LLMCallStartedEvent
+        from .metrics_tracker import get_tracker
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def _on_llm_started(source, event):
+            agent, task = _agents.get(event.agent_id), _tasks.get(event.task_id)
+            counts = attribute_prompt(event.messages, event.model, known_sections(agent, task))
+            (tracker or get_tracker()).track_prompt_sections(
+                agent=event.agent_role or "unknown",
+                task=task_label(event.task_name),
+                model=event.model or "unknown",
+                sections=counts,
+            )
+
+        _crewai_installed = True
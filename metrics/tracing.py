@@ -0,0 +1,502 @@
+# metrics/tracing.py
+"""
+Spans hierárquicos (crew → task → agent → tool → LLM) com contextvars.
+
+Os eventos do MetricsTracker são listas planas; os spans ligam cada
+operação ao pai (parent_id), então dá para ver em qual task o tempo foi
+gasto, em quais tools/LLMs e onde está o overhead de orquestração.
+
+- span() / traced(): context manager e decorator; o span corrente fica num
+  ContextVar (herdado por threads do crewai_event_bus e por asyncio);
+- spans de escopo (task/agent), abertos e fechados por eventos da CrewAI em
+  threads diferentes: ficam registrados por chave e servem de pai para os
+  spans abertos depois deles (o processo da crew é sequencial);
+- spans já terminados (ex.: chamadas LLM medidas por eventos) entram com
+  record_span().
+- spans de outros processos (segmentos de metrics/aggregate.py) entram com
+  add_span(); cada span guarda o pid de origem.
+
+Exportação: Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev,
+speedscope) e OTLP-JSON (OpenTelemetry), para abrir uma execução como
+flame chart offline.
+"""
+import os
+import json
+import time
+import random
+import inspect
+import threading
+import functools
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+# Sentinela: pai resolvido automaticamente (span corrente ou escopo aberto)
+_AUTO = object()
+
+# kind do span -> SpanKind do OTLP (1 INTERNAL, 3 CLIENT)
+_OTLP_KINDS = {'llm': 3, 'embedding': 3}
+
+
+class Span:
+    """Uma operação com início, fim, atributos e pai."""
+
+    __slots__ = ('name', 'kind', 'trace_id', 'span_id', 'parent_id', 'start_ns',
+                 'end_ns', 'attributes', 'status', 'pid', 'thread_id', 'thread_name',
+                 '_perf_start', '_tracer')
+
+    def __init__(self, tracer: 'Tracer', name: str, kind: str, trace_id: str,
+                 parent_id: Optional[str], start_ns: int, thread_id: int,
+                 thread_name: str, attributes: Optional[Dict[str, Any]] = None):
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = 'ok'
+        self.pid = os.getpid()
+        self.thread_id = thread_id
+        self.thread_name = thread_name
+        self._perf_start: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        """Duração em segundos (0 se ainda aberto)."""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else 0.0
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def end(self, end_ns: Optional[int] = None, error: Optional[Union[str, BaseException]] = None):
+        """Fecha o span (idempotente) e o entrega ao tracer."""
+        if self.end_ns is not None:
+            return
+        if end_ns is None:
+            if self._perf_start is not None:
+                # Duração medida com perf_counter (monotônico, alta resolução)
+                end_ns = self.start_ns + time.perf_counter_ns() - self._perf_start
+            else:
+                end_ns = time.time_ns()
+        self.end_ns = max(end_ns, self.start_ns)
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = str(error)[:500]
+        self._tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration': self.duration,
+            'status': self.status,
+            'pid': self.pid,
+            'thread_id': self.thread_id,
+            'thread': self.thread_name,
+            'attributes': _json_safe(self.attributes),
+        }
+
+
+class Tracer:
+    """
+    Coleta os spans de uma sessão (um por MetricsTracker).
+
+    Uso:
+        with tracer.span("crew.kickoff", kind="crew", project=idea):
+            with tracer.span("tool: semantic_search", kind="tool", query=q):
+                ...
+        tracer.export_chrome_trace("trace.json")
+    """
+
+    def __init__(self, service_name: str = "crewai-software-company",
+                 max_spans: int = 100_000):
+        self.service_name = service_name
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._finished: List[Span] = []
+        self._scopes: Dict[Any, Span] = {}
+        # Spans abertos (execuções/tasks em andamento; ver open_spans)
+        self._open: Dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    # --- criação -----------------------------------------------------------------
+
+    def current_span(self) -> Optional[Span]:
+        """
+        Pai para um novo span: o mais recente entre o span do contexto e os
+        escopos abertos por eventos (task/agent) do mesmo trace.
+        """
+        current = _current_span.get()
+        with self._lock:
+            scopes = [s for s in self._scopes.values()
+                      if current is None or s.trace_id == current.trace_id]
+        if not scopes:
+            return current
+        scope = max(scopes, key=lambda s: s.start_ns)
+        if current is None or scope.start_ns >= current.start_ns:
+            return scope
+        return current
+
+    def start_span(self, name: str, kind: str = "internal",
+                   attributes: Optional[Dict[str, Any]] = None, parent: Any = _AUTO,
+                   start_ns: Optional[int] = None, key: Any = None) -> Span:
+        """
+        Abre um span (sem torná-lo o span corrente; ver span()).
+
+        Args:
+            parent: Span pai; padrão = current_span(); None = raiz de um novo trace
+            start_ns: Início em ns desde a época (padrão: agora)
+            key: Registra o span como escopo aberto (ex.: ('task', id)) até
+                 end_scope(key); spans criados depois o terão como pai
+        """
+        if parent is _AUTO:
+            parent = self.current_span()
+        thread = threading.current_thread()
+        if start_ns is not None and parent is not None:
+            # Span medido por eventos (outra thread): fica na faixa do pai
+            thread_id, thread_name = parent.thread_id, parent.thread_name
+        else:
+            thread_id, thread_name = thread.ident, thread.name
+        span = Span(
+            self, name, kind,
+            trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+            parent_id=parent.span_id if parent else None,
+            start_ns=start_ns if start_ns is not None else time.time_ns(),
+            thread_id=thread_id, thread_name=thread_name, attributes=attributes,
+        )
+        if start_ns is None:
+            span._perf_start = time.perf_counter_ns()
+        with self._lock:
+            self._open[span.span_id] = span
+            if key is not None:
+                self._scopes[key] = span
+        return span
+
+    def add_span(self, data: Dict[str, Any]) -> Span:
+        """Adiciona um span terminado serializado com Span.to_dict (outro processo)."""
+        span = Span(self, data['name'], data['kind'], data['trace_id'], data['parent_id'],
+                    data['start_ns'], data.get('thread_id') or 0, data.get('thread', ''),
+                    data.get('attributes'))
+        span.span_id = data['span_id']
+        span.status = data.get('status', 'ok')
+        span.pid = data.get('pid', span.pid)
+        span.end(data['end_ns'])
+        return span
+
+    def scope(self, key: Any) -> Optional[Span]:
+        with self._lock:
+            return self._scopes.get(key)
+
+    def end_scope(self, key: Any, end_ns: Optional[int] = None,
+                  error: Optional[str] = None) -> Optional[Span]:
+        """Fecha o escopo aberto com start_span(key=...)."""
+        with self._lock:
+            span = self._scopes.pop(key, None)
+        if span is not None:
+            span.end(end_ns, error)
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes) -> Iterator[Span]:
+        """Span corrente durante o bloco; exceções marcam status 'error'."""
+        span = self.start_span(name, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def record_span(self, name: str, kind: str, start_ns: int, end_ns: int,
+                    attributes: Optional[Dict[str, Any]] = None, parent: Any = _AUTO,
+                    error: Optional[str] = None) -> Span:
+        """Grava um span já terminado (ex.: chamada LLM medida por eventos)."""
+        span = self.start_span(name, kind, attributes, parent=parent, start_ns=start_ns)
+        span.end(end_ns, error)
+        return span
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self._open.pop(span.span_id, None)
+            if len(self._finished) >= self.max_spans:
+                self.dropped += 1
+            else:
+                self._finished.append(span)
+
+    # --- leitura e exportação ------------------------------------------------------
+
+    def spans(self) -> List[Span]:
+        """Spans terminados, em ordem de início."""
+        with self._lock:
+            return sorted(self._finished, key=lambda s: s.start_ns)
+
+    def open_spans(self) -> List[Span]:
+        """Spans abertos neste processo; os sem pai são execuções em andamento."""
+        with self._lock:
+            return list(self._open.values())
+
+    def finished_since(self, cursor: int = 0) -> Tuple[List[Span], int]:
+        """
+        Spans terminados depois de `cursor` (em ordem de término) e o novo
+        cursor; usado pelo MetricsFlusher para gravar só os spans novos.
+        """
+        with self._lock:
+            if cursor > len(self._finished):
+                cursor = 0  # clear() desde a última leitura
+            return self._finished[cursor:], len(self._finished)
+
+    def drain(self) -> List[Span]:
+        """
+        Retira os spans terminados (em ordem de término); usado pelo
+        MetricsFlusher quando um sink guarda os spans no lugar do tracer.
+        """
+        with self._lock:
+            spans, self._finished = self._finished, []
+            return spans
+
+    def clear(self):
+        with self._lock:
+            self._finished.clear()
+            self.dropped = 0
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON (eventos completos 'X', tempos em µs)."""
+        spans = self.spans()
+        origin = spans[0].start_ns if spans else 0
+        pids = sorted({span.pid for span in spans} or {os.getpid()})
+        tids: Dict[Tuple[int, int], int] = {}
+        events: List[Dict[str, Any]] = [{
+            'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0,
+            'args': {'name': self.service_name if len(pids) == 1
+                     else f"{self.service_name} [{pid}]"},
+        } for pid in pids]
+        for span in spans:
+            thread = (span.pid, span.thread_id)
+            if thread not in tids:
+                tids[thread] = len(tids) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': span.pid,
+                               'tid': tids[thread],
+                               'args': {'name': span.thread_name}})
+            events.append({
+                'ph': 'X',
+                'name': span.name,
+                'cat': span.kind,
+                'ts': (span.start_ns - origin) / 1000,
+                'dur': (span.end_ns - span.start_ns) / 1000,
+                'pid': span.pid,
+                'tid': tids[thread],
+                'args': {**_json_safe(span.attributes), 'span_id': span.span_id,
+                         'parent_id': span.parent_id, 'status': span.status},
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'start_time': datetime.fromtimestamp(origin / 1e9).isoformat()
+                          if spans else None,
+                          'dropped_spans': self.dropped},
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP-JSON (ExportTraceServiceRequest): um resource por processo."""
+        by_pid: Dict[int, List[Dict[str, Any]]] = {}
+        for span in self.spans():
+            otlp_span = {
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': _OTLP_KINDS.get(span.kind, 1),
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns),
+                'attributes': _otlp_attributes({'span.kind': span.kind,
+                                                'thread.name': span.thread_name,
+                                                **span.attributes}),
+                'status': {'code': 2, 'message': span.attributes.get('error', '')}
+                          if span.status == 'error' else {'code': 1},
+            }
+            if span.parent_id:
+                otlp_span['parentSpanId'] = span.parent_id
+            by_pid.setdefault(span.pid, []).append(otlp_span)
+        return {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({
+                'service.name': self.service_name,
+                'process.pid': pid,
+            })},
+            'scopeSpans': [{'scope': {'name': 'metrics.tracing'}, 'spans': otlp_spans}],
+        } for pid, otlp_spans in (sorted(by_pid.items()) or [(os.getpid(), [])])]}
+
+    def export_chrome_trace(self, path: Union[str, Path]) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps(self.to_chrome_trace()))
+        return path
+
+    def export_otlp(self, path: Union[str, Path]) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps(self.to_otlp()))
+        return path
+
+
+def _json_safe(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v if isinstance(v, (str, int, float, bool)) or v is None else str(v)
+            for k, v in attributes.items()}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': k, 'value': _otlp_value(v)}
+            for k, v in attributes.items() if v is not None]
+
+
+# --- API do tracker global --------------------------------------------------------
+
+def get_tracer() -> Tracer:
+    """Tracer da sessão corrente (o do tracker global)."""
+    from .metrics_tracker import get_tracker
+    return get_tracker().tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def span(name: str, kind: str = "internal", **attributes):
+    """Context manager de span no tracer da sessão corrente."""
+    return get_tracer().span(name, kind, **attributes)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal",
+           record_args: Sequence[str] = ()):
+    """
+    Decorator: executa a função dentro de um span.
+
+    Args:
+        name: Nome do span (padrão: nome qualificado da função)
+        record_args: Argumentos nomeados gravados como atributos (strings
+                     truncadas em 200 caracteres)
+
+    Uso (abaixo do @tool, para a CrewAI ver a assinatura original):
+        @tool("semantic_search")
+        @traced("tool: semantic_search", kind="tool", record_args=("query",))
+        def semantic_search_tool(query: str, top_k: int = 5) -> str: ...
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+        positions = list(inspect.signature(func).parameters)
+
+        def _attributes(args, kwargs) -> Dict[str, Any]:
+            attributes = {}
+            for arg in record_args:
+                if arg in kwargs:
+                    value = kwargs[arg]
+                elif positions.index(arg) < len(args):
+                    value = args[positions.index(arg)]
+                else:
+                    continue
+                attributes[arg] = value[:200] if isinstance(value, str) else value
+            return attributes
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name, kind, **_attributes(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Spans de task/agent a partir dos eventos da CrewAI -------------------------
+
+_crewai_installed = False
+_crewai_lock = threading.Lock()
+
+
+def _event_ns(event) -> int:
+    return int(event.timestamp.timestamp() * 1e9)
+
+
+def install_crewai_trace_hooks():
+    """
+    Abre/fecha spans de task e agent com os eventos da CrewAI (idempotente).
+
+    Os spans ficam abaixo do span corrente de quem disparou a crew (ex.:
+    crew.kickoff) e viram pais das tools e chamadas LLM executadas dentro
+    deles.
+    """
+    global _crewai_installed
+    with _crewai_lock:
+        if _crewai_installed:
+            return
+        from crewai.events import (
+            crewai_event_bus,
+            TaskStartedEvent,
+            TaskCompletedEvent,
+            TaskFailedEvent,
+            AgentExecutionStartedEvent,
+            AgentExecutionCompletedEvent,
+            AgentExecutionErrorEvent,
+        )
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def _on_task_started(source, event):
+            get_tracer().start_span(
+                f"task: {(event.task_name or 'task')[:80]}", kind="task",
+                attributes={'task_id': event.task_id}, start_ns=_event_ns(event),
+                key=('task', event.task_id),
+            )
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def _on_task_completed(source, event):
+            get_tracer().end_scope(('task', event.task_id), _event_ns(event))
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def _on_task_failed(source, event):
+            get_tracer().end_scope(('task', event.task_id), _event_ns(event), event.error)
+
+        @crewai_event_bus.on(AgentExecutionStartedEvent)
+        def _on_agent_started(source, event):
+            tracer = get_tracer()
+            task_id = str(getattr(event.task, 'id', event.task_id))
+            parent = tracer.scope(('task', task_id)) or tracer.current_span()
+            tracer.start_span(
+                f"agent: {event.agent.role}", kind="agent",
+                attributes={'agent_role': event.agent.role, 'task_id': task_id},
+                parent=parent, start_ns=_event_ns(event), key=('agent', task_id),
+            )
+
+        @crewai_event_bus.on(AgentExecutionCompletedEvent)
+        def _on_agent_completed(source, event):
+            task_id = str(getattr(event.task, 'id', event.task_id))
+            get_tracer().end_scope(('agent', task_id), _event_ns(event))
+
+        @crewai_event_bus.on(AgentExecutionErrorEvent)
+        def _on_agent_error(source, event):
+            task_id = str(getattr(event.task, 'id', event.task_id))
+            get_tracer().end_scope(('agent', task_id), _event_ns(event), event.error)
+
+        _crewai_installed = True
@@ -10,8 +10,23 @@ from .retriever_tools import (
     retrieve_context_tool,
     add_document_tool,
     get_kb_stats_tool,
+    search_workspace_tool,
+    search_collections_tool,
     setup_knowledge_base,
     get_vector_store,
+    load_prebuilt_index,
+    rebuild_knowledge_base,
+    get_rebuild_status,
+)
+from .watcher import KnowledgeBaseWatcher, start_knowledge_base_watcher
+from .router import CollectionRouter, get_collection_router
+from .migration import EmbeddingMigration, start_embedding_migration, get_active_migration
+from .workspace_index import (
+    WorkspaceIndex,
+    chunk_by_symbol,
+    activate_workspace_index,
+    deactivate_workspace_index,
+    get_workspace_index,
 )
 
 __all__ = [
@@ -24,6 +39,23 @@ __all__ = [
     'retrieve_context_tool',
     'add_document_tool',
     'get_kb_stats_tool',
+    'search_workspace_tool',
+    'search_collections_tool',
     'setup_knowledge_base',
     'get_vector_store',
+    'load_prebuilt_index',
+    'rebuild_knowledge_base',
+    'get_rebuild_status',
+    'KnowledgeBaseWatcher',
+    'start_knowledge_base_watcher',
+    'CollectionRouter',
+    'get_collection_router',
+    'EmbeddingMigration',
+    'start_embedding_migration',
+    'get_active_migration',
+    'WorkspaceIndex',
+    'chunk_by_symbol',
+    'activate_workspace_index',
+    'deactivate_workspace_index',
+    'get_workspace_index',
 ]
@@ -0,0 +1,12 @@
+# rag/__main__.py
+"""Permite `python -m rag build|status|verify|compact`."""
+import sys
+
+from dotenv import load_dotenv
+
+from rag.cli import main
+
+
+if __name__ == "__main__":
+    load_dotenv(override=True)
+    sys.exit(main())
@@ -0,0 +1,335 @@
+# rag/artifacts.py
+"""
+Artefatos de índice versionados (gerados offline por `python -m rag build`).
+
+Layout:
+    rag/vector_db/<collection>/
+        v1/ v2/ ...          -> export npy (rag/embedding_io.py) + artifact.json
+        current              -> nome da versão ativa (ex.: "v2")
+
+artifact.json guarda versão, modelo, contagem, informações do build e o
+sha256 de cada arquivo, usado por verify_artifact. Versões são gravadas em
+um diretório temporário (único por escritor) e renomeadas; o ponteiro
+`current` é trocado com os.replace, então leitores nunca veem uma versão
+parcial. Escolha do número da versão, renomeação e troca de `current`
+acontecem sob publish_lock: um lock de processo mais um lock de arquivo
+(<collection>/.publish.lock), que também serializa a CLI (outro processo).
+
+Quando a coleção já usa artefatos, atualizações incrementais (watcher,
+add_document_to_kb) também publicam uma nova versão (persist_vector_store):
+a partida carrega `current`, então gravar só os arquivos legados
+(<collection>.npy/.db) perderia essas atualizações no próximo restart.
+"""
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: só o lock de processo
+    FCNTL_AVAILABLE = False
+
+from rag.embedding_io import write_export, read_export
+
+
+DEFAULT_ROOT = "rag/vector_db"
+ARTIFACT_MANIFEST = "artifact.json"
+CURRENT_POINTER = "current"
+PUBLISH_LOCK = ".publish.lock"
+# Versões mantidas após cada build/rebuild (além da atual)
+DEFAULT_RETENTION = int(os.getenv("RAG_INDEX_RETENTION", "3"))
+# Campos do build_info com o chunking usado pelo build (ver read_chunking)
+CHUNK_FIELDS = ('chunk_size', 'chunk_overlap')
+
+
+def collection_dir(collection: str, root: str = DEFAULT_ROOT) -> Path:
+    return Path(root) / collection
+
+
+def list_versions(collection: str, root: str = DEFAULT_ROOT) -> List[int]:
+    """Versões completas existentes, em ordem crescente."""
+    base = collection_dir(collection, root)
+    if not base.exists():
+        return []
+    versions = []
+    for entry in base.iterdir():
+        if entry.is_dir() and entry.name.startswith('v') and entry.name[1:].isdigit():
+            if (entry / ARTIFACT_MANIFEST).exists():
+                versions.append(int(entry.name[1:]))
+    return sorted(versions)
+
+
+def version_dir(collection: str, version: int, root: str = DEFAULT_ROOT) -> Path:
+    return collection_dir(collection, root) / f"v{version}"
+
+
+# Publicações são serializadas: no processo (threads: watcher, add_document,
+# rebuild, migração) e entre processos (lock de arquivo por coleção)
+_publish_lock = threading.RLock()
+_held = threading.local()
+
+
+@contextmanager
+def publish_lock(collection: str, root: str = DEFAULT_ROOT):
+    """
+    Lock de publicação da coleção (reentrante na mesma thread): escolha da
+    próxima versão, renomeação e troca de `current` acontecem sob ele.
+    """
+    base = collection_dir(collection, root)
+    base.mkdir(parents=True, exist_ok=True)
+    key = str(base.resolve())
+    with _publish_lock:
+        held = _held.__dict__.setdefault('bases', set())
+        if key in held or not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(base / PUBLISH_LOCK, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_current(collection: str, root: str = DEFAULT_ROOT) -> Optional[int]:
+    """Versão apontada por `current` (None se não houver)."""
+    pointer = collection_dir(collection, root) / CURRENT_POINTER
+    try:
+        name = pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    if name.startswith('v') and name[1:].isdigit():
+        return int(name[1:])
+    return None
+
+
+def set_current(collection: str, version: int, root: str = DEFAULT_ROOT):
+    """Troca atomicamente o ponteiro `current`."""
+    base = collection_dir(collection, root)
+    with publish_lock(collection, root):
+        tmp = base / f".{CURRENT_POINTER}.tmp-{os.getpid()}"
+        tmp.write_text(f"v{version}\n")
+        os.replace(tmp, base / CURRENT_POINTER)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_artifact(
+    collection: str,
+    vectors: np.ndarray,
+    documents: List[str],
+    metadata: List[Dict],
+    embedding_model: str,
+    build_info: Optional[Dict] = None,
+    root: str = DEFAULT_ROOT,
+    promote: bool = True
+) -> Tuple[int, Path]:
+    """
+    Grava uma nova versão do artefato.
+
+    Args:
+        collection: Nome da coleção
+        vectors, documents, metadata: Conteúdo do índice
+        embedding_model: Modelo usado nos vetores
+        build_info: Informações extras do build (workers, duração...)
+        root: Diretório raiz dos índices
+        promote: Aponta `current` para a nova versão
+
+    Returns:
+        (número da versão, diretório da versão)
+    """
+    base = collection_dir(collection, root)
+    base.mkdir(parents=True, exist_ok=True)
+
+    # Gravação (lenta) fora do lock, num diretório exclusivo deste escritor
+    tmp_dir = base / f".tmp-{os.getpid()}-{uuid.uuid4().hex}"
+    try:
+        write_export(tmp_dir, vectors, documents, metadata, info={
+            'embedding_model': embedding_model,
+            'collection_name': collection,
+        })
+        files = {
+            entry.name: {'sha256': _sha256(entry), 'size': entry.stat().st_size}
+            for entry in sorted(tmp_dir.iterdir()) if entry.is_file()
+        }
+
+        with publish_lock(collection, root):
+            version = max(list_versions(collection, root), default=0) + 1
+            final_dir = version_dir(collection, version, root)
+            manifest = {
+                'collection': collection,
+                'version': version,
+                'created_at': datetime.now().isoformat(),
+                'embedding_model': embedding_model,
+                'dimension': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                'count': len(documents),
+                'build': build_info or {},
+                'files': files,
+            }
+            (tmp_dir / ARTIFACT_MANIFEST).write_text(json.dumps(manifest, indent=2))
+            os.replace(tmp_dir, final_dir)
+            if promote:
+                set_current(collection, version, root)
+    finally:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return version, final_dir
+
+
+def read_manifest(path: Path) -> Dict:
+    return json.loads((Path(path) / ARTIFACT_MANIFEST).read_text())
+
+
+def read_chunking(collection: str, version: Optional[int] = None,
+                  root: str = DEFAULT_ROOT) -> Dict[str, int]:
+    """
+    chunk_size/chunk_overlap do build de uma versão (padrão: current).
+    Versões derivadas (incremental, compact, migrate) os herdam, para que
+    arquivos reindexados depois sejam divididos como no build original.
+
+    Returns:
+        Dict só com os campos registrados ({} se não houver versão)
+    """
+    if version is None:
+        version = read_current(collection, root)
+    if version is None:
+        return {}
+    try:
+        build = read_manifest(version_dir(collection, version, root)).get('build', {})
+    except (OSError, ValueError):
+        return {}
+    return {field: build[field] for field in CHUNK_FIELDS if field in build}
+
+
+def verify_artifact(path: Path) -> Tuple[bool, List[str]]:
+    """
+    Verifica checksums e consistência de uma versão.
+
+    Returns:
+        (ok, lista de problemas encontrados)
+    """
+    path = Path(path)
+    problems = []
+    try:
+        manifest = read_manifest(path)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        return False, [f"{ARTIFACT_MANIFEST} ilegível: {e}"]
+
+    for name, info in manifest.get('files', {}).items():
+        file_path = path / name
+        if not file_path.exists():
+            problems.append(f"arquivo ausente: {name}")
+        elif file_path.stat().st_size != info['size']:
+            problems.append(f"tamanho divergente: {name}")
+        elif _sha256(file_path) != info['sha256']:
+            problems.append(f"checksum divergente: {name}")
+
+    if not problems:
+        try:
+            vectors, documents, _, _ = read_export(path)
+            if len(documents) != manifest['count']:
+                problems.append(f"contagem {len(documents)} != manifest {manifest['count']}")
+            if vectors.shape[0] and vectors.shape[1] != manifest['dimension']:
+                problems.append(f"dimensão {vectors.shape[1]} != manifest {manifest['dimension']}")
+        except Exception as e:
+            problems.append(f"export ilegível: {e}")
+
+    return not problems, problems
+
+
+def prune_versions(collection: str, keep: int = DEFAULT_RETENTION,
+                   root: str = DEFAULT_ROOT) -> List[int]:
+    """
+    Remove versões antigas, mantendo as `keep` mais recentes e a atual.
+
+    Returns:
+        Versões removidas
+    """
+    with publish_lock(collection, root):
+        versions = list_versions(collection, root)
+        current = read_current(collection, root)
+        keep_set = set(versions[-keep:]) if keep > 0 else set()
+        if current is not None:
+            keep_set.add(current)
+
+        removed = []
+        for version in versions:
+            if version not in keep_set:
+                shutil.rmtree(version_dir(collection, version, root), ignore_errors=True)
+                removed.append(version)
+    return removed
+
+
+def load_current_artifact(vector_store, root: str = DEFAULT_ROOT,
+                          verify: bool = False) -> Optional[int]:
+    """
+    Carrega a versão `current` da coleção do vector store (sem API).
+
+    Returns:
+        Versão carregada, ou None se não houver artefato
+    """
+    version = read_current(vector_store.collection_name, root)
+    if version is None:
+        return None
+    path = version_dir(vector_store.collection_name, version, root)
+    if verify:
+        ok, problems = verify_artifact(path)
+        if not ok:
+            raise ValueError(f"Artefato {path} corrompido: {'; '.join(problems)}")
+    # O artefato define o modelo (pode ter sido migrado; ver rag/migration.py)
+    vectors, documents, metadata, manifest = read_export(path)
+    vector_store.switch_model(manifest['embedding_model'], vectors, documents, metadata)
+    return version
+
+
+def persist_vector_store(vector_store, root: Optional[str] = None,
+                         keep: int = DEFAULT_RETENTION) -> Optional[int]:
+    """
+    Persiste o estado atual do vector store no formato que a partida lê.
+
+    Se a coleção tem artefato (`current`), grava uma nova versão a partir do
+    snapshot atual e a promove; senão, salva os arquivos legados
+    (save_index).
+
+    Args:
+        root: Diretório raiz dos artefatos (padrão: persist_directory do store)
+        keep: Versões mantidas pela política de retenção
+
+    Returns:
+        Versão publicada, ou None se salvou no formato legado
+    """
+    root = str(root or vector_store.persist_directory)
+    collection = vector_store.collection_name
+    with publish_lock(collection, root):
+        base_version = read_current(collection, root)
+        if base_version is None:
+            vector_store.save_index()
+            return None
+        vectors, documents, metadata, embedding_model = vector_store.snapshot_data()
+        version, _ = write_artifact(
+            collection, vectors, documents, metadata, embedding_model,
+            build_info={'source': 'incremental', 'base_version': base_version,
+                        'store_version': vector_store.version,
+                        **read_chunking(collection, base_version, root)},
+            root=root,
+        )
+        prune_versions(collection, keep, root)
+    return version
@@ -0,0 +1,247 @@
+# rag/cli.py
+"""
+Linha de comando do índice RAG (tira a indexação do caminho crítico da crew).
+
+    python -m rag build    [--source knowledge_base] [--workers 4] [--batch-size 64]
+    python -m rag status
+    python -m rag verify   [--version N | --all]
+    python -m rag compact  [--keep 3]
+    python -m rag migrate  --model text-embedding-3-large [--rate 20]
+    python -m rag migrate-legacy
+
+`migrate-legacy` converte o <collection>.pkl legado de --root para SQLite
+(o VectorStore não lê pickle por conta própria).
+
+`build` gera embeddings com um pool de workers (rag/index_builder.py) e
+grava uma nova versão do artefato (rag/artifacts.py); a crew carrega a
+versão `current` na partida.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from rag import artifacts
+from rag.embedding_io import read_export
+from rag.index_builder import build_version
+from rag.migration import EmbeddingMigration
+from rag.vector_store import VectorStore
+
+
+def cmd_build(args) -> int:
+    try:
+        version, path, stats = build_version(
+            source=args.source,
+            collection=args.collection,
+            root=args.root,
+            embedding_model=args.model,
+            extensions=args.extensions,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            promote=not args.no_promote,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    removed = artifacts.prune_versions(args.collection, args.keep, args.root)
+
+    print(f"✅ Versão v{version} gravada em {path}")
+    print(f"   - Chunks: {stats['documents']} | Dimensão: {stats['dimension']}")
+    print(f"   - Throughput: {stats['throughput']:.1f} chunks/s "
+          f"({args.workers} workers, lotes de {args.batch_size})")
+    if not args.no_promote:
+        print(f"   - current -> v{version}")
+    if removed:
+        print(f"   - Versões removidas: {', '.join(f'v{v}' for v in removed)}")
+    return 0
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+def cmd_status(args) -> int:
+    root = Path(args.root)
+    collections = sorted(
+        d.name for d in root.iterdir()
+        if d.is_dir() and artifacts.list_versions(d.name, args.root)
+    ) if root.exists() else []
+
+    if not collections:
+        print(f"⚠️  Nenhum artefato em {root} (rode `python -m rag build`)")
+    for collection in collections:
+        current = artifacts.read_current(collection, args.root)
+        print(f"📚 {collection} (current: {f'v{current}' if current else '-'})")
+        for version in artifacts.list_versions(collection, args.root):
+            path = artifacts.version_dir(collection, version, args.root)
+            manifest = artifacts.read_manifest(path)
+            marker = "*" if version == current else " "
+            print(f"  {marker} v{version}: {manifest['count']} docs, "
+                  f"{manifest['embedding_model']} ({manifest['dimension']}d), "
+                  f"{_dir_size(path) / 1024:.1f} KB, {manifest['created_at']}")
+
+    legacy = sorted({p.stem for pattern in ("*.db", "*.pkl")
+                     for p in root.glob(pattern)}) if root.exists() else []
+    if legacy:
+        print(f"🗂️  Índices legados: {', '.join(legacy)}")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    if args.all:
+        versions = artifacts.list_versions(args.collection, args.root)
+    elif args.version is not None:
+        versions = [args.version]
+    else:
+        current = artifacts.read_current(args.collection, args.root)
+        versions = [current] if current is not None else []
+
+    if not versions:
+        print(f"❌ Nenhum artefato para a coleção '{args.collection}'")
+        return 1
+
+    failed = 0
+    for version in versions:
+        path = artifacts.version_dir(args.collection, version, args.root)
+        ok, problems = artifacts.verify_artifact(path)
+        if ok:
+            print(f"✅ v{version}: íntegro")
+        else:
+            failed += 1
+            print(f"❌ v{version}: {'; '.join(problems)}")
+    return 1 if failed else 0
+
+
+def cmd_compact(args) -> int:
+    current = artifacts.read_current(args.collection, args.root)
+    if current is None:
+        print(f"❌ Nenhum artefato para a coleção '{args.collection}'")
+        return 1
+
+    path = artifacts.version_dir(args.collection, current, args.root)
+    vectors, documents, metadata, manifest = read_export(path)
+
+    # Duplicatas (mesma origem e conteúdo): vale a última ocorrência
+    latest = {}
+    for i, (doc, meta) in enumerate(zip(documents, metadata)):
+        if doc.strip():
+            latest[(meta.get('source'), meta.get('chunk'), doc)] = i
+    keep = sorted(latest.values())
+    dropped = len(documents) - len(keep)
+
+    if dropped:
+        version, new_path = artifacts.write_artifact(
+            args.collection, np.asarray(vectors)[keep],
+            [documents[i] for i in keep], [metadata[i] for i in keep],
+            manifest['embedding_model'],
+            build_info={'compacted_from': current, 'dropped': dropped,
+                        **artifacts.read_chunking(args.collection, current, args.root)},
+            root=args.root,
+        )
+        print(f"✅ v{current} -> v{version}: {dropped} entradas duplicadas/vazias removidas")
+    else:
+        print(f"✅ v{current} já está compacto")
+
+    removed = artifacts.prune_versions(args.collection, args.keep, args.root)
+    if removed:
+        print(f"🗑️  Versões removidas: {', '.join(f'v{v}' for v in removed)}")
+    return 0
+
+
+def cmd_migrate(args) -> int:
+    store = VectorStore(collection_name=args.collection,
+                        persist_directory=str(artifacts.collection_dir(args.collection, args.root)))
+    if artifacts.load_current_artifact(store, args.root, verify=True) is None:
+        print(f"❌ Nenhum artefato para a coleção '{args.collection}' (rode `build` antes)")
+        return 1
+
+    migration = EmbeddingMigration(store, args.model, max_docs_per_second=args.rate,
+                                   batch_size=args.batch_size, root=args.root)
+    migration.start()
+    while migration.is_alive():
+        migration.join(1.0)
+        report = migration.report()
+        print(f"\r🔄 {report['done']}/{report['total']} documentos "
+              f"({report['progress']:.0%})", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    report = migration.report()
+    if report['state'] != "cutover":
+        print(f"❌ Migração terminou em '{report['state']}': {report['error']}")
+        return 1
+    print(f"✅ {report['source_model']} -> {report['target_model']} "
+          f"(v{report['artifact_version']}, {report['elapsed']:.1f}s)")
+    return 0
+
+
+def cmd_migrate_legacy(args) -> int:
+    pickle_path = Path(args.root) / f"{args.collection}.pkl"
+    if not pickle_path.exists():
+        print(f"❌ {pickle_path} não existe")
+        return 1
+
+    store = VectorStore(collection_name=args.collection, persist_directory=args.root,
+                        migrate_legacy=True)
+    if store.index is None:
+        print(f"❌ Não foi possível migrar {pickle_path}")
+        return 1
+    print(f"✅ {len(store.documents)} documentos de {pickle_path.name} "
+          f"agora em {args.collection}.db")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m rag",
+                                     description="Gerencia o índice pré-construído do RAG")
+    parser.add_argument("--root", default=artifacts.DEFAULT_ROOT,
+                        help="Diretório raiz dos artefatos")
+    parser.add_argument("--collection", default="knowledge_base")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Gera uma nova versão do índice")
+    build.add_argument("--source", default="knowledge_base")
+    build.add_argument("--extensions", nargs="+", default=['.txt', '.md', '.py'])
+    build.add_argument("--workers", type=int, default=4)
+    build.add_argument("--batch-size", type=int, default=64)
+    build.add_argument("--chunk-size", type=int, default=0,
+                       help="0 = um documento por arquivo (comportamento atual)")
+    build.add_argument("--chunk-overlap", type=int, default=200)
+    build.add_argument("--model", default="text-embedding-3-small")
+    build.add_argument("--keep", type=int, default=artifacts.DEFAULT_RETENTION,
+                       help="Versões mantidas")
+    build.add_argument("--no-promote", action="store_true",
+                       help="Não aponta `current` para a nova versão")
+    build.set_defaults(func=cmd_build)
+
+    status = sub.add_parser("status", help="Lista coleções e versões")
+    status.set_defaults(func=cmd_status)
+
+    verify = sub.add_parser("verify", help="Confere checksums e consistência")
+    verify.add_argument("--version", type=int)
+    verify.add_argument("--all", action="store_true")
+    verify.set_defaults(func=cmd_verify)
+
+    compact = sub.add_parser("compact", help="Remove duplicatas e versões antigas")
+    compact.add_argument("--keep", type=int, default=artifacts.DEFAULT_RETENTION)
+    compact.set_defaults(func=cmd_compact)
+
+    migrate = sub.add_parser("migrate", help="Reembeda a versão atual com outro modelo")
+    migrate.add_argument("--model", required=True)
+    migrate.add_argument("--rate", type=float, default=20.0,
+                         help="Limite de documentos/segundo")
+    migrate.add_argument("--batch-size", type=int, default=16)
+    migrate.set_defaults(func=cmd_migrate)
+
+    migrate_legacy = sub.add_parser("migrate-legacy",
+                                    help="Converte o .pkl legado para SQLite (só arquivos confiáveis)")
+    migrate_legacy.set_defaults(func=cmd_migrate_legacy)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,394 @@
+# rag/document_store.py
+"""
+Armazenamento de documentos e metadados em SQLite (modo WAL).
+
+Substitui o pickle de `save_index`/`load_index`:
+- formato tipado e seguro (nenhum código executado na leitura);
+- o id de cada registro é a posição do vetor no índice (acesso aleatório);
+- gravações incrementais: só as linhas que mudaram são reescritas;
+- iteração em streaming (fetchmany), sem carregar tudo;
+- carga preguiçosa: LazyColumn expõe uma coluna como lista somente leitura
+  e só lê tudo na primeira escrita/iteração (partida sem custo de carga);
+- WAL permite leituras concorrentes enquanto outro processo grava; as
+  visões preguiçosas leem de uma transação de leitura própria (ReadSnapshot),
+  então continuam vendo a versão do momento da carga mesmo que outra
+  instância reescreva o arquivo. A transação dura no máximo
+  SNAPSHOT_MAX_AGE segundos: depois disso as visões são carregadas e ela é
+  encerrada (senão seguraria o checkpoint do WAL indefinidamente);
+- o .pkl legado só é lido por migrate_pickle, chamado explicitamente
+  (`python -m rag migrate-legacy` ou VectorStore(migrate_legacy=True)).
+
+Schema (SCHEMA_VERSION = 1):
+    documents(id INTEGER PRIMARY KEY, source TEXT, content TEXT, metadata TEXT JSON)
+    store_info(key TEXT PRIMARY KEY, value TEXT)   -- dimension, embedding_model...
+"""
+import json
+import pickle
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from collections.abc import Sequence as SequenceABC
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+SCHEMA_VERSION = 1
+
+# Tempo máximo (s) que um ReadSnapshot segura a transação de leitura
+SNAPSHOT_MAX_AGE = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source);
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row(doc_id: int, content: str, metadata: Dict) -> Tuple:
+    return doc_id, metadata.get('source'), content, json.dumps(metadata, ensure_ascii=False)
+
+
+def _get_field(conn: sqlite3.Connection, doc_id: int, column: str):
+    if column not in ('content', 'metadata'):
+        raise ValueError(f"Coluna desconhecida: {column}")
+    row = conn.execute(f"SELECT {column} FROM documents WHERE id = ?", (doc_id,)).fetchone()
+    if row is None:
+        raise IndexError(doc_id)
+    return json.loads(row[0]) if column == 'metadata' else row[0]
+
+
+def _load_column(conn: sqlite3.Connection, column: str) -> list:
+    if column == 'content':
+        return [r[0] for r in conn.execute("SELECT content FROM documents ORDER BY id")]
+    if column == 'metadata':
+        # Um único json.loads sobre o array concatenado (bem mais rápido
+        # que um json.loads por linha)
+        rows = [r[0] for r in conn.execute("SELECT metadata FROM documents ORDER BY id")]
+        return json.loads("[" + ",".join(rows) + "]")
+    raise ValueError(f"Coluna desconhecida: {column}")
+
+
+class DocumentStore:
+    """
+    Documentos + metadados indexados pela posição no índice vetorial.
+    Thread-safe (uma conexão protegida por lock).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        version = self.get_info('schema_version')
+        if version is None:
+            self.set_info('schema_version', SCHEMA_VERSION)
+        elif int(version) != SCHEMA_VERSION:
+            raise ValueError(f"Versão de schema não suportada em {self.path}: {version}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # --- informações da coleção -------------------------------------------
+
+    def get_info(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM store_info WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_info(self, key: str, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_info (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+
+    # --- leitura -----------------------------------------------------------
+
+    def get(self, doc_id: int) -> Optional[Tuple[str, Dict]]:
+        """(conteúdo, metadados) do documento, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, metadata FROM documents WHERE id = ?", (doc_id,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def get_field(self, doc_id: int, column: str):
+        """Um único campo ('content' ou 'metadata') de um registro."""
+        with self._lock:
+            return _get_field(self._conn, doc_id, column)
+
+    def load_column(self, column: str) -> list:
+        """Todos os valores de uma coluna, em ordem de id."""
+        with self._lock:
+            return _load_column(self._conn, column)
+
+    def get_many(self, ids: Sequence[int]) -> Dict[int, Tuple[str, Dict]]:
+        """Busca vários ids numa consulta (ex.: resultados de uma busca)."""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, content, metadata FROM documents WHERE id IN ({placeholders})",
+                list(ids),
+            ).fetchall()
+        return {r[0]: (r[1], json.loads(r[2])) for r in rows}
+
+    def ids_for_source(self, source: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM documents WHERE source = ? ORDER BY id", (source,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, Dict]]:
+        """Itera (id, conteúdo, metadados) em ordem, em lotes (streaming)."""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, content, metadata FROM documents WHERE id > ? "
+                    "ORDER BY id LIMIT ?", (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for doc_id, content, metadata in rows:
+                yield doc_id, content, json.loads(metadata)
+            last_id = rows[-1][0]
+
+    def load_all(self) -> Tuple[List[str], List[Dict]]:
+        """Carrega todos os documentos e metadados em ordem de id."""
+        return self.load_column('content'), self.load_column('metadata')
+
+    def lazy_columns(self, max_age: Optional[float] = SNAPSHOT_MAX_AGE
+                     ) -> Tuple['LazyColumn', 'LazyColumn']:
+        """
+        (documentos, metadados) como visões preguiçosas de uma mesma versão
+        do banco (ReadSnapshot), imunes a gravações posteriores. Após
+        `max_age` segundos as duas são carregadas e a transação encerrada.
+        """
+        snapshot = ReadSnapshot(self.path, columns=2, max_age=max_age)
+        return (LazyColumn(snapshot, 'content', snapshot.length),
+                LazyColumn(snapshot, 'metadata', snapshot.length))
+
+    # --- escrita -----------------------------------------------------------
+
+    def update(self, doc_id: int, content: Optional[str] = None,
+               metadata: Optional[Dict] = None) -> bool:
+        """Atualização parcial de um registro (sem reescrever os demais)."""
+        sets, params = [], []
+        if content is not None:
+            sets.append("content = ?")
+            params.append(content)
+        if metadata is not None:
+            sets += ["metadata = ?", "source = ?"]
+            params += [json.dumps(metadata, ensure_ascii=False), metadata.get('source')]
+        if not sets:
+            return False
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE documents SET {', '.join(sets)} WHERE id = ?", params + [doc_id]
+            )
+        return cursor.rowcount > 0
+
+    def write_from(self, start_id: int, documents: Sequence[str],
+                   metadata: Sequence[Dict]):
+        """
+        Substitui os registros a partir de `start_id` (trunca o restante)
+        numa única transação. write_from(len(store), novos) é um append.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE id >= ?", (start_id,))
+            self._conn.executemany(
+                "INSERT INTO documents (id, source, content, metadata) VALUES (?, ?, ?, ?)",
+                (_row(start_id + i, d, m) for i, (d, m) in enumerate(zip(documents, metadata))),
+            )
+
+    def replace_all(self, documents: Sequence[str], metadata: Sequence[Dict]):
+        self.write_from(0, documents, metadata)
+
+
+class _SnapshotReleased(Exception):
+    """A transação do ReadSnapshot já foi encerrada (colunas carregadas)."""
+
+
+class ReadSnapshot:
+    """
+    Transação de leitura numa conexão própria: com WAL, todas as leituras
+    veem a versão do banco do momento da abertura, mesmo que outra conexão
+    (outra instância do VectorStore, outro processo) grave depois.
+
+    Segura o checkpoint do WAL enquanto aberta: é encerrada quando as
+    `columns` visões que a usam são carregadas (release) ou, no máximo,
+    `max_age` segundos após a abertura (close carrega as visões restantes).
+    """
+
+    def __init__(self, path: Union[str, Path], columns: int = 1,
+                 max_age: Optional[float] = SNAPSHOT_MAX_AGE):
+        self._lock = threading.Lock()
+        self._users = columns
+        self._views: List[weakref.ref] = []
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("BEGIN")
+        # A primeira leitura fixa a versão da transação
+        self.length = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        self._timer: Optional[threading.Timer] = None
+        if max_age is not None:
+            self._timer = threading.Timer(max_age, self.close)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def released(self) -> bool:
+        return self._conn is None
+
+    def attach(self, view: 'LazyColumn'):
+        """Registra uma visão para ser carregada por close()."""
+        self._views.append(weakref.ref(view))
+
+    def get_field(self, doc_id: int, column: str):
+        with self._lock:
+            if self._conn is None:
+                raise _SnapshotReleased()
+            return _get_field(self._conn, doc_id, column)
+
+    def load_column(self, column: str) -> list:
+        with self._lock:
+            if self._conn is None:
+                raise _SnapshotReleased()
+            return _load_column(self._conn, column)
+
+    def release(self):
+        """Uma visão já não precisa do banco; a última encerra a transação."""
+        with self._lock:
+            self._users -= 1
+            if self._users <= 0:
+                self._end()
+
+    def close(self):
+        """Carrega as visões ainda preguiçosas e encerra a transação."""
+        for ref in self._views:
+            view = ref()
+            if view is not None:
+                view.materialize()
+        with self._lock:
+            self._end()
+
+    def _end(self):
+        if self._conn is not None:
+            self._conn.rollback()
+            self._conn.close()
+            self._conn = None
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+class LazyColumn(SequenceABC):
+    """
+    Coluna do DocumentStore vista como lista somente leitura.
+
+    Acesso por índice lê só o registro pedido (ex.: resultados de busca).
+    Iteração, slices e concatenação carregam a coluna inteira uma vez e a
+    guardam: a partir daí os mesmos objetos são devolvidos, o que mantém a
+    comparação por identidade do save_index incremental.
+
+    As leituras vão para `store`: um ReadSnapshot (lazy_columns) fixa a
+    versão do banco, e é liberado quando a coluna é carregada (ou a carrega
+    ao expirar); lendo direto
+    de um DocumentStore, o dono deve chamar materialize() antes de gravar
+    registros que ela ainda pode ler.
+    """
+
+    def __init__(self, store: Union[DocumentStore, ReadSnapshot], column: str, length: int):
+        self._store = store
+        self._column = column
+        self._length = length
+        self._items: Optional[list] = None
+        self._lock = threading.Lock()
+        if isinstance(store, ReadSnapshot):
+            store.attach(self)
+
+    @property
+    def materialized(self) -> bool:
+        return self._items is not None
+
+    def materialize(self) -> list:
+        with self._lock:
+            if self._items is None:
+                self._items = self._store.load_column(self._column)
+                if isinstance(self._store, ReadSnapshot):
+                    self._store.release()
+        return self._items
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        items = self._items
+        if items is not None:
+            return items[index]
+        if isinstance(index, slice):
+            return self.materialize()[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        try:
+            return self._store.get_field(index, self._column)
+        except _SnapshotReleased:
+            # Carregada por outra thread entre a checagem e a leitura
+            return self._items[index]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __add__(self, other) -> list:
+        return self.materialize() + list(other)
+
+    def __radd__(self, other) -> list:
+        return list(other) + self.materialize()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazyColumn)):
+            return self.materialize() == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        state = "carregada" if self.materialized else "preguiçosa"
+        return f"LazyColumn({self._column}, {self._length} registros, {state})"
+
+
+def migrate_pickle(pickle_path: Union[str, Path], store: DocumentStore) -> int:
+    """
+    Converte o .pkl legado (documents/metadata/dimension) para o DocumentStore.
+    Só use com arquivos gerados por este projeto: pickle executa código, por
+    isso a migração nunca é automática (ver `python -m rag migrate-legacy`).
+
+    Returns:
+        Número de documentos migrados
+    """
+    with open(pickle_path, 'rb') as f:
+        data = pickle.load(f)
+    store.replace_all(data['documents'], data['metadata'])
+    store.set_info('dimension', data['dimension'])
+    return len(data['documents'])
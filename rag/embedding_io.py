@@ -0,0 +1,152 @@
+# rag/embedding_io.py
+"""
+Import/export em lote de embeddings pré-calculados.
+
+Permite construir índices offline (máquina de batch), distribuí-los como
+artefatos e carregá-los em produção sem chamar a API de embeddings.
+
+Formatos suportados (um diretório ou arquivo por export):
+- npy (padrão): diretório com
+    manifest.json        -> contagem, dimensão, dtype, modelo, formato
+    vectors.npy          -> matriz [n, d] (carregada via mmap, sem cópia)
+    documents.txt        -> todos os documentos concatenados (UTF-8)
+    document_offsets.npy -> offsets (em caracteres) [n + 1]
+    metadata.json        -> lista de metadados
+  documents.txt + document_offsets.npy é o mesmo layout de uma coluna
+  string do Arrow (buffer de dados + offsets).
+- arrow: arquivo IPC do Arrow com colunas vector (fixed_size_list<float>),
+  document (string) e metadata (string JSON); lido via memory map.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+EXPORT_FORMAT_VERSION = 1
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+
+def _check_arrow():
+    if not ARROW_AVAILABLE:
+        raise ImportError("pyarrow não está instalado (pip install pyarrow)")
+
+
+def write_export(
+    path: Union[str, Path],
+    vectors: np.ndarray,
+    documents: List[str],
+    metadata: List[Dict],
+    info: Optional[Dict] = None,
+    format: str = "npy"
+) -> Path:
+    """
+    Grava um export de embeddings.
+
+    Args:
+        path: Diretório (npy) ou arquivo (arrow) de destino
+        vectors: Matriz [n, d]
+        documents: Lista de n documentos
+        metadata: Lista de n metadados
+        info: Campos extras do manifest (ex.: embedding_model)
+        format: 'npy' ou 'arrow'
+
+    Returns:
+        Caminho gravado
+    """
+    path = Path(path)
+    vectors = np.ascontiguousarray(vectors)
+    documents, metadata = list(documents), list(metadata)
+    n = vectors.shape[0]
+    if len(documents) != n or len(metadata) != n:
+        raise ValueError("vectors, documents e metadata devem ter o mesmo tamanho")
+
+    manifest = {
+        'format_version': EXPORT_FORMAT_VERSION,
+        'count': n,
+        'dimension': int(vectors.shape[1]),
+        'dtype': str(vectors.dtype),
+        **(info or {}),
+    }
+
+    if format == "arrow":
+        _check_arrow()
+        flat = pa.array(vectors.reshape(-1))
+        table = pa.table({
+            'vector': pa.FixedSizeListArray.from_arrays(flat, vectors.shape[1]),
+            'document': pa.array(documents, type=pa.large_string()),
+            'metadata': pa.array([json.dumps(m, ensure_ascii=False) for m in metadata],
+                                 type=pa.large_string()),
+        })
+        table = table.replace_schema_metadata({'manifest': json.dumps(manifest)})
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return path
+
+    if format != "npy":
+        raise ValueError(f"Formato desconhecido: {format}")
+
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(str(path / "vectors.npy"), vectors, allow_pickle=False)
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    if n:
+        np.cumsum([len(d) for d in documents], out=offsets[1:])
+    np.save(str(path / "document_offsets.npy"), offsets, allow_pickle=False)
+    # Bytes (sem tradução de quebras de linha): offsets são em caracteres
+    (path / "documents.txt").write_bytes("".join(documents).encode('utf-8'))
+    (path / "metadata.json").write_text(json.dumps(metadata, ensure_ascii=False),
+                                        encoding='utf-8')
+    (path / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return path
+
+
+def read_export(
+    path: Union[str, Path],
+    mmap: bool = True
+) -> Tuple[np.ndarray, List[str], List[Dict], Dict]:
+    """
+    Lê um export de embeddings.
+
+    Os vetores são devolvidos sem cópia (memmap do .npy ou buffer do Arrow
+    mapeado em memória); documentos são fatiados de um único buffer.
+
+    Returns:
+        (vectors, documents, metadata, manifest)
+    """
+    path = Path(path)
+
+    if path.is_file() and path.suffix in ARROW_SUFFIXES:
+        _check_arrow()
+        source = pa.memory_map(str(path), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        manifest = json.loads((table.schema.metadata or {}).get(b'manifest', b'{}'))
+        vector_col = table.column('vector').combine_chunks()
+        dimension = vector_col.type.list_size
+        vectors = vector_col.values.to_numpy(zero_copy_only=True).reshape(-1, dimension)
+        documents = table.column('document').to_pylist()
+        metadata = [json.loads(m) for m in table.column('metadata').to_pylist()]
+        return vectors, documents, metadata, manifest
+
+    manifest = json.loads((path / "manifest.json").read_text())
+    if manifest.get('format_version') != EXPORT_FORMAT_VERSION:
+        raise ValueError(f"Versão de export não suportada: {manifest.get('format_version')}")
+
+    vectors = np.load(str(path / "vectors.npy"), mmap_mode='r' if mmap else None,
+                      allow_pickle=False)
+    offsets = np.load(str(path / "document_offsets.npy"), allow_pickle=False).tolist()
+    text = (path / "documents.txt").read_bytes().decode('utf-8')
+    documents = [text[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+    metadata = json.loads((path / "metadata.json").read_text(encoding='utf-8'))
+
+    if not (vectors.shape[0] == len(documents) == len(metadata) == manifest['count']):
+        raise ValueError(f"Export inconsistente em {path}")
+    return vectors, documents, metadata, manifest
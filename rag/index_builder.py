@@ -0,0 +1,161 @@
+# rag/index_builder.py
+"""
+Construção de versões do índice (usada por `python -m rag build` e pelo
+rebuild em background do initialize_knowledge_base).
+
+O build roda num VectorStore isolado: a instância que atende as buscas só
+é tocada no final, quando a nova versão já está gravada e verificada.
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag import artifacts
+from rag.vector_store import VectorStore, DocumentLoader
+
+
+class BuildProgress:
+    """Barra de progresso (stderr) com throughput e ETA; thread-safe."""
+
+    def __init__(self, total: int, width: int = 30, stream=None):
+        self.total = total
+        self.width = width
+        self.stream = stream or sys.stderr
+        self.done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, n: int):
+        with self._lock:
+            self.done += n
+            rate = self.rate
+            remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+            filled = int(self.width * self.done / self.total) if self.total else self.width
+            bar = "█" * filled + "░" * (self.width - filled)
+            self.stream.write(
+                f"\r🔄 [{bar}] {self.done}/{self.total} chunks "
+                f"| {rate:.1f} chunks/s | ETA {remaining:.0f}s"
+            )
+            if self.done >= self.total:
+                self.stream.write("\n")
+            self.stream.flush()
+
+
+def chunk_document(doc: Dict, chunk_size: int = 0,
+                   chunk_overlap: int = 200) -> Tuple[List[str], List[Dict]]:
+    """Divide um documento do DocumentLoader em chunks (nenhum se vazio)."""
+    content = doc['content']
+    if not content.strip():
+        return [], []
+    if chunk_size > 0 and len(content) > chunk_size:
+        chunks = DocumentLoader.chunk_text(content, chunk_size, chunk_overlap)
+        return chunks, [{**doc['metadata'], 'chunk': i, 'total_chunks': len(chunks)}
+                        for i in range(len(chunks))]
+    return [content], [doc['metadata']]
+
+
+def collect_chunks(source: Path, extensions: List[str], chunk_size: int = 0,
+                   chunk_overlap: int = 200) -> Tuple[List[str], List[Dict]]:
+    """Carrega os arquivos e (opcionalmente) divide em chunks."""
+    documents, metadata = [], []
+    for doc in DocumentLoader.load_directory(Path(source), extensions):
+        chunks, chunk_metadata = chunk_document(doc, chunk_size, chunk_overlap)
+        documents.extend(chunks)
+        metadata.extend(chunk_metadata)
+    return documents, metadata
+
+
+def embed_parallel(store: VectorStore, documents: List[str], workers: int,
+                   batch_size: int, progress: Optional[BuildProgress] = None) -> np.ndarray:
+    """
+    Gera embeddings em lotes distribuídos por um pool de threads.
+
+    A chamada à API é I/O-bound, então threads bastam; cada lote volta para
+    sua posição original, preservando o alinhamento com os documentos.
+    """
+    batches = [(start, documents[start:start + batch_size])
+               for start in range(0, len(documents), batch_size)]
+    results: Dict[int, np.ndarray] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(store.get_embeddings_batch, batch): start
+                   for start, batch in batches}
+        for future in as_completed(futures):
+            vectors = future.result()
+            results[futures[future]] = vectors
+            if progress:
+                progress.update(len(vectors))
+
+    return np.concatenate([results[start] for start, _ in batches])
+
+
+def build_version(
+    source: str = "knowledge_base",
+    collection: str = "knowledge_base",
+    root: str = artifacts.DEFAULT_ROOT,
+    embedding_model: str = "text-embedding-3-small",
+    extensions: List[str] = ['.txt', '.md', '.py'],
+    workers: int = 4,
+    batch_size: int = 64,
+    chunk_size: int = 0,
+    chunk_overlap: int = 200,
+    promote: bool = True,
+    show_progress: bool = True
+) -> Tuple[int, Path, Dict]:
+    """
+    Indexa um diretório e grava uma nova versão do artefato.
+
+    Returns:
+        (versão, diretório da versão, estatísticas do build)
+
+    Raises:
+        FileNotFoundError: diretório inexistente
+        ValueError: nenhum documento encontrado
+    """
+    source = Path(source)
+    if not source.exists():
+        raise FileNotFoundError(f"Diretório {source} não encontrado")
+
+    started = time.monotonic()
+    documents, metadata = collect_chunks(source, extensions, chunk_size, chunk_overlap)
+    if not documents:
+        raise ValueError(f"Nenhum documento encontrado em {source}")
+
+    # persist_directory isolado: o build não carrega nem altera o índice legado
+    store = VectorStore(
+        collection_name=collection,
+        persist_directory=str(artifacts.collection_dir(collection, root)),
+        embedding_model=embedding_model,
+    )
+    embed_started = time.monotonic()
+    progress = BuildProgress(len(documents)) if show_progress else None
+    vectors = embed_parallel(store, documents, workers, batch_size, progress)
+    embed_seconds = time.monotonic() - embed_started
+
+    stats = {
+        'source': str(source),
+        'documents': len(documents),
+        'dimension': int(vectors.shape[1]),
+        'workers': workers,
+        'batch_size': batch_size,
+        'chunk_size': chunk_size,
+        'chunk_overlap': chunk_overlap,
+        'embedding_seconds': round(embed_seconds, 3),
+        'throughput': round(len(documents) / max(embed_seconds, 1e-9), 1),
+    }
+    version, path = artifacts.write_artifact(
+        collection, vectors, documents, metadata, embedding_model,
+        build_info=stats, root=root, promote=promote,
+    )
+    stats['total_seconds'] = round(time.monotonic() - started, 3)
+    return version, path, stats
@@ -0,0 +1,365 @@
+# rag/migration.py
+"""
+Migração de modelo de embedding sem interrupção do serviço.
+
+1. Um thread reembeda os documentos do vector store em execução com o modelo
+   novo, em ritmo limitado (documentos/segundo). Os vetores são acumulados
+   na migração e publicados no índice separado a cada publish_every lotes
+   (cada publicação copia o índice inteiro).
+2. As buscas continuam sendo atendidas pelo índice antigo.
+3. Opcionalmente, cada busca é repetida no índice novo (shadow read, fora do
+   caminho da resposta) para medir overlap@k e latência.
+4. Com o índice novo completo, o cutover reembeda (em lotes, com o mesmo
+   limite de ritmo) os documentos que entraram no índice antigo durante o
+   build, grava um artefato versionado com o modelo novo e troca modelo +
+   índice atomicamente (VectorStore.switch_model).
+"""
+import time
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from rag import artifacts
+from rag.vector_store import VectorStore
+
+
+# Dimensão dos modelos de embedding da OpenAI
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+# Máximo de amostras de shadow read mantidas para o relatório
+MAX_SHADOW_SAMPLES = 10000
+
+
+def _doc_key(document: str, metadata: Dict):
+    return metadata.get('source'), document
+
+
+class EmbeddingMigration(threading.Thread):
+    """
+    Constrói o índice do modelo novo em background e faz o cutover.
+
+    Estados: pending -> building -> ready -> cutover (ou failed/cancelled).
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        target_model: str,
+        max_docs_per_second: float = 20.0,
+        batch_size: int = 16,
+        publish_every: int = 8,
+        shadow: bool = False,
+        auto_cutover: bool = True,
+        root: str = artifacts.DEFAULT_ROOT
+    ):
+        """
+        Args:
+            vector_store: VectorStore em serviço (modelo antigo)
+            target_model: Modelo de embedding novo
+            max_docs_per_second: Limite de ritmo do reembedding (custo de API)
+            batch_size: Documentos por chamada à API
+            publish_every: Lotes entre publicações do índice novo (shadow read)
+            shadow: Repete as buscas no índice novo e mede overlap@k
+            auto_cutover: Faz o cutover assim que o índice novo estiver completo
+            root: Diretório raiz dos artefatos
+        """
+        super().__init__(name="embedding-migration", daemon=True)
+        if target_model == vector_store.embedding_model:
+            raise ValueError(f"Vector store já usa o modelo '{target_model}'")
+
+        self.source = vector_store
+        self.source_model = vector_store.embedding_model
+        self.target_model = target_model
+        self.max_docs_per_second = max_docs_per_second
+        self.batch_size = batch_size
+        self.publish_every = max(1, publish_every)
+        self.shadow = shadow
+        self.auto_cutover = auto_cutover
+        self.root = root
+
+        self.target = VectorStore(
+            collection_name=vector_store.collection_name,
+            persist_directory=str(artifacts.collection_dir(vector_store.collection_name, root)),
+            embedding_model=target_model,
+            backend=vector_store.backend,
+        )
+        self.target.dimension = EMBEDDING_DIMENSIONS.get(target_model, self.target.dimension)
+
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.total = 0
+        self.done = 0
+        self.artifact_version: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._cutover_lock = threading.Lock()
+        self._samples: List[Dict] = []
+        self._samples_lock = threading.Lock()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1,
+                                                   thread_name_prefix="shadow-read")
+        self._started_at: Optional[float] = None
+        # Índice novo em construção: lotes de vetores + posição de cada documento
+        self._vectors: List[np.ndarray] = []
+        self._documents: List[str] = []
+        self._metadata: List[Dict] = []
+        self._position: Dict = {}
+        self._unpublished_batches = 0
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    def run(self):
+        self._started_at = time.monotonic()
+        self.state = "building"
+        snapshot = self.source._snapshot
+        self.total = len(snapshot.documents)
+
+        try:
+            if not self._embed_batches(snapshot.documents, snapshot.metadata):
+                self.state = "cancelled"
+                return
+            self._publish_target()
+
+            self.state = "ready"
+            print(f"✅ Índice '{self.target_model}' completo ({self.done} documentos)")
+            if self.auto_cutover:
+                self.cutover()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"❌ Migração para '{self.target_model}' falhou: {e}")
+
+    def _embed_batches(self, documents: List[str], metadata: List[Dict]) -> bool:
+        """
+        Reembeda em lotes de batch_size, respeitando max_docs_per_second.
+
+        Returns:
+            False se a migração foi cancelada no meio
+        """
+        for start in range(0, len(documents), self.batch_size):
+            if self._stop_event.is_set():
+                return False
+            batch_started = time.monotonic()
+            docs = documents[start:start + self.batch_size]
+            metas = metadata[start:start + self.batch_size]
+            vectors = self.target.get_embeddings_batch(docs)
+
+            for doc, meta in zip(docs, metas):
+                self._position[_doc_key(doc, meta)] = len(self._documents)
+                self._documents.append(doc)
+                self._metadata.append(meta)
+            self._vectors.append(np.asarray(vectors, dtype=np.float32))
+            self.done += len(docs)
+            self._unpublished_batches += 1
+            if self._unpublished_batches >= self.publish_every:
+                self._publish_target()
+
+            # Throttle: cada lote leva no mínimo len(docs)/limite segundos
+            if self.max_docs_per_second > 0:
+                remaining = len(docs) / self.max_docs_per_second - (
+                    time.monotonic() - batch_started)
+                if remaining > 0 and self._stop_event.wait(remaining):
+                    return False
+        return True
+
+    def _built_vectors(self) -> np.ndarray:
+        if not self._vectors:
+            return np.empty((0, self.target.dimension), dtype=np.float32)
+        if len(self._vectors) > 1:
+            self._vectors = [np.concatenate(self._vectors)]
+        return self._vectors[0]
+
+    def _publish_target(self):
+        """Publica os vetores acumulados no índice novo (uma cópia por publicação)."""
+        self._unpublished_batches = 0
+        vectors = self._built_vectors()
+        if len(vectors):
+            self.target.switch_model(self.target_model, vectors,
+                                     self._documents, self._metadata)
+
+    def _missing(self, live) -> List[int]:
+        """Posições do snapshot em serviço ainda sem vetor no modelo novo."""
+        return [i for i, (doc, meta) in enumerate(zip(live.documents, live.metadata))
+                if _doc_key(doc, meta) not in self._position]
+
+    def cancel(self, timeout: Optional[float] = None):
+        """Interrompe a migração; o índice antigo continua servindo."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self._shadow_executor.shutdown(wait=False)
+
+    def search(self, query: str, top_k: int = 5, **kwargs) -> List[Dict]:
+        """
+        Busca no índice em serviço; com shadow ativo, agenda a mesma busca
+        no índice novo sem atrasar a resposta.
+        """
+        started = time.monotonic()
+        results = self.source.search(query, top_k=top_k, **kwargs)
+        served_latency = time.monotonic() - started
+
+        if (self.shadow and self.state in ("building", "ready")
+                and len(self.target.documents) > 0):
+            try:
+                self._shadow_executor.submit(
+                    self._shadow_read, query, top_k, results, served_latency
+                )
+            except RuntimeError:
+                pass  # executor encerrado (cancel/cutover)
+        return results
+
+    def _shadow_read(self, query: str, top_k: int, served: List[Dict],
+                     served_latency: float):
+        started = time.monotonic()
+        try:
+            shadow = self.target.search(query, top_k=top_k)
+        except Exception:
+            return
+        shadow_latency = time.monotonic() - started
+
+        served_keys = {_doc_key(r['document'], r['metadata']) for r in served}
+        shadow_keys = {_doc_key(r['document'], r['metadata']) for r in shadow}
+        k = max(1, min(top_k, len(served_keys)))
+        sample = {
+            'overlap': len(served_keys & shadow_keys) / k,
+            'served_latency': served_latency,
+            'shadow_latency': shadow_latency,
+            'coverage': self.progress,
+        }
+        with self._samples_lock:
+            self._samples.append(sample)
+            if len(self._samples) > MAX_SHADOW_SAMPLES:
+                del self._samples[:len(self._samples) - MAX_SHADOW_SAMPLES]
+
+    def report(self) -> Dict:
+        """Progresso da migração e métricas de shadow read."""
+        with self._samples_lock:
+            samples = list(self._samples)
+        # overlap@k só é comparável com o índice novo completo
+        complete = [s for s in samples if s['coverage'] >= 1.0]
+
+        def p50(key, items):
+            return statistics.median(s[key] for s in items) if items else None
+
+        return {
+            'state': self.state,
+            'source_model': self.source_model,
+            'target_model': self.target_model,
+            'done': self.done,
+            'total': self.total,
+            'progress': self.progress,
+            'elapsed': time.monotonic() - self._started_at if self._started_at else 0.0,
+            'shadow_queries': len(samples),
+            'overlap_at_k': (sum(s['overlap'] for s in complete) / len(complete)
+                             if complete else None),
+            'served_latency_p50': p50('served_latency', samples),
+            'shadow_latency_p50': p50('shadow_latency', samples),
+            'artifact_version': self.artifact_version,
+            'error': self.error,
+        }
+
+    def cutover(self) -> int:
+        """
+        Promove o índice novo.
+
+        Documentos adicionados/removidos no índice antigo durante o build
+        (watcher, add_document) são reconciliados antes da troca; os novos
+        são reembedados em lotes de batch_size, com o limite de ritmo do build.
+
+        Returns:
+            Versão do artefato gravado com o modelo novo
+        """
+        with self._cutover_lock:
+            if self.state == "cutover":
+                return self.artifact_version
+            if self.state != "ready":
+                raise RuntimeError(f"Migração não está pronta (estado: {self.state})")
+
+            # Catch-up em lotes (mesmo ritmo do build) dos documentos que entraram
+            # durante o build; repete enquanto a diferença for de um lote ou mais
+            caught_up = 0
+            while True:
+                live = self.source._snapshot
+                missing = self._missing(live)
+                self.total += len(missing)
+                caught_up += len(missing)
+                if not self._embed_batches([live.documents[i] for i in missing],
+                                           [live.metadata[i] for i in missing]):
+                    self.state = "cancelled"
+                    raise RuntimeError("Migração cancelada durante o cutover")
+                if len(missing) < self.batch_size:
+                    break
+
+            built_vectors = self._built_vectors()
+            rows = [self._position[_doc_key(d, m)]
+                    for d, m in zip(live.documents, live.metadata)]
+            vectors = built_vectors[rows] if rows else np.empty(
+                (0, built_vectors.shape[1]), dtype=np.float32)
+
+            # Artefato e troca juntos: uma publicação incremental concorrente
+            # não promove um snapshot do modelo antigo depois do cutover
+            with artifacts.publish_lock(self.source.collection_name, self.root):
+                self.artifact_version, _ = artifacts.write_artifact(
+                    self.source.collection_name, vectors, live.documents, live.metadata,
+                    self.target_model,
+                    build_info={'migrated_from': self.source_model, 'caught_up': caught_up,
+                                **artifacts.read_chunking(self.source.collection_name,
+                                                          root=self.root)},
+                    root=self.root,
+                )
+                self.source.switch_model(self.target_model, vectors,
+                                         live.documents, live.metadata)
+            self.state = "cutover"
+            self._shadow_executor.shutdown(wait=False)
+
+        print(f"✅ Cutover: '{self.source_model}' -> '{self.target_model}' "
+              f"(artefato v{self.artifact_version})")
+        return self.artifact_version
+
+
+# Migração ativa (consultada pelas tools de busca)
+_active_migration: Optional[EmbeddingMigration] = None
+
+
+def start_embedding_migration(
+    target_model: str,
+    vector_store: Optional[VectorStore] = None,
+    **kwargs
+) -> EmbeddingMigration:
+    """
+    Inicia a migração do vector store global para outro modelo.
+
+    Args:
+        target_model: Modelo de embedding novo
+        vector_store: VectorStore em serviço (default: get_vector_store())
+        **kwargs: Opções de EmbeddingMigration (max_docs_per_second, shadow...)
+
+    Returns:
+        Migração já iniciada
+    """
+    global _active_migration
+    if _active_migration is not None and _active_migration.state in ("pending", "building",
+                                                                      "ready"):
+        raise RuntimeError("Já existe uma migração em andamento")
+    if vector_store is None:
+        from rag.retriever_tools import get_vector_store
+        vector_store = get_vector_store()
+
+    _active_migration = EmbeddingMigration(vector_store, target_model, **kwargs)
+    _active_migration.start()
+    return _active_migration
+
+
+def get_active_migration() -> Optional[EmbeddingMigration]:
+    """Migração em andamento (None se não houver ou se já terminou)."""
+    migration = _active_migration
+    if migration is None or migration.state not in ("building", "ready"):
+        return None
+    return migration
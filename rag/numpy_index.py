@@ -0,0 +1,179 @@
+# rag/numpy_index.py
+"""
+Backend de busca exata em NumPy puro (fallback quando FAISS não está instalado).
+
+Implementa o subconjunto da API de faiss.IndexFlatL2 usado pelo VectorStore
+(add, search, reconstruct_n, ntotal, d), então o VectorStore troca de backend
+sem mudar o restante do código. Os vetores ficam numa matriz contígua
+float32 (ou float16, metade da memória) e são persistidos em .npy, que pode
+ser carregado com mmap.
+"""
+import os
+from pathlib import Path
+from typing import Tuple, Union
+import numpy as np
+
+
+class NumpyIndex:
+    """
+    Índice L2 força-bruta com produtos matriz-vetor em blocos.
+
+    Cada bloco de `block_size` linhas gera as distâncias para todas as
+    queries de uma vez; o top-k parcial de cada bloco é obtido com
+    argpartition (O(n) em vez de O(n log n)) e combinado com o acumulado.
+    Distâncias retornadas são L2 ao quadrado, como no IndexFlatL2.
+    """
+
+    def __init__(self, dimension: int, dtype=np.float32, block_size: int = 16384):
+        self.d = dimension
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError("dtype deve ser float32 ou float16")
+        self.block_size = block_size
+        self._vectors = np.empty((0, dimension), dtype=self.dtype)
+        # Normas ao quadrado pré-calculadas (sempre float32)
+        self._norms = np.empty(0, dtype=np.float32)
+
+    @property
+    def ntotal(self) -> int:
+        return self._vectors.shape[0]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Matriz de vetores (somente leitura; pode ser um memmap)."""
+        return self._vectors
+
+    @staticmethod
+    def _row_norms(vectors: np.ndarray) -> np.ndarray:
+        v = vectors.astype(np.float32, copy=False)
+        return np.einsum('ij,ij->i', v, v)
+
+    def add(self, vectors: np.ndarray):
+        """Adiciona vetores (shape [n, d])."""
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.d:
+            raise ValueError(f"Esperado shape [n, {self.d}], recebido {vectors.shape}")
+        vectors = vectors.astype(self.dtype, copy=False)
+        if self.ntotal == 0:
+            self._vectors = np.ascontiguousarray(vectors)
+            self._norms = self._row_norms(self._vectors)
+        else:
+            self._vectors = np.concatenate([self._vectors, vectors])
+            self._norms = np.concatenate([self._norms, self._row_norms(vectors)])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k vizinhos mais próximos.
+
+        Returns:
+            (distâncias [nq, k], índices [nq, k]); posições sem resultado
+            têm índice -1, como no FAISS.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.d)
+        nq = queries.shape[0]
+        distances = np.full((nq, k), np.inf, dtype=np.float32)
+        indices = np.full((nq, k), -1, dtype=np.int64)
+
+        n = self.ntotal
+        if n == 0 or k <= 0:
+            return distances, indices
+
+        k_eff = min(k, n)
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        best_d = None
+        best_i = None
+
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            block = self._vectors[start:end]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+
+            # ||x||² - 2·x·q + ||q||²  -> [bloco, nq]
+            dist = block @ queries.T
+            dist *= -2.0
+            dist += self._norms[start:end, None]
+            dist += q_norms[None, :]
+
+            kb = min(k_eff, end - start)
+            part = np.argpartition(dist, kb - 1, axis=0)[:kb]
+            cand_d = np.take_along_axis(dist, part, axis=0)
+            cand_i = part + start
+
+            if best_d is None:
+                best_d, best_i = cand_d, cand_i
+            else:
+                merged_d = np.concatenate([best_d, cand_d])
+                merged_i = np.concatenate([best_i, cand_i])
+                keep = np.argpartition(merged_d, k_eff - 1, axis=0)[:k_eff]
+                best_d = np.take_along_axis(merged_d, keep, axis=0)
+                best_i = np.take_along_axis(merged_i, keep, axis=0)
+
+        order = np.argsort(best_d, axis=0)
+        best_d = np.take_along_axis(best_d, order, axis=0)
+        best_i = np.take_along_axis(best_i, order, axis=0)
+
+        # Erros de arredondamento podem gerar distâncias levemente negativas
+        np.maximum(best_d, 0.0, out=best_d)
+        distances[:, :k_eff] = best_d.T
+        indices[:, :k_eff] = best_i.T
+        return distances, indices
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        """Retorna os vetores [start, start+n) como float32."""
+        return np.array(self._vectors[start:start + n], dtype=np.float32)
+
+    def copy(self) -> 'NumpyIndex':
+        """Cópia independente (usada no copy-on-write do VectorStore)."""
+        clone = NumpyIndex(self.d, self.dtype, self.block_size)
+        clone._vectors = np.array(self._vectors, copy=True)
+        clone._norms = self._norms.copy()
+        return clone
+
+    @staticmethod
+    def write_npy(path: Union[str, Path], array: np.ndarray):
+        """
+        Grava .npy de forma atômica (arquivo temporário + os.replace).
+
+        Snapshots antigos podem estar mapeados (mmap) no arquivo atual;
+        sobrescrevê-lo no lugar invalidaria essas páginas.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def save(self, path: Union[str, Path]):
+        """Salva os vetores em .npy."""
+        self.write_npy(path, self._vectors)
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray, block_size: int = 16384) -> 'NumpyIndex':
+        """
+        Cria índice adotando a matriz sem copiá-la (pode ser memmap ou
+        buffer Arrow). Apenas as normas são calculadas, bloco a bloco.
+        Matrizes de outro dtype (ex.: float64) são convertidas para float32.
+        """
+        if vectors.ndim != 2:
+            raise ValueError(f"Esperada matriz 2D, recebido shape {vectors.shape}")
+        if vectors.dtype not in (np.float32, np.float16):
+            index = cls(vectors.shape[1], np.float32, block_size)
+            index.add(vectors)
+            return index
+        index = cls(vectors.shape[1], vectors.dtype, block_size)
+        index._vectors = vectors
+        index._norms = np.concatenate([
+            cls._row_norms(vectors[s:s + block_size])
+            for s in range(0, vectors.shape[0], block_size)
+        ]) if vectors.shape[0] else np.empty(0, dtype=np.float32)
+        return index
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True,
+             block_size: int = 16384) -> 'NumpyIndex':
+        """Carrega vetores de .npy (com mmap por padrão: sem cópia na carga)."""
+        vectors = np.load(str(path), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if vectors.ndim != 2:
+            raise ValueError(f"Arquivo {path} não contém uma matriz 2D")
+        return cls.from_vectors(vectors, block_size)
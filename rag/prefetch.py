@@ -0,0 +1,169 @@
+# rag/prefetch.py
+"""
+Pré-busca do contexto das tasks na montagem da crew.
+
+Em vez de cada agente gastar um turno de LLM só para decidir chamar
+retrieve_context (e outro para ler o resultado), as queries das cinco
+tasks são derivadas da ideia do projeto e executadas antes do kickoff:
+- um único lote de embeddings para todas as queries;
+- buscas em paralelo num pool de threads;
+- o contexto compactado (trechos relevantes, com orçamento de caracteres)
+  é injetado direto na descrição de cada task.
+
+Roda em background (start_task_context_prefetch) enquanto a crew é montada;
+a crew só espera o resultado depois de criar agentes, tasks e Crew, e
+apply_task_contexts() anexa o contexto às descrições.
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from rag.snippets import extract_snippet
+from metrics import get_tracker, register_section
+
+
+# Query de cada task (o texto da ideia do projeto é inserido em {idea})
+TASK_QUERIES = {
+    'prd': "product requirements document template, user stories and success metrics for {idea}",
+    'architecture': "software architecture patterns, technology stack and project structure for {idea}",
+    'implementation': "code examples, implementation patterns and error handling for {idea}",
+    'testing': "test plan, test cases and unit testing best practices for {idea}",
+    'documentation': "README, user guide and documentation best practices for {idea}",
+}
+
+# Orçamento do contexto injetado em cada task
+CONTEXT_MAX_CHARS = 2400
+SNIPPET_CHARS = 700
+
+
+def build_task_queries(project_idea: str) -> Dict[str, str]:
+    """Queries de retrieval das tasks para uma ideia de projeto."""
+    idea = " ".join(project_idea.split())
+    return {task: template.format(idea=idea) for task, template in TASK_QUERIES.items()}
+
+
+def _search(vector_store, searcher, query: str, vector, top_k: int,
+            score_threshold: Optional[float]):
+    if searcher is vector_store:
+        try:
+            return vector_store.search_by_vector(vector, top_k, score_threshold,
+                                                 embedding_model=vector_store.embedding_model)
+        except ValueError:
+            pass
+    # Migração ativa ou modelo trocado: a busca reembeda a query
+    return searcher.search(query, top_k=top_k, score_threshold=score_threshold)
+
+
+def pack_context(query: str, results, max_chars: int = CONTEXT_MAX_CHARS) -> str:
+    """Formata os resultados como trechos relevantes dentro do orçamento."""
+    blocks, used = [], 0
+    for result in results:
+        snippet = extract_snippet(result['document'], query, max_chars=SNIPPET_CHARS)
+        source = Path(result['metadata'].get('source', 'unknown')).name
+        block = (f"### {source} (linhas {snippet['start_line']}-{snippet['end_line']}, "
+                 f"Score: {result['score']:.2f})\n{snippet['text']}\n")
+        if blocks and used + len(block) > max_chars:
+            break
+        blocks.append(block)
+        used += len(block)
+    return "\n".join(blocks)
+
+
+def prefetch_task_contexts(
+    project_idea: str,
+    top_k: int = 3,
+    score_threshold: Optional[float] = 0.5,
+    max_chars: int = CONTEXT_MAX_CHARS,
+    max_workers: int = 5
+) -> Dict[str, str]:
+    """
+    Busca o contexto de todas as tasks de uma vez.
+
+    Args:
+        project_idea: Ideia do projeto
+        top_k: Documentos por task
+        score_threshold: Limite de similaridade
+        max_chars: Orçamento de caracteres por task
+        max_workers: Buscas em paralelo
+
+    Returns:
+        {task: contexto compactado}; tasks sem resultado ficam de fora.
+        Base vazia ou erro -> {} (os agentes usam retrieve_context como antes)
+    """
+    from rag.retriever_tools import get_vector_store
+    from rag.migration import get_active_migration
+
+    start_time = time.time()
+    tracker = get_tracker()
+    try:
+        vector_store = get_vector_store()
+        if len(vector_store.documents) == 0:
+            return {}
+        searcher = get_active_migration() or vector_store
+
+        queries = build_task_queries(project_idea)
+        for _ in queries:
+            tracker.track_query()
+        embed_start = time.time()
+        vectors = vector_store.get_embeddings_batch(list(queries.values()))
+        embedding_latency = time.time() - embed_start
+
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix="context-prefetch") as executor:
+            futures = {
+                task: executor.submit(_search, vector_store, searcher, query,
+                                      vector, top_k, score_threshold)
+                for (task, query), vector in zip(queries.items(), vectors)
+            }
+            results = {task: future.result() for task, future in futures.items()}
+
+        contexts = {}
+        for task, task_results in results.items():
+            if not task_results:
+                continue
+            contexts[task] = pack_context(queries[task], task_results, max_chars)
+            tracker.track_retrieval(
+                duration=time.time() - start_time,
+                docs_retrieved=len(task_results),
+                relevance_score=sum(r['score'] for r in task_results) / len(task_results),
+                embedding_latency=embedding_latency / len(queries),
+            )
+        tracker.track_tool_call("prefetch_context", time.time() - start_time, True)
+        return contexts
+
+    except Exception as e:
+        tracker.track_tool_call("prefetch_context", time.time() - start_time, False)
+        print(f"⚠️  Pré-busca de contexto falhou: {e}")
+        return {}
+
+
+def start_task_context_prefetch(project_idea: str, **kwargs) -> Future:
+    """Inicia prefetch_task_contexts em background e retorna o Future."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-prefetch")
+    future = executor.submit(prefetch_task_contexts, project_idea, **kwargs)
+    executor.shutdown(wait=False)
+    return future
+
+
+def apply_task_contexts(tasks: Sequence[Any], contexts: Dict[str, str]) -> None:
+    """
+    Anexa o contexto pré-buscado à descrição das tasks já criadas, na ordem
+    de TASK_QUERIES (prd, architecture, implementation, testing, documentation).
+    """
+    for key, task in zip(TASK_QUERIES, tasks):
+        task.description += format_task_context(contexts.get(key))
+
+
+def format_task_context(context: Optional[str]) -> str:
+    """Bloco anexado à descrição da task (vazio se não houver contexto)."""
+    if not context:
+        return ""
+    # Tokens deste bloco aparecem como 'rag_context' na atribuição do prompt
+    register_section("rag_context", context)
+    return f"""
+
+KNOWLEDGE BASE CONTEXT (already retrieved for this task - use it directly; call
+retrieve_context only if you need something that is not covered here):
+
+{context}"""
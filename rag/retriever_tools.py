@@ -3,13 +3,29 @@
 Tools de RAG para uso com CrewAI agents.
 Integra vector store com o sistema de tools do CrewAI.
 """
+import os
 import time
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from crewai.tools import tool
 
 from rag.vector_store import VectorStore, DocumentLoader, create_vector_store
+from rag.artifacts import (
+    DEFAULT_ROOT,
+    DEFAULT_RETENTION,
+    load_current_artifact,
+    persist_vector_store,
+    prune_versions,
+    publish_lock,
+    set_current,
+)
+from rag.index_builder import build_version
+from rag.migration import get_active_migration
+from rag.snippets import EmbeddingScorer, extract_snippet
+from rag.workspace_index import get_workspace_index
 from metrics import get_tracker
+from metrics.tracing import traced
 
 
 # Instância global do vector store (será inicializada no primeiro uso)
@@ -21,16 +37,120 @@ def get_vector_store() -> VectorStore:
     global _vector_store
     if _vector_store is None:
         _vector_store = VectorStore()
-        # Tentar carregar índice existente
-        _vector_store.load_index()
+        # Preferir o artefato pré-construído (python -m rag build)
+        if load_current_artifact(_vector_store) is None:
+            _vector_store.load_index()
     return _vector_store
 
 
+def load_prebuilt_index(verify: bool = True) -> Optional[VectorStore]:
+    """
+    Carrega a versão `current` do artefato gerado por `python -m rag build`
+    na instância global, sem gerar embeddings.
+
+    Returns:
+        VectorStore carregado, ou None se não houver artefato
+    """
+    global _vector_store
+    vector_store = VectorStore()
+    version = load_current_artifact(vector_store, verify=verify)
+    if version is None:
+        return None
+    _vector_store = vector_store
+    print(f"✅ Índice pré-construído v{version} carregado")
+    return vector_store
+
+
+# Rebuild em background (no máximo um por vez)
+_rebuild_lock = threading.Lock()
+_rebuild_thread: Optional[threading.Thread] = None
+_rebuild_status: Dict = {'state': 'idle'}
+
+
+def _run_rebuild(vector_store: VectorStore, directory: str, root: str, keep: int):
+    """Constrói uma nova versão fora da instância global e a promove."""
+    start_time = time.time()
+    _rebuild_status.update(directory=directory, started_at=start_time)
+    try:
+        version, path, stats = build_version(
+            source=directory,
+            collection=vector_store.collection_name,
+            root=root,
+            embedding_model=vector_store.embedding_model,
+            promote=False,
+            show_progress=False,
+        )
+        # Troca atômica: import_ publica o novo snapshot com uma atribuição;
+        # buscas em andamento terminam na versão antiga que capturaram.
+        # `current` só é promovido depois: uma publicação incremental
+        # (watcher, add_document) concorrente grava um snapshot anterior ao
+        # rebuild antes da promoção, ou do store já reconstruído depois dela
+        with publish_lock(vector_store.collection_name, root):
+            vector_store.import_(str(path), replace=True)
+            set_current(vector_store.collection_name, version, root)
+        removed = prune_versions(vector_store.collection_name, keep, root)
+        _rebuild_status.update(
+            state='done', version=version, documents=stats['documents'],
+            removed_versions=removed, duration=time.time() - start_time,
+        )
+        print(f"✅ Base de conhecimento v{version} promovida ({stats['documents']} documentos)")
+    except Exception as e:
+        _rebuild_status.update(state='failed', error=str(e),
+                               duration=time.time() - start_time)
+        print(f"❌ Rebuild da base de conhecimento falhou: {e}")
+
+
+def rebuild_knowledge_base(
+    directory: str = "knowledge_base",
+    background: bool = True,
+    root: str = DEFAULT_ROOT,
+    keep: int = DEFAULT_RETENTION
+) -> threading.Thread:
+    """
+    Reindexa o diretório em uma nova versão (vector_db/<collection>/v<N>/)
+    sem interromper as buscas: o índice atual continua servindo até a troca.
+
+    Args:
+        directory: Diretório com documentos
+        background: Se False, espera o rebuild terminar
+        root: Diretório raiz dos artefatos
+        keep: Versões mantidas pela política de retenção
+
+    Returns:
+        Thread do rebuild (a já em andamento, se houver)
+    """
+    global _rebuild_thread
+    with _rebuild_lock:
+        if _rebuild_thread is None or not _rebuild_thread.is_alive():
+            _rebuild_status.clear()
+            _rebuild_status['state'] = 'running'  # visível antes da thread iniciar
+            _rebuild_thread = threading.Thread(
+                target=_run_rebuild,
+                args=(get_vector_store(), directory, root, keep),
+                name="kb-rebuild",
+                daemon=True,
+            )
+            _rebuild_thread.start()
+        thread = _rebuild_thread
+    if not background:
+        thread.join()
+    return thread
+
+
+def get_rebuild_status() -> Dict:
+    """Estado do último rebuild ('idle', 'running', 'done' ou 'failed')."""
+    return dict(_rebuild_status)
+
+
 @tool("initialize_knowledge_base")
+@traced("tool: initialize_knowledge_base", kind="tool", record_args=("directory",))
 def initialize_knowledge_base_tool(directory: str = "knowledge_base") -> str:
     """
     Inicializa a base de conhecimento carregando documentos de um diretório.
 
+    A indexação roda em background; buscas continuam respondendo com a
+    versão atual até a nova ser promovida.
+
     Args:
         directory: Caminho do diretório com documentos (default: knowledge_base/)
 
@@ -44,29 +164,24 @@ def initialize_knowledge_base_tool(directory: str = "knowledge_base") -> str:
         if not kb_path.exists():
             return f"❌ Diretório {directory} não encontrado"
 
-        # Criar e popular vector store
-        vector_store = create_vector_store(directory)
-
-        # Atualizar instância global
-        global _vector_store
-        _vector_store = vector_store
-
-        stats = vector_store.get_stats()
+        already_running = _rebuild_thread is not None and _rebuild_thread.is_alive()
+        rebuild_knowledge_base(directory)
+        stats = get_vector_store().get_stats()
         duration = time.time() - start_time
 
         # Rastrear métricas
         tracker = get_tracker()
         tracker.track_tool_call("initialize_knowledge_base", duration, True)
 
-        return f"""✅ Base de conhecimento inicializada com sucesso!
+        status = "já estava em andamento" if already_running else "iniciada em background"
+        return f"""✅ Indexação da base de conhecimento {status}.
 
-📊 Estatísticas:
+📊 Versão em uso até a troca:
 - Total de documentos: {stats['total_documents']}
 - Modelo de embedding: {stats['embedding_model']}
 - Dimensão dos vetores: {stats['dimension']}
-- Tempo de inicialização: {duration:.2f}s
 
-A base de conhecimento está pronta para buscas semânticas."""
+As buscas semânticas continuam disponíveis durante a indexação."""
 
     except Exception as e:
         duration = time.time() - start_time
@@ -75,7 +190,24 @@ A base de conhecimento está pronta para buscas semânticas."""
         return f"❌ Erro ao inicializar base de conhecimento: {str(e)}"
 
 
+# Trechos dos resultados: janela mais relevante à query (rag/snippets.py).
+# RAG_SNIPPET_EMBEDDINGS=true pontua linhas por embeddings (com cache) em vez
+# de sobreposição lexical.
+SNIPPET_MAX_CHARS = 300
+_snippet_scorer: Optional[EmbeddingScorer] = None
+
+
+def _get_snippet_scorer(vector_store: VectorStore) -> Optional[EmbeddingScorer]:
+    global _snippet_scorer
+    if os.getenv("RAG_SNIPPET_EMBEDDINGS", "false").lower() != "true":
+        return None
+    if _snippet_scorer is None or _snippet_scorer.vector_store is not vector_store:
+        _snippet_scorer = EmbeddingScorer(vector_store)
+    return _snippet_scorer
+
+
 @tool("semantic_search")
+@traced("tool: semantic_search", kind="tool", record_args=("query", "top_k"))
 def semantic_search_tool(query: str, top_k: int = 5) -> str:
     """
     Realiza busca semântica na base de conhecimento.
@@ -88,6 +220,7 @@ def semantic_search_tool(query: str, top_k: int = 5) -> str:
         Documentos relevantes encontrados
     """
     start_time = time.time()
+    get_tracker().track_query()
 
     try:
         vector_store = get_vector_store()
@@ -99,7 +232,9 @@ Use a tool 'initialize_knowledge_base' primeiro para carregar documentos."""
 
         # Realizar busca
         embedding_start = time.time()
-        results = vector_store.search(query, top_k=top_k)
+        # Durante uma migração de modelo, a busca passa pela migração (shadow read)
+        searcher = get_active_migration() or vector_store
+        results = searcher.search(query, top_k=top_k)
         embedding_latency = time.time() - embedding_start
 
         if not results:
@@ -126,16 +261,19 @@ Use a tool 'initialize_knowledge_base' primeiro para carregar documentos."""
 📊 Encontrados {len(results)} documentos relevantes:
 
 """
+        scorer = _get_snippet_scorer(vector_store)
+        if scorer is not None:
+            scorer = scorer.for_query(query)  # query embedada uma vez para todos os resultados
         for i, result in enumerate(results, 1):
-            doc_preview = result['document'][:300]
-            if len(result['document']) > 300:
-                doc_preview += "..."
+            snippet = extract_snippet(result['document'], query,
+                                      max_chars=SNIPPET_MAX_CHARS, scorer=scorer)
+            lines = f"linhas {snippet['start_line']}-{snippet['end_line']}"
 
             formatted_results += f"""
 --- Resultado {i} (Score: {result['score']:.3f}) ---
-Fonte: {result['metadata'].get('source', 'N/A')}
-Conteúdo:
-{doc_preview}
+Fonte: {result['metadata'].get('source', 'N/A')} ({lines})
+Trecho:
+{snippet['text']}
 
 """
 
@@ -150,6 +288,8 @@ Conteúdo:
 
 
 @tool("retrieve_context")
+@traced("tool: retrieve_context", kind="tool",
+        record_args=("task_description", "top_k"))
 def retrieve_context_tool(task_description: str, top_k: int = 3) -> str:
     """
     Recupera contexto relevante da base de conhecimento para uma tarefa específica.
@@ -163,6 +303,7 @@ def retrieve_context_tool(task_description: str, top_k: int = 3) -> str:
         Contexto relevante formatado para uso pelo agente
     """
     start_time = time.time()
+    get_tracker().track_query()
 
     try:
         vector_store = get_vector_store()
@@ -173,7 +314,8 @@ def retrieve_context_tool(task_description: str, top_k: int = 3) -> str:
 Prosseguindo sem contexto adicional da base de conhecimento."""
 
         # Buscar documentos relevantes
-        results = vector_store.search(task_description, top_k=top_k, score_threshold=0.5)
+        searcher = get_active_migration() or vector_store
+        results = searcher.search(task_description, top_k=top_k, score_threshold=0.5)
 
         if not results:
             return f"""ℹ️  Nenhum contexto relevante encontrado na base de conhecimento para: '{task_description}'
@@ -220,7 +362,127 @@ Prosseguindo com conhecimento geral."""
         return f"⚠️  Erro ao recuperar contexto: {str(e)}\n\nProsseguindo sem contexto adicional."
 
 
+@tool("search_workspace")
+@traced("tool: search_workspace", kind="tool", record_args=("query", "top_k"))
+def search_workspace_tool(query: str, top_k: int = 5) -> str:
+    """
+    Busca trechos relevantes (funções, classes, seções) nos arquivos já
+    gerados no workspace deste projeto. Prefira esta tool a ler arquivos
+    inteiros com read_file.
+
+    Args:
+        query: O que você procura (ex.: "validação de entrada do comando add")
+        top_k: Número de trechos a retornar (default: 5)
+
+    Returns:
+        Trechos de código/documentação com arquivo, símbolo e linhas
+    """
+    start_time = time.time()
+    get_tracker().track_query()
+
+    try:
+        workspace_index = get_workspace_index()
+        if workspace_index is None:
+            return """ℹ️  Índice do workspace não está ativo.
+
+Use as tools list_files/read_file para acessar os arquivos."""
+
+        results = workspace_index.search(query, top_k=top_k)
+
+        if not results:
+            return f"ℹ️  Nenhum trecho relevante encontrado no workspace para: '{query}'"
+
+        duration = time.time() - start_time
+        tracker = get_tracker()
+        avg_relevance = sum(r['score'] for r in results) / len(results)
+        tracker.track_retrieval(
+            duration=duration,
+            docs_retrieved=len(results),
+            relevance_score=avg_relevance,
+            embedding_latency=0.0  # Já incluído na busca
+        )
+        tracker.track_tool_call("search_workspace", duration, True)
+
+        formatted_results = f"""🔍 Workspace: '{query}'
+
+"""
+        for i, result in enumerate(results, 1):
+            meta = result['metadata']
+            formatted_results += f"""--- Trecho {i}: workspace/{meta.get('source', '?')} :: {meta.get('symbol', '?')} (linhas {meta.get('start_line', '?')}-{meta.get('end_line', '?')}, Score: {result['score']:.3f}) ---
+{result['document']}
+
+"""
+        return formatted_results
+
+    except Exception as e:
+        duration = time.time() - start_time
+        tracker = get_tracker()
+        tracker.track_tool_call("search_workspace", duration, False)
+        return f"❌ Erro na busca no workspace: {str(e)}"
+
+
+@tool("search_collections")
+@traced("tool: search_collections", kind="tool",
+        record_args=("query", "collections", "top_k"))
+def search_collections_tool(query: str, collections: str = "", top_k: int = 5) -> str:
+    """
+    Busca em várias coleções da base de conhecimento em paralelo e combina
+    os melhores resultados (scores calibrados por coleção).
+
+    Args:
+        query: Query de busca
+        collections: Coleções separadas por vírgula (vazio = todas)
+        top_k: Número de resultados (default: 5)
+
+    Returns:
+        Resultados com coleção, fonte e trecho relevante
+    """
+    start_time = time.time()
+    get_tracker().track_query()
+
+    try:
+        from rag.router import get_collection_router
+
+        router = get_collection_router()
+        selected = [c.strip() for c in collections.split(",") if c.strip()] or None
+        results = router.search(query, top_k=top_k, collections=selected)
+
+        if not results:
+            return f"ℹ️  Nenhum resultado encontrado nas coleções {router.collections} para: '{query}'"
+
+        duration = time.time() - start_time
+        tracker = get_tracker()
+        avg_relevance = sum(r['raw_score'] for r in results) / len(results)
+        tracker.track_retrieval(
+            duration=duration,
+            docs_retrieved=len(results),
+            relevance_score=avg_relevance,
+            embedding_latency=0.0  # Já incluído na busca
+        )
+        tracker.track_tool_call("search_collections", duration, True)
+
+        formatted_results = f"""🔍 Coleções: '{query}'
+
+"""
+        for result in results:
+            snippet = extract_snippet(result['document'], query, max_chars=SNIPPET_MAX_CHARS)
+            formatted_results += f"""--- Resultado {result['rank']} [{result['collection']}] (Score: {result['score']:.3f}) ---
+Fonte: {result['metadata'].get('source', 'Unknown')} (linhas {snippet['start_line']}-{snippet['end_line']})
+Trecho:
+{snippet['text']}
+
+"""
+        return formatted_results
+
+    except Exception as e:
+        duration = time.time() - start_time
+        tracker = get_tracker()
+        tracker.track_tool_call("search_collections", duration, False)
+        return f"❌ Erro na busca nas coleções: {str(e)}"
+
+
 @tool("add_document_to_kb")
+@traced("tool: add_document_to_kb", kind="tool", record_args=("source",))
 def add_document_tool(content: str, source: str = "user_provided") -> str:
     """
     Adiciona um documento à base de conhecimento.
@@ -244,8 +506,8 @@ def add_document_tool(content: str, source: str = "user_provided") -> str:
         metadata = {'source': source, 'added_at': time.strftime('%Y-%m-%d %H:%M:%S')}
         vector_store.add_documents([content], [metadata])
 
-        # Salvar
-        vector_store.save_index()
+        # Salvar no formato lido na partida (artefato `current` ou legado)
+        persist_vector_store(vector_store)
 
         duration = time.time() - start_time
         tracker = get_tracker()
@@ -267,6 +529,7 @@ Total de documentos na base: {len(vector_store.documents)}"""
 
 
 @tool("get_kb_stats")
+@traced("tool: get_kb_stats", kind="tool")
 def get_kb_stats_tool() -> str:
     """
     Retorna estatísticas da base de conhecimento.
@@ -297,13 +560,23 @@ knowledge_base_tools = [
     retrieve_context_tool,
     add_document_tool,
     get_kb_stats_tool,
+    search_workspace_tool,
+    search_collections_tool,
 ]
 
 
 # Função helper para criar vector store manualmente
-def setup_knowledge_base(directory: str = "knowledge_base") -> VectorStore:
+def setup_knowledge_base(directory: str = "knowledge_base",
+                         use_prebuilt: bool = True) -> VectorStore:
     """
     Função helper para setup manual da base de conhecimento.
     Útil para scripts de inicialização.
+
+    Com use_prebuilt=True, carrega o artefato de `python -m rag build` quando
+    existir, em vez de gerar embeddings no caminho crítico da crew.
     """
+    if use_prebuilt:
+        vector_store = load_prebuilt_index()
+        if vector_store is not None:
+            return vector_store
     return create_vector_store(directory)
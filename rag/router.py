@@ -0,0 +1,297 @@
+# rag/router.py
+"""
+Busca em várias coleções (shards) com fan-out paralelo.
+
+Cada coleção é um VectorStore independente (templates, boas práticas,
+exemplos de código, artefatos do projeto...), com seu próprio artefato
+versionado em rag/vector_db/<coleção>/: rebuild de uma coleção não toca as
+demais. O CollectionRouter:
+- gera o embedding da query uma vez por modelo e busca todas as coleções
+  selecionadas em paralelo num pool de threads (FAISS e o matmul do NumPy
+  liberam o GIL);
+- calibra os scores por coleção (z-score contra a distribuição histórica
+  dos scores daquela coleção, via média/variância exponenciais), já que
+  distâncias de coleções/modelos diferentes não são comparáveis;
+- combina os top-k de cada coleção (já ordenados) com heapq.merge, sem
+  repetir o mesmo trecho da mesma fonte (ex.: knowledge_base e
+  kb_<subdiretório> indexam os mesmos arquivos).
+"""
+import math
+import heapq
+import threading
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from rag import artifacts
+from rag.vector_store import VectorStore
+
+
+class ScoreCalibrator:
+    """
+    Média e variância exponenciais dos scores brutos de uma coleção.
+
+    calibrate(s) = sigmoid((s - média) / desvio). Durante o warm-up (menos de
+    min_samples amostras) média e desvio são interpolados entre uma
+    distribuição a priori e a observada, de modo que coleções frias e
+    calibradas produzem scores na mesma escala [0, 1].
+    """
+
+    def __init__(self, alpha: float = 0.05, min_samples: int = 20,
+                 prior_mean: float = 0.5, prior_std: float = 0.1):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        # Scores brutos são 1 / (1 + distância L2): ~0.33-1 para vetores normalizados
+        self.prior_mean = prior_mean
+        self.prior_std = prior_std
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, scores: Iterable[float]):
+        with self._lock:
+            for score in scores:
+                self.count += 1
+                if self.count == 1:
+                    self.mean = score
+                    continue
+                # Welford nas primeiras amostras, EWMA depois
+                alpha = max(self.alpha, 1.0 / self.count)
+                delta = score - self.mean
+                self.mean += alpha * delta
+                self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+    def calibrate(self, score: float) -> float:
+        with self._lock:
+            mean, std = self.mean, math.sqrt(self.var)
+            if self.count < self.min_samples:
+                observed = self.count / self.min_samples
+                mean = observed * mean + (1 - observed) * self.prior_mean
+                std = observed * std + (1 - observed) * self.prior_std
+        z = (score - mean) / max(std, 1e-6)
+        return 1.0 / (1.0 + math.exp(-max(min(z, 50.0), -50.0)))
+
+
+def _unique(results: Iterable[Dict]) -> Iterable[Dict]:
+    """Mantém só a primeira ocorrência (melhor score) de cada trecho por fonte."""
+    seen = set()
+    for result in results:
+        key = (result['metadata'].get('source'), result['document'])
+        if key not in seen:
+            seen.add(key)
+            yield result
+
+
+class CollectionRouter:
+    """
+    Dono de várias coleções; busca um subconjunto delas em paralelo.
+    """
+
+    def __init__(self, persist_directory: str = artifacts.DEFAULT_ROOT,
+                 max_workers: int = 4):
+        """
+        Args:
+            persist_directory: Raiz dos artefatos/índices das coleções
+            max_workers: Threads do fan-out
+        """
+        self.persist_directory = persist_directory
+        self._stores: Dict[str, VectorStore] = {}
+        self._sources: Dict[str, Optional[str]] = {}
+        self._weights: Dict[str, float] = {}
+        self._calibrators: Dict[str, ScoreCalibrator] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="collection-search")
+
+    # --- registro de coleções ----------------------------------------------
+
+    def register(self, name: str, vector_store: Optional[VectorStore] = None,
+                 source_directory: Optional[str] = None, weight: float = 1.0) -> VectorStore:
+        """
+        Registra uma coleção.
+
+        Args:
+            name: Nome da coleção
+            vector_store: VectorStore existente; se None, abre o artefato
+                `current` da coleção (ou o índice legado, se houver)
+            source_directory: Diretório de origem (usado por rebuild)
+            weight: Peso multiplicado ao score calibrado
+
+        Returns:
+            VectorStore da coleção
+        """
+        if vector_store is None:
+            vector_store = VectorStore(collection_name=name,
+                                       persist_directory=self.persist_directory)
+            artifacts.load_current_artifact(vector_store, self.persist_directory)
+        with self._lock:
+            self._stores[name] = vector_store
+            self._sources[name] = source_directory
+            self._weights[name] = weight
+            self._calibrators.setdefault(name, ScoreCalibrator())
+        return vector_store
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._stores.pop(name, None)
+            self._sources.pop(name, None)
+            self._weights.pop(name, None)
+            self._calibrators.pop(name, None)
+
+    def register_subdirectories(self, directory: str = "knowledge_base",
+                                prefix: str = "kb_") -> List[str]:
+        """
+        Registra uma coleção por subdiretório (ex.: knowledge_base/templates
+        -> kb_templates). Coleções sem artefato ficam vazias até um rebuild.
+
+        Returns:
+            Nomes registrados
+        """
+        names = []
+        for subdir in sorted(p for p in Path(directory).iterdir() if p.is_dir()):
+            name = f"{prefix}{subdir.name}"
+            self.register(name, source_directory=str(subdir))
+            names.append(name)
+        return names
+
+    @property
+    def collections(self) -> List[str]:
+        return list(self._stores)
+
+    def get(self, name: str) -> VectorStore:
+        return self._stores[name]
+
+    # --- busca ---------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        collections: Optional[Iterable[str]] = None,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Busca nas coleções selecionadas (todas, por padrão) em paralelo.
+
+        Args:
+            query: Query de busca
+            top_k: Número de resultados combinados
+            collections: Subconjunto de coleções
+            score_threshold: Limite sobre o score bruto de cada coleção
+
+        Returns:
+            Resultados com 'collection', 'raw_score' e 'score' (calibrado)
+        """
+        # Snapshot do registro: unregister/rebuild concorrentes não afetam esta busca
+        with self._lock:
+            selected = [n for n in (collections or self._stores) if n in self._stores]
+            stores = {n: self._stores[n] for n in selected}
+            calibrators = {n: self._calibrators[n] for n in selected}
+            weights = {n: self._weights[n] for n in selected}
+        stores = {n: s for n, s in stores.items() if len(s.documents) > 0}
+        if not stores:
+            return []
+
+        # Um embedding por modelo (normalmente um só para todas as coleções)
+        models = {s.embedding_model for s in stores.values()}
+        any_store = {s.embedding_model: s for s in stores.values()}
+        vectors = dict(zip(models, self._executor.map(
+            lambda m: any_store[m].get_embedding(query, model=m), models
+        )))
+
+        futures = {
+            name: self._executor.submit(
+                self._search_one, store, query, vectors[store.embedding_model],
+                top_k, score_threshold
+            )
+            for name, store in stores.items()
+        }
+
+        ranked = []
+        for name, future in futures.items():
+            results = future.result()
+            calibrator = calibrators[name]
+            weight = weights[name]
+            for result in results:
+                result['collection'] = name
+                result['raw_score'] = result['score']
+                result['score'] = weight * calibrator.calibrate(result['score'])
+            calibrator.update(r['raw_score'] for r in results)
+            # A calibração é monotônica: cada lista continua ordenada
+            ranked.append(results)
+
+        merged = list(islice(
+            _unique(heapq.merge(*ranked, key=lambda r: -r['score'])), top_k
+        ))
+        for rank, result in enumerate(merged, 1):
+            result['rank'] = rank
+        return merged
+
+    @staticmethod
+    def _search_one(store: VectorStore, query: str, vector, top_k: int,
+                    score_threshold: Optional[float]) -> List[Dict]:
+        try:
+            return store.search_by_vector(vector, top_k, score_threshold,
+                                          embedding_model=store.embedding_model)
+        except ValueError:
+            # Modelo trocado durante a busca (migração): reembeda nesta coleção
+            return store.search(query, top_k, score_threshold)
+
+    # --- manutenção por coleção --------------------------------------------
+
+    def rebuild(self, name: str, source_directory: Optional[str] = None,
+                keep: int = artifacts.DEFAULT_RETENTION) -> int:
+        """
+        Reconstrói só uma coleção (nova versão + troca atômica do snapshot);
+        as demais continuam servindo sem alteração.
+
+        Returns:
+            Versão do artefato gerado
+        """
+        from rag.index_builder import build_version
+
+        store = self._stores[name]
+        source = source_directory or self._sources.get(name)
+        if not source:
+            raise ValueError(f"Coleção '{name}' não tem diretório de origem")
+        version, path, _ = build_version(
+            source=source, collection=name, root=self.persist_directory,
+            embedding_model=store.embedding_model, show_progress=False,
+        )
+        store.import_(str(path), replace=True)
+        artifacts.prune_versions(name, keep, self.persist_directory)
+        # Distribuição de scores mudou: recomeçar a calibração da coleção
+        with self._lock:
+            self._calibrators[name] = ScoreCalibrator()
+        return version
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+# Router global (coleção principal + kb_<subdiretório> já construídas)
+_router: Optional[CollectionRouter] = None
+
+
+def get_collection_router() -> CollectionRouter:
+    """
+    Retorna o router global. Na primeira chamada registra a coleção
+    principal (get_vector_store()) como 'knowledge_base' e as coleções
+    kb_<subdiretório> que já tiverem artefato construído.
+    """
+    global _router
+    if _router is None:
+        from rag.retriever_tools import get_vector_store
+
+        router = CollectionRouter()
+        router.register("knowledge_base", get_vector_store(), source_directory="knowledge_base")
+        kb_path = Path("knowledge_base")
+        if kb_path.exists():
+            for subdir in sorted(p for p in kb_path.iterdir() if p.is_dir()):
+                name = f"kb_{subdir.name}"
+                if artifacts.read_current(name) is not None:
+                    router.register(name, source_directory=str(subdir))
+        _router = router
+    return _router
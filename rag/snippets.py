@@ -0,0 +1,175 @@
+# rag/snippets.py
+"""
+Extração de trechos (snippets) relevantes à query em resultados de busca.
+
+Em vez dos primeiros N caracteres do documento (quase sempre o cabeçalho),
+cada linha/frase do documento recebe uma pontuação em relação à query e a
+janela de até `max_chars` em torno da mais relevante é devolvida com o
+intervalo de linhas. Pontuação padrão: sobreposição lexical ponderada por
+IDF entre as linhas do documento. Opcionalmente, similaridade de embeddings
+com vetores de linhas em cache (EmbeddingScorer).
+"""
+import re
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Palavras muito comuns (pt/en) que não discriminam trechos
+STOPWORDS = frozenset("""
+a o as os de da do das dos e é em um uma uns umas para por com sem no na nos
+nas que se ao à às como mais ou ser the an and or of to in on for with is are
+be by this that it as at from
+""".split())
+
+# (query, textos das unidades) -> pontuação de cada unidade
+Scorer = Callable[[str, List[str]], np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def split_units(document: str, max_unit_chars: int) -> List[Tuple[int, str]]:
+    """
+    Divide o documento em unidades (linha, texto).
+
+    Linhas longas (ex.: parágrafos sem quebra) viram frases, todas com o
+    número da linha de origem (1-based).
+    """
+    units = []
+    for line_no, line in enumerate(document.splitlines(), 1):
+        if len(line) <= max_unit_chars:
+            units.append((line_no, line))
+        else:
+            units.extend((line_no, s) for s in SENTENCE_RE.split(line) if s)
+    return units
+
+
+def lexical_scores(query: str, texts: List[str]) -> np.ndarray:
+    """Soma dos pesos IDF (entre as unidades) dos termos da query presentes."""
+    terms = set(tokenize(query))
+    if not terms:
+        return np.zeros(len(texts))
+    unit_terms = [set(tokenize(t)) & terms for t in texts]
+    n = len(texts)
+    df = {term: sum(term in u for u in unit_terms) for term in terms}
+    idf = {term: math.log(1 + n / (1 + df[term])) for term in terms}
+    return np.array([sum(idf[t] for t in u) for u in unit_terms], dtype=np.float64)
+
+
+class EmbeddingScorer:
+    """
+    Similaridade de cosseno entre a query e cada linha, com cache LRU dos
+    vetores de linha (linhas repetem entre buscas; só as novas vão à API).
+    Para vários resultados da mesma busca, use for_query(): a query é
+    embedada uma vez só.
+    """
+
+    def __init__(self, vector_store, max_cache: int = 20000):
+        self.vector_store = vector_store
+        self.max_cache = max_cache
+        self._cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> Tuple[str, str]:
+        return self.vector_store.embedding_model, hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _line_vectors(self, texts: List[str]) -> np.ndarray:
+        keys = [self._key(t) for t in texts]
+        with self._lock:
+            cached = {k: self._cache[k] for k in keys if k in self._cache}
+            for k in cached:
+                self._cache.move_to_end(k)
+        missing = list(dict.fromkeys(
+            (k, t) for k, t in zip(keys, texts) if k not in cached and t.strip()
+        ))
+        if missing:
+            vectors = self.vector_store.get_embeddings_batch([t for _, t in missing])
+            with self._lock:
+                for (k, _), v in zip(missing, vectors):
+                    cached[k] = self._cache[k] = v
+                while len(self._cache) > self.max_cache:
+                    self._cache.popitem(last=False)
+        dimension = next(iter(cached.values())).shape[0] if cached else 1
+        return np.array([cached.get(k, np.zeros(dimension, np.float32)) for k in keys])
+
+    def for_query(self, query: str) -> Scorer:
+        """Scorer com o embedding da query já calculado (um por busca)."""
+        query_vector = np.asarray(self.vector_store.get_embedding(query), dtype=np.float32)
+        return lambda _query, texts: self._score(query_vector, texts)
+
+    def __call__(self, query: str, texts: List[str]) -> np.ndarray:
+        return self.for_query(query)(query, texts)
+
+    def _score(self, query_vector: np.ndarray, texts: List[str]) -> np.ndarray:
+        vectors = self._line_vectors(texts)
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+        norms[norms == 0] = 1.0
+        return np.clip(vectors @ query_vector / norms, 0.0, None)
+
+
+def extract_snippet(
+    document: str,
+    query: str,
+    max_chars: int = 300,
+    scorer: Optional[Scorer] = None
+) -> Dict:
+    """
+    Seleciona a janela de linhas em torno da linha mais relevante para a query.
+
+    Args:
+        document: Texto completo do resultado
+        query: Query de busca
+        max_chars: Tamanho máximo do trecho
+        scorer: Função de pontuação (default: lexical_scores)
+
+    Returns:
+        Dict com 'text', 'start_line', 'end_line' (1-based) e 'score'
+    """
+    units = split_units(document, max_chars)
+    if not units:
+        return {'text': document[:max_chars], 'start_line': 1, 'end_line': 1, 'score': 0.0}
+
+    texts = [t for _, t in units]
+    scores = (scorer or lexical_scores)(query, texts)
+
+    # Âncora: unidade mais relevante (sem termos em comum: a primeira não
+    # vazia, como o preview antigo). A janela cresce para o vizinho de maior
+    # pontuação (empate: o seguinte) enquanto couber em max_chars.
+    if scores.max() > 0:
+        anchor = int(np.argmax(scores))
+    else:
+        anchor = next((i for i, t in enumerate(texts) if t.strip()), 0)
+    score = float(max(scores[anchor], 0.0))
+    start = end = anchor
+    length = len(texts[anchor])
+    while True:
+        candidates = []
+        if end + 1 < len(texts):
+            candidates.append((scores[end + 1], 1, end + 1))
+        if start > 0:
+            candidates.append((scores[start - 1], 0, start - 1))
+        fitting = [c for c in candidates if length + len(texts[c[2]]) + 1 <= max_chars]
+        if not fitting:
+            break
+        _, _, index = max(fitting)
+        length += len(texts[index]) + 1
+        start, end = min(start, index), max(end, index)
+
+    text = "\n".join(texts[start:end + 1])
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + "..."
+    return {
+        'text': text,
+        'start_line': units[start][0],
+        'end_line': units[end][0],
+        'score': score,
+    }
@@ -1,13 +1,14 @@
 # rag/vector_store.py
 """
 Vector Store para gerenciamento de embeddings e busca semântica.
-Suporta FAISS para armazenamento local eficiente.
+Suporta FAISS para armazenamento local eficiente, com fallback para busca
+exata em NumPy puro (rag/numpy_index.py) quando o FAISS não está instalado.
 """
 import os
 import json
-import pickle
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable
 import numpy as np
 
 try:
@@ -15,10 +16,37 @@ try:
     FAISS_AVAILABLE = True
 except ImportError:
     FAISS_AVAILABLE = False
-    print("⚠️  FAISS não instalado. Instale com: pip install faiss-cpu")
+    print("ℹ️  FAISS não instalado, usando busca exata em NumPy (pip install faiss-cpu para acelerar)")
 
 from openai import OpenAI
 
+from rag.numpy_index import NumpyIndex
+from rag.embedding_io import write_export, read_export
+from rag.document_store import DocumentStore, LazyColumn, migrate_pickle
+from metrics.timing import timed
+
+
+class IndexSnapshot:
+    """
+    Versão imutável do índice: índice FAISS + documentos + metadados (e o
+    modelo de embedding com que os vetores foram gerados).
+
+    Buscas capturam a referência do snapshot atual uma única vez, então
+    atualizações concorrentes (que publicam um novo snapshot) nunca bloqueiam
+    nem deixam uma busca ver índice e documentos de versões diferentes.
+    """
+
+    __slots__ = ('index', 'documents', 'metadata', 'version', 'embedding_model')
+
+    def __init__(self, index=None, documents: Optional[List[str]] = None,
+                 metadata: Optional[List[Dict]] = None, version: int = 0,
+                 embedding_model: Optional[str] = None):
+        self.index = index
+        self.documents = documents if documents is not None else []
+        self.metadata = metadata if metadata is not None else []
+        self.version = version
+        self.embedding_model = embedding_model
+
 
 class VectorStore:
     """
@@ -29,8 +57,31 @@ class VectorStore:
         self,
         collection_name: str = "knowledge_base",
         persist_directory: str = "rag/vector_db",
-        embedding_model: str = "text-embedding-3-small"
+        embedding_model: str = "text-embedding-3-small",
+        backend: str = "auto",
+        vector_dtype: str = "float32",
+        migrate_legacy: bool = False
     ):
+        """
+        Args:
+            collection_name: Nome da coleção (prefixo dos arquivos)
+            persist_directory: Diretório de persistência
+            embedding_model: Modelo de embedding da OpenAI
+            backend: 'faiss', 'numpy' ou 'auto' (FAISS se instalado)
+            vector_dtype: 'float32' ou 'float16' (apenas backend numpy)
+            migrate_legacy: Migra o .pkl legado para SQLite na carga (pickle
+                executa código: só para arquivos confiáveis)
+        """
+        if backend == "auto":
+            backend = "faiss" if FAISS_AVAILABLE else "numpy"
+        if backend not in ("faiss", "numpy"):
+            raise ValueError(f"Backend desconhecido: {backend}")
+        if backend == "faiss" and not FAISS_AVAILABLE:
+            raise ImportError("FAISS não está instalado")
+        self.backend = backend
+        self.vector_dtype = np.dtype(vector_dtype)
+        self.migrate_legacy = migrate_legacy
+
         self.collection_name = collection_name
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
@@ -42,28 +93,76 @@ class VectorStore:
             raise ValueError("OPENAI_API_KEY não encontrada")
         self.client = OpenAI(api_key=api_key)
 
-        # FAISS index
-        self.index = None
-        self.documents = []  # Lista de documentos
-        self.metadata = []   # Metadados dos documentos
+        # Snapshot atual (índice FAISS + documentos + metadados).
+        # Escritores constroem um novo snapshot sob _write_lock e o publicam
+        # com uma única atribuição; leitores nunca pegam o lock.
+        self._snapshot = IndexSnapshot()
+        self._write_lock = threading.Lock()
         self.dimension = 1536  # Dimensão do embedding (text-embedding-3-small)
 
+        # Documentos persistidos em SQLite; _persisted guarda as listas da
+        # última gravação/carga para que save_index só grave o que mudou
+        self._document_store: Optional[DocumentStore] = None
+        self._persisted: Tuple[List[str], List[Dict]] = ([], [])
+
         # Tentar carregar índice existente
         self.load_index()
 
-    def get_embedding(self, text: str) -> np.ndarray:
+    @property
+    def index(self):
+        """Índice FAISS da versão atual."""
+        return self._snapshot.index
+
+    @property
+    def documents(self) -> List[str]:
+        """Documentos da versão atual."""
+        return self._snapshot.documents
+
+    @property
+    def metadata(self) -> List[Dict]:
+        """Metadados da versão atual."""
+        return self._snapshot.metadata
+
+    @property
+    def version(self) -> int:
+        """Número da versão atual do índice (incrementa a cada atualização)."""
+        return self._snapshot.version
+
+    def _publish(self, index, documents: List[str], metadata: List[Dict]):
+        """Publica atomicamente um novo snapshot (chamar com _write_lock)."""
+        self._snapshot = IndexSnapshot(
+            index, documents, metadata, self._snapshot.version + 1,
+            self.embedding_model
+        )
+
+    def _new_index(self):
+        """Cria um índice vazio (FAISS ou NumPy) com a dimensão atual."""
+        if self.backend == "faiss":
+            return faiss.IndexFlatL2(self.dimension)
+        return NumpyIndex(self.dimension, self.vector_dtype)
+
+    @staticmethod
+    def _clone_index(index):
+        """Cópia independente do índice (copy-on-write)."""
+        if isinstance(index, NumpyIndex):
+            return index.copy()
+        return faiss.clone_index(index)
+
+    @timed("vector_store.embedding", kind="embedding")
+    def get_embedding(self, text: str, model: Optional[str] = None) -> np.ndarray:
         """
         Gera embedding para um texto usando OpenAI.
 
         Args:
             text: Texto para gerar embedding
+            model: Modelo (default: o do vector store)
 
         Returns:
             Vetor numpy com o embedding
         """
         try:
             response = self.client.embeddings.create(
-                model=self.embedding_model,
+                model=model or self.embedding_model,
                 input=text
             )
             embedding = np.array(response.data[0].embedding, dtype=np.float32)
@@ -72,6 +171,7 @@ class VectorStore:
             print(f"❌ Erro ao gerar embedding: {e}")
             raise
 
+    @timed("vector_store.embedding_batch", kind="embedding")
     def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
         """
         Gera embeddings para múltiplos textos.
@@ -97,14 +197,12 @@ class VectorStore:
             raise
 
     def initialize_index(self):
-        """Inicializa índice FAISS."""
-        if not FAISS_AVAILABLE:
-            raise ImportError("FAISS não está instalado")
-
+        """Inicializa índice (FAISS ou NumPy, conforme o backend)."""
         # Usar IndexFlatL2 para busca exata (melhor para pequenos datasets)
         # Para datasets maiores, considerar IndexIVFFlat
-        self.index = faiss.IndexFlatL2(self.dimension)
-        print(f"✅ Índice FAISS inicializado (dimensão: {self.dimension})")
+        with self._write_lock:
+            self._publish(self._new_index(), [], [])
+        print(f"✅ Índice {self.backend.upper()} inicializado (dimensão: {self.dimension})")
 
     def add_documents(
         self,
@@ -127,23 +225,239 @@ class VectorStore:
         if self.index is None:
             self.initialize_index()
 
-        # Gerar embeddings
+        # Gerar embeddings (fora do lock: é a parte lenta)
         print(f"🔄 Gerando embeddings para {len(documents)} documentos...")
         embeddings = self.get_embeddings_batch(documents)
 
-        # Adicionar ao índice FAISS
-        self.index.add(embeddings)
+        self.add_embeddings(embeddings, documents, metadata)
+
+        print(f"✅ {len(documents)} documentos adicionados ao vector store")
+        return len(documents)
+
+    def add_embeddings(
+        self,
+        vectors: np.ndarray,
+        documents: List[str],
+        metadata: Optional[List[Dict]] = None
+    ) -> int:
+        """
+        Adiciona vetores pré-calculados (sem chamar a API de embeddings).
+
+        Args:
+            vectors: Matriz [n, dimension] (float32 contíguo evita cópia)
+            documents: Lista de n textos
+            metadata: Lista de n metadados (opcional)
 
-        # Armazenar documentos e metadata
-        self.documents.extend(documents)
-        if metadata:
-            self.metadata.extend(metadata)
+        Returns:
+            Número de documentos adicionados
+        """
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[0] != len(documents):
+            raise ValueError(
+                f"vectors deve ter shape [{len(documents)}, d], recebido {vectors.shape}"
+            )
+        if metadata and len(metadata) != len(documents):
+            raise ValueError("metadata deve ter o mesmo tamanho de documents")
+        if not documents:
+            return 0
+        if not metadata:
+            metadata = [{} for _ in documents]
+
+        # Copy-on-write: buscas em andamento continuam no snapshot antigo
+        with self._write_lock:
+            current = self._snapshot
+            if current.index is None or current.index.ntotal == 0:
+                # Índice vazio: adota a dimensão dos vetores recebidos
+                self.dimension = vectors.shape[1]
+                index = self._new_index()
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Dimensão {vectors.shape[1]} difere da do índice ({self.dimension})"
+                )
+            else:
+                index = self._clone_index(current.index)
+            if self.backend == "faiss":
+                vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            index.add(vectors)
+            self._publish(
+                index,
+                current.documents + list(documents),
+                current.metadata + list(metadata),
+            )
+        return len(documents)
+
+    def export(self, path: str, format: str = "npy") -> Path:
+        """
+        Exporta vetores, documentos e metadados da versão atual.
+
+        Args:
+            path: Diretório (npy) ou arquivo .arrow de destino
+            format: 'npy' (padrão) ou 'arrow'
+
+        Returns:
+            Caminho do export
+        """
+        vectors, documents, metadata, embedding_model = self.snapshot_data()
+        out = write_export(
+            path, vectors, documents, metadata,
+            info={
+                'embedding_model': embedding_model,
+                'collection_name': self.collection_name,
+            },
+            format=format,
+        )
+        print(f"✅ {len(documents)} embeddings exportados para {out}")
+        return out
+
+    def snapshot_data(self) -> Tuple[np.ndarray, List[str], List[Dict], str]:
+        """(vetores, documentos, metadados, modelo) de uma mesma versão."""
+        snapshot = self._snapshot
+        if snapshot.index is None:
+            vectors = np.empty((0, self.dimension), dtype=np.float32)
+        elif isinstance(snapshot.index, NumpyIndex):
+            vectors = snapshot.index.vectors
         else:
-            self.metadata.extend([{} for _ in documents])
+            vectors = snapshot.index.reconstruct_n(0, snapshot.index.ntotal)
+        return (vectors, snapshot.documents, snapshot.metadata,
+                snapshot.embedding_model or self.embedding_model)
 
-        print(f"✅ {len(documents)} documentos adicionados ao vector store")
+    def import_(self, path: str, replace: bool = False) -> int:
+        """
+        Importa um export (npy ou arrow) sem chamar a API de embeddings.
+
+        Com replace=True e backend numpy, a matriz do export é adotada sem
+        cópia (memmap). ('import' é palavra reservada, daí o sufixo '_'.)
+
+        Args:
+            path: Diretório npy ou arquivo .arrow
+            replace: Substitui o conteúdo atual em vez de acrescentar
+
+        Returns:
+            Número de documentos importados
+        """
+        vectors, documents, metadata, manifest = read_export(path)
+
+        model = manifest.get('embedding_model')
+        if model and model != self.embedding_model:
+            raise ValueError(
+                f"Export gerado com '{model}', vector store usa '{self.embedding_model}'"
+            )
+
+        if replace:
+            index = self._index_from_vectors(vectors)
+            with self._write_lock:
+                self.dimension = vectors.shape[1]
+                self._publish(index, documents, metadata)
+        else:
+            self.add_embeddings(vectors, documents, metadata)
+
+        print(f"✅ {len(documents)} embeddings importados de {path}")
         return len(documents)
 
+    def _index_from_vectors(self, vectors: np.ndarray):
+        """Cria um índice completo a partir de uma matriz (sem cópia no numpy)."""
+        if self.backend == "numpy":
+            if vectors.ndim == 2 and vectors.dtype == self.vector_dtype:
+                return NumpyIndex.from_vectors(vectors)
+            # Outro dtype (ex.: float64): converte para o dtype do store
+            index = NumpyIndex(vectors.shape[1], self.vector_dtype)
+            index.add(vectors)
+            return index
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        return index
+
+    def switch_model(
+        self,
+        embedding_model: str,
+        vectors: np.ndarray,
+        documents: List[str],
+        metadata: List[Dict]
+    ):
+        """
+        Troca atomicamente o modelo de embedding e todo o conteúdo.
+
+        Modelo, dimensão e índice mudam juntos num único snapshot: buscas em
+        andamento terminam com o modelo antigo contra o índice antigo.
+        """
+        index = self._index_from_vectors(vectors)
+        with self._write_lock:
+            self.embedding_model = embedding_model
+            self.dimension = vectors.shape[1]
+            self._publish(index, list(documents), list(metadata))
+
+    def apply_updates(
+        self,
+        upserts: Optional[Dict[str, Tuple[List[str], List[Dict]]]] = None,
+        deletes: Optional[Iterable[str]] = None
+    ) -> Dict[str, int]:
+        """
+        Aplica upserts e deletes incrementais, agrupados por 'source'.
+
+        Todos os documentos cujo metadata['source'] esteja em upserts ou
+        deletes são removidos; os novos documentos dos upserts são então
+        adicionados. O resultado é publicado como uma única nova versão.
+
+        Args:
+            upserts: Dict source -> (documentos, metadados)
+            deletes: Sources a remover
+
+        Returns:
+            Dict com 'added', 'removed' e 'version'
+        """
+        upserts = upserts or {}
+        replaced = set(upserts) | set(deletes or [])
+        if not replaced:
+            return {'added': 0, 'removed': 0, 'version': self.version}
+
+        new_docs: List[str] = []
+        new_meta: List[Dict] = []
+        for docs, metas in upserts.values():
+            new_docs.extend(docs)
+            new_meta.extend(metas if metas else [{} for _ in docs])
+
+        # Embeddings fora do lock; só a troca do snapshot é serializada
+        embeddings = self.get_embeddings_batch(new_docs) if new_docs else None
+
+        with self._write_lock:
+            current = self._snapshot
+            keep = [
+                i for i, meta in enumerate(current.metadata)
+                if meta.get('source') not in replaced
+            ]
+            index = self._new_index()
+            if keep and current.index is not None:
+                vectors = current.index.reconstruct_n(0, current.index.ntotal)
+                index.add(np.ascontiguousarray(vectors[keep]))
+            all_documents = list(current.documents)
+            documents = [all_documents[i] for i in keep]
+            metadata = [current.metadata[i] for i in keep]
+
+            if embeddings is not None:
+                index.add(embeddings)
+                documents.extend(new_docs)
+                metadata.extend(new_meta)
+
+            removed = len(current.documents) - len(keep)
+            self._publish(index, documents, metadata)
+            version = self._snapshot.version
+
+        return {'added': len(new_docs), 'removed': removed, 'version': version}
+
+    def upsert_documents(
+        self,
+        source: str,
+        documents: List[str],
+        metadata: Optional[List[Dict]] = None
+    ) -> Dict[str, int]:
+        """Substitui todos os documentos de uma source pelos informados."""
+        return self.apply_updates(upserts={source: (documents, metadata)})
+
+    def delete_documents(self, source: str) -> Dict[str, int]:
+        """Remove todos os documentos de uma source."""
+        return self.apply_updates(deletes=[source])
+
+    @timed("vector_store.search", kind="retrieval")
     def search(
         self,
         query: str,
@@ -161,16 +475,63 @@ class VectorStore:
         Returns:
             Lista de documentos com scores e metadata
         """
-        if self.index is None or len(self.documents) == 0:
+        # Capturar o snapshot uma única vez: índice e documentos consistentes
+        snapshot = self._snapshot
+        if snapshot.index is None or len(snapshot.documents) == 0:
             print("⚠️  Vector store vazio")
             return []
 
-        # Gerar embedding da query
-        query_embedding = self.get_embedding(query)
-        query_embedding = np.array([query_embedding])
+        # Gerar embedding da query com o modelo do snapshot (pode mudar
+        # durante uma migração de modelo; ver rag/migration.py)
+        query_embedding = self.get_embedding(query, model=snapshot.embedding_model)
+        return self._search_snapshot(snapshot, query_embedding, top_k, score_threshold)
+
+    @timed("vector_store.search_by_vector", kind="retrieval")
+    def search_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        score_threshold: Optional[float] = None,
+        embedding_model: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Busca com um embedding de query já calculado (ex.: CollectionRouter
+        reaproveita o mesmo vetor em várias coleções).
+
+        Args:
+            query_embedding: Vetor da query
+            top_k: Número de resultados
+            score_threshold: Limite de similaridade (opcional)
+            embedding_model: Modelo que gerou o vetor; se diferente do modelo
+                do snapshot atual, levanta ValueError
+
+        Returns:
+            Lista de documentos com scores e metadata
+        """
+        snapshot = self._snapshot
+        if snapshot.index is None or len(snapshot.documents) == 0:
+            return []
+        if embedding_model and snapshot.embedding_model not in (None, embedding_model):
+            raise ValueError(
+                f"Vetor gerado com '{embedding_model}', índice usa '{snapshot.embedding_model}'"
+            )
+        return self._search_snapshot(snapshot, query_embedding, top_k, score_threshold)
+
+    @staticmethod
+    def _search_snapshot(
+        snapshot: IndexSnapshot,
+        query_embedding: np.ndarray,
+        top_k: int,
+        score_threshold: Optional[float]
+    ) -> List[Dict]:
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        if query_embedding.shape[1] != snapshot.index.d:
+            raise ValueError(
+                f"Query com dimensão {query_embedding.shape[1]}, índice com {snapshot.index.d}"
+            )
 
         # Buscar no FAISS
-        distances, indices = self.index.search(query_embedding, top_k)
+        distances, indices = snapshot.index.search(query_embedding, top_k)
 
         # Preparar resultados
         results = []
@@ -186,8 +547,8 @@ class VectorStore:
                 continue
 
             result = {
-                'document': self.documents[idx],
-                'metadata': self.metadata[idx],
+                'document': snapshot.documents[idx],
+                'metadata': snapshot.metadata[idx],
                 'score': float(similarity_score),
                 'rank': i + 1
             }
@@ -197,70 +558,159 @@ class VectorStore:
 
     def save_index(self):
         """Salva índice e documentos em disco."""
-        if self.index is None:
+        snapshot = self._snapshot
+        if snapshot.index is None:
             print("⚠️  Nenhum índice para salvar")
             return
 
-        # Salvar índice FAISS
-        index_path = self.persist_directory / f"{self.collection_name}.index"
-        faiss.write_index(self.index, str(index_path))
-
-        # Salvar documentos e metadata
-        data_path = self.persist_directory / f"{self.collection_name}.pkl"
-        with open(data_path, 'wb') as f:
-            pickle.dump({
-                'documents': self.documents,
-                'metadata': self.metadata,
-                'dimension': self.dimension
-            }, f)
+        # Salvar índice FAISS (se for o backend) e sempre os vetores em .npy,
+        # que podem ser carregados via mmap sem FAISS
+        if self.backend == "faiss":
+            index_path = self.persist_directory / f"{self.collection_name}.index"
+            faiss.write_index(snapshot.index, str(index_path))
+            vectors = snapshot.index.reconstruct_n(0, snapshot.index.ntotal)
+            NumpyIndex.write_npy(self._vectors_path(), vectors)
+        else:
+            snapshot.index.save(self._vectors_path())
+
+        # Salvar documentos e metadata: apenas a partir do primeiro registro
+        # que difere da última gravação (appends gravam só as linhas novas)
+        store = self._get_document_store()
+        persisted_docs, persisted_meta = self._persisted
+        start = _common_prefix(persisted_docs, snapshot.documents,
+                               persisted_meta, snapshot.metadata)
+        if start < len(snapshot.documents) or len(persisted_docs) != len(snapshot.documents):
+            # Visões preguiçosas já enxergam uma versão fixa do banco; carregá-las
+            # libera a transação de leitura, que seguraria o checkpoint do WAL
+            for column in self._persisted:
+                if isinstance(column, LazyColumn):
+                    column.materialize()
+            store.write_from(start, snapshot.documents[start:], snapshot.metadata[start:])
+        store.set_info('dimension', self.dimension)
+        store.set_info('embedding_model', self.embedding_model)
+        self._persisted = (snapshot.documents, snapshot.metadata)
 
         print(f"✅ Vector store salvo em {self.persist_directory}")
 
+    def _vectors_path(self) -> Path:
+        return self.persist_directory / f"{self.collection_name}.npy"
+
+    def _documents_path(self) -> Path:
+        return self.persist_directory / f"{self.collection_name}.db"
+
+    def _get_document_store(self) -> DocumentStore:
+        if self._document_store is None:
+            self._document_store = DocumentStore(self._documents_path())
+        return self._document_store
+
+    def _read_index(self):
+        """Lê o índice persistido no formato do backend (None se ausente)."""
+        index_path = self.persist_directory / f"{self.collection_name}.index"
+        vectors_path = self._vectors_path()
+
+        if self.backend == "faiss":
+            if index_path.exists():
+                return faiss.read_index(str(index_path))
+            if vectors_path.exists():
+                vectors = np.load(str(vectors_path), allow_pickle=False)
+                index = faiss.IndexFlatL2(vectors.shape[1])
+                index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+                return index
+            return None
+
+        if vectors_path.exists():
+            index = NumpyIndex.load(vectors_path, mmap=True)
+            if index.dtype != self.vector_dtype:
+                converted = NumpyIndex(index.d, self.vector_dtype)
+                converted.add(index.vectors)
+                index = converted
+            return index
+        if index_path.exists():
+            print(f"⚠️  {index_path} é um índice FAISS e FAISS não está instalado; "
+                  f"salve novamente com FAISS para gerar {vectors_path.name}")
+        return None
+
     def load_index(self):
         """Carrega índice e documentos do disco."""
-        index_path = self.persist_directory / f"{self.collection_name}.index"
-        data_path = self.persist_directory / f"{self.collection_name}.pkl"
+        legacy_path = self.persist_directory / f"{self.collection_name}.pkl"
 
-        if not index_path.exists() or not data_path.exists():
+        if not self._documents_path().exists() and not legacy_path.exists():
             print(f"ℹ️  Nenhum índice existente encontrado em {self.persist_directory}")
             return
 
         try:
-            # Carregar índice FAISS
-            self.index = faiss.read_index(str(index_path))
-
-            # Carregar documentos e metadata
-            with open(data_path, 'rb') as f:
-                data = pickle.load(f)
-                self.documents = data['documents']
-                self.metadata = data['metadata']
-                self.dimension = data['dimension']
+            # Carregar índice (FAISS ou NumPy)
+            index = self._read_index()
+            if index is None:
+                print(f"ℹ️  Nenhum índice existente encontrado em {self.persist_directory}")
+                return
+
+            # Carregar documentos e metadata (o .pkl legado só com migrate_legacy)
+            if legacy_path.exists() and not self.migrate_legacy and (
+                    not self._documents_path().exists() or len(self._get_document_store()) == 0):
+                print(f"⚠️  {legacy_path} é um índice legado em pickle e não é carregado "
+                      f"automaticamente (pickle executa código). Se o arquivo é confiável, "
+                      f"migre com `python -m rag --root {self.persist_directory} "
+                      f"--collection {self.collection_name} migrate-legacy`")
+                return
+            store = self._get_document_store()
+            if len(store) == 0 and legacy_path.exists():
+                migrated = migrate_pickle(legacy_path, store)
+                print(f"🔄 {migrated} documentos migrados de {legacy_path.name} "
+                      f"para {self._documents_path().name}")
+            # Documentos são lidos sob demanda (LazyColumn): partida sem carga
+            documents, metadata = store.lazy_columns()
+            if len(documents) != index.ntotal:
+                raise ValueError(
+                    f"{len(documents)} documentos para {index.ntotal} vetores"
+                )
+
+            with self._write_lock:
+                self.dimension = store.get_info('dimension', index.d)
+                self._publish(index, documents, metadata)
+            self._persisted = (documents, metadata)
 
             print(f"✅ Vector store carregado: {len(self.documents)} documentos")
         except Exception as e:
             print(f"❌ Erro ao carregar vector store: {e}")
-            self.index = None
-            self.documents = []
-            self.metadata = []
+            with self._write_lock:
+                self._publish(None, [], [])
 
     def clear(self):
         """Limpa o vector store."""
-        self.index = None
-        self.documents = []
-        self.metadata = []
+        with self._write_lock:
+            self._publish(None, [], [])
         print("✅ Vector store limpo")
 
     def get_stats(self) -> Dict:
         """Retorna estatísticas do vector store."""
+        snapshot = self._snapshot
         return {
-            'total_documents': len(self.documents),
+            'total_documents': len(snapshot.documents),
             'dimension': self.dimension,
             'embedding_model': self.embedding_model,
             'collection_name': self.collection_name,
-            'has_index': self.index is not None
+            'has_index': snapshot.index is not None,
+            'backend': self.backend,
+            'version': snapshot.version
         }
 
 
+def _common_prefix(old_docs: List[str], new_docs: List[str],
+                   old_meta: List[Dict], new_meta: List[Dict]) -> int:
+    """
+    Tamanho do prefixo comum entre duas versões (comparação por identidade:
+    snapshots compartilham os mesmos objetos e nunca os alteram).
+    """
+    limit = min(len(old_docs), len(new_docs))
+    if old_docs is new_docs and old_meta is new_meta:
+        return limit
+    for i in range(limit):
+        if old_docs[i] is not new_docs[i] or old_meta[i] is not new_meta[i]:
+            return i
+    return limit
+
+
 class DocumentLoader:
     """
     Carrega documentos de diferentes formatos.
@@ -275,6 +725,27 @@ class DocumentLoader:
             print(f"❌ Erro ao carregar {file_path}: {e}")
             return ""
 
+    @staticmethod
+    def load_file(file_path: Path) -> Optional[Dict]:
+        """
+        Carrega um único arquivo no formato usado por load_directory.
+
+        Returns:
+            Dict com 'content' e 'metadata', ou None se vazio/ilegível
+        """
+        content = DocumentLoader.load_text_file(file_path)
+        if not content:
+            return None
+        return {
+            'content': content,
+            'metadata': {
+                'source': str(file_path),
+                'filename': file_path.name,
+                'extension': file_path.suffix,
+                'size': len(content)
+            }
+        }
+
     @staticmethod
     def load_directory(
         directory: Path,
@@ -298,17 +769,9 @@ class DocumentLoader:
         for ext in extensions:
             for file_path in directory.glob(f"{pattern}{ext}"):
                 if file_path.is_file():
-                    content = DocumentLoader.load_text_file(file_path)
-                    if content:
-                        documents.append({
-                            'content': content,
-                            'metadata': {
-                                'source': str(file_path),
-                                'filename': file_path.name,
-                                'extension': ext,
-                                'size': len(content)
-                            }
-                        })
+                    doc = DocumentLoader.load_file(file_path)
+                    if doc:
+                        documents.append(doc)
 
         print(f"✅ Carregados {len(documents)} documentos de {directory}")
         return documents
@@ -0,0 +1,317 @@
+# rag/watcher.py
+"""
+Watcher da base de conhecimento com atualização incremental do vector store.
+
+Observa o diretório knowledge_base/ (inotify no Linux, polling nos demais
+sistemas), agrupa eventos com debounce e aplica upserts/deletes no
+VectorStore em execução. Cada lote vira uma nova versão do índice, publicada
+atomicamente: buscas em andamento nunca são bloqueadas.
+"""
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from rag.vector_store import VectorStore, DocumentLoader
+from rag.artifacts import persist_vector_store, read_chunking
+from rag.index_builder import chunk_document
+
+
+DEFAULT_EXTENSIONS = ('.txt', '.md', '.py')
+
+# Constantes inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _InotifySource:
+    """Fonte de eventos baseada em inotify (via ctypes, sem dependências)."""
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc não encontrada")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify não suportado nesta plataforma")
+
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._watches: Dict[int, Path] = {}
+        self._add_tree(root)
+
+    def _add_watch(self, directory: Path):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(str(directory)), WATCH_MASK
+        )
+        if wd >= 0:
+            self._watches[wd] = directory
+
+    def _add_tree(self, root: Path):
+        self._add_watch(root)
+        for sub in root.rglob('*'):
+            if sub.is_dir():
+                self._add_watch(sub)
+
+    def read(self, timeout: float) -> Set[Path]:
+        """Retorna os caminhos alterados (espera no máximo timeout segundos)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: Set[Path] = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & IN_ISDIR:
+                # Diretório novo: observar e reindexar seu conteúdo;
+                # diretório removido/movido: o poll da árvore resolve os arquivos
+                if mask & (IN_CREATE | IN_MOVED_TO) and path.is_dir():
+                    self._add_tree(path)
+                    changed.update(p for p in path.rglob('*') if p.is_file())
+                changed.add(path)
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingSource:
+    """Fonte de eventos por polling de (mtime, tamanho) dos arquivos."""
+
+    def __init__(self, root: Path, interval: float):
+        self._root = root
+        self._interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        state = {}
+        for path in self._root.rglob('*'):
+            try:
+                if path.is_file():
+                    st = path.stat()
+                    state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return state
+
+    def read(self, timeout: float) -> Set[Path]:
+        time.sleep(min(timeout, self._interval))
+        new_state = self._scan()
+        changed = {
+            path for path in set(self._state) | set(new_state)
+            if self._state.get(path) != new_state.get(path)
+        }
+        self._state = new_state
+        return changed
+
+    def close(self):
+        pass
+
+
+class KnowledgeBaseWatcher(threading.Thread):
+    """
+    Thread daemon que mantém o VectorStore sincronizado com o diretório.
+
+    Eventos são acumulados até o diretório ficar `debounce` segundos sem
+    mudanças; então todo o lote é aplicado com uma única chamada a
+    VectorStore.apply_updates (uma chamada de embeddings, uma nova versão).
+
+    Cada arquivo é dividido em chunks como no build (chunk_document), com
+    chunk_size/chunk_overlap explícitos ou os registrados no artefato atual.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        directory: str = "knowledge_base",
+        extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+        persist: bool = True,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
+    ):
+        super().__init__(name="KnowledgeBaseWatcher", daemon=True)
+        self.vector_store = vector_store
+        self.directory = Path(directory)
+        self.extensions = tuple(extensions)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.persist = persist
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+        self.backend = None
+        self.updates_applied = 0
+        self._pending: Dict[Path, float] = {}
+        self._stop_event = threading.Event()
+
+    def _open_source(self):
+        if self.use_inotify:
+            try:
+                source = _InotifySource(self.directory)
+                self.backend = 'inotify'
+                return source
+            except (OSError, AttributeError) as e:
+                print(f"ℹ️  inotify indisponível ({e}), usando polling")
+        self.backend = 'polling'
+        return _PollingSource(self.directory, self.poll_interval)
+
+    def _is_tracked(self, path: Path) -> bool:
+        return path.suffix in self.extensions
+
+    def _source_key(self, path: Path) -> str:
+        """Mesmo formato de metadata['source'] gerado por DocumentLoader."""
+        return str(path)
+
+    def _chunking(self) -> Dict[str, int]:
+        """Chunking explícito ou o do build da versão current do artefato."""
+        chunking = read_chunking(self.vector_store.collection_name,
+                                 root=str(self.vector_store.persist_directory))
+        if self.chunk_size is not None:
+            chunking['chunk_size'] = self.chunk_size
+        if self.chunk_overlap is not None:
+            chunking['chunk_overlap'] = self.chunk_overlap
+        return chunking
+
+    def flush(self) -> Optional[Dict[str, int]]:
+        """Aplica imediatamente as mudanças pendentes."""
+        paths = list(self._pending)
+        self._pending.clear()
+
+        chunking = self._chunking()
+        upserts: Dict[str, Tuple[List[str], List[Dict]]] = {}
+        deletes: List[str] = []
+        for path in paths:
+            if path.is_dir():
+                continue
+            if not self._is_tracked(path):
+                continue
+            doc = DocumentLoader.load_file(path) if path.is_file() else None
+            if doc:
+                upserts[self._source_key(path)] = chunk_document(doc, **chunking)
+            else:
+                deletes.append(self._source_key(path))
+
+        # Arquivos sob diretórios removidos/movidos
+        for path in paths:
+            if not path.exists():
+                prefix = self._source_key(path) + os.sep
+                deletes.extend(
+                    meta.get('source') for meta in self.vector_store.metadata
+                    if str(meta.get('source', '')).startswith(prefix)
+                )
+
+        if not upserts and not deletes:
+            return None
+
+        try:
+            result = self.vector_store.apply_updates(upserts=upserts, deletes=deletes)
+        except Exception as e:
+            print(f"❌ Erro ao aplicar atualização incremental: {e}")
+            return None
+
+        self.updates_applied += 1
+        print(
+            f"🔄 Knowledge base atualizada (v{result['version']}): "
+            f"+{result['added']} / -{result['removed']} documentos"
+        )
+        if self.persist:
+            # Nova versão do artefato (se houver), senão os arquivos legados
+            persist_vector_store(self.vector_store)
+        return result
+
+    def run(self):
+        source = self._open_source()
+        print(f"👀 Observando {self.directory} ({self.backend})")
+        try:
+            while not self._stop_event.is_set():
+                timeout = self.debounce if self._pending else self.poll_interval
+                now = time.monotonic()
+                for path in source.read(timeout):
+                    self._pending[path] = now
+
+                if self._pending:
+                    last_change = max(self._pending.values())
+                    if time.monotonic() - last_change >= self.debounce:
+                        self.flush()
+        finally:
+            source.close()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Sinaliza a thread para parar e aguarda seu término."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def start_knowledge_base_watcher(
+    directory: str = "knowledge_base",
+    vector_store: Optional[VectorStore] = None,
+    **kwargs
+) -> KnowledgeBaseWatcher:
+    """
+    Inicia o watcher sobre o vector store global usado pelas tools.
+
+    Args:
+        directory: Diretório observado
+        vector_store: VectorStore alvo (default: get_vector_store())
+        **kwargs: Opções de KnowledgeBaseWatcher (debounce, poll_interval...)
+
+    Returns:
+        Watcher já iniciado
+    """
+    if vector_store is None:
+        from rag.retriever_tools import get_vector_store
+        vector_store = get_vector_store()
+
+    watcher = KnowledgeBaseWatcher(vector_store, directory, **kwargs)
+    watcher.start()
+    return watcher
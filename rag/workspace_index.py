@@ -0,0 +1,336 @@
+# rag/workspace_index.py
+"""
+Índice dos artefatos gerados no workspace (coleção separada por projeto).
+
+Arquivos salvos pelo write_file_tool são divididos por símbolo (funções e
+classes em Python/JS, seções em Markdown) e indexados incrementalmente numa
+coleção própria do projeto, separada de knowledge_base. Agentes posteriores
+(QA, Tech Writer) recuperam só os trechos relevantes via search_workspace em
+vez de ler arquivos inteiros.
+
+A chave 'source' de cada arquivo é o caminho relativo ao workspace
+(normalizado), e a ativação remove da coleção os arquivos de execuções
+anteriores que não existem mais no workspace.
+"""
+import os
+import re
+import ast
+import hashlib
+import unicodedata
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import List, Dict, Optional
+
+from rag.vector_store import VectorStore
+
+
+WORKSPACE_PERSIST_DIR = "rag/vector_db/workspace"
+
+# Tamanho máximo de um chunk (em linhas) antes de ser subdividido
+MAX_CHUNK_LINES = 80
+FALLBACK_WINDOW_LINES = 60
+
+_MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.+)$')
+_JS_DECLARATION = re.compile(
+    r'^(?:export\s+(?:default\s+)?)?'
+    r'(?:async\s+)?(?:function\*?\s+(?P<func>\w+)|class\s+(?P<cls>\w+)|'
+    r'(?:const|let|var)\s+(?P<var>\w+)\s*=)'
+)
+_JS_EXTENSIONS = {'.js', '.jsx', '.ts', '.tsx', '.mjs'}
+
+
+def project_collection_name(project_idea: str) -> str:
+    """Nome estável da coleção do projeto: slug + hash curto da ideia."""
+    normalized = unicodedata.normalize('NFKD', project_idea)
+    ascii_text = normalized.encode('ascii', 'ignore').decode().lower()
+    slug = re.sub(r'[^a-z0-9]+', '_', ascii_text).strip('_')[:40] or 'project'
+    digest = hashlib.sha1(project_idea.encode('utf-8')).hexdigest()[:8]
+    return f"workspace_{slug}_{digest}"
+
+
+def workspace_source(path: str, workspace_dir: Optional[Path] = None) -> str:
+    """
+    Chave 'source' de um arquivo: caminho relativo ao workspace, em formato
+    POSIX ('./src/a.py', 'src//a.py' e o caminho absoluto viram 'src/a.py').
+    """
+    if workspace_dir is not None:
+        path = os.path.relpath(Path(workspace_dir) / path, workspace_dir)
+    return Path(os.path.normpath(path)).as_posix()
+
+
+def _make_chunk(path: str, lines: List[str], start: int, end: int,
+                symbol: str, kind: str) -> Dict:
+    """Cria chunk com linhas [start, end) (0-based) e metadados 1-based."""
+    body = "\n".join(lines[start:end]).strip("\n")
+    return {
+        'content': f"# {path} :: {symbol}\n{body}",
+        'metadata': {
+            'source': path,
+            'symbol': symbol,
+            'kind': kind,
+            'start_line': start + 1,
+            'end_line': end,
+        }
+    }
+
+
+def _split_long(path: str, lines: List[str], start: int, end: int,
+                symbol: str, kind: str) -> List[Dict]:
+    """Divide blocos maiores que MAX_CHUNK_LINES em janelas consecutivas."""
+    if end - start <= MAX_CHUNK_LINES:
+        return [_make_chunk(path, lines, start, end, symbol, kind)]
+    chunks = []
+    for part, offset in enumerate(range(start, end, MAX_CHUNK_LINES), 1):
+        chunks.append(_make_chunk(
+            path, lines, offset, min(offset + MAX_CHUNK_LINES, end),
+            f"{symbol} (parte {part})", kind
+        ))
+    return chunks
+
+
+def _chunk_python(path: str, content: str, lines: List[str]) -> List[Dict]:
+    tree = ast.parse(content)
+    chunks = []
+    covered = set()
+
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno]) - 1
+        end = node.end_lineno
+        covered.update(range(start, end))
+        kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+
+        if kind == 'class' and end - start > MAX_CHUNK_LINES:
+            # Classes grandes: cabeçalho + um chunk por método
+            methods = [
+                n for n in node.body
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            header_end = (methods[0].lineno - 1) if methods else end
+            chunks.extend(_split_long(path, lines, start, header_end, node.name, 'class'))
+            for method in methods:
+                m_start = min([d.lineno for d in method.decorator_list] + [method.lineno]) - 1
+                chunks.extend(_split_long(
+                    path, lines, m_start, method.end_lineno,
+                    f"{node.name}.{method.name}", 'method'
+                ))
+        else:
+            chunks.extend(_split_long(path, lines, start, end, node.name, kind))
+
+    # Código de módulo (imports, constantes, main) fora de funções/classes
+    module_lines = [i for i in range(len(lines)) if i not in covered and lines[i].strip()]
+    if module_lines:
+        text = "\n".join(lines[i] for i in module_lines)
+        chunks.insert(0, {
+            'content': f"# {path} :: <module>\n{text}",
+            'metadata': {
+                'source': path,
+                'symbol': '<module>',
+                'kind': 'module',
+                'start_line': module_lines[0] + 1,
+                'end_line': module_lines[-1] + 1,
+            }
+        })
+    return chunks
+
+
+def _chunk_by_boundaries(path: str, lines: List[str],
+                         boundaries: List[tuple], kind: str) -> List[Dict]:
+    """Chunks entre fronteiras [(linha, símbolo), ...] ordenadas."""
+    chunks = []
+    if not boundaries or boundaries[0][0] > 0:
+        boundaries = [(0, '<preamble>')] + boundaries
+    for i, (start, symbol) in enumerate(boundaries):
+        end = boundaries[i + 1][0] if i + 1 < len(boundaries) else len(lines)
+        if any(line.strip() for line in lines[start:end]):
+            chunks.extend(_split_long(path, lines, start, end, symbol, kind))
+    return chunks
+
+
+def _chunk_markdown(path: str, lines: List[str]) -> List[Dict]:
+    boundaries = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith('```'):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _MARKDOWN_HEADING.match(line)
+        if match:
+            boundaries.append((i, match.group(1).strip()))
+    return _chunk_by_boundaries(path, lines, boundaries, 'section')
+
+
+def _chunk_javascript(path: str, lines: List[str]) -> List[Dict]:
+    boundaries = []
+    for i, line in enumerate(lines):
+        match = _JS_DECLARATION.match(line)
+        if match:
+            name = match.group('func') or match.group('cls') or match.group('var')
+            boundaries.append((i, name))
+    return _chunk_by_boundaries(path, lines, boundaries, 'declaration')
+
+
+def chunk_by_symbol(path: str, content: str) -> List[Dict]:
+    """
+    Divide um arquivo em chunks por símbolo.
+
+    Args:
+        path: Caminho relativo ao workspace (usado como 'source')
+        content: Conteúdo do arquivo
+
+    Returns:
+        Lista de dicts com 'content' e 'metadata' (symbol, kind, linhas)
+    """
+    lines = content.splitlines()
+    if not lines:
+        return []
+
+    suffix = Path(path).suffix.lower()
+    try:
+        if suffix == '.py':
+            chunks = _chunk_python(path, content, lines)
+        elif suffix in ('.md', '.markdown'):
+            chunks = _chunk_markdown(path, lines)
+        elif suffix in _JS_EXTENSIONS:
+            chunks = _chunk_javascript(path, lines)
+        else:
+            chunks = []
+    except SyntaxError:
+        chunks = []
+
+    if not chunks:
+        # Fallback: janelas fixas de linhas
+        chunks = [
+            _make_chunk(path, lines, start, min(start + FALLBACK_WINDOW_LINES, len(lines)),
+                        f"linhas {start + 1}-{min(start + FALLBACK_WINDOW_LINES, len(lines))}",
+                        'lines')
+            for start in range(0, len(lines), FALLBACK_WINDOW_LINES)
+        ]
+    return chunks
+
+
+class WorkspaceIndex:
+    """
+    Coleção vetorial dos arquivos de um projeto, atualizada incrementalmente.
+
+    A indexação roda numa thread de background (uma escrita de arquivo não
+    espera a chamada de embeddings); buscas aguardam as indexações pendentes
+    para enxergar os arquivos recém-escritos.
+    """
+
+    def __init__(self, collection_name: str,
+                 persist_directory: Optional[str] = None,
+                 workspace_dir: Optional[Path] = None):
+        """
+        Args:
+            collection_name: Coleção do projeto (project_collection_name)
+            persist_directory: Diretório do índice (default: WORKSPACE_PERSIST_DIR)
+            workspace_dir: Raiz do workspace; as sources ficam relativas a ela
+        """
+        self.vector_store = VectorStore(
+            collection_name=collection_name,
+            # Lido na criação: o batch_runner.py isola o diretório por execução
+            persist_directory=persist_directory or WORKSPACE_PERSIST_DIR,
+        )
+        self.workspace_dir = Path(workspace_dir) if workspace_dir is not None else None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workspace-index")
+        self._pending: List[Future] = []
+
+    @property
+    def collection_name(self) -> str:
+        return self.vector_store.collection_name
+
+    def _index_now(self, path: str, content: str) -> Dict[str, int]:
+        chunks = chunk_by_symbol(path, content)
+        if chunks:
+            result = self.vector_store.upsert_documents(
+                path,
+                [c['content'] for c in chunks],
+                [c['metadata'] for c in chunks],
+            )
+        else:
+            result = self.vector_store.delete_documents(path)
+        self.vector_store.save_index()
+        return result
+
+    def _prune_now(self) -> int:
+        sources = {m.get('source') for m in self.vector_store.metadata}
+        missing = sorted(s for s in sources
+                         if s and not (self.workspace_dir / s).is_file())
+        if missing:
+            self.vector_store.apply_updates(deletes=missing)
+            self.vector_store.save_index()
+        return len(missing)
+
+    def _submit(self, fn, *args) -> Future:
+        self._pending = [f for f in self._pending if not f.done()]
+        future = self._executor.submit(fn, *args)
+        self._pending.append(future)
+        return future
+
+    def index_file(self, path: str, content: str) -> Future:
+        """Agenda a (re)indexação de um arquivo do workspace."""
+        return self._submit(self._index_now, workspace_source(path, self.workspace_dir),
+                            content)
+
+    def prune_missing(self) -> Optional[Future]:
+        """
+        Agenda a remoção dos arquivos que não existem mais no workspace
+        (ex.: escritos por execuções anteriores do mesmo projeto).
+        """
+        if self.workspace_dir is None:
+            return None
+        return self._submit(self._prune_now)
+
+    def flush(self, timeout: Optional[float] = 30.0):
+        """Aguarda as indexações pendentes."""
+        if self._pending:
+            wait(self._pending, timeout=timeout)
+            self._pending = [f for f in self._pending if not f.done()]
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Busca trechos relevantes (após concluir indexações pendentes)."""
+        self.flush()
+        return self.vector_store.search(query, top_k=top_k)
+
+
+# Índice do projeto ativo (None = indexação de workspace desabilitada)
+_workspace_index: Optional[WorkspaceIndex] = None
+
+
+def activate_workspace_index(project_idea: str,
+                             workspace_dir: Optional[Path] = None) -> WorkspaceIndex:
+    """
+    Ativa a coleção de workspace do projeto (chamado ao montar o crew) e
+    remove dela os arquivos que não estão mais em workspace_dir.
+    """
+    global _workspace_index
+    name = project_collection_name(project_idea)
+    workspace_dir = Path(workspace_dir) if workspace_dir is not None else None
+    if (_workspace_index is None
+            or (_workspace_index.collection_name, _workspace_index.workspace_dir)
+            != (name, workspace_dir)):
+        _workspace_index = WorkspaceIndex(name, workspace_dir=workspace_dir)
+    _workspace_index.prune_missing()
+    return _workspace_index
+
+
+def deactivate_workspace_index():
+    """Desativa a indexação (ex.: baseline sem RAG)."""
+    global _workspace_index
+    if _workspace_index is not None:
+        _workspace_index.flush()
+    _workspace_index = None
+
+
+def get_workspace_index() -> Optional[WorkspaceIndex]:
+    """Retorna o índice do projeto ativo, se houver."""
+    return _workspace_index
+
+
+def index_workspace_file(path: str, content: str) -> Optional[Future]:
+    """Hook do write_file_tool: indexa o arquivo se houver projeto ativo."""
+    if _workspace_index is None:
+        return None
+    return _workspace_index.index_file(path, content)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pickle legado vs DocumentStore (SQLite WAL) para os documentos
+do vector store.
+
+Mede, para 10k e 100k documentos:
+- tempo de carga completa e pico de RSS (cada carga roda num processo
+  novo, então um formato não herda memória do outro);
+- partida com visões preguiçosas (LazyColumn, o que o VectorStore usa):
+  abrir o banco e ler 5 resultados de busca, sem carregar tudo;
+- tempo de gravar +100 documentos (pickle reescreve tudo; SQLite só insere);
+- tempo de acesso aleatório a 100 ids (SQLite sem carregar tudo).
+
+Uso:
+    python scripts/benchmark_document_store.py [--sizes 10000 100000]
+"""
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_document_store_module():
+    """Importa rag/document_store.py sem o pacote rag (evita carregar crewai)."""
+    spec = importlib.util.spec_from_file_location(
+        "document_store", ROOT / "rag" / "document_store.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def proc_status_kb(field: str) -> int:
+    """Campo de /proc/self/status em KB (VmRSS atual, VmHWM = pico).
+
+    ru_maxrss não serve aqui: no Linux ele herda o pico do processo pai
+    através do fork.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def make_documents(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["arquitetura", "api", "cache", "teste", "deploy", "fila", "banco",
+             "microserviço", "latência", "contrato", "schema", "índice"]
+    documents, metadata = [], []
+    for i in range(n):
+        text = " ".join(rng.choice(words) for _ in range(110))
+        documents.append(f"# Documento {i}\n\n{text}")
+        source = f"knowledge_base/docs/doc_{i}.md"
+        metadata.append({'source': source, 'filename': f"doc_{i}.md",
+                         'extension': ".md", 'size': len(text)})
+    return documents, metadata
+
+
+def child(fmt: str, path: str):
+    """Executado num subprocesso: carrega e reporta tempo e pico de RSS."""
+    module = load_document_store_module() if fmt != "pickle" else None
+    rss_before = proc_status_kb("VmRSS")
+    started = time.perf_counter()
+    if fmt == "pickle":
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        count = len(data['documents'])
+    elif fmt == "sqlite":
+        documents, _ = module.DocumentStore(path).load_all()
+        count = len(documents)
+    else:
+        documents, metadata = module.DocumentStore(path).lazy_columns()
+        count = len(documents)
+        for i in random.Random(3).sample(range(count), 5):
+            documents[i], metadata[i]
+    elapsed = time.perf_counter() - started
+    peak = proc_status_kb("VmHWM")
+    print(json.dumps({'count': count, 'seconds': elapsed,
+                      'peak_rss_mb': (peak - rss_before) / 1024}))
+
+
+def measure_load(fmt: str, path: Path, repeats: int = 3) -> dict:
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", fmt, str(path)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'seconds': min(r['seconds'] for r in runs),
+        'peak_rss_mb': min(r['peak_rss_mb'] for r in runs),
+    }
+
+
+def bench(n: int, workdir: Path) -> dict:
+    module = load_document_store_module()
+    documents, metadata = make_documents(n)
+
+    pickle_path = workdir / f"docs_{n}.pkl"
+    with open(pickle_path, 'wb') as f:
+        pickle.dump({'documents': documents, 'metadata': metadata, 'dimension': 1536}, f)
+    db_path = workdir / f"docs_{n}.db"
+    store = module.DocumentStore(db_path)
+    store.replace_all(documents, metadata)
+
+    extra_docs, extra_meta = make_documents(100, seed=1)
+
+    started = time.perf_counter()
+    with open(pickle_path, 'wb') as f:
+        pickle.dump({'documents': documents + extra_docs,
+                     'metadata': metadata + extra_meta, 'dimension': 1536}, f)
+    pickle_append = time.perf_counter() - started
+
+    started = time.perf_counter()
+    store.write_from(n, extra_docs, extra_meta)
+    sqlite_append = time.perf_counter() - started
+
+    ids = random.Random(2).sample(range(n), 100)
+    started = time.perf_counter()
+    store.get_many(ids)
+    random_access = time.perf_counter() - started
+    store.close()
+
+    return {
+        'n': n,
+        'pickle_size_mb': pickle_path.stat().st_size / 1e6,
+        'sqlite_size_mb': db_path.stat().st_size / 1e6,
+        'pickle_load': measure_load("pickle", pickle_path),
+        'sqlite_load': measure_load("sqlite", db_path),
+        'lazy_load': measure_load("lazy", db_path),
+        'pickle_append_s': pickle_append,
+        'sqlite_append_s': sqlite_append,
+        'sqlite_random_100_s': random_access,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print("\n" + "=" * 80)
+    print("📊 BENCHMARK: pickle vs DocumentStore (SQLite WAL)")
+    print("=" * 80)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            r = bench(n, Path(tmp))
+            print(f"\n--- {r['n']:,} documentos ---")
+            print(f"{'':26}{'pickle':>12}{'sqlite':>12}{'preguiçoso':>12}")
+            print(f"{'Tamanho em disco (MB)':26}{r['pickle_size_mb']:>12.1f}"
+                  f"{r['sqlite_size_mb']:>12.1f}{'':>12}")
+            print(f"{'Carga na partida (s)':26}{r['pickle_load']['seconds']:>12.3f}"
+                  f"{r['sqlite_load']['seconds']:>12.3f}{r['lazy_load']['seconds']:>12.4f}")
+            print(f"{'Pico de RSS (MB)':26}{r['pickle_load']['peak_rss_mb']:>12.1f}"
+                  f"{r['sqlite_load']['peak_rss_mb']:>12.1f}"
+                  f"{r['lazy_load']['peak_rss_mb']:>12.1f}")
+            print(f"{'Gravar +100 docs (s)':26}{r['pickle_append_s']:>12.3f}"
+                  f"{r['sqlite_append_s']:>12.3f}{'':>12}")
+            print(f"{'100 ids aleatórios (s)':26}{'-':>12}"
+                  f"{r['sqlite_random_100_s']:>12.4f}{'':>12}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
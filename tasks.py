@@ -137,7 +137,7 @@ Your deliverables should include:
    - Example unit tests for core functionality
    - Test structure and organization
 
-Read the implementation files and create testing documentation.
+Use search_workspace to retrieve the implemented functions and create testing documentation.
 Save test plan to 'test_plan.md' and test cases to 'test_cases.md'.""",
         expected_output="Testing documentation saved to workspace: test_plan.md and test_cases.md",
         agent=create_qa_engineer(),
@@ -170,7 +170,7 @@ Your documentation should include:
    - Screenshots descriptions (text)
    - Troubleshooting section
 
-Read all project files and create comprehensive documentation.
+Use search_workspace to retrieve the relevant parts of the project files and create comprehensive documentation.
 The README should be beginner-friendly and include everything needed to get started.""",
         expected_output="Complete project documentation: README.md, user_guide.md saved to workspace",
         agent=create_tech_writer(),
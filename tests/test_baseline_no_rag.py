@@ -23,37 +23,9 @@ from crewai import Agent, Task, Crew
 import agentops
 from crew_no_rag import run_software_dev_crew
 import config
-from metrics import get_tracker, reset_tracker
-
-
-# 5 projetos de teste para baseline - MESMOS projetos do baseline com RAG
-TEST_PROJECTS = [
-    {
-        "id": "project_01",
-        "name": "Todo List CLI",
-        "description": "crie uma aplicação CLI para gerenciar lista de tarefas com comandos add, list, done e delete",
-    },
-    {
-        "id": "project_02",
-        "name": "URL Shortener API",
-        "description": "crie uma API REST para encurtar URLs com endpoints para criar, listar e redirecionar",
-    },
-    {
-        "id": "project_03",
-        "name": "Weather CLI",
-        "description": "crie uma ferramenta CLI que consulta API de clima e mostra previsão formatada",
-    },
-    {
-        "id": "project_04",
-        "name": "Password Generator",
-        "description": "crie um gerador de senhas seguras CLI com opções de tamanho, caracteres especiais e força",
-    },
-    {
-        "id": "project_05",
-        "name": "Markdown to HTML Converter",
-        "description": "crie um conversor de Markdown para HTML com suporte a títulos, listas e links",
-    },
-]
+from metrics import (get_tracker, reset_tracker, merge_summaries, enable_profiling,
+                     start_exporter, BudgetExceededError, build_baseline_report)
+from baseline_projects import TEST_PROJECTS
 
 
 def initialize_observability():
@@ -76,10 +48,14 @@ def initialize_observability():
         return False
 
 
-def run_single_project(project_info: dict, project_num: int, total: int):
+def run_single_project(project_info: dict, project_num: int, total: int,
+                       profile: bool = False):
     """
     Executa um único projeto e coleta métricas.
 
+    Args:
+        profile: Memória/CPU por task e pilhas amostradas (metrics/profiling.py)
+
     Returns:
         dict: Métricas do projeto
     """
@@ -91,6 +67,8 @@ def run_single_project(project_info: dict, project_num: int, total: int):
 
     # Reset tracker para este projeto
     tracker = reset_tracker()
+    if profile:
+        enable_profiling(tracker)
     start_time = time.time()
 
     try:
@@ -101,6 +79,8 @@ def run_single_project(project_info: dict, project_num: int, total: int):
         duration = time.time() - start_time
 
         # Coletar métricas
+        if tracker.profiler is not None:
+            tracker.profiler.stop()
         summary = tracker.get_summary()
 
         # Salvar métricas específicas deste projeto em diretório separado
@@ -118,7 +98,16 @@ def run_single_project(project_info: dict, project_num: int, total: int):
             "metrics": summary,
         }
 
+        if tracker.profiler is not None:
+            # RSS/tracemalloc por task e pilhas amostradas (flamegraph)
+            project_metrics["profile"] = tracker.profiler.to_dict()
+            project_metrics["profile"]["collapsed"] = str(
+                tracker.profiler.export_collapsed(metrics_file.with_suffix(".collapsed.txt")))
+
         metrics_file.write_text(json.dumps(project_metrics, indent=2))
+        # Flame chart da execução (crew → task → agent → tool → LLM)
+        tracker.tracer.export_chrome_trace(metrics_file.with_suffix(".trace.json"))
+        tracker.tracer.export_otlp(metrics_file.with_suffix(".otlp.json"))
 
         print()
         print("=" * 80)
@@ -135,6 +124,8 @@ def run_single_project(project_info: dict, project_num: int, total: int):
     except Exception as e:
         print(f"\n❌ ERRO no projeto {project_num}: {e}")
         duration = time.time() - start_time
+        if tracker.profiler is not None:
+            tracker.profiler.stop()
 
         error_metrics = {
             "project_id": project_info['id'],
@@ -145,7 +136,9 @@ def run_single_project(project_info: dict, project_num: int, total: int):
             "status": "failed",
             "rag_enabled": False,
             "error": str(e),
-            "metrics": None,
+            # Parada por orçamento: métricas parciais até o limite
+            "budget_exceeded": isinstance(e, BudgetExceededError),
+            "metrics": tracker.get_summary() if isinstance(e, BudgetExceededError) else None,
         }
 
         return error_metrics
@@ -178,10 +171,11 @@ def generate_baseline_report(all_metrics: list, batch_duration: float):
         print("⚠️  Nenhum projeto concluído com sucesso")
         return
 
-    # Calcular estatísticas agregadas
-    total_cost = sum(m['metrics']['summary']['total_cost'] for m in successful)
-    total_tokens = sum(m['metrics']['summary']['total_tokens'] for m in successful)
-    total_llm_calls = sum(m['metrics']['summary']['total_llm_calls'] for m in successful)
+    # Estatísticas agregadas: contadores somados e histogramas mesclados
+    merged = merge_summaries(m['metrics'] for m in successful)
+    total_cost = merged['summary']['total_cost']
+    total_tokens = merged['summary']['total_tokens']
+    total_llm_calls = merged['summary']['total_llm_calls']
     avg_duration = sum(m['duration_seconds'] for m in successful) / len(successful)
 
     print("--- ESTATÍSTICAS AGREGADAS (SEM RAG) ---")
@@ -192,6 +186,10 @@ def generate_baseline_report(all_metrics: list, batch_duration: float):
     print(f"📞 LLM calls totais: {total_llm_calls}")
     print(f"📞 LLM calls médias: {total_llm_calls//len(successful)}")
     print(f"⏱️  Duração média por projeto: {avg_duration:.2f}s")
+    for operation, stats in merged['summary']['latency'].items():
+        if stats['count']:
+            print(f"⏱️  Latência {operation}: p50 {stats['p50']:.3f}s, "
+                  f"p90 {stats['p90']:.3f}s, p99 {stats['p99']:.3f}s (n={stats['count']})")
     print()
 
     print("--- DETALHES POR PROJETO ---")
@@ -214,34 +212,21 @@ def generate_baseline_report(all_metrics: list, batch_duration: float):
     report_path = Path("metrics/data/no_rag/baseline_report.json")
     report_path.parent.mkdir(parents=True, exist_ok=True)
 
-    consolidated_report = {
-        "report_type": "baseline_no_rag",
-        "rag_enabled": False,
-        "timestamp": datetime.now().isoformat(),
-        "batch_duration_seconds": batch_duration,
-        "total_projects": len(all_metrics),
-        "successful_projects": len(successful),
-        "failed_projects": len(failed),
-        "aggregated_stats": {
-            "total_cost": total_cost,
-            "avg_cost_per_project": total_cost / len(successful) if successful else 0,
-            "total_tokens": total_tokens,
-            "avg_tokens_per_project": total_tokens // len(successful) if successful else 0,
-            "total_llm_calls": total_llm_calls,
-            "avg_llm_calls_per_project": total_llm_calls // len(successful) if successful else 0,
-            "total_rag_retrievals": 0,  # Zero para baseline sem RAG
-            "avg_duration_per_project": avg_duration if successful else 0,
-        },
-        "projects": all_metrics,
-    }
+    consolidated_report = build_baseline_report(
+        all_metrics, batch_duration, report_type="baseline_no_rag", merged=merged, rag_enabled=False)
 
     report_path.write_text(json.dumps(consolidated_report, indent=2))
     print(f"\n💾 Relatório consolidado salvo em: {report_path}")
     print()
 
 
-def main():
-    """Executa teste baseline SEM RAG completo."""
+def main(profile: bool = False):
+    """
+    Executa teste baseline SEM RAG completo.
+
+    Args:
+        profile: Liga o modo --profile em cada projeto
+    """
     print()
     print("=" * 80)
     print("🧪 TESTE BASELINE SEM RAG - BATCH DE 5 PROJETOS")
@@ -274,13 +259,23 @@ def main():
     input("Pressione ENTER para iniciar ou Ctrl+C para cancelar...")
     print()
 
+    # Métricas ao vivo do projeto corrente (o exporter segue o tracker global)
+    if config.METRICS_CONFIG["exporter_port"]:
+        exporter = start_exporter(
+            host=config.METRICS_CONFIG["exporter_host"],
+            port=config.METRICS_CONFIG["exporter_port"],
+            max_label_values=config.METRICS_CONFIG["exporter_max_label_values"],
+        )
+        print(f"📡 Endpoint OpenMetrics: {exporter.url}")
+        print()
+
     # Executar batch
     batch_start = time.time()
     all_metrics = []
 
     try:
         for i, project in enumerate(TEST_PROJECTS, 1):
-            metrics = run_single_project(project, i, len(TEST_PROJECTS))
+            metrics = run_single_project(project, i, len(TEST_PROJECTS), profile=profile)
             all_metrics.append(metrics)
 
             # Pequena pausa entre projetos
@@ -318,5 +313,5 @@ def main():
 
 
 if __name__ == "__main__":
-    exit_code = main()
+    exit_code = main(profile="--profile" in sys.argv[1:])
     sys.exit(exit_code)
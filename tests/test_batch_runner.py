@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Testes do batch paralelo (batch_runner.py) e do limite compartilhado
+(metrics/rate_limit.py).
+"""
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")   # config.py exige a chave
+
+import config
+from batch_runner import Variant, run_batch
+from metrics import MetricsAggregator, SharedRateLimiter, build_baseline_report, get_tracker
+
+
+PROJECTS = [
+    {"id": "p1", "name": "Um", "description": "projeto um"},
+    {"id": "p2", "name": "Dois", "description": "projeto dois (falha)"},
+]
+FAKE = Variant("test_batch_runner:fake_crew", "baseline_fake")
+
+
+def fake_crew(project_idea):
+    """Crew de mentira: escreve no workspace e grava uma chamada LLM."""
+    (config.WORKSPACE_DIR / "README.md").write_text(project_idea)
+    get_tracker().track_llm_call(0.1, 100, 20, model="gpt-4o-mini")
+    if "falha" in project_idea:
+        raise RuntimeError("falhou")
+
+
+def always_fails(project_idea):
+    raise AssertionError("execução já concluída não deveria rodar de novo")
+
+
+def test_batch_isolates_runs_streams_results_and_reports(tmp_path):
+    report = run_batch(FAKE, PROJECTS, repetitions=2, workers=2, batch_dir=tmp_path)
+
+    sequential = build_baseline_report([], 0.0)
+    assert set(report) == set(sequential)
+    assert set(report['aggregated_stats']) == set(sequential['aggregated_stats'])
+    assert report['report_type'] == "baseline_fake"
+    assert (report['total_projects'], report['successful_projects'],
+            report['failed_projects']) == (4, 2, 2)
+    assert report['aggregated_stats']['total_llm_calls'] == 2
+    assert [p['run_id'] for p in report['projects']] == ["p1-r01", "p2-r01", "p1-r02", "p2-r02"]
+    assert json.loads((tmp_path / "baseline_report.json").read_text())['total_projects'] == 4
+
+    # Um workspace por execução
+    for project in report['projects']:
+        readme = tmp_path / "runs" / project['run_id'] / "workspace" / "README.md"
+        assert readme.read_text() == project['description']
+        saved = json.loads((tmp_path / "projects" / f"{project['run_id']}.json").read_text())
+        assert saved['status'] == project['status']
+    lines = (tmp_path / "results.jsonl").read_text().splitlines()
+    assert sorted(json.loads(line)['run_id'] for line in lines) == [
+        "p1-r01", "p1-r02", "p2-r01", "p2-r02"]
+
+    # Segmentos dos workers: visão consolidada com todas as chamadas
+    summary = MetricsAggregator(tmp_path / "segments").summary()
+    assert summary['summary']['total_llm_calls'] == 4
+
+    # --resume reaproveita as execuções com sucesso e refaz só as falhas
+    resumed = run_batch(Variant("test_batch_runner:always_fails", "baseline_fake"),
+                        PROJECTS, repetitions=2, workers=2, batch_dir=tmp_path, resume=True)
+    assert resumed['successful_projects'] == 2
+    assert all("deveria" in p['error'] for p in resumed['projects'] if p['status'] == 'failed')
+
+
+def test_rate_limiter_spaces_reservations():
+    limiter = SharedRateLimiter(requests_per_minute=600, burst=2)
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+    with pytest.raises(ValueError):
+        SharedRateLimiter(0)
+
+
+_limiter = None
+
+
+def _set_limiter(limiter):
+    global _limiter
+    _limiter = limiter
+
+
+def _acquire(_):
+    return _limiter.acquire()
+
+
+def test_rate_limit_is_shared_by_worker_processes():
+    context = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(requests_per_minute=1200, context=context)  # 1 a cada 50ms
+    with ProcessPoolExecutor(max_workers=3, mp_context=context,
+                             initializer=_set_limiter, initargs=(limiter,)) as pool:
+        list(pool.map(_acquire, range(3)))   # processos prontos
+        start = time.time()
+        list(pool.map(_acquire, range(9)))
+    # 9 vagas a 20/s entre todos os workers: >= 8 intervalos de 50ms
+    assert time.time() - start >= 0.35
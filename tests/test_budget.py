@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Testes do orçamento de tokens/custo/chamadas/tempo (metrics/budget.py).
+"""
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import BudgetExceededError, BudgetGuard, BudgetLimits, MetricsTracker, enable_budget
+from metrics import budget
+from metrics.budget import compress_messages, save_partial_outputs
+
+
+def test_soft_then_hard_limit_per_run_and_task():
+    guard = BudgetGuard(run=BudgetLimits(tokens=10_000), task=BudgetLimits(llm_calls=3))
+    assert guard.check("Create PRD") == 'ok'
+    guard.charge(8_500, 0.01)
+    assert guard.check("Create PRD") == 'soft'   # 85% dos tokens da execução
+
+    guard.charge(100, 0.0)
+    guard.charge(100, 0.0)                        # 3 chamadas na task
+    with pytest.raises(BudgetExceededError) as error:
+        guard.check("Create PRD")
+    assert (error.value.scope, error.value.limit) == ("Create PRD", 'llm_calls')
+    # Depois do estouro rígido nenhuma chamada passa, nem de outra task
+    with pytest.raises(BudgetExceededError):
+        guard.check("Design")
+
+    state = guard.to_dict()
+    assert state['usage']['run']['tokens'] == 8_700
+    assert state['usage']['tasks']['Create PRD']['llm_calls'] == 3
+    assert state['exceeded']['limit'] == 'llm_calls'
+    assert not BudgetGuard().enabled
+
+
+def test_wall_time_and_cost_limits():
+    guard = BudgetGuard(run=BudgetLimits(wall_seconds=0.05, cost=1.0))
+    guard.charge(10, 0.5)
+    assert guard.check() == 'ok'
+    time.sleep(0.06)
+    with pytest.raises(BudgetExceededError) as error:
+        guard.check()
+    assert error.value.scope == budget.RUN_SCOPE and error.value.limit == 'wall_seconds'
+
+
+def test_soft_actions_downgrade_and_compress():
+    guard = BudgetGuard(fallback_model="gpt-4.1-nano", compress_max_chars=100)
+    llm = SimpleNamespace(model="gpt-4o")
+    assert guard.downgrade(llm) == "gpt-4o" and llm.model == "gpt-4.1-nano"
+    assert guard.downgrade(llm) is None                   # já no fallback
+    assert guard.downgrade(SimpleNamespace(model="gpt-4.1-nano-x")) is None
+
+    messages = [{'role': 'system', 'content': "s" * 500},
+                {'role': 'user', 'content': "u" * 500},
+                {'role': 'assistant', 'content': "Observation: " + "o" * 500},
+                {'role': 'user', 'content': "last" * 200},
+                {'role': 'assistant', 'content': "x" * 500}]
+    assert guard.compress(messages) > 0
+    assert len(messages[0]['content']) == 500             # sistema intacto
+    assert len(messages[1]['content']) < 200
+    assert messages[2]['content'].startswith("Observation: ")
+    assert messages[-2]['content'] == "last" * 200        # últimas intactas
+    assert [e['action'] for e in guard.soft_events] == ['downgrade', 'compress']
+    assert compress_messages(messages, 100) == 0          # idempotente
+
+    with pytest.raises(ValueError):
+        BudgetGuard(soft_actions="downgrade,retry")
+
+
+def test_tracker_charges_calls_and_saves_budget(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    guard = enable_budget(tracker, run={'cost': 0.001}, soft_actions="")
+    guard.check("Implement")
+    tracker.track_llm_call(1.0, 4_000, 1_000, model="gpt-4o-mini")   # $0.0012
+    assert guard.usage("Implement")['tokens'] == 5_000
+    with pytest.raises(BudgetExceededError):
+        guard.check("Implement")
+
+    saved = json.loads(tracker.save_metrics("run.json").read_text())
+    assert saved['budget']['exceeded']['limit'] == 'cost'
+    assert saved['budget']['limits']['run']['cost'] == 0.001
+
+    done = SimpleNamespace(description="Create PRD\nfor the CLI", name=None,
+                           agent=SimpleNamespace(role="Product Manager"),
+                           output=SimpleNamespace(raw="# PRD"))
+    pending = SimpleNamespace(description="Design", name=None, agent=None, output=None)
+    path = save_partial_outputs(SimpleNamespace(tasks=[done, pending]),
+                                tmp_path / "partial.json", guard.exceeded)
+    partial = json.loads(path.read_text())
+    assert partial['stopped_by'].startswith("Orçamento excedido")
+    assert partial['tasks'][0] == {'task': "Create PRD", 'agent': "Product Manager",
+                                   'completed': True, 'output': "# PRD"}
+    assert partial['tasks'][1]['completed'] is False
+
+
+def test_crewai_hook_blocks_call_on_hard_limit(tmp_path, monkeypatch):
+    hooks = pytest.importorskip("crewai.hooks")
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr("metrics.metrics_tracker.global_tracker", tracker)
+    tracker.budget = BudgetGuard(run=BudgetLimits(tokens=1_000), soft_fraction=0.5,
+                                 fallback_model="gpt-4o-mini")
+
+    context = SimpleNamespace(task=SimpleNamespace(name=None, description="Write docs\n..."),
+                              llm=SimpleNamespace(model="gpt-4o"), messages=[])
+    assert budget._before_llm_call(context) is None
+    tracker.track_llm_call(1.0, 500, 100, model="gpt-4o")
+    budget._before_llm_call(context)                       # 60%: limite suave
+    assert context.llm.model == "gpt-4o-mini"
+    tracker.track_llm_call(1.0, 400, 100, model="gpt-4o-mini")
+    with pytest.raises(hooks.HookAborted):
+        budget._before_llm_call(context)
+    assert tracker.budget.usage("Write docs")['llm_calls'] == 2
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Testes do CollectionRouter (busca paralela em várias coleções).
+Não faz chamadas à API.
+"""
+import os
+import threading
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import artifacts
+from rag.router import CollectionRouter, ScoreCalibrator
+from rag.vector_store import VectorStore
+
+
+WORDS = ["cache", "redis", "api", "rest", "teste", "pytest", "deploy", "docker"]
+
+
+def fake_embedding(self, text, model=None):
+    vector = np.array([text.count(w) for w in WORDS], dtype=np.float32) + 0.01
+    return vector / np.linalg.norm(vector)
+
+
+def fake_embeddings_batch(self, texts):
+    return np.array([fake_embedding(self, t) for t in texts], dtype=np.float32)
+
+
+def make_store(tmp_path, name, documents, prefix=None):
+    store = VectorStore(collection_name=name, persist_directory=str(tmp_path),
+                        backend="numpy")
+    store.add_documents(documents, [{'source': f"{prefix or name}/{i}.md"}
+                                    for i in range(len(documents))])
+    return store
+
+
+def test_fan_out_merges_top_k_across_collections(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings_batch)
+
+    router = CollectionRouter(persist_directory=str(tmp_path))
+    router.register("templates", make_store(tmp_path, "templates", ["api rest", "deploy docker"]))
+    router.register("examples", make_store(tmp_path, "examples", ["cache redis", "teste pytest"]))
+    router.register("vazia", make_store(tmp_path, "vazia", []))
+
+    embedded = []
+    original = VectorStore.get_embedding
+    monkeypatch.setattr(VectorStore, "get_embedding",
+                        lambda self, text, model=None: (embedded.append(threading.current_thread().name),
+                                                        original(self, text, model))[1])
+    threads = []
+    original_search = VectorStore.search_by_vector
+    monkeypatch.setattr(VectorStore, "search_by_vector",
+                        lambda self, *a, **k: (threads.append(threading.current_thread().name),
+                                               original_search(self, *a, **k))[1])
+
+    results = router.search("cache redis", top_k=3)
+    assert len(embedded) == 1
+    assert all(t.startswith("collection-search") for t in threads) and len(threads) == 2
+    assert results[0]['collection'] == "examples"
+    assert results[0]['document'] == "cache redis"
+    assert [r['rank'] for r in results] == [1, 2, 3]
+    assert [r['score'] for r in results] == sorted((r['score'] for r in results), reverse=True)
+
+    only_templates = router.search("cache redis", top_k=5, collections=["templates", "nenhuma"])
+    assert {r['collection'] for r in only_templates} == {"templates"}
+
+
+def test_calibrator_normalizes_after_warm_up():
+    calibrator = ScoreCalibrator(min_samples=5)
+    # Frio: mesma escala [0, 1], pela distribuição a priori
+    assert calibrator.calibrate(calibrator.prior_mean) == 0.5
+    assert 0.9 < calibrator.calibrate(0.9) < 1.0
+    calibrator.update([0.5, 0.6, 0.55, 0.45, 0.5, 0.52])
+    assert 0.45 < calibrator.calibrate(calibrator.mean) < 0.55
+    assert calibrator.calibrate(0.7) > 0.9
+    assert calibrator.calibrate(0.3) < 0.1
+
+
+def test_cold_and_warm_collections_share_the_score_scale(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings_batch)
+    documents = ["cache redis", "api rest", "teste pytest"]
+
+    router = CollectionRouter(persist_directory=str(tmp_path))
+    router.register("warm", make_store(tmp_path, "warm", documents))
+    router.register("cold", make_store(tmp_path, "cold", documents))
+    # Histórico da coleção quente com a mesma distribuição da priori
+    router._calibrators["warm"].update([0.4, 0.6] * 50)
+
+    results = router.search("cache redis", top_k=6)
+    assert all(0.0 <= r['score'] <= 1.0 for r in results)
+    by_collection = {(r['collection'], r['document']): r['score'] for r in results}
+    for document in documents:
+        assert abs(by_collection["warm", document] - by_collection["cold", document]) < 0.05
+    assert {r['collection'] for r in results[:2]} == {"warm", "cold"}
+
+
+def test_same_chunk_from_overlapping_collections_is_returned_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings_batch)
+
+    router = CollectionRouter(persist_directory=str(tmp_path))
+    # knowledge_base e kb_templates indexam os mesmos arquivos
+    router.register("knowledge_base", make_store(
+        tmp_path, "knowledge_base", ["api rest", "deploy docker"], prefix="knowledge_base/templates"))
+    router.register("kb_templates", make_store(
+        tmp_path, "kb_templates", ["api rest", "deploy docker"], prefix="knowledge_base/templates"))
+
+    results = router.search("api rest", top_k=5)
+    assert sorted(r['document'] for r in results) == ["api rest", "deploy docker"]
+    assert [r['rank'] for r in results] == [1, 2]
+
+
+def test_search_survives_concurrent_unregister(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings_batch)
+
+    router = CollectionRouter(persist_directory=str(tmp_path))
+    router.register("templates", make_store(tmp_path, "templates", ["api rest"]))
+    original = CollectionRouter._search_one
+    monkeypatch.setattr(CollectionRouter, "_search_one", staticmethod(
+        lambda *args: (router.unregister("templates"), original(*args))[1]))
+
+    assert router.search("api rest", top_k=1)[0]['document'] == "api rest"
+    assert router.collections == []
+
+
+def test_rebuild_touches_only_one_collection(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings_batch)
+    source = tmp_path / "kb" / "templates"
+    source.mkdir(parents=True)
+    (source / "api.md").write_text("api rest")
+    root = str(tmp_path / "db")
+
+    router = CollectionRouter(persist_directory=root)
+    router.register("kb_templates", source_directory=str(source))
+    router.register("examples", make_store(tmp_path, "examples", ["cache redis"]))
+    assert router.search("api", collections=["kb_templates"]) == []
+
+    assert router.rebuild("kb_templates") == 1
+    assert artifacts.list_versions("examples", root) == []
+    assert router.search("api rest", top_k=1)[0]['collection'] == "kb_templates"
+
+    # Uma nova instância abre o artefato `current` da coleção
+    reopened = CollectionRouter(persist_directory=root)
+    reopened.register("kb_templates")
+    assert reopened.get("kb_templates").documents == ["api rest"]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Testes do DocumentStore em SQLite que substitui o pickle do vector store.
+Não faz chamadas à API.
+"""
+import os
+import pickle
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import cli
+from rag.document_store import DocumentStore
+from rag.vector_store import VectorStore
+
+
+def test_random_access_partial_update_and_streaming(tmp_path):
+    store = DocumentStore(tmp_path / "docs.db")
+    docs = [f"documento {i}" for i in range(2500)]
+    meta = [{'source': f"{i % 10}.md", 'n': i} for i in range(2500)]
+    store.replace_all(docs, meta)
+
+    assert len(store) == 2500
+    assert store.get(1234) == ("documento 1234", {'source': "4.md", 'n': 1234})
+    assert store.get(99999) is None
+    assert set(store.get_many([1, 2, 3])) == {1, 2, 3}
+    assert store.ids_for_source("7.md")[:2] == [7, 17]
+
+    assert store.update(5, metadata={'source': "novo.md"})
+    assert store.get(5) == ("documento 5", {'source': "novo.md"})
+    assert store.ids_for_source("novo.md") == [5]
+
+    streamed = list(store.iter_documents(batch_size=1000))
+    assert [d[0] for d in streamed] == list(range(2500))
+
+    store.write_from(2000, ["fim"], [{}])
+    documents, metadata = store.load_all()
+    assert len(documents) == 2001 and documents[-1] == "fim"
+    assert metadata[5] == {'source': "novo.md"}
+
+
+def make_store(tmp_path):
+    store = VectorStore(collection_name="kb", persist_directory=str(tmp_path),
+                        backend="numpy")
+    store.get_embeddings_batch = lambda texts: np.random.default_rng(len(texts)).random(
+        (len(texts), 8), dtype=np.float32)
+    return store
+
+
+def test_save_index_writes_only_changed_rows(tmp_path):
+    store = make_store(tmp_path)
+    store.add_documents(["a", "b", "c"], [{'source': s} for s in "abc"])
+    store.save_index()
+    assert not (tmp_path / "kb.pkl").exists()
+
+    writes = []
+    document_store = store._get_document_store()
+    original = document_store.write_from
+    document_store.write_from = lambda start, d, m: (writes.append((start, len(d))),
+                                                     original(start, d, m))
+    store.add_documents(["d"], [{'source': "d"}])
+    store.save_index()
+    store.save_index()
+    assert writes == [(3, 1)]
+
+    store.delete_documents("b")
+    store.save_index()
+    assert writes[-1] == (1, 2)
+
+    reloaded = make_store(tmp_path)
+    assert reloaded.documents == ["a", "c", "d"]
+    assert reloaded.index.ntotal == 3
+
+
+def test_lazy_snapshot_ignores_writes_from_another_instance(tmp_path):
+    writer = make_store(tmp_path)
+    writer.add_documents(["a", "b", "c"], [{'source': s} for s in "abc"])
+    writer.save_index()
+
+    reader = make_store(tmp_path)
+    documents, metadata = reader.documents, reader.metadata
+    assert not documents.materialized
+
+    # Outra instância reescreve o arquivo a partir do primeiro registro
+    other = make_store(tmp_path)
+    other.delete_documents("a")
+    other.add_documents(["x", "y"], [{'source': "x"}, {'source': "y"}])
+    other.save_index()
+
+    assert len(documents) == reader.index.ntotal == 3
+    assert documents[0] == "a" and metadata[2] == {'source': "c"}
+    assert list(documents) == ["a", "b", "c"]
+    assert list(metadata) == [{'source': s} for s in "abc"]
+    # Carregadas as duas colunas, a transação de leitura é encerrada
+    assert documents._store.released
+    assert make_store(tmp_path).documents == ["b", "c", "x", "y"]
+
+
+def test_legacy_pickle_is_migrated_only_on_request(tmp_path, capsys):
+    vectors = np.eye(2, 8, dtype=np.float32)
+    np.save(tmp_path / "kb.npy", vectors)
+    with open(tmp_path / "kb.pkl", 'wb') as f:
+        pickle.dump({'documents': ["x", "y"], 'metadata': [{'source': "x"}, {}],
+                     'dimension': 8}, f)
+
+    # Sem opt-in o pickle não é lido
+    store = make_store(tmp_path)
+    assert store.index is None and store.documents == []
+    assert "migrate-legacy" in capsys.readouterr().out
+    assert not (tmp_path / "kb.db").exists()
+
+    assert cli.main(["--root", str(tmp_path), "--collection", "kb", "migrate-legacy"]) == 0
+    store = make_store(tmp_path)
+    assert store.documents == ["x", "y"]
+    assert store.dimension == 8
+    assert (tmp_path / "kb.db").exists()
+    assert DocumentStore(tmp_path / "kb.db").get(0) == ("x", {'source': "x"})
+
+
+def test_expired_snapshot_loads_views_and_frees_the_wal(tmp_path):
+    store = DocumentStore(tmp_path / "docs.db")
+    store.replace_all(["a", "b"], [{'n': 0}, {'n': 1}])
+    documents, metadata = store.lazy_columns(max_age=0.05)
+    snapshot = documents._store
+    assert not snapshot.released
+
+    store.write_from(0, ["z"], [{}])
+    snapshot._timer.join(5)
+    assert snapshot.released
+    assert documents.materialized and metadata.materialized
+    assert list(documents) == ["a", "b"] and metadata[1] == {'n': 1}
+
+    # Sem leitores abertos o checkpoint consegue truncar o WAL
+    busy, _, _ = store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    assert busy == 0
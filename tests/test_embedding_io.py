@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Testes de import/export em lote de embeddings pré-calculados.
+Não faz chamadas à API.
+"""
+import os
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag.embedding_io import ARROW_AVAILABLE
+from rag.vector_store import VectorStore
+
+
+DOCS = ["primeiro\r\ncom CRLF", "segundo – ünïcode", ""]
+META = [{'source': 'a.md'}, {'source': 'b.md', 'tags': ['x']}, {'source': 'c.md'}]
+
+
+def make_store(tmp_path, name, backend="auto"):
+    store = VectorStore(collection_name=name, persist_directory=str(tmp_path / "db"),
+                        backend=backend)
+
+    def no_api(*args, **kwargs):
+        raise AssertionError("API de embeddings não deveria ser chamada")
+
+    store.get_embeddings_batch = no_api
+    return store
+
+
+def test_add_embeddings_adopts_dimension(tmp_path):
+    store = make_store(tmp_path, "src")
+    vectors = np.eye(3, 8, dtype=np.float32)
+    assert store.add_embeddings(vectors, DOCS, META) == 3
+    assert store.dimension == 8
+    assert store.index.ntotal == 3
+
+    try:
+        store.add_embeddings(np.ones((1, 4), dtype=np.float32), ["x"])
+        assert False, "dimensão incompatível deveria falhar"
+    except ValueError:
+        pass
+
+
+def _roundtrip(tmp_path, export_path, fmt, backend):
+    source = make_store(tmp_path, "src")
+    vectors = np.random.default_rng(0).random((3, 8), dtype=np.float32)
+    source.add_embeddings(vectors, DOCS, META)
+    source.export(str(export_path), format=fmt)
+
+    target = make_store(tmp_path, f"dst_{fmt}_{backend}", backend=backend)
+    assert target.import_(str(export_path), replace=True) == 3
+    assert target.documents == DOCS
+    assert target.metadata == META
+    assert np.allclose(target.index.reconstruct_n(0, 3), vectors)
+    if backend == "numpy" and fmt == "npy":
+        assert isinstance(target.index.vectors, np.memmap)
+
+    # Acrescentar sobre o conteúdo existente
+    target.import_(str(export_path))
+    assert len(target.documents) == 6
+    return target
+
+
+def test_npy_roundtrip_is_memory_mapped(tmp_path):
+    target = _roundtrip(tmp_path, tmp_path / "export", "npy", "numpy")
+    assert (tmp_path / "export" / "manifest.json").exists()
+    assert target.index.ntotal == 6
+
+
+def test_npy_roundtrip_faiss(tmp_path):
+    _roundtrip(tmp_path, tmp_path / "export", "npy", "auto")
+
+
+def test_arrow_roundtrip(tmp_path):
+    if not ARROW_AVAILABLE:
+        return
+    _roundtrip(tmp_path, tmp_path / "export.arrow", "arrow", "numpy")
+
+
+def test_import_rejects_other_embedding_model(tmp_path):
+    source = make_store(tmp_path, "src")
+    source.add_embeddings(np.eye(3, 8, dtype=np.float32), DOCS, META)
+    source.export(str(tmp_path / "export"))
+
+    target = make_store(tmp_path, "dst")
+    target.embedding_model = "text-embedding-3-large"
+    try:
+        target.import_(str(tmp_path / "export"))
+        assert False, "modelo diferente deveria falhar"
+    except ValueError:
+        pass
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testes da migração de modelo de embedding (build em background, shadow read
+e cutover). Não faz chamadas à API.
+"""
+import os
+import time
+import zlib
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import artifacts
+from rag.migration import EmbeddingMigration
+from rag.vector_store import VectorStore
+
+
+OLD, NEW = "text-embedding-3-small", "text-embedding-3-large"
+
+
+def embed(text, model):
+    base = np.random.default_rng(zlib.crc32(text.encode())).random(8, dtype=np.float32)
+    # Modelo novo: outra dimensão, mesma ordenação (overlap@k = 1)
+    return base if model == OLD else np.concatenate([base, np.zeros(4, np.float32)])
+
+
+def fake_embedding(self, text, model=None):
+    return embed(text, model or self.embedding_model)
+
+
+def fake_embeddings(self, texts):
+    return np.array([embed(t, self.embedding_model) for t in texts], dtype=np.float32)
+
+
+def make_store(tmp_path, monkeypatch, n=20):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings)
+    store = VectorStore(persist_directory=str(tmp_path / "legacy"), backend="numpy")
+    docs = [f"doc {i}" for i in range(n)]
+    store.add_documents(docs, [{'source': f"{i}.md"} for i in range(n)])
+    return store
+
+
+def test_shadow_reads_and_cutover(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    root = str(tmp_path / "db")
+    migration = EmbeddingMigration(store, NEW, max_docs_per_second=0, batch_size=4,
+                                   shadow=True, auto_cutover=False, root=root)
+    migration.start()
+    migration.join()
+    assert migration.state == "ready"
+
+    # Ainda servindo com o modelo antigo
+    assert store.embedding_model == OLD and store.dimension == 8
+    for i in range(5):
+        assert migration.search(f"doc {i}", top_k=3)[0]['document'] == f"doc {i}"
+    migration._shadow_executor.submit(lambda: None).result()
+
+    report = migration.report()
+    assert report['shadow_queries'] == 5
+    assert report['overlap_at_k'] == 1.0
+    assert report['shadow_latency_p50'] is not None
+
+    # Documento novo no índice antigo durante o build é reconciliado no cutover
+    store.add_documents(["doc extra"], [{'source': "extra.md"}])
+    version = migration.cutover()
+
+    assert store.embedding_model == NEW and store.dimension == 12
+    assert len(store.documents) == 21
+    assert store.search("doc extra", top_k=1)[0]['document'] == "doc extra"
+    assert artifacts.read_manifest(
+        artifacts.version_dir("knowledge_base", version, root))['embedding_model'] == NEW
+
+    # Na partida, o artefato define o modelo
+    fresh = VectorStore(persist_directory=str(tmp_path / "other"), backend="numpy")
+    assert artifacts.load_current_artifact(fresh, root, verify=True) == version
+    assert fresh.embedding_model == NEW
+
+
+def test_build_is_throttled(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch, n=10)
+    migration = EmbeddingMigration(store, NEW, max_docs_per_second=50, batch_size=5,
+                                   root=str(tmp_path / "db"))
+    started = time.monotonic()
+    migration.start()
+    migration.join()
+    assert time.monotonic() - started >= 0.18
+    assert migration.state == "cutover"
+    assert store.embedding_model == NEW
+
+
+def test_cancel_keeps_old_model(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch, n=10)
+    migration = EmbeddingMigration(store, NEW, max_docs_per_second=5, batch_size=1,
+                                   root=str(tmp_path / "db"))
+    migration.start()
+    migration.cancel(timeout=2)
+    assert migration.state == "cancelled"
+    assert store.embedding_model == OLD and len(store.documents) == 10
+
+
+def test_build_publishes_in_batches_and_cutover_catches_up(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch, n=20)
+    migration = EmbeddingMigration(store, NEW, max_docs_per_second=0, batch_size=4,
+                                   publish_every=2, auto_cutover=False,
+                                   root=str(tmp_path / "db"))
+    migration.start()
+    migration.join()
+    # 5 lotes: publicado após o 2º e o 4º lote e no fim do build
+    assert migration.target.version == 3
+    assert len(migration.target.documents) == 20
+
+    store.add_documents([f"late {i}" for i in range(10)],
+                        [{'source': f"late{i}.md"} for i in range(10)])
+    store.delete_documents("0.md")
+    calls = []
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch",
+                        lambda self, texts: calls.append(len(texts)) or fake_embeddings(self, texts))
+    version = migration.cutover()
+
+    assert calls == [4, 4, 2]
+    assert len(store.documents) == 29
+    assert store.search("late 7", top_k=1)[0]['document'] == "late 7"
+    assert artifacts.read_manifest(artifacts.version_dir(
+        "knowledge_base", version, str(tmp_path / "db")))['build']['caught_up'] == 10
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Testes do rebuild sem downtime da base de conhecimento.
+Não faz chamadas à API.
+"""
+import os
+import time
+import zlib
+import threading
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import artifacts, retriever_tools
+from rag.vector_store import VectorStore
+
+
+def fake_embedding(self, text, model=None):
+    return np.random.default_rng(zlib.crc32(text.encode())).random(8, dtype=np.float32)
+
+
+def slow_embeddings(self, texts):
+    time.sleep(0.2)
+    return np.array([fake_embedding(self, t) for t in texts], dtype=np.float32)
+
+
+def test_searches_keep_serving_old_version_during_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", slow_embeddings)
+    root = str(tmp_path / "db")
+
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    for i in range(4):
+        (kb / f"old{i}.md").write_text(f"antigo {i}")
+
+    store = VectorStore(persist_directory=str(tmp_path / "legacy"), backend="numpy")
+    monkeypatch.setattr(retriever_tools, "_vector_store", store)
+    retriever_tools.rebuild_knowledge_base(str(kb), background=False, root=root, keep=1)
+    assert retriever_tools.get_rebuild_status()['version'] == 1
+    assert len(store.documents) == 4
+
+    for i in range(6):
+        (kb / f"new{i}.md").write_text(f"novo {i}")
+
+    seen = set()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            seen.add(len(store.search("novo 1", top_k=20)))
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for t in readers:
+        t.start()
+    thread = retriever_tools.rebuild_knowledge_base(str(kb), root=root, keep=1)
+    assert retriever_tools.get_rebuild_status()['state'] == 'running'
+    # Segundo pedido durante o rebuild reaproveita a mesma thread
+    assert retriever_tools.rebuild_knowledge_base(str(kb), root=root) is thread
+    thread.join()
+    time.sleep(0.05)
+    stop.set()
+    for t in readers:
+        t.join()
+
+    # Leitores só viram a versão antiga completa ou a nova completa
+    assert seen <= {4, 10} and 10 in seen
+    status = retriever_tools.get_rebuild_status()
+    assert status['state'] == 'done' and status['version'] == 2
+    assert status['removed_versions'] == [1]
+    assert artifacts.read_current("knowledge_base", root) == 2
+    assert artifacts.list_versions("knowledge_base", root) == [2]
+
+
+def test_failed_rebuild_keeps_current_version(tmp_path, monkeypatch):
+    store = VectorStore(persist_directory=str(tmp_path / "legacy"), backend="numpy")
+    store.add_embeddings(np.eye(2, 8, dtype=np.float32), ["a", "b"])
+    monkeypatch.setattr(retriever_tools, "_vector_store", store)
+
+    retriever_tools.rebuild_knowledge_base(str(tmp_path / "vazio"), background=False,
+                                           root=str(tmp_path / "db"))
+    assert retriever_tools.get_rebuild_status()['state'] == 'failed'
+    assert store.documents == ["a", "b"]
+
+
+def test_incremental_publish_during_rebuild_does_not_undo_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", slow_embeddings)
+    root = str(tmp_path / "db")
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "a.md").write_text("antigo")
+
+    store = VectorStore(persist_directory=root, backend="numpy")
+    monkeypatch.setattr(retriever_tools, "_vector_store", store)
+    retriever_tools.rebuild_knowledge_base(str(kb), background=False, root=root, keep=5)
+    (kb / "b.md").write_text("novo")
+
+    # Publicação incremental (watcher/add_document) enquanto o rebuild embeda
+    original = retriever_tools.build_version
+
+    def build_with_concurrent_publish(**kwargs):
+        result = original(**kwargs)
+        artifacts.persist_vector_store(store, root)
+        return result
+
+    monkeypatch.setattr(retriever_tools, "build_version", build_with_concurrent_publish)
+    retriever_tools.rebuild_knowledge_base(str(kb), background=False, root=root, keep=5)
+
+    rebuilt = retriever_tools.get_rebuild_status()['version']
+    assert artifacts.read_current("knowledge_base", root) == rebuilt
+    assert artifacts.list_versions("knowledge_base", root) == [1, 2, 3]
+    restarted = VectorStore(persist_directory=str(tmp_path / "other"), backend="numpy")
+    assert artifacts.load_current_artifact(restarted, root) == rebuilt
+    assert len(restarted.documents) == 2
+
+
+def _write_versions(root, n):
+    vectors = np.eye(2, 4, dtype=np.float32)
+    for _ in range(n):
+        artifacts.write_artifact("kb", vectors, ["a", "b"], [{}, {}], "m", root=root)
+
+
+def test_concurrent_publishers_get_distinct_versions(tmp_path):
+    import multiprocessing
+
+    root = str(tmp_path / "db")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_write_versions, args=(root, 5)) for _ in range(2)]
+    threads = [threading.Thread(target=_write_versions, args=(root, 5)) for _ in range(3)]
+    for worker in processes + threads:
+        worker.start()
+    for worker in processes + threads:
+        worker.join()
+
+    assert all(p.exitcode == 0 for p in processes)
+    assert artifacts.list_versions("kb", root) == list(range(1, 26))
+    assert not list((tmp_path / "db" / "kb").glob(".tmp-*"))
+    for version in (1, 25):
+        ok, problems = artifacts.verify_artifact(artifacts.version_dir("kb", version, root))
+        assert ok, problems
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Testes do watcher da base de conhecimento (atualização incremental).
+Usa embeddings determinísticos locais: não faz chamadas à API.
+"""
+import os
+import time
+import threading
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag.artifacts import (
+    list_versions, load_current_artifact, read_chunking, read_current, write_artifact,
+)
+from rag.vector_store import VectorStore
+from rag.watcher import KnowledgeBaseWatcher
+
+
+class LocalEmbeddingStore(VectorStore):
+    """VectorStore com embeddings determinísticos (hash do texto)."""
+
+    def get_embeddings_batch(self, texts):
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            vectors.append(np.random.default_rng(seed).random(self.dimension))
+        return np.array(vectors, dtype=np.float32)
+
+    def get_embedding(self, text, model=None):
+        return self.get_embeddings_batch([text])[0]
+
+
+def make_store(tmp_path: Path) -> LocalEmbeddingStore:
+    store = LocalEmbeddingStore(
+        collection_name="watch_test",
+        persist_directory=str(tmp_path / "db"),
+    )
+    store.dimension = 16
+    return store
+
+
+def test_apply_updates_replaces_by_source(tmp_path):
+    store = make_store(tmp_path)
+    store.add_documents(["a1", "a2", "b1"], [
+        {'source': 'a'}, {'source': 'a'}, {'source': 'b'},
+    ])
+    old_snapshot = store._snapshot
+
+    result = store.apply_updates(upserts={'a': (["a-new"], [{'source': 'a'}])})
+
+    assert result == {'added': 1, 'removed': 2, 'version': old_snapshot.version + 1}
+    assert sorted(store.documents) == ["a-new", "b1"]
+    assert store.index.ntotal == 2
+    # O snapshot antigo continua íntegro para leitores em andamento
+    assert old_snapshot.documents == ["a1", "a2", "b1"]
+    assert old_snapshot.index.ntotal == 3
+
+    store.delete_documents('b')
+    assert store.documents == ["a-new"]
+    assert store.search("a-new", top_k=1)[0]['document'] == "a-new"
+
+
+def test_concurrent_search_never_torn(tmp_path):
+    store = make_store(tmp_path)
+    store.add_documents([f"doc {i}" for i in range(20)],
+                        [{'source': f's{i}'} for i in range(20)])
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for r in store.search("doc 3", top_k=5):
+                    assert r['metadata']['source'].startswith('s')
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(30):
+        store.apply_updates(upserts={f's{i % 20}': ([f"doc {i} v2"], [{'source': f's{i % 20}'}])})
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(store.documents) == 20
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _run_watcher(tmp_path, use_inotify):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "keep.md").write_text("original")
+    store = make_store(tmp_path)
+    store.add_documents(["original"], [{'source': str(kb / "keep.md")}])
+
+    watcher = KnowledgeBaseWatcher(
+        store, str(kb), debounce=0.2, poll_interval=0.1,
+        use_inotify=use_inotify, persist=False,
+    )
+    watcher.start()
+    try:
+        time.sleep(0.3)
+        (kb / "new.md").write_text("novo documento")
+        (kb / "keep.md").write_text("editado")
+        assert _wait_for(lambda: sorted(store.documents) == ["editado", "novo documento"])
+
+        (kb / "new.md").unlink()
+        assert _wait_for(lambda: store.documents == ["editado"])
+    finally:
+        watcher.stop(timeout=5)
+    return watcher
+
+
+def test_watcher_polling(tmp_path):
+    watcher = _run_watcher(tmp_path, use_inotify=False)
+    assert watcher.backend == 'polling'
+
+
+def test_watcher_inotify_or_fallback(tmp_path):
+    watcher = _run_watcher(tmp_path, use_inotify=True)
+    assert watcher.backend in ('inotify', 'polling')
+
+
+def test_watcher_update_survives_restart_with_artifact(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "keep.md").write_text("original")
+    store = make_store(tmp_path)
+    store.add_documents(["original"], [{'source': str(kb / "keep.md")}])
+    # A coleção já usa artefatos: a partida carrega `current`, não os arquivos legados
+    root = str(tmp_path / "db")
+    vectors, documents, metadata, model = store.snapshot_data()
+    write_artifact("watch_test", vectors, documents, metadata, model, root=root)
+
+    watcher = KnowledgeBaseWatcher(store, str(kb), debounce=0.2, poll_interval=0.1,
+                                   use_inotify=False)
+    watcher.start()
+    try:
+        time.sleep(0.3)
+        (kb / "new.md").write_text("novo documento")
+        assert _wait_for(lambda: read_current("watch_test", root) == 2)
+    finally:
+        watcher.stop(timeout=5)
+
+    restarted = make_store(tmp_path)
+    assert load_current_artifact(restarted, root=root) == 2
+    assert sorted(restarted.documents) == ["novo documento", "original"]
+    assert list_versions("watch_test", root) == [1, 2]
+
+
+def test_watcher_chunks_files_like_the_build(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    store = make_store(tmp_path)
+    store.add_documents(["original"], [{'source': str(kb / "keep.md")}])
+    root = str(tmp_path / "db")
+    vectors, documents, metadata, model = store.snapshot_data()
+    write_artifact("watch_test", vectors, documents, metadata, model, root=root,
+                   build_info={'chunk_size': 40, 'chunk_overlap': 10})
+
+    text = " ".join(f"palavra{i}" for i in range(30))
+    (kb / "long.md").write_text(text)
+    watcher = KnowledgeBaseWatcher(store, str(kb), use_inotify=False)
+    watcher._pending[kb / "long.md"] = time.monotonic()
+    result = watcher.flush()
+
+    chunks = [m for m in store.metadata if m['source'] == str(kb / "long.md")]
+    assert result['added'] == len(chunks) > 1
+    assert [m['chunk'] for m in chunks] == list(range(len(chunks)))
+    assert all(len(d) <= 40 for d in store.documents[1:])
+    # A versão incremental herda o chunking do build
+    assert read_current("watch_test", root) == 2
+    assert read_chunking("watch_test", root=root) == {'chunk_size': 40, 'chunk_overlap': 10}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Testes do histograma de latências (metrics/histogram.py).
+"""
+import json
+import random
+
+from metrics import LatencyHistogram, MetricsTracker, merge_histograms
+
+
+def test_quantiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-1.5, 1.0) for _ in range(50_000)]
+    histogram = LatencyHistogram()
+    histogram.record_many(values)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * len(ordered)) - 1]
+        assert abs(histogram.quantile(q) - exact) / exact < 0.01
+    assert histogram.max == max(values)
+    assert abs(histogram.mean - sum(values) / len(values)) < 1e-9
+    assert len(histogram.counts) < 2000
+
+
+def test_merge_equals_single_histogram():
+    rng = random.Random(3)
+    parts = [[rng.uniform(0.001, 5.0) for _ in range(1000)] for _ in range(3)]
+    single = LatencyHistogram()
+    merged = LatencyHistogram()
+    for part in parts:
+        single.record_many(part)
+        h = LatencyHistogram()
+        h.record_many(part)
+        merged.merge(LatencyHistogram.from_dict(json.loads(json.dumps(h.to_dict()))))
+    assert merged.counts == single.counts
+    for key in ('p50', 'p90', 'p99', 'max', 'count'):
+        assert merged.percentiles()[key] == single.percentiles()[key]
+    assert abs(merged.mean - single.mean) < 1e-9
+
+
+def test_summary_reports_percentiles(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    for i in range(1, 101):
+        tracker.track_tool_call("semantic_search", i / 100, True)
+        tracker.track_retrieval(i / 1000, 3, 0.8, 0.0)
+    summary = tracker.get_summary()
+
+    tool = summary['summary']['latency']['tool']
+    assert tool['count'] == 100
+    assert abs(tool['p50'] - 0.50) < 0.01 and abs(tool['p99'] - 0.99) < 0.01
+    assert tool['max'] == 1.0
+    assert summary['summary']['latency']['embedding']['count'] == 0
+    assert abs(summary['summary']['avg_retrieval_latency'] - 0.0505) < 1e-9
+
+    # Histogramas serializados de duas execuções se combinam
+    merged = merge_histograms([summary['detailed_metrics']['latency_histograms']] * 2)
+    assert merged['tool'].count == 200
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testes da captura automática de chamadas LLM (metrics/llm_hooks.py) e da
+tabela de preços (metrics/pricing.py).
+"""
+import pytest
+
+from metrics import MetricsTracker, load_metrics
+from metrics.llm_hooks import LLMCallTimer, parse_usage
+from metrics.pricing import estimate_cost, find_price, PRICE_TABLE
+
+
+def test_price_lookup_uses_longest_prefix():
+    assert find_price("gpt-4o-mini") == PRICE_TABLE['gpt-4o-mini']
+    assert find_price("openai/gpt-4o-mini-2024-07-18") == PRICE_TABLE['gpt-4o-mini']
+    assert find_price("gpt-4o-2024-08-06") == PRICE_TABLE['gpt-4o']
+    assert find_price("GPT-4.1-nano") == PRICE_TABLE['gpt-4.1-nano']
+    assert find_price("gpt-4-0613") == PRICE_TABLE['gpt-4']
+    assert find_price("llama3") is None
+
+
+def test_estimate_cost_bills_cached_tokens_at_cached_rate():
+    # gpt-4o-mini: 0.15 entrada, 0.075 cache, 0.60 saída (USD / 1M)
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000, cached_tokens=400_000) == \
+        pytest.approx(0.6 * 0.15 + 0.4 * 0.075 + 0.60)
+    # Sem preço de cache: cobra o preço normal de entrada
+    assert estimate_cost("gpt-4", 1000, 0, cached_tokens=1000) == pytest.approx(0.03)
+    assert estimate_cost("modelo-local", 1000, 1000) == 0.0
+
+
+def test_parse_usage_formats():
+    assert parse_usage(None) == (0, 0, 0)
+    crewai = {'prompt_tokens': 120, 'completion_tokens': 30, 'cached_prompt_tokens': 100}
+    assert parse_usage(crewai) == (120, 30, 100)
+    openai = {'prompt_tokens': 50, 'completion_tokens': 5,
+              'prompt_tokens_details': {'cached_tokens': 32}}
+    assert parse_usage(openai) == (50, 5, 32)
+    langchain = {'input_tokens': 10, 'output_tokens': 4,
+                 'input_token_details': {'cache_read': 2}}
+    assert parse_usage(langchain) == (10, 4, 2)
+
+
+def test_timer_records_latency_ttft_and_tokens(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    timer = LLMCallTimer(tracker)
+
+    timer.start("a", "gpt-4o-mini", at=100.0)
+    timer.first_token("a", at=100.4)
+    timer.first_token("a", at=100.9)    # só o primeiro chunk conta
+    timer.finish("a", {'prompt_tokens': 1000, 'completion_tokens': 200,
+                       'cached_prompt_tokens': 800}, at=102.0)
+    # Handlers fora de ordem: o fim chega antes do início
+    timer.finish("b", {'prompt_tokens': 10, 'completion_tokens': 10}, "gpt-4o", at=51.0)
+    timer.start("b", at=50.0)
+    # Falha: descartada, nada gravado
+    timer.start("c", "gpt-4o", at=10.0)
+    timer.discard("c")
+    assert timer.in_flight() == 0
+
+    calls = tracker.metrics['llm_calls']
+    assert [c['model'] for c in calls] == ["gpt-4o-mini", "gpt-4o"]
+    first, second = calls
+    assert first['duration'] == pytest.approx(2.0)
+    assert first['ttft'] == pytest.approx(0.4)
+    assert first['cached_tokens'] == 800
+    assert first['estimated_cost'] == pytest.approx(estimate_cost("gpt-4o-mini", 1000, 200, 800))
+    assert second['ttft'] is None
+
+    summary = tracker.get_summary()
+    assert summary['summary']['total_tokens'] == 1220
+    assert summary['summary']['total_cached_tokens'] == 800
+    assert summary['summary']['latency']['ttft']['count'] == 1
+    by_model = summary['detailed_metrics']['llm_usage_by_model']
+    assert by_model['gpt-4o']['calls'] == 1
+    assert by_model['gpt-4o-mini']['cached_tokens'] == 800
+
+
+def test_crewai_events_reach_tracker(tmp_path):
+    pytest.importorskip("crewai.events")
+    from crewai.events import (
+        crewai_event_bus, LLMCallStartedEvent, LLMCallCompletedEvent, LLMStreamChunkEvent,
+    )
+    from crewai.events.types.llm_events import LLMCallType
+    from metrics import llm_hooks
+
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    with crewai_event_bus.scoped_handlers():
+        llm_hooks._crewai_timer = None
+        try:
+            timer = llm_hooks.install_crewai_llm_hooks(tracker)
+            assert llm_hooks.install_crewai_llm_hooks() is timer
+
+            for event in (
+                LLMCallStartedEvent(call_id="x", model="gpt-4o-mini", messages="oi"),
+                LLMStreamChunkEvent(call_id="x", model="gpt-4o-mini", chunk="o"),
+                LLMCallCompletedEvent(
+                    call_id="x", model="gpt-4o-mini", response="olá",
+                    call_type=LLMCallType.LLM_CALL,
+                    usage={'prompt_tokens': 12, 'completion_tokens': 3,
+                           'cached_prompt_tokens': 0},
+                ),
+            ):
+                future = crewai_event_bus.emit(None, event)
+                if future is not None:
+                    future.result(timeout=5)
+        finally:
+            llm_hooks._crewai_timer = None
+
+    calls = tracker.metrics['llm_calls']
+    assert len(calls) == 1
+    assert calls[0]['tokens_total'] == 15
+    assert calls[0]['ttft'] is not None and calls[0]['ttft'] <= calls[0]['duration']
+
+
+def test_replay_accepts_events_without_new_fields(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text(
+        '{"type": "llm_calls", "duration": 1.0, "tokens_prompt": 10, '
+        '"tokens_completion": 5, "tokens_total": 15, "estimated_cost": 0.001, '
+        '"model": "gpt-4", "timestamp": "2025-01-01T00:00:00"}\n'
+    )
+    tracker = load_metrics(path, output_dir=str(tmp_path))
+    row, = tracker.metrics['llm_calls']
+    assert row['cached_tokens'] == 0 and row['ttft'] is None
+    assert tracker.get_total_tokens() == 15
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Testes da agregação de métricas entre processos (metrics/aggregate.py).
+"""
+import json
+import multiprocessing
+
+import pytest
+
+from metrics import MetricsAggregator, MetricsTracker, attach_segment, merge_summaries
+from metrics.aggregate import segment_path
+
+
+def record(tracker, n, model="gpt-4o-mini"):
+    with tracker.tracer.span("crew.run", kind="crew"):
+        for i in range(n):
+            with tracker.tracer.span("tool: semantic_search", kind="tool"):
+                tracker.track_tool_call("semantic_search", 0.2, i % 4 != 0)
+            tracker.track_retrieval(0.5, 3, 0.8, 0.1)
+        tracker.track_llm_call(2.0, 1000, 500, model=model)
+        tracker.track_agent_task("Engineer", "impl", True, 30.0, quality_score=0.9)
+
+
+def _worker(directory, n):
+    tracker = MetricsTracker(output_dir=directory)
+    attach_segment(tracker, directory, interval=0.05)
+    record(tracker, n)
+    tracker.close()
+
+
+def test_aggregates_segments_from_worker_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_worker, args=(str(tmp_path), n)) for n in (4, 8)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    aggregator = MetricsAggregator(tmp_path)
+    summary = aggregator.summary()
+    assert set(summary['workers']) == {p.pid for p in workers}
+    assert summary['summary']['total_tool_calls'] == 12
+    assert summary['summary']['total_llm_calls'] == 2
+    assert summary['summary']['total_tokens'] == 3000
+    assert summary['summary']['latency']['tool']['count'] == 12
+    tools = summary['detailed_metrics']['tool_efficiency']['semantic_search']
+    assert tools['failed_calls'] == 1 + 2    # i % 4 == 0 falha
+    assert summary['detailed_metrics']['agent_success_rates']['Engineer']['tasks_completed'] == 2
+
+    # Spans dos dois processos, cada um na sua faixa do flame chart
+    spans = aggregator.tracker.tracer.spans()
+    assert len(spans) == 2 + 12
+    assert {s.pid for s in spans} == {p.pid for p in workers}
+    trace = aggregator.tracker.tracer.to_chrome_trace()
+    processes = [e for e in trace['traceEvents'] if e['name'] == 'process_name']
+    assert len(processes) == 2
+    assert len(aggregator.tracker.tracer.to_otlp()['resourceSpans']) == 2
+
+    saved = json.loads(aggregator.save("merged.json").read_text())
+    assert saved['summary']['total_tool_calls'] == 12
+    assert 'chrome' in saved['traces']
+
+
+def test_live_refresh_reads_only_complete_lines(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    attach_segment(tracker, tmp_path, interval=60)
+    aggregator = MetricsAggregator(tmp_path)
+    try:
+        record(tracker, 2)
+        tracker.flush()
+        assert aggregator.summary()['summary']['total_tool_calls'] == 2
+
+        # Nada novo: refresh não reaplica eventos
+        assert aggregator.refresh() == 0
+        record(tracker, 3)
+        tracker.flush()
+        assert aggregator.summary()['summary']['total_tool_calls'] == 5
+        assert len(aggregator.tracker.tracer.spans()) == 2 + 5
+    finally:
+        tracker.close()
+
+    # Linha em escrita por outro worker: só entra quando terminar
+    other = segment_path(tmp_path, pid=1)
+    event = json.dumps({'type': 'tool_usage', 'tool_name': 'read_file', 'duration': 0.1,
+                        'success': True, 'timestamp': '2025-01-01T00:00:00'})
+    other.write_text(event[:20])
+    assert aggregator.refresh() == 0
+    with open(other, 'a') as f:
+        f.write(event[20:] + "\n")
+    assert aggregator.refresh() == 1
+    summary = aggregator.summary()
+    assert summary['detailed_metrics']['tool_efficiency']['read_file']['total_calls'] == 1
+    # O tracker do agregador não acumula os eventos em memória
+    assert aggregator.tracker.buffered_events() == 0
+
+
+def test_merge_summaries_matches_single_session(tmp_path):
+    first, second, single = (MetricsTracker(output_dir=str(tmp_path)) for _ in range(3))
+    record(first, 4)
+    record(second, 8, model="gpt-4o")
+    record(single, 4)
+    record(single, 8, model="gpt-4o")
+
+    merged = merge_summaries([first.get_summary(), None, second.get_summary()])
+    expected = single.get_summary()
+    for key in ('total_tool_calls', 'total_llm_calls', 'total_tokens', 'total_agent_tasks'):
+        assert merged['summary'][key] == expected['summary'][key]
+    assert merged['summary']['total_cost'] == pytest.approx(expected['summary']['total_cost'])
+    assert merged['summary']['latency'] == expected['summary']['latency']
+    assert merged['detailed_metrics']['tool_efficiency'] == \
+        expected['detailed_metrics']['tool_efficiency']
+    assert merged['detailed_metrics']['llm_usage_by_model'] == \
+        expected['detailed_metrics']['llm_usage_by_model']
+    engineer = merged['detailed_metrics']['agent_success_rates']['Engineer']
+    assert engineer['success_rate'] == 1.0 and engineer['quality_scores'] == [0.9, 0.9]
+
+    # Resumos antigos, sem histogramas nem campos novos
+    legacy = merge_summaries([{'summary': {'total_cost': 0.5, 'total_tokens': 10}}])
+    assert legacy['summary']['total_tokens'] == 10 and legacy['summary']['latency'] == {}
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Testes da gravação de eventos do MetricsTracker (metrics/recorder.py).
+"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from metrics import MetricsTracker
+
+
+def test_concurrent_recording_loses_no_events(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+
+    def worker(i):
+        for _ in range(2000):
+            tracker.track_tool_call(f"tool_{i % 2}", 0.5, i != 3)
+            tracker.track_retrieval(0.3, 2, 0.9, 0.1)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    summary = tracker.get_summary()['summary']
+    assert summary['total_tool_calls'] == 12000
+    assert summary['total_retrievals'] == 12000
+    assert abs(summary['avg_retrieval_latency'] - 0.3) < 1e-9
+
+    efficiency = tracker.get_tool_efficiency()
+    assert efficiency['tool_0']['total_calls'] == 6000
+    assert efficiency['tool_1']['failed_calls'] == 2000
+
+
+def test_rows_materialize_in_time_order_with_legacy_shape(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    tracker.track_agent_task("Architect", "t1", True, 2.0)
+    tracker.track_agent_task("Architect", "t2", False, 1.0, quality_score=0.7)
+    tracker.track_llm_call(1.2, 100, 50, model="gpt-4o-mini")
+    tracker.track_query()
+
+    rows = tracker.metrics['agent_performance']
+    assert [r['task_id'] for r in rows] == ["t1", "t2"]
+    assert rows[0] == {
+        'agent_name': "Architect", 'task_id': "t1", 'success': True,
+        'duration': 2.0, 'quality_score': None, 'timestamp': rows[0]['timestamp'],
+    }
+    assert rows[1]['quality_score'] == 0.7
+    assert datetime.fromisoformat(rows[0]['timestamp']) <= datetime.now()
+
+    llm = tracker.metrics['llm_calls'][0]
+    assert llm['model'] == "gpt-4o-mini" and llm['tokens_total'] == 150
+    assert tracker.get_total_tokens() == 150
+    assert tracker.calculate_throughput() == 1
+
+    saved = tracker.save_metrics("m.json").read_text()
+    assert '"raw_metrics"' in saved and '"Architect"' in saved
+
+
+def test_bad_value_does_not_misalign_columns(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    # Tokens como float são convertidos; valores inválidos falham antes do append
+    tracker.track_llm_call(0.1, 10.5, 20)
+    with pytest.raises((TypeError, ValueError)):
+        tracker.track_llm_call(0.2, "muitos", 20)
+    tracker.track_llm_call(0.3, 100, 50, model="gpt-4o-mini")
+
+    calls = tracker.metrics['llm_calls']
+    assert [c['duration'] for c in calls] == [0.1, 0.3]
+    assert [c['tokens_prompt'] for c in calls] == [10, 100]
+    assert calls[1]['model'] == "gpt-4o-mini"
+    assert abs(tracker.get_summary()['summary']['avg_llm_latency'] - 0.2) < 1e-9
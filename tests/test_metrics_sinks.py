@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Testes dos sinks de métricas em streaming (metrics/sinks.py).
+"""
+import json
+import time
+import threading
+
+import pytest
+
+from metrics import (
+    MetricsFlusher,
+    MetricsTracker,
+    RotatingJSONLSink,
+    analyze_spans,
+    create_sinks,
+    load_metrics,
+)
+from metrics.sinks import ARROW_AVAILABLE, JSONLSink, MetricsSink
+
+
+def totals(tracker):
+    """Resumo sem as taxas (dependem do relógio, não dos eventos)."""
+    summary = tracker.get_summary()['summary']
+    summary.pop('rates_per_minute')
+    summary.pop('throughput')
+    return summary
+
+
+def record(tracker, n):
+    for i in range(n):
+        tracker.track_tool_call("semantic_search", 0.2, i % 4 != 0)
+        tracker.track_retrieval(0.5, 3, 0.8, 0.1)
+    tracker.track_llm_call(2.0, 1000, 500, model="gpt-4o-mini")
+    tracker.track_agent_task("Engineer", "impl", True, 30.0, quality_score=0.9)
+    tracker.track_query()
+
+
+def test_flusher_drains_memory_and_summary_survives(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    flusher = tracker.attach_sinks([JSONLSink(tmp_path / "events.jsonl")],
+                                   interval=60, max_buffered=50)
+    record(tracker, 100)
+    expected = tracker.get_summary()
+
+    flusher.flush()
+    assert tracker.buffered_events() == 0
+    assert tracker.metrics['tool_usage'] == []
+    summary = tracker.get_summary()
+    assert summary['summary']['total_tool_calls'] == 100
+    assert summary['summary']['latency'] == expected['summary']['latency']
+    assert summary['detailed_metrics'] == expected['detailed_metrics']
+
+    record(tracker, 10)
+    tracker.close()
+    lines = (tmp_path / "events.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])['type'] == "session"
+    assert len(lines) == 1 + 2 * (110 + 3)
+
+    reloaded = load_metrics(tmp_path / "events.jsonl")
+    assert reloaded.session_id == tracker.session_id
+    assert totals(reloaded) == totals(tracker)
+    assert reloaded.get_tool_efficiency() == tracker.get_tool_efficiency()
+
+
+def test_background_flush_bounds_memory(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    flusher = MetricsFlusher(tracker, create_sinks("rotating", tmp_path / "stream"),
+                             interval=60, max_buffered=500, poll_interval=0.001)
+    tracker.flusher = flusher
+    flusher.start()
+
+    def worker():
+        for i in range(3000):
+            tracker.track_tool_call("file_writer", 0.01, True)
+            if i % 100 == 0:
+                time.sleep(0.002)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    tracker.close()
+
+    assert flusher.flushes > 1
+    assert tracker.get_summary()['summary']['total_tool_calls'] == 12000
+    assert load_metrics(tmp_path / "stream").get_summary()['summary']['total_tool_calls'] == 12000
+
+
+def test_rotating_sink_splits_parts(tmp_path):
+    sink = RotatingJSONLSink(tmp_path, max_bytes=200)
+    for i in range(5):
+        sink.write("tool_usage", [{'tool_name': "x" * 50, 'duration': 0.1,
+                                   'success': True, 'timestamp': "2026-01-01T00:00:00"}] * 2)
+        sink.flush()
+    sink.close()
+    parts = sorted(tmp_path.glob("events-*.jsonl"))
+    assert len(parts) >= 3
+    assert load_metrics(tmp_path).get_tool_efficiency()['x' * 50]['total_calls'] == 10
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"type": "throughput", "timestamp": "2026-01-01T00:00:00"}\n{"type": "thr')
+    assert load_metrics(path).get_summary()['summary']['total_queries'] == 1
+
+
+@pytest.mark.skipif(not ARROW_AVAILABLE, reason="pyarrow não instalado")
+def test_parquet_sink_round_trip(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    flusher = tracker.attach_sinks(create_sinks("parquet", tmp_path), interval=60)
+    record(tracker, 20)
+    flusher.flush()
+    record(tracker, 5)
+    tracker.close()
+    assert len(list((tmp_path / "parquet" / "tool_usage").glob("*.parquet"))) == 2
+    reloaded = load_metrics(tmp_path)
+    assert totals(reloaded) == totals(tracker)
+
+
+def test_sink_interface_is_abstract():
+    with pytest.raises(TypeError):
+        MetricsSink()
+
+
+def test_flushed_spans_leave_the_tracer_and_are_read_back(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"type": "spans", "name": "sessão anterior"}\n')
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    flusher = tracker.attach_sinks([JSONLSink(path)], interval=60)
+    with tracker.tracer.span("crew.run", kind="crew"):
+        with tracker.tracer.span("tool: semantic_search", kind="tool"):
+            pass
+    flusher.flush()
+    assert tracker.tracer.spans() == []
+
+    with tracker.tracer.span("crew.run", kind="crew"):
+        pass
+    names = [span.name for span in tracker.trace().spans()]
+    assert sorted(names) == ["crew.run", "crew.run", "tool: semantic_search"]
+    assert tracker.get_summary()['detailed_metrics']['run_analysis']['runs'] == 2
+
+    tracker.close()
+    saved = json.loads(tracker.save_metrics("m.json").read_text())
+    trace = json.loads((tmp_path / "m.trace.json").read_text())
+    assert len([e for e in trace['traceEvents'] if e['ph'] == "X"]) == 3
+    assert saved['traces']['otlp'].endswith("m.otlp.json")
+
+
+def test_jsonl_and_parquet_of_a_session_are_not_double_counted(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    tracker.attach_sinks([JSONLSink(tmp_path / "events.jsonl")], interval=60)
+    record(tracker, 5)
+    tracker.close()
+    # Mesmos eventos em Parquet (create_sinks("jsonl,parquet")): ignorados
+    parquet = tmp_path / "parquet" / "tool_usage"
+    parquet.mkdir(parents=True)
+    (parquet / "part-00001.parquet").write_bytes(b"PAR1")
+    assert load_metrics(tmp_path).get_summary()['summary']['total_tool_calls'] == 5
+
+
+def test_summary_uses_span_aggregates_instead_of_rereading_the_sink(tmp_path, monkeypatch):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    flusher = tracker.attach_sinks([JSONLSink(tmp_path / "events.jsonl")], interval=60)
+    with tracker.tracer.span("crew.run", kind="crew"):
+        with tracker.tracer.span("task: prd", kind="task", task_id="t1"):
+            with tracker.tracer.span("llm", kind="llm"):
+                time.sleep(0.01)
+        # Execução ainda aberta: a task vai para o sink antes da raiz
+        flusher.flush()
+    with tracker.tracer.span("crew.run", kind="crew"):
+        pass
+    flusher.flush()
+    assert tracker.tracer.spans() == []
+
+    def reread(*args):
+        raise AssertionError("get_summary releu o sink")
+    monkeypatch.setattr(flusher.span_archive, "read_events", reread)
+    analysis = tracker.get_summary()['detailed_metrics']['run_analysis']
+    assert analysis['runs'] == 2
+    assert analysis['tasks']['count'] == 1
+    assert analysis['time_by_category']['llm'] >= 0.01
+    tracker.print_summary()
+
+    monkeypatch.undo()
+    tracker.close()
+    assert analysis == analyze_spans(tracker.trace().spans())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Testes do backend NumPy (fallback sem FAISS) do vector store.
+Não faz chamadas à API.
+"""
+import os
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag.numpy_index import NumpyIndex
+from rag.vector_store import VectorStore, FAISS_AVAILABLE
+
+
+def brute_force(vectors, query, k):
+    dist = ((vectors - query) ** 2).sum(axis=1)
+    order = np.argsort(dist)[:k]
+    return dist[order], order
+
+
+def test_search_matches_brute_force_across_blocks():
+    rng = np.random.default_rng(0)
+    vectors = rng.random((1000, 32), dtype=np.float32)
+    queries = rng.random((3, 32), dtype=np.float32)
+
+    index = NumpyIndex(32, block_size=128)
+    index.add(vectors[:600])
+    index.add(vectors[600:])
+    distances, indices = index.search(queries, 10)
+
+    for q in range(3):
+        expected_d, expected_i = brute_force(vectors, queries[q], 10)
+        assert list(indices[q]) == list(expected_i)
+        assert np.allclose(distances[q], expected_d, rtol=1e-4, atol=1e-4)
+
+
+def test_pads_with_minus_one_when_k_exceeds_ntotal():
+    index = NumpyIndex(4)
+    index.add(np.eye(4, dtype=np.float32)[:2])
+    distances, indices = index.search(np.ones((1, 4), dtype=np.float32), 5)
+    assert list(indices[0][2:]) == [-1, -1, -1]
+    assert np.isinf(distances[0][2:]).all()
+
+
+def test_float16_and_mmap_roundtrip(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.random((200, 16), dtype=np.float32)
+    index = NumpyIndex(16, dtype=np.float16)
+    index.add(vectors)
+    index.save(tmp_path / "v.npy")
+
+    loaded = NumpyIndex.load(tmp_path / "v.npy", mmap=True)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.dtype == np.float16
+    _, expected_i = brute_force(vectors, vectors[7], 1)
+    _, indices = loaded.search(vectors[7:8], 1)
+    assert indices[0][0] == expected_i[0] == 7
+
+    # Copy-on-write a partir de um memmap gera matriz própria
+    clone = loaded.copy()
+    clone.add(vectors[:1])
+    assert clone.ntotal == 201 and loaded.ntotal == 200
+
+
+def test_vector_store_numpy_backend_persists_npy(tmp_path):
+    store = VectorStore(collection_name="np", persist_directory=str(tmp_path),
+                        backend="numpy")
+    store.dimension = 8
+    vectors = np.eye(8, dtype=np.float32)[:3]
+    store.get_embeddings_batch = lambda texts: vectors[:len(texts)]
+    store.get_embedding = lambda text, model=None: vectors[["a", "b", "c"].index(text)]
+
+    store.add_documents(["a", "b", "c"], [{'source': s} for s in "abc"])
+    assert store.search("b", top_k=1)[0]['document'] == "b"
+    store.save_index()
+    assert (tmp_path / "np.npy").exists()
+    assert not (tmp_path / "np.index").exists()
+
+    reloaded = VectorStore(collection_name="np", persist_directory=str(tmp_path),
+                           backend="numpy")
+    assert reloaded.get_stats()['backend'] == "numpy"
+    assert reloaded.documents == ["a", "b", "c"]
+    assert reloaded.index.ntotal == 3
+
+
+def test_numpy_matches_faiss_when_available():
+    if not FAISS_AVAILABLE:
+        return
+    import faiss
+
+    rng = np.random.default_rng(2)
+    vectors = rng.random((500, 24), dtype=np.float32)
+    queries = rng.random((4, 24), dtype=np.float32)
+
+    flat = faiss.IndexFlatL2(24)
+    flat.add(vectors)
+    index = NumpyIndex(24, block_size=100)
+    index.add(vectors)
+
+    f_d, f_i = flat.search(queries, 8)
+    n_d, n_i = index.search(queries, 8)
+    assert (f_i == n_i).all()
+    assert np.allclose(f_d, n_d, rtol=1e-4, atol=1e-4)
+
+
+def test_float64_vectors_are_converted(tmp_path):
+    from rag.embedding_io import write_export
+
+    vectors = np.eye(8)[:3]
+    assert vectors.dtype == np.float64
+    index = NumpyIndex.from_vectors(vectors)
+    assert index.dtype == np.float32 and index.ntotal == 3
+
+    store = VectorStore(collection_name="np64", persist_directory=str(tmp_path),
+                        backend="numpy", vector_dtype="float16")
+    store.get_embedding = lambda text, model=None: vectors[["a", "b", "c"].index(text)]
+    export = write_export(tmp_path / "export", vectors, ["a", "b", "c"],
+                          [{'source': s} for s in "abc"],
+                          info={'embedding_model': store.embedding_model})
+    assert store.import_(str(export), replace=True) == 3
+    assert store.index.dtype == np.float16
+    assert store.search("c", top_k=1)[0]['document'] == "c"
+
+    store.switch_model("outro-modelo", np.eye(4)[:2], ["x", "y"], [{}, {}])
+    assert store.dimension == 4 and store.index.ntotal == 2
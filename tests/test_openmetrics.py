@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Testes do endpoint OpenMetrics (metrics/openmetrics.py).
+"""
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import MetricsTracker
+from metrics.histogram import LatencyHistogram
+from metrics.openmetrics import CONTENT_TYPE, LabelLimiter, render_openmetrics, start_exporter
+
+
+def samples(text):
+    """{'nome{labels}': valor} das linhas de amostra."""
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            result[name] = float(value)
+    return result
+
+
+def populated_tracker(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    tracker.track_retrieval(0.2, 5, 0.9, embedding_latency=0.05)
+    tracker.track_llm_call(1.5, 1000, 200, model="gpt-4o-mini", cached_tokens=400)
+    tracker.track_llm_call(0.5, 500, 100, model="gpt-4o-mini")
+    tracker.track_tool_call("retrieve_context", 0.1, True)
+    tracker.track_tool_call("retrieve_context", 0.1, False)
+    tracker.track_agent_task("Architect", "t1", True, 30.0)
+    return tracker
+
+
+def test_exposition_covers_counters_histograms_and_gauges(tmp_path):
+    tracker = populated_tracker(tmp_path)
+    with tracker.tracer.span("crew.run", kind="crew"):
+        with tracker.tracer.span("task", kind="task"):
+            text = render_openmetrics(tracker)
+
+    assert text.endswith("# EOF\n")
+    values = samples(text)
+    assert values['crewai_retrievals_total'] == 1
+    assert values['crewai_llm_calls_total{model="gpt-4o-mini"}'] == 2
+    assert values['crewai_llm_tokens_total{model="gpt-4o-mini",type="prompt"}'] == 1500
+    assert values['crewai_llm_cached_tokens_total{model="gpt-4o-mini"}'] == 400
+    assert values['crewai_llm_prompt_cache_hit_ratio'] == pytest.approx(400 / 1500)
+    assert values['crewai_llm_cost_usd_total{model="gpt-4o-mini"}'] == pytest.approx(
+        tracker.get_total_cost())
+    assert values['crewai_tool_calls_total{tool="retrieve_context",status="failure"}'] == 1
+    assert values['crewai_tool_success_ratio{tool="retrieve_context"}'] == 0.5
+    assert values['crewai_agent_tasks_total{agent="Architect",status="success"}'] == 1
+
+    # Histograma cumulativo em segundos
+    assert values['crewai_latency_seconds_bucket{operation="llm",le="1.0"}'] == 1
+    assert values['crewai_latency_seconds_bucket{operation="llm",le="+Inf"}'] == 2
+    assert values['crewai_latency_seconds_sum{operation="llm"}'] == pytest.approx(2.0)
+    assert "# UNIT crewai_latency_seconds seconds" in text
+    assert 'crewai_llm_calls_created{model="gpt-4o-mini"}' in values
+
+    assert values['crewai_active_runs'] == 1
+    assert values['crewai_spans_in_progress{kind="task"}'] == 1
+    assert values['crewai_buffered_events'] == tracker.buffered_events()
+    assert samples(render_openmetrics(tracker))['crewai_active_runs'] == 0
+
+
+def test_label_cardinality_is_bounded(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    for i in range(5):
+        tracker.track_tool_call(f"tool_{i}", 0.1, True)
+    limiter = LabelLimiter(max_values=2)
+    values = samples(render_openmetrics(tracker, limiter))
+    tools = {name for name in values if name.startswith("crewai_tool_calls_total")
+             and 'status="success"' in name}
+    assert tools == {'crewai_tool_calls_total{tool="tool_0",status="success"}',
+                     'crewai_tool_calls_total{tool="tool_1",status="success"}',
+                     'crewai_tool_calls_total{tool="other",status="success"}'}
+    assert values['crewai_tool_calls_total{tool="other",status="success"}'] == 3
+    # Valores já admitidos continuam estáveis entre scrapes
+    assert limiter("crewai_tool_calls", "tool", "tool_1") == "tool_1"
+    assert limiter("crewai_tool_calls", "tool", 'quote"d') == "other"
+
+
+def test_cumulative_counts_follow_bucket_bounds():
+    histogram = LatencyHistogram()
+    histogram.record_many([0.001, 0.02, 0.5, 3.0])
+    assert histogram.cumulative_counts([0.005, 0.1, 1.0, 10.0]) == [1, 2, 3, 4]
+
+
+def test_http_endpoint_serves_current_tracker(tmp_path):
+    tracker = populated_tracker(tmp_path)
+    exporter = start_exporter(tracker, port=0)
+    try:
+        with urllib.request.urlopen(exporter.url, timeout=5) as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            body = response.read().decode()
+        assert samples(body)['crewai_retrievals_total'] == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(exporter.url.replace("/metrics", "/other"), timeout=5)
+    finally:
+        exporter.stop()
+    exporter.stop()   # idempotente
+
+
+def test_exposition_parses_with_prometheus_client(tmp_path):
+    parser = pytest.importorskip("prometheus_client.openmetrics.parser")
+    text = render_openmetrics(populated_tracker(tmp_path))
+    names = {family.name for family in parser.text_string_to_metric_families(text)}
+    assert {'crewai_llm_calls', 'crewai_latency_seconds', 'crewai_active_runs'} <= names
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Testes do modo --profile (metrics/profiling.py).
+"""
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from metrics import MetricsTracker, RunProfiler, enable_profiling
+from metrics.profiling import BETWEEN_TASKS, SETUP_PHASE, current_rss
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+def test_boundaries_record_memory_cpu_and_allocation_sites():
+    profiler = RunProfiler(sample_interval=0).start()
+    try:
+        profiler.task_started("Create PRD")
+        blob = [bytearray(1024) for _ in range(2000)]   # ~2 MB vivos na task
+        busy(0.05)
+        profiler.task_finished("Create PRD")
+    finally:
+        profiler.stop()
+    assert not tracemalloc.is_tracing()
+
+    labels = [b['label'] for b in profiler.boundaries]
+    assert labels == ["start", "task started: Create PRD",
+                      "task completed: Create PRD", "end"]
+    task_end = profiler.boundaries[2]
+    assert task_end['phase'] == "Create PRD"
+    assert task_end['cpu_seconds'] > 0.02
+    assert task_end['traced_peak_bytes'] >= 2000 * 1024
+    top = task_end['top_allocations'][0]
+    assert __file__ in top['site'] and top['size_diff_bytes'] >= 2000 * 1024
+    assert current_rss() > 0
+
+    phases = profiler.phases()
+    assert set(phases) == {SETUP_PHASE, "Create PRD", BETWEEN_TASKS}
+    assert phases["Create PRD"]['wall_seconds'] >= 0.05
+    del blob
+
+
+def test_sampler_attributes_stacks_to_current_task():
+    profiler = RunProfiler(sample_interval=0.002).start()
+    try:
+        profiler.task_started("Implement")
+        busy(0.2)
+        profiler.task_finished("Implement")
+    finally:
+        profiler.stop()
+
+    assert profiler.samples > 10
+    lines = profiler.collapsed_stacks()
+    hot = [line for line in lines if line.startswith("Implement;MainThread;")]
+    assert any("busy (test_profiling.py)" in line for line in hot)
+    stack, count = hot[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    # A thread do próprio profiler não entra nas amostras
+    assert not any("metrics-profiler" in line for line in lines)
+    assert profiler.phases()["Implement"]['samples'] > 0
+
+
+def test_profile_is_attached_to_metrics_file(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    profiler = enable_profiling(tracker, sample_interval=0.005)
+    assert tracker.profiler is profiler
+    profiler.task_started("Review")
+    busy(0.05)
+    profiler.task_finished("Review")
+    profiler.stop()
+    profiler.stop()   # idempotente
+
+    path = tracker.save_metrics("run.json")
+    saved = json.loads(path.read_text())
+    assert saved['profile']['peak_rss_bytes'] > 0
+    assert "Review" in saved['profile']['phases']
+    collapsed = tmp_path / "run.collapsed.txt"
+    assert saved['profile']['collapsed'] == str(collapsed)
+    assert collapsed.read_text().strip()
+
+
+def test_crewai_task_events_mark_boundaries(tmp_path, monkeypatch):
+    pytest.importorskip("crewai.events")
+    from crewai.events import crewai_event_bus, TaskStartedEvent, TaskCompletedEvent
+    from crewai.tasks.task_output import TaskOutput
+    from metrics import profiling
+
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr("metrics.metrics_tracker.global_tracker", tracker)
+    monkeypatch.setattr(profiling, "_crewai_installed", False)
+
+    def emit(event):
+        future = crewai_event_bus.emit(None, event)
+        if future is not None:
+            future.result(timeout=5)
+
+    with crewai_event_bus.scoped_handlers():
+        profiler = enable_profiling(tracker, sample_interval=0)
+        try:
+            emit(TaskStartedEvent(context=None, task_id="t1", task_name="Create PRD"))
+            output = TaskOutput(description="Create PRD", agent="PM", raw="# PRD")
+            emit(TaskCompletedEvent(output=output, task_id="t1", task_name="Create PRD"))
+        finally:
+            profiler.stop()
+
+    assert [b['label'] for b in profiler.boundaries] == [
+        "start", "task started: Create PRD", "task completed: Create PRD", "end"]
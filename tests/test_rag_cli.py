@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Testes do CLI do índice (python -m rag build|status|verify|compact).
+Não faz chamadas à API.
+"""
+import os
+import zlib
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import artifacts, cli
+from rag.vector_store import VectorStore
+
+
+def fake_embeddings(self, texts):
+    rows = []
+    for text in texts:
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        rows.append(rng.random(8, dtype=np.float32))
+    return np.array(rows, dtype=np.float32)
+
+
+def make_kb(tmp_path, n=10):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    for i in range(n):
+        (kb / f"doc{i}.md").write_text(f"# Documento {i}\n\nconteúdo {i}")
+    return kb
+
+
+def run(tmp_path, *argv):
+    return cli.main(["--root", str(tmp_path / "db"), *argv])
+
+
+def test_build_writes_versioned_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings)
+    kb = make_kb(tmp_path)
+    root = str(tmp_path / "db")
+
+    assert run(tmp_path, "build", "--source", str(kb), "--workers", "3",
+               "--batch-size", "3") == 0
+    assert artifacts.read_current("knowledge_base", root) == 1
+
+    path = artifacts.version_dir("knowledge_base", 1, root)
+    manifest = artifacts.read_manifest(path)
+    assert manifest['count'] == 10 and manifest['dimension'] == 8
+    assert "vectors.npy" in manifest['files']
+
+    # Lotes paralelos mantêm o alinhamento vetor/documento
+    store = VectorStore(persist_directory=str(tmp_path / "legacy"), backend="numpy")
+    assert artifacts.load_current_artifact(store, root, verify=True) == 1
+    for i, doc in enumerate(store.documents):
+        assert np.allclose(store.index.reconstruct_n(i, 1)[0],
+                           fake_embeddings(None, [doc])[0])
+
+    assert run(tmp_path, "build", "--source", str(kb), "--no-promote") == 0
+    assert artifacts.list_versions("knowledge_base", root) == [1, 2]
+    assert artifacts.read_current("knowledge_base", root) == 1
+    assert run(tmp_path, "status") == 0
+
+
+def test_verify_detects_corruption(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings)
+    kb = make_kb(tmp_path, n=3)
+    assert run(tmp_path, "build", "--source", str(kb)) == 0
+    assert run(tmp_path, "verify") == 0
+
+    path = artifacts.version_dir("knowledge_base", 1, str(tmp_path / "db"))
+    data = bytearray((path / "documents.txt").read_bytes())
+    data[0] ^= 0xFF
+    (path / "documents.txt").write_bytes(bytes(data))
+
+    ok, problems = artifacts.verify_artifact(path)
+    assert not ok and "documents.txt" in problems[0]
+    assert run(tmp_path, "verify") == 1
+
+
+def test_compact_drops_duplicates_and_prunes(tmp_path):
+    root = str(tmp_path / "db")
+    vectors = np.eye(4, 8, dtype=np.float32)
+    documents = ["a", "b", "a", ""]
+    metadata = [{'source': 'a.md'}, {'source': 'b.md'}, {'source': 'a.md'}, {'source': 'c.md'}]
+    for _ in range(3):
+        artifacts.write_artifact("knowledge_base", vectors, documents, metadata,
+                                 "text-embedding-3-small", root=root)
+
+    assert run(tmp_path, "compact", "--keep", "1") == 0
+    assert artifacts.list_versions("knowledge_base", root) == [4]
+    path = artifacts.version_dir("knowledge_base", 4, root)
+    manifest = artifacts.read_manifest(path)
+    assert manifest['count'] == 2
+    assert manifest['build'] == {'compacted_from': 3, 'dropped': 2}
+    assert artifacts.verify_artifact(path)[0]
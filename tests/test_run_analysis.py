@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Testes do caminho crítico e da decomposição do tempo (metrics/analysis.py).
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import MetricsTracker, analyze_spans, merge_run_analyses, merge_summaries
+from metrics.analysis import task_dependencies
+
+
+def make_span(span_id, name, kind, start, end, parent=None, trace="t1", **attributes):
+    """Span.to_dict() sintético, com tempos em segundos."""
+    return {'name': name, 'kind': kind, 'trace_id': trace, 'span_id': span_id,
+            'parent_id': parent, 'start_ns': int(start * 1e9), 'end_ns': int(end * 1e9),
+            'attributes': attributes}
+
+
+def run_spans(trace="t1", **root_attributes):
+    """
+    Execução de 10s: task A (LLM + escrita de arquivo), 1s ocioso, task B
+    (busca com embedding + LLM) e 1s ocioso no fim.
+    """
+    p = f"{trace}-"
+    return [
+        make_span(p + "run", "crew.run", "crew", 0, 10, trace=trace, **root_attributes),
+        make_span(p + "a", "task: PRD", "task", 0, 4, p + "run", trace, task_id="a"),
+        make_span(p + "a-llm", "llm: gpt-4o-mini", "llm", 0.5, 3, p + "a", trace),
+        make_span(p + "a-io", "tool: write_file", "tool", 3, 3.5, p + "a", trace),
+        make_span(p + "b", "task: Arquitetura", "task", 5, 9, p + "run", trace, task_id="b"),
+        make_span(p + "b-ret", "vector_store.search", "retrieval", 5, 6, p + "b", trace),
+        make_span(p + "b-emb", "vector_store.embedding", "embedding", 5, 5.2, p + "b-ret", trace),
+        make_span(p + "b-llm", "llm: gpt-4o-mini", "llm", 6, 8.5, p + "b", trace),
+    ]
+
+
+def test_time_is_split_by_most_specific_category():
+    analysis = analyze_spans(run_spans())
+    times = analysis['time_by_category']
+    assert analysis['total_seconds'] == pytest.approx(10)
+    assert times['llm'] == pytest.approx(5)
+    assert times['embedding'] == pytest.approx(0.2)
+    assert times['retrieval'] == pytest.approx(0.8)
+    assert times['file_io'] == pytest.approx(0.5)
+    assert times['framework'] == pytest.approx(1.5)
+    assert times['idle'] == pytest.approx(2)
+    assert sum(analysis['shares'].values()) == pytest.approx(1)
+
+    gap = analysis['idle_gaps'][0]
+    assert gap['seconds'] == pytest.approx(1) and gap['offset'] == pytest.approx(4)
+    assert (gap['after_task'], gap['before_task']) == ("PRD", "Arquitetura")
+    assert analysis['idle_gaps'][1]['before_task'] is None
+
+
+def test_critical_path_follows_latest_finishing_children():
+    spans = run_spans()
+    # Chamada paralela que termina antes: fora do caminho crítico
+    spans.append(make_span("t1-side", "tool: list_files", "tool", 0.5, 1, "t1-a"))
+    critical = analyze_spans(spans)['critical_path']
+    assert critical['seconds'] == pytest.approx(10)
+    assert critical['by_category']['llm'] == pytest.approx(5)
+    assert critical['by_category']['idle'] == pytest.approx(2)
+    assert 'file_io' in critical['by_category']
+    assert critical['by_category']['file_io'] == pytest.approx(0.5)
+    assert sum(critical['by_category'].values()) == pytest.approx(10)
+    assert critical['top_segments'][0]['category'] == 'llm'
+    assert critical['top_segments'][0]['seconds'] == pytest.approx(2.5)
+
+
+def test_speedup_uses_recorded_dependencies_or_assumes_sequential():
+    sequential = analyze_spans(run_spans())['tasks']
+    assert sequential['dependencies'] == 'assumed_sequential'
+    assert sequential['parallel_groups'] == [["PRD"], ["Arquitetura"]]
+    assert sequential['estimated_speedup'] == pytest.approx(1)
+
+    independent = analyze_spans(run_spans(task_dependencies=json.dumps({'a': [], 'b': []})))
+    tasks = independent['tasks']
+    assert tasks['dependencies'] == 'recorded'
+    assert tasks['sequential_seconds'] == pytest.approx(8)
+    assert tasks['parallel_seconds'] == pytest.approx(4)
+    assert tasks['parallel_groups'] == [["PRD", "Arquitetura"]]
+    assert tasks['estimated_run_seconds'] == pytest.approx(6)
+    assert tasks['estimated_speedup'] == pytest.approx(10 / 6)
+
+
+def test_task_dependencies_read_crewai_context():
+    a, b, c = (SimpleNamespace(id=i, context=None) for i in "abc")
+    c.context = [a]
+    crew = SimpleNamespace(tasks=[a, b, c])
+    assert task_dependencies(crew) == {'a': [], 'b': ['a'], 'c': ['a']}
+
+
+def test_runs_are_analyzed_per_trace_and_merged():
+    analysis = analyze_spans(run_spans("t1") + run_spans("t2"))
+    assert analysis['runs'] == 2
+    assert analysis['total_seconds'] == pytest.approx(20)
+    assert analysis['time_by_category']['llm'] == pytest.approx(10)
+    assert analysis['tasks']['count'] == 4
+    assert merge_run_analyses([analysis, None])['runs'] == 2
+    assert analyze_spans([]) is None
+
+
+def test_summary_reports_and_merges_run_analysis(tmp_path, capsys):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    with tracker.tracer.span("crew.run", kind="crew"):
+        with tracker.tracer.span("task: PRD", kind="task", task_id="a"):
+            with tracker.tracer.span("tool: write_file", kind="tool"):
+                pass
+    summary = tracker.get_summary()
+    analysis = summary['detailed_metrics']['run_analysis']
+    assert analysis['runs'] == 1 and analysis['tasks']['count'] == 1
+    assert analysis['time_by_category']['file_io'] > 0
+
+    tracker.print_summary()
+    assert "CAMINHO CRÍTICO" in capsys.readouterr().out
+
+    merged = merge_summaries([summary, summary])
+    assert merged['detailed_metrics']['run_analysis']['runs'] == 2
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Testes da extração de trechos relevantes à query (rag/snippets.py).
+Não faz chamadas à API.
+"""
+import numpy as np
+
+from rag.snippets import EmbeddingScorer, extract_snippet, split_units
+
+
+DOC = "\n".join(
+    ["# Guia de Arquitetura", "", "Introdução geral ao documento."]
+    + [f"Seção genérica {i} sobre assuntos diversos." for i in range(20)]
+    + ["## Cache", "Use Redis para cache de sessões com TTL curto.",
+       "Invalide o cache de sessões ao trocar a senha."]
+    + [f"Rodapé {i}." for i in range(10)]
+)
+
+
+def test_picks_matching_window_with_line_offsets():
+    snippet = extract_snippet(DOC, "como configurar cache de sessões no Redis", max_chars=120)
+    assert "Redis" in snippet['text']
+    assert snippet['start_line'] in (24, 25)
+    assert snippet['end_line'] >= 26
+    assert len(snippet['text']) <= 123
+    assert snippet['score'] > 0
+
+
+def test_falls_back_to_first_lines_without_overlap():
+    snippet = extract_snippet(DOC, "kubernetes", max_chars=60)
+    assert snippet['start_line'] == 1
+    assert snippet['text'].startswith("# Guia de Arquitetura")
+    assert snippet['score'] == 0.0
+
+
+def test_long_lines_are_split_into_sentences():
+    paragraph = "Primeira frase qualquer. " * 30 + "A frase sobre FAISS fica aqui. Fim."
+    units = split_units("título\n" + paragraph, max_unit_chars=100)
+    assert all(line in (1, 2) for line, _ in units)
+    snippet = extract_snippet("título\n" + paragraph, "FAISS", max_chars=100)
+    assert "FAISS" in snippet['text'] and snippet['start_line'] == 2
+
+
+class FakeStore:
+    embedding_model = "fake"
+
+    def __init__(self):
+        self.batch_calls = 0
+        self.query_calls = 0
+
+    def _vector(self, text):
+        return np.array([text.count("cache"), text.count("Rodapé"), 1.0], dtype=np.float32)
+
+    def get_embedding(self, text, model=None):
+        self.query_calls += 1
+        return self._vector(text)
+
+    def get_embeddings_batch(self, texts):
+        self.batch_calls += 1
+        return np.array([self._vector(t) for t in texts])
+
+
+def test_embedding_scorer_caches_line_vectors():
+    store = FakeStore()
+    scorer = EmbeddingScorer(store)
+    snippet = extract_snippet(DOC, "cache cache", max_chars=60, scorer=scorer)
+    assert "cache" in snippet['text']
+    extract_snippet(DOC, "outra query com cache", max_chars=60, scorer=scorer)
+    assert store.batch_calls == 1
+
+
+def test_query_is_embedded_once_per_search():
+    store = FakeStore()
+    scorer = EmbeddingScorer(store).for_query("cache cache")
+    for document in (DOC, DOC + "\nmais cache", "sem nada"):
+        extract_snippet(document, "cache cache", max_chars=60, scorer=scorer)
+    assert store.query_calls == 1
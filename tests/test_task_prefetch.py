@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Testes da pré-busca de contexto das tasks (rag/prefetch.py).
+Não faz chamadas à API.
+"""
+import os
+
+from types import SimpleNamespace
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import retriever_tools
+from rag.prefetch import (
+    TASK_QUERIES,
+    apply_task_contexts,
+    build_task_queries,
+    format_task_context,
+    prefetch_task_contexts,
+)
+from rag.vector_store import VectorStore
+
+
+WORDS = ["requirements", "architecture", "code", "test", "readme"]
+
+
+def fake_embedding(self, text, model=None):
+    vector = np.array([text.lower().count(w) for w in WORDS], dtype=np.float32) + 0.01
+    return vector / np.linalg.norm(vector)
+
+
+def make_store(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_batch(self, texts):
+        calls.append(len(texts))
+        return np.array([fake_embedding(self, t) for t in texts], dtype=np.float32)
+
+    monkeypatch.setattr(VectorStore, "get_embedding", fake_embedding)
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_batch)
+    store = VectorStore(persist_directory=str(tmp_path), backend="numpy")
+    monkeypatch.setattr(retriever_tools, "_vector_store", store)
+    return store, calls
+
+
+def test_prefetch_embeds_once_and_fills_every_task(tmp_path, monkeypatch):
+    store, calls = make_store(tmp_path, monkeypatch)
+    store.add_documents(
+        ["# PRD\nrequirements requirements", "# Arquitetura\narchitecture layers",
+         "# Exemplo\ncode code", "# Testes\ntest test", "# Docs\nreadme readme"],
+        [{'source': f"knowledge_base/{n}.md"} for n in ("prd", "arch", "code", "test", "docs")],
+    )
+    calls.clear()
+
+    contexts = prefetch_task_contexts("CLI de tarefas", top_k=1, score_threshold=None)
+    assert calls == [len(TASK_QUERIES)]
+    assert set(contexts) == set(TASK_QUERIES)
+    assert "prd.md" in contexts['prd'] and "requirements" in contexts['prd']
+    assert "test.md" in contexts['testing']
+
+    block = format_task_context(contexts['prd'])
+    assert block.startswith("\n\nKNOWLEDGE BASE CONTEXT") and contexts['prd'] in block
+    assert format_task_context("") == ""
+
+
+def test_prefetch_with_empty_knowledge_base(tmp_path, monkeypatch):
+    make_store(tmp_path, monkeypatch)
+    assert prefetch_task_contexts("qualquer ideia") == {}
+
+
+def test_queries_include_project_idea():
+    queries = build_task_queries("  API   de\npagamentos ")
+    assert all(q.endswith("API de pagamentos") for q in queries.values())
+
+
+def test_contexts_are_appended_to_built_tasks_in_order():
+    tasks = [SimpleNamespace(description=f"task {i}") for i in range(5)]
+    apply_task_contexts(tasks, {'architecture': "camadas", 'documentation': "readme"})
+    assert tasks[0].description == "task 0"
+    assert tasks[1].description.startswith("task 1\n\nKNOWLEDGE BASE CONTEXT")
+    assert tasks[1].description.endswith("camadas")
+    assert tasks[4].description.endswith("readme")
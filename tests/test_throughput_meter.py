@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Testes dos medidores de throughput (metrics/throughput.py).
+"""
+from metrics import MetricsTracker
+from metrics.throughput import ThroughputMeter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_windows_expire_old_buckets():
+    clock = FakeClock()
+    meter = ThroughputMeter(clock=clock)
+    for _ in range(30):
+        meter.mark()
+        clock.now += 2          # 30 eventos em 60 s
+    # Agora = 1060: a janela de 60 s cobre (1000, 1060]
+    assert meter.window_count(60) == 29
+    clock.now += 30
+    assert meter.window_count(60) == 14
+    assert meter.window_count(300) == 30
+    assert meter.window_count(45) == 7   # janela não configurada
+    clock.now += 3600
+    assert meter.window_count(900) == 0
+    assert meter.count == 30
+
+
+def test_ewma_converges_and_decays():
+    clock = FakeClock()
+    meter = ThroughputMeter(clock=clock)
+    for _ in range(600):        # 2 eventos/s por 10 min
+        meter.mark(2)
+        clock.now += 1
+    rates = meter.rates()
+    assert all(abs(rates[m] - 120) < 5 for m in ('m1', 'm5', 'm15'))
+    assert abs(rates['mean'] - 120) < 1
+
+    clock.now += 600            # 10 min parado: a taxa de 1 min vai a ~0
+    assert meter.rates()['m1'] < 1
+    assert meter.rates()['m15'] > meter.rates()['m1']
+
+
+def test_tracker_uses_meters(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    for _ in range(5):
+        tracker.track_query()
+    tracker.track_llm_call(1.0, 700, 300, model="gpt-4o-mini")
+    assert tracker.calculate_throughput() == 5
+    rates = tracker.get_summary()['summary']['rates_per_minute']
+    assert rates['tokens']['count'] == 1000
+    assert rates['queries']['count'] == 5
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Testes do decorator/context manager de tempo (metrics/timing.py).
+"""
+import asyncio
+import random
+
+import pytest
+
+from metrics import MetricsTracker, timed, track_timing, configure_timing
+from metrics import timing
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr("metrics.metrics_tracker.global_tracker", tracker)
+    monkeypatch.setattr(timing, "_rates", {})
+    yield tracker
+    configure_timing(enabled=True, default_rate=1.0)
+
+
+def operations(tracker):
+    return [row['operation'] for row in tracker.metrics['timings']]
+
+
+def test_sync_async_and_generators_are_recorded(tracker):
+    @timed("sync.op")
+    def add(a, b=1):
+        """Soma."""
+        return a + b
+
+    @timed("async.op")
+    async def fetch(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    @timed("gen.op")
+    def count(n):
+        yield from range(n)
+
+    @timed("agen.op")
+    async def acount(n):
+        for i in range(n):
+            yield i
+
+    async def consume():
+        return [i async for i in acount(3)]
+
+    assert add(1, b=2) == 3
+    assert asyncio.run(fetch(21)) == 42
+    assert list(count(3)) == [0, 1, 2]
+    assert asyncio.run(consume()) == [0, 1, 2]
+
+    # Metadados preservados
+    assert add.__name__ == "add" and add.__doc__ == "Soma."
+    assert add.__wrapped__(1) == 2
+    assert asyncio.iscoroutinefunction(fetch)
+
+    assert operations(tracker) == ["sync.op", "async.op", "gen.op", "agen.op"]
+    timings = tracker.get_summary()['summary']['timings']
+    assert timings['sync.op']['count'] == 1
+    assert {span.name for span in tracker.tracer.spans()} == set(operations(tracker))
+
+
+def test_context_manager_and_failures(tracker):
+    with pytest.raises(RuntimeError):
+        with timed("block.op", kind="tool"):
+            with timed("inner.op"):
+                pass
+            raise RuntimeError("falhou")
+
+    rows = {row['operation']: row for row in tracker.metrics['timings']}
+    assert rows['inner.op']['success'] is True
+    assert rows['block.op']['success'] is False
+    spans = {span.name: span for span in tracker.tracer.spans()}
+    assert spans['inner.op'].parent_id == spans['block.op'].span_id
+    assert spans['block.op'].status == 'error' and spans['block.op'].kind == 'tool'
+
+
+def test_sampling_weights_histogram(tracker):
+    random.seed(7)
+
+    @timed("sampled.op", sample_rate=0.25, span=False)
+    def work():
+        return 1
+
+    for _ in range(2000):
+        work()
+
+    recorded = tracker._recorder.count('timings')
+    assert 350 < recorded < 650
+    histogram = tracker.get_timing_histograms()['sampled.op']
+    assert histogram.count == recorded * 4          # peso 1/taxa
+    assert not tracker.tracer.spans()
+
+    # Agregados sobrevivem ao drain dos sinks
+    tracker.drain('timings')
+    assert tracker.get_timing_histograms()['sampled.op'].count == recorded * 4
+
+
+def test_per_operation_rates_and_disable(tracker):
+    @timed("hot.path")
+    def hot():
+        return "ok"
+
+    configure_timing(rates={"hot.path": 0.0})
+    assert hot() == "ok"
+    assert timing.get_sample_rates()["hot.path"] == 0.0
+
+    configure_timing(rates={"hot.path": 1.0}, enabled=False)
+    assert hot() == "ok"
+    assert tracker._recorder.count('timings') == 0
+
+    configure_timing(enabled=True)
+    hot()
+    assert operations(tracker) == ["hot.path"]
+
+
+def test_track_timing_alias_records_instead_of_printing(tracker, capsys):
+    @track_timing("retrieval_stage")
+    def stage():
+        return 5
+
+    assert stage() == 5
+    assert capsys.readouterr().out == ""
+    assert operations(tracker) == ["retrieval_stage"]
+
+
+def test_parse_rates():
+    assert timing._parse_rates("vector_store.search=0.1, embedding=0.5,") == {
+        "vector_store.search": 0.1, "embedding": 0.5,
+    }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Testes da atribuição de tokens do prompt por seção (metrics/token_attribution.py).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import MetricsTracker, merge_summaries, load_metrics
+from metrics.sinks import JSONLSink
+from metrics import token_attribution
+from metrics.token_attribution import (
+    attribute_prompt,
+    count_tokens,
+    known_sections,
+    register_section,
+    segment_messages,
+    task_label,
+)
+
+
+FEW_SHOT = "Example of an excellent PRD:\n# PRD: Todo CLI\n- FR-1: add tasks\n- FR-2: list tasks"
+BACKSTORY = f"You are an experienced Product Manager.\nUse this as inspiration:\n{FEW_SHOT}\nBe precise."
+KB = "### prd_template.md (linhas 1-20, Score: 0.91)\n## Goals\n## Functional requirements"
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(token_attribution, "_registered", {})
+
+
+def crew_objects():
+    prd = SimpleNamespace(output=SimpleNamespace(raw="# PRD\nFR-1 add, FR-2 list, FR-3 done"))
+    task = SimpleNamespace(
+        description=f"Design the architecture for the todo CLI.\n\nKNOWLEDGE BASE CONTEXT:\n\n{KB}",
+        expected_output="A complete architecture.md document",
+        context=[prd],
+    )
+    agent = SimpleNamespace(role="Software Architect", goal="Design robust architectures",
+                            backstory=BACKSTORY)
+    return agent, task, prd
+
+
+def messages(agent, task, prd):
+    system = (f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+              "\nYou ONLY have access to the following tools...")
+    user = (f"\nCurrent Task: {task.description}\n\nThis is the expected criteria for your "
+            f"final answer: {task.expected_output}\nyou MUST return the actual complete content"
+            f"\n\nThis is the context you're working with:\n{prd.output.raw}\n\nBegin!")
+    assistant = ("Thought: I should look for patterns\nAction: retrieve_context\n"
+                 "Action Input: {\"query\": \"cli architecture\"}\n"
+                 "Observation: Layered CLI architecture: cli.py, service.py, storage.py\n"
+                 "Thought: now read the PRD\nAction: read_file\nAction Input: {}\n"
+                 "Observation: # PRD file contents")
+    return [{'role': 'system', 'content': system}, {'role': 'user', 'content': user},
+            {'role': 'assistant', 'content': assistant}]
+
+
+def test_segments_are_labelled_by_priority_and_cover_the_prompt():
+    register_section("few_shot:PRD_EXAMPLE", FEW_SHOT)
+    register_section("rag_context", KB)
+    agent, task, prd = crew_objects()
+    prompt = messages(agent, task, prd)
+
+    segments = segment_messages(prompt, known_sections(agent, task))
+    by_label = {}
+    for label, text in segments:
+        by_label.setdefault(label, []).append(text)
+
+    # Nada se perde nem se duplica: os trechos recompõem as mensagens
+    assert "".join(text for _, text in segments) == "".join(m['content'] for m in prompt)
+    assert by_label["few_shot:PRD_EXAMPLE"] == [FEW_SHOT]
+    # Backstory sem o few-shot embutido nele
+    assert "".join(by_label["backstory"]).replace(" ", "") == \
+        BACKSTORY.replace(FEW_SHOT, "").replace(" ", "")
+    assert by_label["rag_context"][0] == KB
+    assert any("Layered CLI" in text for text in by_label["rag_context"])
+    assert by_label["tool_results"] == [" # PRD file contents"]
+    assert by_label["task_context"] == [prd.output.raw]
+    assert by_label["expected_output"] == [task.expected_output]
+    assert "Design the architecture" in by_label["task_description"][0]
+    assert any("Thought: I should" in text for text in by_label["agent_scratchpad"])
+    assert any("ONLY have access" in text for text in by_label["framework"])
+
+
+def test_attribute_prompt_counts_each_segment():
+    register_section("few_shot:PRD_EXAMPLE", FEW_SHOT)
+    agent, task, prd = crew_objects()
+    prompt = messages(agent, task, prd)
+    counts = attribute_prompt(prompt, "gpt-4o-mini", known_sections(agent, task))
+    assert counts["few_shot:PRD_EXAMPLE"] == count_tokens(FEW_SHOT, "gpt-4o-mini")
+    assert counts["message_overhead"] == 3 * 3 + 3
+    assert sum(counts.values()) >= count_tokens(
+        "".join(m['content'] for m in prompt), "gpt-4o-mini") * 0.9
+
+    # Prompt em texto e mensagens role=tool (function calling)
+    assert set(attribute_prompt("just a prompt")) == {"framework", "message_overhead"}
+    tool = attribute_prompt([{'role': 'tool', 'name': 'semantic_search', 'content': KB}])
+    assert tool["rag_context"] == count_tokens(KB)
+    assert task_label("Create PRD for the project\nwith details") == "Create PRD for the project"
+
+
+def test_tracker_aggregates_sections_per_agent_and_task(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    tracker.attach_sinks([JSONLSink(tmp_path / "events.jsonl")], interval=60)
+    tracker.track_prompt_sections("Architect", "Design", "gpt-4o-mini",
+                                  {'backstory': 1000, 'rag_context': 3000})
+    tracker.flush()   # parte dos eventos nos agregados drenados
+    tracker.track_prompt_sections("Architect", "Design", "gpt-4o-mini",
+                                  {'backstory': 1000, 'tool_results': 500})
+    tracker.track_prompt_sections("Engineer", "Implement", "llama3", {'task_context': 200})
+
+    summary = tracker.get_summary()
+    assert summary['summary']['prompt_tokens_by_section'] == {
+        'rag_context': 3000, 'backstory': 2000, 'tool_results': 500, 'task_context': 200}
+    design = summary['detailed_metrics']['prompt_attribution']['Architect']['Design']
+    assert design['calls'] == 2 and design['tokens'] == 5500
+    # gpt-4o-mini: 0.15 USD / 1M tokens de entrada
+    assert design['sections']['rag_context']['cost'] == pytest.approx(3000 * 0.15 / 1e6)
+    assert summary['detailed_metrics']['prompt_attribution']['Engineer']['Implement']['cost'] == 0
+    tracker.print_summary()
+    tracker.close()
+
+    reloaded = load_metrics(tmp_path / "events.jsonl", output_dir=str(tmp_path))
+    assert reloaded.get_prompt_tokens_by_section() == summary['summary']['prompt_tokens_by_section']
+    merged = merge_summaries([summary, reloaded.get_summary()])
+    assert merged['summary']['prompt_tokens_by_section']['rag_context'] == 6000
+    assert merged['detailed_metrics']['prompt_attribution']['Architect']['Design']['calls'] == 4
+
+
+def test_crewai_llm_started_event_is_attributed(tmp_path, monkeypatch):
+    pytest.importorskip("crewai.events")
+    from crewai.events import crewai_event_bus, LLMCallStartedEvent
+
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr(token_attribution, "_crewai_installed", False)
+    agent, task, prd = crew_objects()
+    monkeypatch.setattr(token_attribution, "_agents", {"a1": agent})
+    monkeypatch.setattr(token_attribution, "_tasks", {"t1": task})
+
+    with crewai_event_bus.scoped_handlers():
+        token_attribution.install_crewai_prompt_hooks(tracker)
+        event = LLMCallStartedEvent(call_id="c", model="gpt-4o-mini",
+                                    messages=messages(agent, task, prd))
+        event.agent_id, event.agent_role = "a1", "Software Architect"
+        event.task_id, event.task_name = "t1", task.description
+        future = crewai_event_bus.emit(None, event)
+        if future is not None:
+            future.result(timeout=5)
+
+    attribution = tracker.get_prompt_attribution()
+    stats = attribution["Software Architect"]["Design the architecture for the todo CLI."]
+    assert stats['sections']['backstory']['tokens'] > 0
+    assert stats['sections']['task_context']['tokens'] > 0
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Testes dos spans hierárquicos e da exportação de traces (metrics/tracing.py).
+"""
+import json
+
+import pytest
+
+from metrics import MetricsTracker, Tracer, traced
+from metrics.llm_hooks import LLMCallTimer
+
+
+def by_name(tracer):
+    return {s.name: s for s in tracer.spans()}
+
+
+def test_nested_spans_link_parents_and_mark_errors():
+    tracer = Tracer()
+    with tracer.span("crew.run", kind="crew", project="calc"):
+        with tracer.span("tool: semantic_search", kind="tool", query="arquitetura"):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("tool: write_file", kind="tool"):
+                raise ValueError("disco cheio")
+
+    spans = by_name(tracer)
+    crew = spans["crew.run"]
+    assert crew.parent_id is None
+    assert spans["tool: semantic_search"].parent_id == crew.span_id
+    assert spans["tool: semantic_search"].trace_id == crew.trace_id
+    failed = spans["tool: write_file"]
+    assert failed.status == 'error' and "disco cheio" in failed.attributes['error']
+    assert crew.start_ns <= failed.start_ns and failed.end_ns <= crew.end_ns
+
+
+def test_event_scopes_become_parents():
+    tracer = Tracer()
+    with tracer.span("crew.run", kind="crew") as crew:
+        task = tracer.start_span("task: PRD", "task", key=('task', '1'))
+        agent = tracer.start_span("agent: PM", "agent", parent=task, key=('agent', '1'))
+        # Tool executada no contexto da crew: o pai é o escopo aberto mais recente
+        with tracer.span("tool: retrieve_context", kind="tool") as tool:
+            assert tracer.current_span() is tool
+        tracer.record_span("llm: gpt-4o-mini", "llm", agent.start_ns, agent.start_ns + 10**6)
+        tracer.end_scope(('agent', '1'))
+        tracer.end_scope(('task', '1'))
+        assert tracer.current_span() is crew
+
+    spans = by_name(tracer)
+    assert spans["task: PRD"].parent_id == crew.span_id
+    assert spans["tool: retrieve_context"].parent_id == agent.span_id
+    assert spans["llm: gpt-4o-mini"].parent_id == agent.span_id
+    assert spans["llm: gpt-4o-mini"].duration == pytest.approx(0.001)
+
+
+def test_traced_records_selected_args(tmp_path, monkeypatch):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr("metrics.metrics_tracker.global_tracker", tracker)
+
+    @traced("tool: search", kind="tool", record_args=("query", "top_k"))
+    def search(query: str, top_k: int = 5, secret: str = "") -> str:
+        """Busca."""
+        return query * top_k
+
+    assert search("ab", 2, secret="x") == "abab"
+    assert search.__name__ == "search" and search.__doc__ == "Busca."
+    span, = tracker.tracer.spans()
+    assert span.attributes == {'query': "ab", 'top_k': 2}
+
+
+def test_llm_timer_emits_span_under_current_scope(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    timer = LLMCallTimer(tracker)
+    with tracker.tracer.span("tool: semantic_search", kind="tool") as tool:
+        timer.start("c1", "gpt-4o-mini", at=10.0)
+    timer.finish("c1", {'prompt_tokens': 5, 'completion_tokens': 1}, at=10.5)
+
+    llm = by_name(tracker.tracer)["llm: gpt-4o-mini"]
+    assert llm.parent_id == tool.span_id
+    assert llm.kind == "llm" and llm.attributes['tokens_prompt'] == 5
+    assert llm.duration == pytest.approx(0.5)
+
+
+def test_chrome_and_otlp_export(tmp_path):
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    with tracker.tracer.span("crew.run", kind="crew", project="calc"):
+        with tracker.tracer.span("llm: gpt-4o", kind="llm", tokens=12):
+            pass
+
+    chrome = tracker.tracer.to_chrome_trace()
+    complete = [e for e in chrome['traceEvents'] if e['ph'] == 'X']
+    assert [e['name'] for e in complete] == ["crew.run", "llm: gpt-4o"]
+    assert complete[0]['ts'] == 0 and complete[1]['cat'] == "llm"
+    assert complete[1]['args']['parent_id'] == complete[0]['args']['span_id']
+
+    otlp = tracker.tracer.to_otlp()
+    spans = otlp['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert len(spans[0]['traceId']) == 32 and len(spans[0]['spanId']) == 16
+    assert 'parentSpanId' not in spans[0]
+    assert spans[1]['parentSpanId'] == spans[0]['spanId']
+    assert spans[1]['kind'] == 3
+    assert {'key': 'tokens', 'value': {'intValue': '12'}} in spans[1]['attributes']
+
+    path = tracker.save_metrics("run.json")
+    saved = json.loads(path.read_text())
+    assert json.loads((tmp_path / "run.trace.json").read_text())['traceEvents']
+    assert saved['traces']['otlp'].endswith("run.otlp.json")
+
+
+def test_crewai_task_and_agent_events_open_spans(tmp_path, monkeypatch):
+    pytest.importorskip("crewai.events")
+    from crewai.events import crewai_event_bus, TaskStartedEvent, TaskCompletedEvent
+    from crewai.tasks.task_output import TaskOutput
+    from metrics import tracing
+
+    tracker = MetricsTracker(output_dir=str(tmp_path))
+    monkeypatch.setattr("metrics.metrics_tracker.global_tracker", tracker)
+    monkeypatch.setattr(tracing, "_crewai_installed", False)
+
+    def emit(event):
+        future = crewai_event_bus.emit(None, event)
+        if future is not None:
+            future.result(timeout=5)
+
+    with crewai_event_bus.scoped_handlers():
+        tracing.install_crewai_trace_hooks()
+        with tracker.tracer.span("crew.run", kind="crew") as crew:
+            emit(TaskStartedEvent(context=None, task_id="t1", task_name="Create PRD"))
+            with tracker.tracer.span("tool: retrieve_context", kind="tool"):
+                pass
+            output = TaskOutput(description="Create PRD", agent="PM", raw="# PRD")
+            emit(TaskCompletedEvent(output=output, task_id="t1", task_name="Create PRD"))
+
+    spans = by_name(tracker.tracer)
+    task = spans["task: Create PRD"]
+    assert task.parent_id == crew.span_id
+    assert spans["tool: retrieve_context"].parent_id == task.span_id
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Testes do chunking por símbolo usado no índice do workspace.
+Não faz chamadas à API.
+"""
+import os
+import sys
+import subprocess
+import zlib
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from rag import workspace_index
+from rag.vector_store import VectorStore
+from rag.workspace_index import (
+    WorkspaceIndex,
+    activate_workspace_index,
+    chunk_by_symbol,
+    project_collection_name,
+    workspace_source,
+)
+
+
+PYTHON_SOURCE = '''import json
+
+DEFAULT_PATH = "tasks.json"
+
+
+def load_tasks(path=DEFAULT_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TaskManager:
+    def add(self, title):
+        return title
+
+    def done(self, task_id):
+        return task_id
+
+
+if __name__ == "__main__":
+    print(load_tasks())
+'''
+
+MARKDOWN_SOURCE = '''# Todo CLI
+
+Intro text.
+
+## Installation
+
+```bash
+# not a heading
+pip install todo
+```
+
+## Usage
+
+Run `todo add`.
+'''
+
+
+def test_python_chunks_by_symbol():
+    chunks = chunk_by_symbol("todo/cli.py", PYTHON_SOURCE)
+    symbols = [c['metadata']['symbol'] for c in chunks]
+
+    assert symbols == ['<module>', 'load_tasks', 'TaskManager']
+    load = chunks[1]['metadata']
+    assert (load['start_line'], load['end_line']) == (6, 8)
+    assert load['source'] == "todo/cli.py"
+    assert 'def load_tasks' in chunks[1]['content']
+    assert '__main__' in chunks[0]['content']
+
+
+def test_markdown_chunks_by_heading():
+    chunks = chunk_by_symbol("README.md", MARKDOWN_SOURCE)
+    symbols = [c['metadata']['symbol'] for c in chunks]
+
+    assert symbols == ['Todo CLI', 'Installation', 'Usage']
+    assert 'pip install todo' in chunks[1]['content']
+
+
+def test_javascript_and_fallback_chunks():
+    js = "const x = 1;\n\nfunction shorten(url) {\n  return url;\n}\n\nexport class Cache {\n}\n"
+    symbols = [c['metadata']['symbol'] for c in chunk_by_symbol("src/app.js", js)]
+    assert symbols == ['x', 'shorten', 'Cache']
+
+    broken = "def broken(:\n    pass\n"
+    chunks = chunk_by_symbol("bad.py", broken)
+    assert chunks[0]['metadata']['kind'] == 'lines'
+
+    assert chunk_by_symbol("empty.py", "") == []
+
+
+def test_project_collection_name_is_stable():
+    name = project_collection_name("crie uma aplicação CLI de tarefas")
+    assert name == project_collection_name("crie uma aplicação CLI de tarefas")
+    assert name.startswith("workspace_crie_uma_aplicacao_cli_de_tarefas_")
+    assert name != project_collection_name("outro projeto")
+
+
+def fake_embeddings(self, texts):
+    return np.array([np.random.default_rng(zlib.crc32(t.encode())).random(self.dimension)
+                     for t in texts], dtype=np.float32)
+
+
+def test_workspace_source_is_relative_to_the_workspace(tmp_path):
+    for path in ("src/a.py", "./src/a.py", "src//a.py", "src/../src/a.py",
+                 str(tmp_path / "src" / "a.py")):
+        assert workspace_source(path, tmp_path) == "src/a.py"
+
+
+def test_same_file_is_indexed_once_and_stale_files_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(VectorStore, "get_embeddings_batch", fake_embeddings)
+    monkeypatch.setattr(workspace_index, "WORKSPACE_PERSIST_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(workspace_index, "_workspace_index", None)
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / "src" / "a.py").write_text(PYTHON_SOURCE)
+    (workspace / "old.md").write_text(MARKDOWN_SOURCE)
+
+    index = WorkspaceIndex("workspace_test", workspace_dir=workspace)
+    index.index_file("old.md", MARKDOWN_SOURCE)
+    for path in ("./src/a.py", "src//a.py", "src/a.py"):
+        index.index_file(path, PYTHON_SOURCE)
+    index.flush()
+    sources = {m['source'] for m in index.vector_store.metadata}
+    assert sources == {"src/a.py", "old.md"}
+    assert len(index.vector_store.documents) == len(chunk_by_symbol("src/a.py", PYTHON_SOURCE)) \
+        + len(chunk_by_symbol("old.md", MARKDOWN_SOURCE))
+
+    # Nova execução do mesmo projeto: old.md não existe mais no workspace
+    (workspace / "old.md").unlink()
+    monkeypatch.setattr(workspace_index, "project_collection_name", lambda idea: "workspace_test")
+    active = activate_workspace_index("projeto", workspace)
+    active.flush()
+    assert {m['source'] for m in active.vector_store.metadata} == {"src/a.py"}
+
+
+def test_tools_do_not_import_rag():
+    code = "import sys, tools; print(any(m.split('.')[0] in ('rag', 'faiss') for m in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True,
+                            text=True, env={**os.environ, "OPENAI_API_KEY": "sk-test"})
+    assert result.stdout.strip().splitlines()[-1] == "False"
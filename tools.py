@@ -3,12 +3,15 @@
 Custom tools for CrewAI agents that save files in the workspace directory.
 These tools will be properly tracked by AgentOps as "Tool" type.
 """
+import sys
 from crewai.tools import tool
 from pathlib import Path
 import config
+from metrics.tracing import traced
 
 
 @tool("write_file")
+@traced("tool: write_file", kind="tool", record_args=("file_path",))
 def write_file_tool(file_path: str, content: str) -> str:
     """
     Write content to a file in the workspace directory.
@@ -30,12 +33,20 @@ def write_file_tool(file_path: str, content: str) -> str:
         # Write file
         full_path.write_text(content, encoding='utf-8')
 
+        # Index by symbol into the project's workspace collection (async, no-op if inactive).
+        # Looked up lazily: an index can only be active if the RAG package was loaded,
+        # so runs without RAG never import FAISS/OpenAI through this tool
+        workspace_index = sys.modules.get("rag.workspace_index")
+        if workspace_index is not None:
+            workspace_index.index_workspace_file(file_path, content)
+
         return f"✅ Successfully wrote {len(content)} characters to workspace/{file_path}"
     except Exception as e:
         return f"❌ Error writing file: {str(e)}"
 
 
 @tool("read_file")
+@traced("tool: read_file", kind="tool", record_args=("file_path",))
 def read_file_tool(file_path: str) -> str:
     """
     Read content from a file in the workspace directory.
@@ -59,6 +70,7 @@ def read_file_tool(file_path: str) -> str:
 
 
 @tool("list_files")
+@traced("tool: list_files", kind="tool", record_args=("directory",))
 def list_files_tool(directory: str = ".") -> str:
     """
     List all files in a directory within the workspace.
@@ -90,6 +102,7 @@ def list_files_tool(directory: str = ".") -> str:
 
 
 @tool("create_directory")
+@traced("tool: create_directory", kind="tool", record_args=("directory_path",))
 def create_directory_tool(directory_path: str) -> str:
     """
     Create a directory in the workspace.